@@ -13,6 +13,7 @@ AI 基础服务模块 - LLM 调用层
 
 import asyncio
 import hashlib
+import inspect
 import json
 import logging
 import math
@@ -20,7 +21,7 @@ import os
 import re
 import sys
 import time
-from collections.abc import AsyncIterator, Callable
+from collections.abc import AsyncIterator, Awaitable, Callable
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 from urllib.parse import urlparse
@@ -39,14 +40,19 @@ from openai import (
 
 from ai_capacity import (
     ModelCapacityCoolingDown,
+    current_admission,
     get_provider_capacity_controller,
 )
 from ai_provider_route import (
     record_fallback_switch,
     record_primary_recovered,
 )
+from generation_telemetry import current_label as _generation_label
 from generation_telemetry import record_call as _record_generation_call
 from generation_telemetry import telemetry_enabled as _generation_telemetry_on
+from llm_response_cache import get_llm_response_cache
+from metrics import observe_llm_call
+from model_latency import get_model_latency_tracker
 
 # 添加项目根目录到系统路径以导入共享配置
 project_root = Path(__file__).parent.parent
@@ -393,6 +399,28 @@ class AIBase:
             return None
         return (int(prompt_tokens or 0), int(completion_tokens or 0))
 
+    @staticmethod
+    def _chunk_cached_tokens(chunk: Any) -> int | None:
+        """Return prompt tokens served from the provider's prefix cache.
+
+        DeepSeek reports ``prompt_cache_hit_tokens``; OpenAI-compatible
+        providers report ``prompt_tokens_details.cached_tokens``.  ``None``
+        means the provider said nothing, which is not the same as zero hits.
+        """
+        usage = getattr(chunk, "usage", None)
+        if usage is None:
+            return None
+        hit_tokens = getattr(usage, "prompt_cache_hit_tokens", None)
+        if hit_tokens is None:
+            details = getattr(usage, "prompt_tokens_details", None)
+            hit_tokens = getattr(details, "cached_tokens", None)
+        if hit_tokens is None:
+            return None
+        try:
+            return max(0, int(hit_tokens))
+        except (TypeError, ValueError):
+            return None
+
     def _supports_stream_usage(self, model_id: str | None = None) -> bool:
         return (
             (urlparse(self.api_base).hostname or "").casefold(),
@@ -502,7 +530,8 @@ class AIBase:
             failure_key = (provider_scope, model)
             if self._model_failure_cache.get(failure_key, 0) <= now:
                 self._model_failure_cache.pop(failure_key, None)
-        return available
+        # 首选模型首 token 明显更慢时让位给更快的候选，见 model_latency。
+        return get_model_latency_tracker().order(provider_scope, available)
 
     def _remember_model(
         self,
@@ -1246,6 +1275,7 @@ class AIBase:
         model_role: str | None,
         on_stream_activity: Callable[[], None] | None,
         telemetry_sink: Callable[[dict], None] | None,
+        completion_state: dict[str, Any] | None = None,
     ) -> str | None:
         if not self._modelscope_fallback_available():
             if raise_on_failure:
@@ -1298,6 +1328,25 @@ class AIBase:
                     output: str = "",
                     error: Exception | None = None,
                 ) -> None:
+                    observe_llm_call(
+                        model_id=model_id,
+                        model_role=model_role or "",
+                        stream=False,
+                        status=status,
+                        duration_s=time.perf_counter() - attempt_started,
+                        ttfb_s=None,
+                        input_tokens=(
+                            estimated_input_tokens
+                            if physical_request_count
+                            else 0
+                        ),
+                        output_tokens=(
+                            self.estimate_request_tokens(output, "")
+                            if output
+                            else 0
+                        ),
+                        tokens_source="estimate",
+                    )
                     if telemetry_sink is None:
                         return
                     try:
@@ -1407,6 +1456,8 @@ class AIBase:
                     finally:
                         await lease.release()
 
+                    if truncated and completion_state is not None:
+                        completion_state["truncated"] = True
                     if truncated and reject_truncated:
                         raise AIResponseTruncated(
                             "ModelScope fallback output reached max_tokens="
@@ -1670,6 +1721,241 @@ class AIBase:
             raise AIProviderRequestError(str(last_error)) from last_error
         raise AIProviderRequestError("ModelScope fallback has no available model")
 
+    def _observe_latency(
+        self,
+        model_id: str,
+        metric: str,
+        started: float,
+        *,
+        censored: bool = False,
+    ) -> None:
+        get_model_latency_tracker().observe(
+            self._primary_provider_scope(),
+            model_id,
+            metric,
+            (time.perf_counter() - started) * 1000,
+            censored=censored,
+        )
+
+    @staticmethod
+    async def _close_stream_response(response: Any) -> None:
+        close = getattr(response, "close", None)
+        if close is None:
+            return
+        try:
+            result = close()
+            if inspect.isawaitable(result):
+                await result
+        except Exception:
+            logger.debug("Closing an abandoned provider stream failed", exc_info=True)
+
+    def _hedge_plan(
+        self,
+        *,
+        use_fast_model: bool,
+        model_role: str | None,
+        json_mode: bool,
+        metric: str,
+    ) -> tuple[str, float] | None:
+        """``(补发模型, 等待秒数)``；不满足对冲条件时返回 ``None``。
+
+        只对延迟敏感的调用对冲：``interactive`` 准入类（AI 老师、单块重生成）
+        和快速模型上的短 JSON 调用。
+        """
+        tracker = get_model_latency_tracker()
+        if not tracker.hedging or not self.api_key or self._provider_failure:
+            return None
+        if not (
+            current_admission().priority == "interactive"
+            or (json_mode and use_fast_model)
+        ):
+            return None
+        models = self._models_for(use_fast_model, model_role)
+        if len(models) < 2:
+            return None
+        delay = tracker.hedge_delay_seconds(
+            self._primary_provider_scope(),
+            models[0],
+            metric,
+        )
+        if delay is None:
+            return None
+        return models[1], delay
+
+    def _hedge_admissible(self, model_id: str) -> bool:
+        """补发只用空闲容量：要排队才能发出的对冲不如不发。"""
+        tracker = get_model_latency_tracker()
+        capacity = get_provider_capacity_controller(
+            self._primary_provider_scope()
+        )
+        if capacity.has_headroom(model_id):
+            tracker.count_hedge("started")
+            return True
+        tracker.count_hedge("skipped_no_headroom")
+        return False
+
+    async def _hedged_call(
+        self,
+        primary: Callable[[], Awaitable[Optional[str]]],
+        hedge: Callable[[], Awaitable[Optional[str]]],
+        *,
+        hedge_model: str,
+        delay: float,
+    ) -> Optional[str]:
+        """先发主请求；``delay`` 秒内没结果再补发，先拿到正文的一方胜出。
+
+        两边都没有正文时以主请求的结果（含异常）为准，补发永远不改变失败语义。
+        """
+        tracker = get_model_latency_tracker()
+        primary_task = asyncio.ensure_future(primary())
+        hedge_task: asyncio.Future | None = None
+        try:
+            done, _pending = await asyncio.wait({primary_task}, timeout=delay)
+            if done or not self._hedge_admissible(hedge_model):
+                return await primary_task
+            hedge_task = asyncio.ensure_future(hedge())
+            pending = {primary_task, hedge_task}
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                for task in (primary_task, hedge_task):
+                    if (
+                        task in done
+                        and task.exception() is None
+                        and task.result()
+                    ):
+                        tracker.count_hedge(
+                            "won" if task is hedge_task else "lost"
+                        )
+                        return task.result()
+            return primary_task.result()
+        finally:
+            started = [
+                task for task in (primary_task, hedge_task) if task is not None
+            ]
+            for task in started:
+                if not task.done():
+                    task.cancel()
+            await asyncio.gather(*started, return_exceptions=True)
+
+    async def _hedged_stream(
+        self,
+        primary: AsyncIterator[str],
+        hedge: Callable[[], AsyncIterator[str]],
+        *,
+        hedge_model: str,
+        delay: float,
+    ) -> AsyncIterator[str]:
+        """流式版对冲：先吐出首个正文分片的一路胜出，另一路立即取消。
+
+        胜负在首个分片处就定了，之后只转发胜者，不会出现两路正文交错。
+        """
+        tracker = get_model_latency_tracker()
+        queue: asyncio.Queue[tuple[int, str | None, Exception | None]] = (
+            asyncio.Queue()
+        )
+
+        async def pump(index: int, stream: AsyncIterator[str]) -> None:
+            try:
+                async for chunk in stream:
+                    await queue.put((index, chunk, None))
+                await queue.put((index, None, None))
+            except Exception as exc:
+                await queue.put((index, None, exc))
+
+        loop = asyncio.get_running_loop()
+        deadline: float | None = loop.time() + delay
+        tasks = {0: asyncio.ensure_future(pump(0, primary))}
+        finished: dict[int, Exception | None] = {}
+        winner: int | None = None
+        getter: asyncio.Future | None = None
+        try:
+            while True:
+                if getter is None:
+                    getter = asyncio.ensure_future(queue.get())
+                timeout = (
+                    max(0.0, deadline - loop.time())
+                    if winner is None and deadline is not None
+                    else None
+                )
+                done, _pending = await asyncio.wait({getter}, timeout=timeout)
+                if not done:
+                    deadline = None
+                    if self._hedge_admissible(hedge_model):
+                        tasks[1] = asyncio.ensure_future(pump(1, hedge()))
+                    continue
+                index, chunk, error = getter.result()
+                getter = None
+                if winner is None:
+                    if chunk is not None:
+                        winner = index
+                        for other, task in tasks.items():
+                            if other != winner:
+                                task.cancel()
+                        if 1 in tasks:
+                            tracker.count_hedge("won" if winner == 1 else "lost")
+                        yield chunk
+                        continue
+                    finished[index] = error
+                    if index == 0 and 1 not in tasks:
+                        # 主请求没出正文就结束了，它自己已经换过模型；
+                        # 此时再补发只会重复同样的失败。
+                        deadline = None
+                    if set(finished) != set(tasks) or deadline is not None:
+                        continue
+                    outcome = finished.get(0)
+                    if outcome is not None:
+                        raise outcome
+                    return
+                if index != winner:
+                    continue
+                if chunk is None:
+                    if error is not None:
+                        raise error
+                    return
+                yield chunk
+        finally:
+            if getter is not None and not getter.done():
+                getter.cancel()
+            for task in tasks.values():
+                if not task.done():
+                    task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+
+    def _response_cache_key(
+        self,
+        *,
+        prompt: str,
+        system_prompt: str,
+        use_fast_model: bool,
+        model_role: str | None,
+        json_mode: bool,
+        enable_thinking: bool,
+        max_tokens: int | None,
+        max_input_tokens: int | None,
+        max_input_chars: int | None,
+    ) -> str | None:
+        """Content address of a request, or ``None`` when caching is off for it."""
+        cache = get_llm_response_cache()
+        if not cache.applies_to(
+            _generation_label().get("stage", ""),
+            type(self).__name__,
+        ):
+            return None
+        return cache.request_key(
+            models=self.fast_models if use_fast_model else self.smart_models,
+            model_role=model_role,
+            system_prompt=system_prompt,
+            prompt=prompt,
+            json_mode=json_mode,
+            enable_thinking=enable_thinking,
+            max_tokens=max_tokens or self.max_tokens,
+            max_input_tokens=max_input_tokens,
+            max_input_chars=max_input_chars,
+        )
+
     async def _call_llm(
         self,
         prompt: str,
@@ -1690,6 +1976,130 @@ class AIBase:
     ) -> Optional[str]:
         """
         通用 LLM 调用函数。
+
+        开启 ``LLM_RESPONSE_CACHE`` 时先查响应缓存 / 回放记录，见
+        :mod:`llm_response_cache`；未命中才交给 :meth:`_call_provider_llm`。
+        开启 ``AI_HEDGE_REQUESTS`` 时，延迟敏感的调用超过主模型学到的耗时
+        分位仍无结果会向下一个模型补发，见 :mod:`model_latency`。
+        参数与返回值同 :meth:`_call_provider_llm`。
+        """
+
+        # 截断的响应可以照常返回给调用方，但不能写进缓存；provider 调用在
+        # 这里回报是否截断。对冲两路共用一份，任一路截断都不缓存。
+        completion_state: dict[str, Any] = {}
+
+        def provider_call() -> Awaitable[Optional[str]]:
+            return self._call_provider_llm(
+                prompt,
+                system_prompt,
+                use_fast_model=use_fast_model,
+                retry_count=retry_count,
+                enable_thinking=enable_thinking,
+                max_tokens=max_tokens,
+                max_input_tokens=max_input_tokens,
+                max_input_chars=max_input_chars,
+                max_attempts=max_attempts,
+                reject_truncated=reject_truncated,
+                raise_on_failure=raise_on_failure,
+                json_mode=json_mode,
+                model_role=model_role,
+                on_stream_activity=on_stream_activity,
+                telemetry_sink=telemetry_sink,
+                completion_state=completion_state,
+            )
+
+        hedge_plan = self._hedge_plan(
+            use_fast_model=use_fast_model,
+            model_role=model_role,
+            json_mode=json_mode,
+            metric="total",
+        )
+        call_provider = provider_call
+        if hedge_plan is not None:
+            hedge_model, hedge_delay = hedge_plan
+
+            def hedge_call() -> Awaitable[Optional[str]]:
+                return self._call_provider_llm(
+                    prompt,
+                    system_prompt,
+                    use_fast_model=use_fast_model,
+                    retry_count=1,
+                    enable_thinking=enable_thinking,
+                    max_tokens=max_tokens,
+                    max_input_tokens=max_input_tokens,
+                    max_input_chars=max_input_chars,
+                    max_attempts=1,
+                    reject_truncated=reject_truncated,
+                    json_mode=json_mode,
+                    model_role=model_role,
+                    on_stream_activity=on_stream_activity,
+                    telemetry_sink=telemetry_sink,
+                    models=[hedge_model],
+                    completion_state=completion_state,
+                )
+
+            def hedged_provider_call() -> Awaitable[Optional[str]]:
+                return self._hedged_call(
+                    provider_call,
+                    hedge_call,
+                    hedge_model=hedge_model,
+                    delay=hedge_delay,
+                )
+
+            call_provider = hedged_provider_call
+
+        cache_key = self._response_cache_key(
+            prompt=prompt,
+            system_prompt=system_prompt,
+            use_fast_model=use_fast_model,
+            model_role=model_role,
+            json_mode=json_mode,
+            enable_thinking=enable_thinking,
+            max_tokens=max_tokens,
+            max_input_tokens=max_input_tokens,
+            max_input_chars=max_input_chars,
+        )
+        if cache_key is None:
+            return await call_provider()
+        cache = get_llm_response_cache()
+        cached = await cache.alookup(cache_key)
+        if cached is not None:
+            return cached.content
+        if cache.replay_only:
+            if raise_on_failure:
+                raise AIProviderUnavailable("replay_miss")
+            return None
+        content = await call_provider()
+        if content and not completion_state.get("truncated"):
+            await cache.astore(
+                cache_key,
+                [content],
+                stage=_generation_label().get("stage", ""),
+            )
+        return content
+
+    async def _call_provider_llm(
+        self,
+        prompt: str,
+        system_prompt: str = "You are a helpful assistant.",
+        use_fast_model: bool = False,
+        retry_count: int = 3,
+        enable_thinking: bool = False,
+        max_tokens: int | None = None,
+        max_input_tokens: int | None = None,
+        max_input_chars: int | None = None,
+        max_attempts: int | None = None,
+        reject_truncated: bool = False,
+        raise_on_failure: bool = False,
+        json_mode: bool = False,
+        model_role: str | None = None,
+        on_stream_activity: Callable[[], None] | None = None,
+        telemetry_sink: Callable[[dict], None] | None = None,
+        models: list[str] | None = None,
+        completion_state: dict[str, Any] | None = None,
+    ) -> Optional[str]:
+        """
+        通用 LLM 调用函数（直达 provider，不经响应缓存）。
         
         特性：
         - 支持模型路由（智能模型 vs 快速模型）
@@ -1711,6 +2121,9 @@ class AIBase:
             max_attempts: 跨候选模型共享的提供方总尝试次数。
             reject_truncated: 输出达到 max_tokens 时是否直接报告截断。
             raise_on_failure: 失败时是否抛出统一的提供方异常，而不是返回 None
+            models: 只在这组模型间尝试且不切换 ModelScope 备用；对冲补发用。
+            completion_state: 输出达到 max_tokens 时写入 ``truncated=True``，
+                供响应缓存判断能否保存。
 
         Returns:
             LLM 完整响应文本，失败返回 None
@@ -1746,11 +2159,15 @@ class AIBase:
             requested_max_tokens * 2,
         )
         primary_models = (
-            self._models_for(use_fast_model, model_role)
+            (
+                list(models)
+                if models is not None
+                else self._models_for(use_fast_model, model_role)
+            )
             if self.api_key and not self._provider_failure
             else []
         )
-        fallback_eligible = not primary_models
+        fallback_eligible = not primary_models and models is None
         for model_id in primary_models:
             if max_attempts is not None and attempts >= max_attempts:
                 break
@@ -1763,6 +2180,7 @@ class AIBase:
                 queue_wait_reason = ""
                 physical_request_count = 0
                 real_usage: tuple[int, int] | None = None
+                cached_input_tokens: int | None = None
                 first_token_at: float | None = None
                 estimated_input_tokens = self.estimate_request_tokens(
                     prompt,
@@ -1776,8 +2194,34 @@ class AIBase:
                     error: Exception | None = None,
                 ) -> None:
                     """A-1 全链路账单：请求统一出口的唯一打点。"""
-                    if not _generation_telemetry_on():
-                        return
+                    observe_llm_call(
+                        model_id=model_id,
+                        model_role=model_role or "",
+                        stream=False,
+                        status=status,
+                        duration_s=time.perf_counter() - attempt_started,
+                        ttfb_s=(
+                            None
+                            if first_token_at is None
+                            else first_token_at - attempt_started
+                        ),
+                        input_tokens=(
+                            real_usage[0]
+                            if real_usage
+                            else estimated_input_tokens
+                            if physical_request_count
+                            else 0
+                        ),
+                        output_tokens=(
+                            real_usage[1]
+                            if real_usage
+                            else self.estimate_request_tokens(output, "")
+                            if output
+                            else 0
+                        ),
+                        tokens_source="provider" if real_usage else "estimate",
+                    )
+                    # 常开：实时账单总要记，落不落 JSONL 由埋点模块自己判断。
                     _record_generation_call(
                         model_id=model_id,
                         model_role=model_role or "",
@@ -1803,6 +2247,7 @@ class AIBase:
                             real_usage[1] if real_usage else None
                         ),
                         tokens_source="provider" if real_usage else "estimate",
+                        cached_input_tokens=cached_input_tokens,
                         retry_reason=(
                             type(error).__name__ if error else ""
                         ),
@@ -1904,9 +2349,12 @@ class AIBase:
                     queue_wait_reason = getattr(
                         lease, "queue_wait_reason", ""
                     )
+                    response = None
+                    request_sent = time.perf_counter()
                     try:
                         try:
                             await self._wait_for_request_slot()
+                            request_sent = time.perf_counter()
                             physical_request_count += 1
                             response = await self.client.chat.completions.create(
                                 **request_options
@@ -1961,6 +2409,9 @@ class AIBase:
                             usage_pair = self._chunk_usage(chunk)
                             if usage_pair is not None:
                                 real_usage = usage_pair
+                                cached_input_tokens = self._chunk_cached_tokens(
+                                    chunk
+                                )
                             if chunk.choices:
                                 reasoning = self._delta_reasoning(
                                     chunk.choices[0].delta
@@ -1974,15 +2425,34 @@ class AIBase:
                                 if delta.content:
                                     if first_token_at is None:
                                         first_token_at = time.perf_counter()
+                                        self._observe_latency(
+                                            model_id, "ttft", request_sent,
+                                        )
                                     full_content += delta.content
                                     if on_stream_activity:
                                         on_stream_activity()
                                 if getattr(chunk.choices[0], "finish_reason", None) == "length":
                                     truncated = True
+                    except asyncio.CancelledError:
+                        # 对冲落败或调用方放弃：关掉底层连接，已等的时长只是
+                        # 下界（censored），只在它能抬高分位时记入，慢模型不会
+                        # 因为总被取消而显得很快，早早落败也不会显得更快。
+                        # 非流式对冲按 total 排序，所以 total 也要记下界。
+                        if first_token_at is None:
+                            self._observe_latency(
+                                model_id, "ttft", request_sent, censored=True,
+                            )
+                        self._observe_latency(
+                            model_id, "total", request_sent, censored=True,
+                        )
+                        await self._close_stream_response(response)
+                        raise
                     finally:
                         await lease.release()
 
                     if truncated:
+                        if completion_state is not None:
+                            completion_state["truncated"] = True
                         logger.warning(
                             f"AI response truncated by max_tokens={effective_max_tokens} "
                             f"(Model: {model_id}, Attempt {attempt+1}/{retry_count}, "
@@ -2065,6 +2535,7 @@ class AIBase:
                         model_role,
                     )
                     await capacity.report_success(model_id)
+                    self._observe_latency(model_id, "total", request_sent)
                     # A successful primary call is the recovery signal: no
                     # separate health probe is needed to leave fallback mode.
                     record_primary_recovered()
@@ -2131,7 +2602,11 @@ class AIBase:
             if self._provider_failure:
                 break
 
-        if fallback_eligible and self._modelscope_fallback_available():
+        if (
+            fallback_eligible
+            and models is None
+            and self._modelscope_fallback_available()
+        ):
             return await self._call_modelscope_fallback(
                 prompt=prompt,
                 system_prompt=system_prompt,
@@ -2145,6 +2620,7 @@ class AIBase:
                 model_role=model_role,
                 on_stream_activity=on_stream_activity,
                 telemetry_sink=telemetry_sink,
+                completion_state=completion_state,
             )
 
         if raise_on_failure:
@@ -2172,6 +2648,110 @@ class AIBase:
         """
         流式 LLM 调用 - 生成器函数
 
+        开启 ``LLM_RESPONSE_CACHE`` 时按录制时的分块回放命中的响应；未命中
+        时边转发 :meth:`_stream_provider_llm` 的分块边收集，流完整结束才写回。
+        调用方中途放弃的流不会被缓存。首 token 超过学到的分位仍未到达时
+        按 :meth:`_hedged_stream` 对冲。
+        """
+        cache_key = self._response_cache_key(
+            prompt=prompt,
+            system_prompt=system_prompt,
+            use_fast_model=use_fast_model,
+            model_role=None,
+            json_mode=False,
+            enable_thinking=enable_thinking,
+            max_tokens=max_tokens,
+            max_input_tokens=max_input_tokens,
+            max_input_chars=max_input_chars,
+        )
+
+        def provider_stream() -> AsyncIterator[str]:
+            return self._stream_provider_llm(
+                prompt,
+                system_prompt,
+                use_fast_model=use_fast_model,
+                enable_thinking=enable_thinking,
+                max_tokens=max_tokens,
+                max_input_tokens=max_input_tokens,
+                max_input_chars=max_input_chars,
+                max_attempts=max_attempts,
+                on_stream_activity=on_stream_activity,
+            )
+
+        hedge_plan = self._hedge_plan(
+            use_fast_model=use_fast_model,
+            model_role=None,
+            json_mode=False,
+            metric="ttft",
+        )
+        stream_provider = provider_stream
+        if hedge_plan is not None:
+            hedge_model, hedge_delay = hedge_plan
+
+            def hedge_stream() -> AsyncIterator[str]:
+                return self._stream_provider_llm(
+                    prompt,
+                    system_prompt,
+                    use_fast_model=use_fast_model,
+                    enable_thinking=enable_thinking,
+                    max_tokens=max_tokens,
+                    max_input_tokens=max_input_tokens,
+                    max_input_chars=max_input_chars,
+                    max_attempts=1,
+                    on_stream_activity=on_stream_activity,
+                    models=[hedge_model],
+                )
+
+            def hedged_provider_stream() -> AsyncIterator[str]:
+                return self._hedged_stream(
+                    provider_stream(),
+                    hedge_stream,
+                    hedge_model=hedge_model,
+                    delay=hedge_delay,
+                )
+
+            stream_provider = hedged_provider_stream
+
+        if cache_key is None:
+            async for chunk in stream_provider():
+                yield chunk
+            return
+        cache = get_llm_response_cache()
+        cached = await cache.alookup(cache_key)
+        if cached is not None:
+            for chunk in cached.chunks:
+                if on_stream_activity:
+                    on_stream_activity()
+                yield chunk
+            return
+        if cache.replay_only:
+            raise AIProviderUnavailable("replay_miss")
+        chunks: list[str] = []
+        async for chunk in stream_provider():
+            chunks.append(chunk)
+            yield chunk
+        await cache.astore(
+            cache_key,
+            chunks,
+            stage=_generation_label().get("stage", ""),
+        )
+
+    async def _stream_provider_llm(
+        self,
+        prompt: str,
+        system_prompt: str = "You are a helpful assistant.",
+        use_fast_model: bool = False,
+        enable_thinking: bool = False,
+        max_tokens: int | None = None,
+        max_input_tokens: int | None = None,
+        max_input_chars: int | None = None,
+        max_attempts: int | None = None,
+        on_stream_activity: Callable[[], None] | None = None,
+        models: list[str] | None = None,
+    ) -> AsyncIterator[str]:
+        """
+        流式 LLM 调用 - 生成器函数（直达 provider，不经响应缓存）
+
         以流式方式调用LLM，逐块返回生成的内容，
         适用于实时显示长文本生成过程。
 
@@ -2184,6 +2764,7 @@ class AIBase:
             max_input_tokens: 最终 system + user prompt 的硬输入预算。
             max_input_chars: 最终请求的独立字符数硬上限。
             max_attempts: 跨候选模型共享的提供方总尝试次数。
+            models: 只在这组模型间尝试且不切换 ModelScope 备用；对冲补发用。
 
         Yields:
             生成的文本块
@@ -2205,11 +2786,15 @@ class AIBase:
         last_error: Exception | None = None
         attempts = 0
         primary_models = (
-            self._models_for(use_fast_model)
+            (
+                list(models)
+                if models is not None
+                else self._models_for(use_fast_model)
+            )
             if self.api_key and not self._provider_failure
             else []
         )
-        fallback_eligible = not primary_models
+        fallback_eligible = not primary_models and models is None
         for model_id in primary_models:
             if max_attempts is not None and attempts >= max_attempts:
                 break
@@ -2227,7 +2812,9 @@ class AIBase:
             stream_wait_reason = ""
             stream_first_token_at: float | None = None
             stream_output_chars = 0
+            stream_output_ascii = 0
             stream_usage: tuple[int, int] | None = None
+            stream_cached_tokens: int | None = None
             stream_requests = 0
 
             def emit_stream_record(
@@ -2235,8 +2822,34 @@ class AIBase:
                 status: str,
                 error: Exception | None = None,
             ) -> None:
-                if not _generation_telemetry_on():
-                    return
+                non_ascii = stream_output_chars - stream_output_ascii
+                observe_llm_call(
+                    model_id=model_id,
+                    model_role="",
+                    stream=True,
+                    status=status,
+                    duration_s=time.perf_counter() - stream_started,
+                    ttfb_s=(
+                        None
+                        if stream_first_token_at is None
+                        else stream_first_token_at - stream_started
+                    ),
+                    input_tokens=(
+                        stream_usage[0]
+                        if stream_usage
+                        else self.estimate_request_tokens(prompt, system_prompt)
+                        if stream_requests
+                        else 0
+                    ),
+                    # 与 estimate_request_tokens 同一套启发式，只是按字符计数累加，
+                    # 不必为估算保留整段流式正文。
+                    output_tokens=(
+                        stream_usage[1]
+                        if stream_usage
+                        else math.ceil(stream_output_ascii / 3.2 + non_ascii * 1.2)
+                    ),
+                    tokens_source="provider" if stream_usage else "estimate",
+                )
                 _record_generation_call(
                     model_id=model_id,
                     model_role="",
@@ -2257,6 +2870,7 @@ class AIBase:
                     input_tokens=stream_usage[0] if stream_usage else None,
                     output_tokens=stream_usage[1] if stream_usage else None,
                     tokens_source="provider" if stream_usage else "estimate",
+                    cached_input_tokens=stream_cached_tokens,
                     retry_reason=type(error).__name__ if error else "",
                     error_code=str(error)[:200] if error else "",
                     physical_request_count=stream_requests,
@@ -2288,8 +2902,11 @@ class AIBase:
                     stream_wait_reason = getattr(
                         lease, "queue_wait_reason", ""
                     ) or stream_wait_reason
+                    response = None
+                    request_sent = time.perf_counter()
                     try:
                         await self._wait_for_request_slot()
+                        request_sent = time.perf_counter()
                         request_options = {
                             "model": model_id,
                             "messages": [
@@ -2342,6 +2959,9 @@ class AIBase:
                             usage_pair = self._chunk_usage(chunk)
                             if usage_pair is not None:
                                 stream_usage = usage_pair
+                                stream_cached_tokens = self._chunk_cached_tokens(
+                                    chunk
+                                )
                             if chunk.choices:
                                 reasoning = self._delta_reasoning(
                                     chunk.choices[0].delta
@@ -2355,13 +2975,32 @@ class AIBase:
                                         stream_first_token_at = (
                                             time.perf_counter()
                                         )
+                                        self._observe_latency(
+                                            model_id, "ttft", request_sent,
+                                        )
                                     stream_output_chars += len(delta.content)
+                                    stream_output_ascii += (
+                                        len(delta.content)
+                                        if delta.content.isascii()
+                                        else sum(
+                                            character.isascii()
+                                            for character in delta.content
+                                        )
+                                    )
                                     yielded = True
                                     if on_stream_activity:
                                         on_stream_activity()
                                     yield delta.content
                                 if getattr(chunk.choices[0], "finish_reason", None) == "length":
                                     truncated = True
+                    except (asyncio.CancelledError, GeneratorExit):
+                        # 与非流式一致：取消时的耗时只作下界样本。
+                        if stream_first_token_at is None:
+                            self._observe_latency(
+                                model_id, "ttft", request_sent, censored=True,
+                            )
+                        await self._close_stream_response(response)
+                        raise
                     finally:
                         await lease.release()
                     if (
@@ -2391,6 +3030,7 @@ class AIBase:
                 if yielded:
                     self._remember_model(use_fast_model, model_id)
                     await capacity.report_success(model_id)
+                    self._observe_latency(model_id, "total", request_sent)
                     record_primary_recovered()
                     emit_stream_record(status="completed")
                     return
@@ -2433,7 +3073,11 @@ class AIBase:
             if self._provider_failure:
                 break
 
-        if fallback_eligible and self._modelscope_fallback_available():
+        if (
+            fallback_eligible
+            and models is None
+            and self._modelscope_fallback_available()
+        ):
             async for chunk in self._stream_modelscope_fallback(
                 prompt=prompt,
                 system_prompt=system_prompt,
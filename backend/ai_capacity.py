@@ -8,11 +8,103 @@ letting every stage burst into the provider at once.
 from __future__ import annotations
 
 import asyncio
+import itertools
 import math
 import os
 import time
+from collections import deque
+from collections.abc import AsyncIterable, AsyncIterator, Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
 from dataclasses import dataclass
-from typing import Any, Callable
+from typing import Any, TypeVar
+
+from metrics import llm_queue_wait_seconds
+
+# Admission classes, most urgent first.  A learner waiting on an AI-teacher
+# answer or a teacher waiting on one regenerated block must not queue behind a
+# 60-section bulk content phase.
+PRIORITY_CLASSES = ("interactive", "guided_review", "bulk", "background")
+DEFAULT_PRIORITY = "bulk"
+_PRIORITY_RANK = {name: rank for rank, name in enumerate(PRIORITY_CLASSES)}
+_WAIT_SAMPLES_PER_CLASS = 512
+
+
+@dataclass(frozen=True)
+class Admission:
+    priority: str = DEFAULT_PRIORITY
+    course_id: str = ""
+    weight: float = 1.0
+
+
+_ADMISSION: ContextVar[Admission] = ContextVar("_ADMISSION", default=Admission())
+
+
+@contextmanager
+def admission(
+    priority: str,
+    *,
+    course_id: str = "",
+    weight: float = 1.0,
+) -> Iterator[None]:
+    """Tag provider requests made in this context with an admission class.
+
+    Like ``generation_telemetry.stage``, this rides a contextvar, so tasks
+    spawned inside inherit it and deep ``AIBase`` calls need no new arguments.
+    An empty ``course_id`` keeps the enclosing course.
+    """
+    current = _ADMISSION.get()
+    token = _ADMISSION.set(Admission(
+        priority=priority if priority in _PRIORITY_RANK else DEFAULT_PRIORITY,
+        course_id=str(course_id or current.course_id),
+        weight=max(0.01, float(weight)),
+    ))
+    try:
+        yield
+    finally:
+        try:
+            _ADMISSION.reset(token)
+        except ValueError:
+            # An async generator closed from another context (client gone
+            # mid-stream); that context is being discarded anyway.
+            pass
+
+
+_T = TypeVar("_T")
+
+
+async def admitted(
+    stream: AsyncIterable[_T],
+    priority: str,
+    *,
+    course_id: str = "",
+    weight: float = 1.0,
+) -> AsyncIterator[_T]:
+    """Re-yield ``stream`` with the admission tag applied to each step only.
+
+    Holding ``with admission(...)`` around an ``async for`` that yields leaves
+    the tag set while the generator is suspended, so the consumer's own
+    provider calls between chunks would ride the wrong class.  Here the tag is
+    set just for each ``__anext__`` of the provider stream and reset before the
+    item is handed on.
+    """
+    iterator = aiter(stream)
+    try:
+        while True:
+            with admission(priority, course_id=course_id, weight=weight):
+                try:
+                    item = await anext(iterator)
+                except StopAsyncIteration:
+                    return
+            yield item
+    finally:
+        aclose = getattr(iterator, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+
+def current_admission() -> Admission:
+    return _ADMISSION.get()
 
 
 def _env_float(name: str, default: float, *, minimum: float = 0.0) -> float:
@@ -63,15 +155,26 @@ class ModelCapacityCoolingDown(RuntimeError):
         )
 
 
+@dataclass(eq=False)
+class _Waiter:
+    seq: int
+    model_id: str
+    priority: str
+    course_id: str
+    weight: float
+
+
 class CapacityLease:
     def __init__(
         self,
         controller: "ProviderCapacityController",
         model_id: str,
         queue_wait_seconds: float = 0.0,
+        priority: str = DEFAULT_PRIORITY,
     ) -> None:
         self._controller = controller
         self.model_id = model_id
+        self.priority = priority
         # A-1：排队等待时长由队列自己计量。调用方用秒表夹住 acquire() 只能
         # 量到"等了多久"，量不到"为什么等"——是并发位满了，还是 cooldown /
         # 发车间隔在压着。后者是 B-4 要对齐容量时真正要看的数。
@@ -118,6 +221,12 @@ class ProviderCapacityController:
         )
         self.post_request_interval_seconds = 0.0
         self.wait_during_cooldown = False
+        # Optional: an interactive request may start inside the start-interval
+        # spacing window instead of waiting it out.  Off by default because
+        # the spacing exists to protect burst-sensitive providers.
+        self.interactive_preempts_spacing = os.getenv(
+            "AI_PROVIDER_INTERACTIVE_PREEMPTS_SPACING", "",
+        ).strip().lower() in {"1", "true", "yes", "on"}
         self.rate_limit_backoff_seconds = _env_float(
             "AI_PROVIDER_RATE_LIMIT_BACKOFF_SECONDS", 2.0,
             minimum=0.1,
@@ -129,6 +238,19 @@ class ProviderCapacityController:
         self._provider_success_streak = 0
         self._provider_slow_start = True
         self._next_provider_start = 0.0
+        self._waiters: list[_Waiter] = []
+        self._waiter_seq = itertools.count()
+        # Weighted fair sharing within a class: each course carries a virtual
+        # finish time that advances by 1/weight per admission; the class clock
+        # is the finish time of the last admitted request.  A course that was
+        # idle rejoins at the clock instead of cashing in its idle time.
+        self._fair_pass: dict[tuple[str, str], float] = {}
+        self._class_clock: dict[str, float] = {}
+        self._class_waits: dict[str, deque[float]] = {
+            name: deque(maxlen=_WAIT_SAMPLES_PER_CLASS)
+            for name in PRIORITY_CLASSES
+        }
+        self._class_admitted: dict[str, int] = dict.fromkeys(PRIORITY_CLASSES, 0)
 
     async def configure_last_resort(
         self,
@@ -179,82 +301,205 @@ class ProviderCapacityController:
             ),
         )
 
+    def _model_ready(self, waiter: _Waiter, now: float) -> bool:
+        state = self._state(waiter.model_id)
+        if state.in_flight >= state.limit:
+            return False
+        return not (
+            self.wait_during_cooldown and state.cooldown_until > now
+        )
+
+    def _admission_key(self, waiter: _Waiter) -> tuple[int, float, int]:
+        fair_pass = self._fair_pass.get(
+            (waiter.priority, waiter.course_id),
+            self._class_clock.get(waiter.priority, 0.0),
+        )
+        return (
+            _PRIORITY_RANK[waiter.priority],
+            max(fair_pass, self._class_clock.get(waiter.priority, 0.0)),
+            waiter.seq,
+        )
+
+    def _next_waiter(self, now: float) -> _Waiter | None:
+        """The waiter admission order serves next.
+
+        Only waiters whose own model has room compete, so a request queued
+        for a saturated model never holds back one for an idle model.
+        """
+        ready = [
+            waiter for waiter in self._waiters
+            if self._model_ready(waiter, now)
+        ]
+        return min(ready, key=self._admission_key) if ready else None
+
+    def _record_admission(self, waiter: _Waiter, waited: float) -> None:
+        key = (waiter.priority, waiter.course_id)
+        clock = self._class_clock.get(waiter.priority, 0.0)
+        start = max(self._fair_pass.get(key, clock), clock)
+        self._class_clock[waiter.priority] = start
+        self._fair_pass[key] = start + 1.0 / waiter.weight
+        if len(self._fair_pass) > 256:
+            # Entries at or behind their clock carry no credit; dropping them
+            # is equivalent to keeping them.
+            self._fair_pass = {
+                entry: value
+                for entry, value in self._fair_pass.items()
+                if value > self._class_clock.get(entry[0], 0.0)
+            }
+        self._class_waits[waiter.priority].append(waited)
+        self._class_admitted[waiter.priority] += 1
+
     async def acquire(
         self,
         model_id: str,
         *,
         on_wait_activity: Callable[[], None] | None = None,
     ) -> CapacityLease:
+        """Wait for a slot, in admission order.
+
+        Waiters are served by priority class, then weighted-fair across
+        courses within a class, then FIFO.  The class and course come from
+        :func:`admission`; untagged callers are ``bulk``.
+        """
         wait_started = time.monotonic()
+        tag = current_admission()
         # 只记第一次让出的原因：那是这次请求真正被什么挡住的原因，后续轮次
         # 往往只是被唤醒后重新检查条件。
         wait_reason = ""
-        while True:
-            async with self._condition:
-                state = self._state(model_id)
-                now = time.monotonic()
-                if (
-                    state.cooldown_until > now
-                    and not self.wait_during_cooldown
-                ):
-                    raise ModelCapacityCoolingDown(
-                        model_id,
-                        state.cooldown_until - now,
-                    )
-                ready_at = max(
-                    self._next_provider_start,
-                    state.cooldown_until
-                    if self.wait_during_cooldown
-                    else 0.0,
-                )
-                if (
-                    state.in_flight < state.limit
-                    and self._provider_in_flight < self._provider_limit
-                    and now >= ready_at
-                ):
-                    state.in_flight += 1
-                    self._provider_in_flight += 1
-                    state.started += 1
-                    self._next_provider_start = (
-                        now + self.start_interval_seconds
+        waiter = _Waiter(
+            seq=next(self._waiter_seq),
+            model_id=model_id,
+            priority=tag.priority,
+            course_id=tag.course_id,
+            weight=tag.weight,
+        )
+        async with self._condition:
+            self._waiters.append(waiter)
+        try:
+            while True:
+                async with self._condition:
+                    state = self._state(model_id)
+                    now = time.monotonic()
+                    if (
+                        state.cooldown_until > now
+                        and not self.wait_during_cooldown
+                    ):
+                        raise ModelCapacityCoolingDown(
+                            model_id,
+                            state.cooldown_until - now,
+                        )
+                    next_start = self._next_provider_start
+                    if (
+                        waiter.priority == "interactive"
+                        and self.interactive_preempts_spacing
+                    ):
+                        next_start = 0.0
+                    ready_at = max(
+                        next_start,
+                        state.cooldown_until
+                        if self.wait_during_cooldown
+                        else 0.0,
                     )
-                    waited = now - wait_started
-                    state.queue_wait_seconds_total += waited
-                    lease = CapacityLease(self, model_id, waited)
-                    lease.queue_wait_reason = wait_reason
-                    return lease
-
-                if not wait_reason:
-                    if state.in_flight >= state.limit:
-                        wait_reason = "model_concurrency"
-                    elif self._provider_in_flight >= self._provider_limit:
-                        wait_reason = "provider_concurrency"
-                    elif (
-                        self.wait_during_cooldown
-                        and state.cooldown_until > now
+                    head = self._next_waiter(now)
+                    if (
+                        head is waiter
+                        and self._provider_in_flight < self._provider_limit
+                        and now >= ready_at
                     ):
-                        wait_reason = "cooldown"
-                    else:
-                        wait_reason = "start_interval"
-                    state.queue_wait_events += 1
-
-                # A release will notify capacity waiters.  A cooldown/spacing
-                # window needs a bounded timer so it can wake without traffic.
-                timeout = None
-                if now < ready_at:
-                    timeout = max(0.01, ready_at - now)
-                if on_wait_activity:
-                    on_wait_activity()
-                    timeout = min(timeout, 5.0) if timeout else 5.0
-                try:
-                    if timeout is None:
-                        await self._condition.wait()
-                    else:
-                        await asyncio.wait_for(
-                            self._condition.wait(), timeout=timeout
+                        self._waiters.remove(waiter)
+                        state.in_flight += 1
+                        self._provider_in_flight += 1
+                        state.started += 1
+                        self._next_provider_start = (
+                            now + self.start_interval_seconds
+                        )
+                        waited = now - wait_started
+                        state.queue_wait_seconds_total += waited
+                        self._record_admission(waiter, waited)
+                        lease = CapacityLease(
+                            self, model_id, waited, priority=waiter.priority,
+                        )
+                        lease.queue_wait_reason = wait_reason
+                        llm_queue_wait_seconds.observe(
+                            waited,
+                            provider=self.provider_id,
+                            reason=wait_reason or "none",
                         )
-                except asyncio.TimeoutError:
-                    pass
+                        # Whoever is next in line may be admissible right now.
+                        self._condition.notify_all()
+                        return lease
+
+                    if not wait_reason:
+                        if state.in_flight >= state.limit:
+                            wait_reason = "model_concurrency"
+                        elif self._provider_in_flight >= self._provider_limit:
+                            wait_reason = "provider_concurrency"
+                        elif (
+                            self.wait_during_cooldown
+                            and state.cooldown_until > now
+                        ):
+                            wait_reason = "cooldown"
+                        elif now < ready_at:
+                            wait_reason = "start_interval"
+                        else:
+                            wait_reason = "priority"
+                        state.queue_wait_events += 1
+
+                    # A release will notify capacity waiters.  A cooldown/spacing
+                    # window needs a bounded timer so it can wake without traffic.
+                    timeout = None
+                    if now < ready_at:
+                        timeout = max(0.01, ready_at - now)
+                    if on_wait_activity:
+                        on_wait_activity()
+                        timeout = min(timeout, 5.0) if timeout else 5.0
+                    # A timer notify instead of ``wait_for``: on Python 3.10/3.11
+                    # ``wait_for`` swallows a cancellation that lands in the
+                    # same tick as a notify, and admission notifies often.
+                    timer = (
+                        asyncio.get_running_loop().call_later(
+                            timeout, self._notify_soon,
+                        )
+                        if timeout is not None
+                        else None
+                    )
+                    try:
+                        await self._condition.wait()
+                    finally:
+                        if timer is not None:
+                            timer.cancel()
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+                # Leaving the queue can make the next waiter the head.
+                self._notify_soon()
+
+    def has_headroom(self, model_id: str) -> bool:
+        """Whether a request for ``model_id`` would be admitted right now.
+
+        Speculative work (hedged requests) checks this first so it only ever
+        spends idle capacity: nobody queued, the model and the provider below
+        their limits, no cooldown and no start spacing left to wait out.
+        """
+        state = self._state(model_id)
+        now = time.monotonic()
+        return (
+            not self._waiters
+            and state.cooldown_until <= now
+            and state.in_flight < state.limit
+            and self._provider_in_flight < self._provider_limit
+            and now >= self._next_provider_start
+        )
+
+    def _notify_soon(self) -> None:
+        async def notify() -> None:
+            async with self._condition:
+                self._condition.notify_all()
+
+        try:
+            asyncio.get_running_loop().create_task(notify())
+        except RuntimeError:
+            pass
 
     async def release(self, model_id: str) -> None:
         async with self._condition:
@@ -367,6 +612,18 @@ class ProviderCapacityController:
             "wait_during_cooldown": self.wait_during_cooldown,
             "limit": self._provider_limit,
             "in_flight": self._provider_in_flight,
+            "interactive_preempts_spacing": self.interactive_preempts_spacing,
+            "waiting": len(self._waiters),
+            "classes": {
+                name: _wait_summary(
+                    self._class_waits[name],
+                    admitted=self._class_admitted[name],
+                    waiting=sum(
+                        1 for waiter in self._waiters if waiter.priority == name
+                    ),
+                )
+                for name in PRIORITY_CLASSES
+            },
             "models": {
                 model_id: {
                     "limit": state.limit,
@@ -386,6 +643,30 @@ class ProviderCapacityController:
         }
 
 
+def _percentile(ordered: list[float], fraction: float) -> float:
+    index = min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+def _wait_summary(
+    samples: deque[float],
+    *,
+    admitted: int,
+    waiting: int,
+) -> dict[str, Any]:
+    """Queue-wait percentiles (ms) over the most recent admissions."""
+    ordered = sorted(samples)
+    summary: dict[str, Any] = {"admitted": admitted, "waiting": waiting}
+    if ordered:
+        summary.update({
+            "p50_ms": round(_percentile(ordered, 0.50) * 1000, 1),
+            "p95_ms": round(_percentile(ordered, 0.95) * 1000, 1),
+            "p99_ms": round(_percentile(ordered, 0.99) * 1000, 1),
+            "max_ms": round(ordered[-1] * 1000, 1),
+        })
+    return summary
+
+
 _CONTROLLERS: dict[tuple[str, int], ProviderCapacityController] = {}
 
 
@@ -401,6 +682,18 @@ def get_provider_capacity_controller(
     return controller
 
 
+def provider_capacity_snapshots() -> list[dict[str, Any]]:
+    """Snapshot every live controller, across all event loops.
+
+    Diagnostics only: benchmarks sample this from outside the loops that own
+    the controllers, so the values are a best-effort read, not a consistent cut.
+    """
+    return [
+        {**controller.snapshot(), "loop_id": loop_id}
+        for (_provider_id, loop_id), controller in list(_CONTROLLERS.items())
+    ]
+
+
 def reset_provider_capacity_controllers() -> None:
     """Test helper; production code never discards live capacity state."""
     _CONTROLLERS.clear()
@@ -12,7 +12,7 @@ from ai_base import (
     AIRequestBudgetExceeded,
     AIResponseTruncated,
 )
-from ai_capacity import ModelCapacityCoolingDown
+from ai_capacity import ModelCapacityCoolingDown, admitted
 from ai_teacher_context import format_ai_teacher_context_prompt
 from prompts import get_prompt
 
@@ -179,8 +179,14 @@ class AIQAService(AIBase):
 
 请严格执行上面的视角、文件范围、回答策略和披露边界。不要假装已经写入笔记、错题、复习任务或课程内容；需要改变系统状态时，只能说明建议动作。"""
         emitted = ""
+        course_id = str((context_package.get("scene") or {}).get("course_id") or "")
         try:
-            async for chunk in self._stream_llm(prompt, system_prompt):
+            # A learner is waiting on this answer; it goes ahead of course generation.
+            async for chunk in admitted(
+                self._stream_llm(prompt, system_prompt),
+                "interactive",
+                course_id=course_id,
+            ):
                 normalized = chunk.strip()
                 if normalized.startswith("[Error:") or normalized == "AI Service not configured.":
                     # Some providers stream their failure as ordinary text
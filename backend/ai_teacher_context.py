@@ -7,8 +7,8 @@ import re
 from copy import deepcopy
 from typing import Any
 
-from content_blocks import project_course_content_blocks
-from course_knowledge_base import compile_course_knowledge_base, knowledge_binding_for_section
+from ai_teacher_index import IndexedCourse, ai_teacher_index_cache
+from course_knowledge_base import knowledge_binding_for_section
 from learner_model import is_model_item_current
 from learning_runtime import build_learning_runtime
 from practice_attempts import practice_attempt_repository
@@ -31,8 +31,13 @@ def build_ai_teacher_context(
     task_ref: dict[str, Any] | None = None,
     conversation: dict[str, Any] | None = None,
 ) -> dict[str, Any]:
-    """Build one immutable package without copying domain state into AI storage."""
-    projected_course = project_course_content_blocks(course_data)
+    """Build one immutable package without copying domain state into AI storage.
+
+    The projection, block index and knowledge base are shared per course
+    revision; see :mod:`ai_teacher_index`.
+    """
+    indexed = ai_teacher_index_cache.indexed_course(course_data)
+    projected_course = indexed.course
     runtime = build_learning_runtime(projected_course, user_id=user_id, node_id=node_id)
     intent = "teacher_design" if perspective == "teacher" else _request_intent(question, entrypoint)
     runtime_context = runtime.get("context") or {}
@@ -43,9 +48,13 @@ def build_ai_teacher_context(
         or ""
     )
     scene = _scene(projected_course, runtime, effective_node_id, context_ref or {})
-    knowledge_context = _knowledge_context(projected_course, effective_node_id)
-    sources = _select_sources(
+    knowledge_context = _knowledge_context(
         projected_course,
+        effective_node_id,
+        knowledge_base=indexed.knowledge_base,
+    )
+    sources = _select_sources(
+        indexed,
         node_id=effective_node_id,
         question=question,
         selection=selection,
@@ -323,8 +332,12 @@ def _scene(
     }
 
 
-def _knowledge_context(course: dict[str, Any], node_id: str) -> dict[str, Any]:
-    knowledge_base = course.get("course_knowledge_base") or compile_course_knowledge_base(course)
+def _knowledge_context(
+    course: dict[str, Any],
+    node_id: str,
+    *,
+    knowledge_base: dict[str, Any],
+) -> dict[str, Any]:
     if knowledge_base.get("lifecycle_status") == "active":
         section_binding = knowledge_binding_for_section(knowledge_base, node_id)
         selected_ids = set(section_binding["course_knowledge_refs"])
@@ -409,7 +422,7 @@ def _knowledge_context(course: dict[str, Any], node_id: str) -> dict[str, Any]:
 
 
 def _select_sources(
-    course: dict[str, Any],
+    indexed: IndexedCourse,
     *,
     node_id: str,
     question: str,
@@ -417,6 +430,7 @@ def _select_sources(
     perspective: str,
     context_ref: dict[str, Any],
 ) -> list[dict[str, Any]]:
+    course = indexed.course
     nodes = course.get("nodes") or []
     anchor = context_ref.get("content_anchor") or {}
     file_scope = anchor.get("file_scope") if isinstance(anchor, dict) else {}
@@ -436,24 +450,26 @@ def _select_sources(
     if not candidate_nodes:
         return []
     requested_revision = str(anchor.get("block_revision_id") or "")
-    terms = _terms(f"{question} {selection}")
-    ranked: list[tuple[int, int, dict[str, Any], dict[str, Any]]] = []
-    sequence = 0
-    for node in candidate_nodes:
-        for index, block in enumerate(node.get("content_blocks") or []):
-            content = str(block.get("content") or "")
-            title = str(block.get("title") or "")
-            score = 0
-            if requested_revision and block.get("block_revision_id") == requested_revision:
-                score += 100
-            if selection and _normalize(selection) in _normalize(content):
-                score += 80
-            normalized = _normalize(f"{node.get('node_name') or ''} {title} {content}")
-            score += sum(5 for term in terms if term in normalized)
-            if index == 0:
-                score += 1
-            ranked.append((score, -sequence, node, block))
-            sequence += 1
+    index = indexed.index
+    doc_ids = [
+        doc_id
+        for node in candidate_nodes
+        for doc_id in index.node_blocks.get(str(node.get("node_id") or ""), [])
+    ]
+    relevance = index.score(f"{question} {selection}", set(doc_ids))
+    normalized_selection = _normalize(selection) if selection else ""
+    ranked: list[tuple[float, int, dict[str, Any], dict[str, Any]]] = []
+    for sequence, doc_id in enumerate(doc_ids):
+        entry = index.blocks[doc_id]
+        block = entry.block
+        score = 5 * relevance.get(doc_id, 0.0)
+        if requested_revision and block.get("block_revision_id") == requested_revision:
+            score += 100
+        if normalized_selection and normalized_selection in entry.normalized_content:
+            score += 80
+        if entry.position == 0:
+            score += 1
+        ranked.append((score, -sequence, entry.node, block))
     ranked.sort(key=lambda item: (item[0], item[1]), reverse=True)
     selected = [(item[2], item[3]) for item in ranked[:MAX_SOURCES] if item[0] > 0]
     if not selected:
@@ -679,12 +695,6 @@ def _find_node(nodes: list[dict[str, Any]], node_id: str) -> dict[str, Any] | No
     return None
 
 
-def _terms(text: str) -> set[str]:
-    ascii_terms = re.findall(r"[a-zA-Z0-9_]{3,}", text.lower())
-    chinese = re.findall(r"[\u4e00-\u9fff]{2,8}", text)
-    return set(ascii_terms + chinese)
-
-
 def _normalize(value: str) -> str:
     return re.sub(r"\s+", "", str(value or "")).lower()
 
@@ -0,0 +1,235 @@
+"""Per-course retrieval index cache for the AI teacher.
+
+Every AI-teacher message used to re-project the whole course into content
+blocks, re-normalize every block and substring-test each query term against
+it. In the teacher "all files" scope that is the entire course per message.
+This module does that work once per course revision instead:
+
+* :meth:`AITeacherIndexCache.indexed_course` returns the projected course, a
+  BM25 index over its blocks and (lazily) the compiled knowledge base, keyed by
+  the course id and a digest of the course view. Any edit changes the digest,
+  so a stale index is never served.
+
+The learning runtime is not kept here: ``build_learning_runtime`` already
+memoizes it on the course and the learner stores' change tokens.
+
+Tokens are lowercase ASCII words plus CJK character bigrams; BM25 needs no
+segmenter and bigrams match the 2–8 character Chinese terms the previous
+substring scoring relied on.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter, OrderedDict
+from collections.abc import Iterator
+from copy import deepcopy
+from dataclasses import dataclass, field
+from typing import Any
+
+from content_blocks import project_course_content_blocks
+from course_knowledge_base import compile_course_knowledge_base
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+DEFAULT_MAX_COURSES = 32
+
+_ASCII_TOKEN = re.compile(r"[a-z0-9_]{2,}")
+_CJK_RUN = re.compile(r"[\u4e00-\u9fff]+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(0, int(os.getenv(name, str(default))))
+    except ValueError:
+        return default
+
+
+def normalize_text(value: str) -> str:
+    return _WHITESPACE.sub("", str(value or "")).lower()
+
+
+def tokenize(text: str) -> list[str]:
+    lowered = str(text or "").lower()
+    tokens = _ASCII_TOKEN.findall(lowered)
+    for run in _CJK_RUN.findall(lowered):
+        if len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[index:index + 2] for index in range(len(run) - 1))
+    return tokens
+
+
+def course_content_revision(course_data: dict[str, Any]) -> str:
+    """Digest of the whole course view the projection and index read.
+
+    Serializing and hashing is an order of magnitude cheaper than projecting
+    and tokenizing, and unlike ``course_document_revision`` it also covers
+    view fields that live outside the document and legacy courses without one.
+    """
+    payload = json.dumps(
+        course_data,
+        ensure_ascii=False,
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+
+@dataclass(slots=True)
+class IndexedBlock:
+    node: dict[str, Any]
+    block: dict[str, Any]
+    position: int
+    normalized_content: str
+    length: int
+
+
+class BlockIndex:
+    """BM25 over the content blocks of one projected course."""
+
+    def __init__(self, course: dict[str, Any]) -> None:
+        self.blocks: list[IndexedBlock] = []
+        self.node_blocks: dict[str, list[int]] = {}
+        self.postings: dict[str, list[tuple[int, int]]] = {}
+        total_length = 0
+        for node in _walk(course.get("nodes") or []):
+            node_id = str(node.get("node_id") or "")
+            for position, block in enumerate(node.get("content_blocks") or []):
+                content = str(block.get("content") or "")
+                title = str(block.get("title") or "")
+                terms = Counter(tokenize(f"{node.get('node_name') or ''} {title} {content}"))
+                doc_id = len(self.blocks)
+                length = sum(terms.values())
+                self.blocks.append(IndexedBlock(
+                    node=node,
+                    block=block,
+                    position=position,
+                    normalized_content=normalize_text(content),
+                    length=length,
+                ))
+                self.node_blocks.setdefault(node_id, []).append(doc_id)
+                for term, frequency in terms.items():
+                    self.postings.setdefault(term, []).append((doc_id, frequency))
+                total_length += length
+        self.average_length = total_length / len(self.blocks) if self.blocks else 0.0
+
+    def score(self, query: str, doc_ids: set[int] | None = None) -> dict[int, float]:
+        """BM25 score per block; blocks sharing no query token are absent."""
+        scores: dict[int, float] = {}
+        if not self.blocks:
+            return scores
+        count = len(self.blocks)
+        average = self.average_length or 1.0
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, frequency in postings:
+                if doc_ids is not None and doc_id not in doc_ids:
+                    continue
+                length = self.blocks[doc_id].length
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * (
+                    frequency * (BM25_K1 + 1)
+                    / (frequency + BM25_K1 * (1 - BM25_B + BM25_B * length / average))
+                )
+        return scores
+
+
+@dataclass
+class IndexedCourse:
+    revision: str
+    course: dict[str, Any]
+    index: BlockIndex
+    _knowledge_base: dict[str, Any] | None = field(default=None, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    @property
+    def knowledge_base(self) -> dict[str, Any]:
+        with self._lock:
+            if self._knowledge_base is None:
+                # The compiler annotates nodes in place; the shared projection
+                # must stay unchanged, since the runtime memo hashes it.
+                self._knowledge_base = (
+                    self.course.get("course_knowledge_base")
+                    or compile_course_knowledge_base(deepcopy(self.course))
+                )
+            return self._knowledge_base
+
+
+class AITeacherIndexCache:
+    def __init__(self, *, max_courses: int = DEFAULT_MAX_COURSES) -> None:
+        self.max_courses = max_courses
+        self._courses: OrderedDict[tuple[str, str], IndexedCourse] = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"index_hits": 0, "index_builds": 0}
+
+    @classmethod
+    def from_env(cls) -> AITeacherIndexCache:
+        return cls(
+            max_courses=_env_int("AI_TEACHER_INDEX_MAX_COURSES", DEFAULT_MAX_COURSES),
+        )
+
+    def indexed_course(self, course_data: dict[str, Any]) -> IndexedCourse:
+        """The shared projection and index; callers must treat both as read-only."""
+        revision = course_content_revision(course_data)
+        key = (str(course_data.get("course_id") or ""), revision)
+        with self._lock:
+            cached = self._courses.get(key)
+            if cached is not None:
+                self._courses.move_to_end(key)
+                self._counters["index_hits"] += 1
+                return cached
+        projected = project_course_content_blocks(course_data)
+        built = IndexedCourse(revision=revision, course=projected, index=BlockIndex(projected))
+        with self._lock:
+            self._counters["index_builds"] += 1
+            if self.max_courses:
+                # A newer revision supersedes every older one of the course.
+                for stale in [item for item in self._courses if item[0] == key[0]]:
+                    del self._courses[stale]
+                self._courses[key] = built
+                while len(self._courses) > self.max_courses:
+                    self._courses.popitem(last=False)
+        return built
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                **self._counters,
+                "courses": len(self._courses),
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._courses.clear()
+            for name in self._counters:
+                self._counters[name] = 0
+
+
+def _walk(nodes: list[dict[str, Any]]) -> Iterator[dict[str, Any]]:
+    for node in nodes:
+        yield node
+        yield from _walk(node.get("children") or [])
+
+
+ai_teacher_index_cache = AITeacherIndexCache.from_env()
+
+
+__all__ = [
+    "AITeacherIndexCache",
+    "BlockIndex",
+    "IndexedCourse",
+    "ai_teacher_index_cache",
+    "course_content_revision",
+    "normalize_text",
+    "tokenize",
+]
@@ -4,14 +4,10 @@ from __future__ import annotations
 
 import math
 import re
+from functools import lru_cache
+from types import ModuleType
 from typing import Any
 
-try:
-    import sympy
-except ImportError:  # pragma: no cover - deployment guard
-    sympy = None
-
-
 VALIDATION_REPORT_SCHEMA = "solution_validation_report_v1"
 VALIDATOR_RESULT_SCHEMA = "assessment_validator_result_v1"
 
@@ -355,7 +351,18 @@ _ALLOWED_SYMBOLIC_FUNCTIONS = frozenset({
 })
 
 
+@lru_cache(maxsize=1)
+def _sympy() -> ModuleType | None:
+    """sympy 导入要 300 ms 以上，只有符号判等用得到，第一次判等时再导入。"""
+    try:
+        import sympy
+    except ImportError:  # pragma: no cover - deployment guard
+        return None
+    return sympy
+
+
 def _symbolic_equivalent(expected: Any, actual: Any) -> bool | None:
+    sympy = _sympy()
     if sympy is None:
         return _symbolic(expected) == _symbolic(actual)
     expected_text = str(expected or "").strip()
@@ -386,6 +393,7 @@ def _symbolic_equivalent(expected: Any, actual: Any) -> bool | None:
 
 
 def _parse_symbolic_expression(value: str):
+    sympy = _sympy()
     text = value.replace("^", "**")
     # 把所有自由变量显式声明为符号。
     #
@@ -13,6 +13,7 @@ import threading
 from typing import Any, Callable
 import uuid
 
+from ai_capacity import admission
 from change_proposals import ChangeProposalRepository, create_authoring_change
 from course_commands import CourseCommandService
 from course_document import CourseBlock, stable_hash
@@ -318,7 +319,9 @@ class BlockRegenerationService:
                 user_id=user_id,
             )
             return self._recover_interrupted_candidate(candidate)
-        return await self._generate_candidate(candidate, user_id=user_id, run_id=run_id)
+        # A teacher is waiting on this one block: it must not queue behind bulk generation.
+        with admission("interactive", course_id=course_id):
+            return await self._generate_candidate(candidate, user_id=user_id, run_id=run_id)
 
     def get_candidate(self, course_id: str, block_id: str, candidate_id: str) -> dict[str, Any]:
         candidate = self.candidate_repository.load(candidate_id)
@@ -401,7 +404,8 @@ class BlockRegenerationService:
                 f"Candidate cannot be retried from status {claimed.get('status')}",
                 candidate=claimed,
             )
-        return await self._generate_candidate(claimed, user_id=user_id, run_id=run_id)
+        with admission("interactive", course_id=course_id):
+            return await self._generate_candidate(claimed, user_id=user_id, run_id=run_id)
 
     async def _generate_candidate(
         self,
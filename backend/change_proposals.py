@@ -25,6 +25,7 @@ import uuid
 from course_commands import CourseCommandService
 from course_document import refresh_block_revision, stable_hash
 from course_repository import CourseDocumentConflict, CourseDocumentRepository
+from worker_coordination import ProcessLock, ProcessLockRegistry
 
 
 COURSE_AUTHORING_CHANGE_SCHEMA = "course_authoring_change_v1"
@@ -73,8 +74,7 @@ class ChangeProposalRepository:
 
         self.root_dir = Path(root_dir or Path(DATA_DIR) / "change_proposals")
         self.root_dir.mkdir(parents=True, exist_ok=True)
-        self._locks: dict[str, threading.RLock] = {}
-        self._locks_guard = threading.Lock()
+        self._locks = ProcessLockRegistry(self.root_dir)
 
     @staticmethod
     def proposal_id_for(course_id: str, request_id: str) -> str:
@@ -158,9 +158,8 @@ class ChangeProposalRepository:
     def _path(self, proposal_id: str) -> Path:
         return self.root_dir / f"{proposal_id}.json"
 
-    def _lock(self, proposal_id: str) -> threading.RLock:
-        with self._locks_guard:
-            return self._locks.setdefault(proposal_id, threading.RLock())
+    def _lock(self, proposal_id: str) -> ProcessLock:
+        return self._locks.get(proposal_id)
 
     @staticmethod
     def _validate_id(value: str) -> None:
@@ -0,0 +1,446 @@
+"""Content-addressed chunk store shared by the revisioned JSON repositories.
+
+Course versions, learning-asset bundles, question-bank bundles and generation
+workspaces all persist one full JSON document per revision. Consecutive
+revisions mostly repeat the same sections and items, so every revision used to
+store another copy of them.
+
+Repositories now split a document at declared paths (``("nodes", "*")``,
+``("items", "*")`` …). Each element at such a path is stored once under the
+SHA-256 of its canonical JSON in ``objects/<2 hex>/<hash>.json``. The revision
+file itself becomes a *manifest*: the document with every chunked element
+replaced by ``{"$chunk": <hash>}``, plus the list of chunks it references.
+
+Reference counts live in ``refs/<2 hex>.json`` shards. :meth:`put` writes the
+missing chunks and increments their counts before the caller writes the
+manifest; :meth:`release` decrements them after a manifest is replaced or
+deleted and removes chunks that reach zero. A crash between those steps can
+only leave a count too high (a leaked chunk), never a manifest pointing at a
+deleted chunk. Writers are serialized by an ``RLock`` and, across processes, by
+``fcntl.flock`` on ``<root>/lock``, the same scheme as ``manifest_index``.
+
+Documents written before this store existed stay plain JSON; :meth:`load`
+returns them unchanged, so no migration is required.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager
+from copy import deepcopy
+from pathlib import Path
+from typing import Any
+
+try:  # pragma: no cover - platform dependent
+    import fcntl
+except ImportError:  # pragma: no cover - Windows development machines
+    fcntl = None  # type: ignore[assignment]
+
+MANIFEST_SCHEMA = "content_manifest_v1"
+CHUNK_MARKER = "$chunk"
+DEFAULT_MIN_CHUNK_BYTES = 512
+DEFAULT_CACHE_BYTES = 32 * 1024 * 1024
+
+ChunkPath = tuple[str, ...]
+
+
+def canonical_json(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, sort_keys=True, separators=(",", ":"), default=str)
+
+
+def chunk_hash(payload: str) -> str:
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def is_manifest(value: Any) -> bool:
+    return isinstance(value, dict) and value.get("schema_version") == MANIFEST_SCHEMA and "document" in value
+
+
+def split_document(
+    document: dict[str, Any],
+    paths: Iterable[ChunkPath],
+    *,
+    min_chunk_bytes: int = DEFAULT_MIN_CHUNK_BYTES,
+) -> tuple[dict[str, Any], dict[str, str]]:
+    """Return ``(skeleton, {hash: canonical_json})`` for ``document``.
+
+    Only dict elements whose canonical JSON reaches ``min_chunk_bytes`` become
+    chunks; small ones stay inline, where a separate file would cost more than
+    it could save.
+    """
+    skeleton = deepcopy(document)
+    chunks: dict[str, str] = {}
+    for path in paths:
+        for container, key in _targets(skeleton, path):
+            value = container[key]
+            if not isinstance(value, dict) or _is_ref(value):
+                continue
+            payload = canonical_json(value)
+            if len(payload.encode("utf-8")) < min_chunk_bytes:
+                continue
+            digest = chunk_hash(payload)
+            chunks[digest] = payload
+            container[key] = {CHUNK_MARKER: digest}
+    return skeleton, chunks
+
+
+class ContentChunkStore:
+    def __init__(
+        self,
+        root: str | Path,
+        *,
+        min_chunk_bytes: int = DEFAULT_MIN_CHUNK_BYTES,
+        cache_bytes: int = DEFAULT_CACHE_BYTES,
+        create: bool = True,
+    ) -> None:
+        """``create=False`` opens a store for reading without creating its directories."""
+        self.root = Path(root)
+        self.min_chunk_bytes = min_chunk_bytes
+        self.cache_bytes = cache_bytes
+        self._objects = self.root / "objects"
+        self._refs = self.root / "refs"
+        self._lock_path = self.root / "lock"
+        self._lock = threading.RLock()
+        self._file_lock_depth = 0
+        # Chunks are immutable, so a cached payload never goes stale; it only
+        # needs re-reading when evicted.
+        self._cache: OrderedDict[str, str] = OrderedDict()
+        self._cache_size = 0
+        self._cache_guard = threading.Lock()
+        self._counters = {"cache_hits": 0, "cache_misses": 0}
+        if create:
+            self._objects.mkdir(parents=True, exist_ok=True)
+            self._refs.mkdir(parents=True, exist_ok=True)
+
+    # ------------------------------------------------------------------
+    # Documents
+    # ------------------------------------------------------------------
+
+    def put(self, document: dict[str, Any], paths: Iterable[ChunkPath]) -> dict[str, Any]:
+        """Store the chunks of ``document`` and return its manifest.
+
+        The caller owns one reference per returned chunk until it passes the
+        manifest to :meth:`release`.
+        """
+        paths = [tuple(path) for path in paths]
+        skeleton, chunks = split_document(document, paths, min_chunk_bytes=self.min_chunk_bytes)
+        with self._lock, self._file_lock():
+            for digest, payload in chunks.items():
+                path = self._object_path(digest)
+                if not path.exists():
+                    _write_text_atomic(path, payload)
+            self._adjust(chunks, +1)
+        for digest, payload in chunks.items():
+            self._remember(digest, payload)
+        return {
+            "schema_version": MANIFEST_SCHEMA,
+            "paths": [list(path) for path in paths],
+            "chunks": sorted(chunks),
+            "document": skeleton,
+        }
+
+    def load(self, value: dict[str, Any]) -> dict[str, Any]:
+        """Reassemble a manifest; plain (pre-chunking) documents pass through."""
+        if not is_manifest(value):
+            return value
+        document = value["document"]
+        for path in value.get("paths") or []:
+            for container, key in _targets(document, tuple(path)):
+                ref = container[key]
+                if _is_ref(ref):
+                    container[key] = json.loads(self._read_chunk(str(ref[CHUNK_MARKER])))
+        return document
+
+    def release(self, value: dict[str, Any] | None) -> int:
+        """Drop one reference per chunk of a manifest; returns chunks deleted."""
+        if not is_manifest(value):
+            return 0
+        digests = [str(item) for item in value.get("chunks") or []]
+        if not digests:
+            return 0
+        with self._lock, self._file_lock():
+            removed = self._adjust(digests, -1)
+            for digest in removed:
+                try:
+                    self._object_path(digest).unlink()
+                except FileNotFoundError:
+                    pass
+        with self._cache_guard:
+            for digest in removed:
+                payload = self._cache.pop(digest, None)
+                if payload is not None:
+                    self._cache_size -= len(payload)
+        return len(removed)
+
+    # ------------------------------------------------------------------
+    # Files holding one document
+    # ------------------------------------------------------------------
+
+    def read(self, path: Path) -> Any:
+        """Read and reassemble ``path``.
+
+        A lockless reader can race a writer that replaces the manifest and
+        collects the old chunks; the file is then re-read once.
+        """
+        try:
+            return self.load(_read_json(path))
+        except KeyError:
+            return self.load(_read_json(path))
+
+    def write(
+        self,
+        path: Path,
+        document: dict[str, Any],
+        paths: Iterable[ChunkPath],
+        *,
+        writer: Callable[[Path, dict[str, Any]], None],
+    ) -> None:
+        """Replace ``path`` with a manifest of ``document`` via ``writer``.
+
+        Chunks of the previous manifest are released only after the new one is
+        in place, so chunks shared by both are never collected in between.
+        """
+        previous = self._read_raw(path)
+        manifest = self.put(document, paths)
+        try:
+            writer(path, manifest)
+        except BaseException:
+            self.release(manifest)
+            raise
+        self.release(previous)
+
+    def discard(self, path: Path) -> bool:
+        """Delete ``path`` and release the chunks its manifest referenced."""
+        previous = self._read_raw(path)
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            return False
+        self.release(previous)
+        return True
+
+    def discard_tree(self, directory: Path, pattern: str = "**/*.json") -> int:
+        """Release every manifest under ``directory`` before it is removed."""
+        released = 0
+        if not directory.exists():
+            return released
+        for path in directory.glob(pattern):
+            if path.is_file():
+                self.release(self._read_raw(path))
+                released += 1
+        return released
+
+    @staticmethod
+    def _read_raw(path: Path) -> dict[str, Any] | None:
+        try:
+            value = _read_json(path)
+        except (FileNotFoundError, ValueError):
+            return None
+        return value if is_manifest(value) else None
+
+    # ------------------------------------------------------------------
+    # Reporting
+    # ------------------------------------------------------------------
+
+    def stats(self) -> dict[str, int]:
+        chunks = 0
+        size = 0
+        for path in self._objects.glob("*/*.json"):
+            chunks += 1
+            try:
+                size += path.stat().st_size
+            except OSError:
+                continue
+        references = 0
+        for shard in self._refs.glob("*.json"):
+            references += sum(self._read_shard(shard).values())
+        return {"chunks": chunks, "chunk_bytes": size, "references": references}
+
+    def cache_stats(self) -> dict[str, int]:
+        """Chunk payload cache counters only; unlike :meth:`stats` it does not walk the disk."""
+        with self._cache_guard:
+            return dict(self._counters)
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _object_path(self, digest: str) -> Path:
+        if len(digest) != 64 or any(char not in "0123456789abcdef" for char in digest):
+            raise ValueError("Invalid content chunk hash")
+        return self._objects / digest[:2] / f"{digest}.json"
+
+    def _read_chunk(self, digest: str) -> str:
+        with self._cache_guard:
+            payload = self._cache.get(digest)
+            if payload is not None:
+                self._cache.move_to_end(digest)
+                self._counters["cache_hits"] += 1
+                return payload
+            self._counters["cache_misses"] += 1
+        try:
+            payload = self._object_path(digest).read_text(encoding="utf-8")
+        except FileNotFoundError:
+            raise KeyError(f"Missing content chunk: {digest}") from None
+        self._remember(digest, payload)
+        return payload
+
+    def _remember(self, digest: str, payload: str) -> None:
+        if len(payload) > self.cache_bytes:
+            return
+        with self._cache_guard:
+            if digest in self._cache:
+                self._cache.move_to_end(digest)
+                return
+            self._cache[digest] = payload
+            self._cache_size += len(payload)
+            while self._cache_size > self.cache_bytes:
+                _, evicted = self._cache.popitem(last=False)
+                self._cache_size -= len(evicted)
+
+    def _adjust(self, digests: Iterable[str], delta: int) -> list[str]:
+        """Apply ``delta`` to each count; returns digests that dropped to zero."""
+        by_shard: dict[str, list[str]] = {}
+        for digest in digests:
+            by_shard.setdefault(digest[:2], []).append(digest)
+        removed: list[str] = []
+        for prefix, members in by_shard.items():
+            shard = self._refs / f"{prefix}.json"
+            counts = self._read_shard(shard)
+            for digest in members:
+                count = counts.get(digest, 0) + delta
+                if count > 0:
+                    counts[digest] = count
+                else:
+                    counts.pop(digest, None)
+                    removed.append(digest)
+            _write_text_atomic(shard, json.dumps(counts, separators=(",", ":"), sort_keys=True))
+        return removed
+
+    @staticmethod
+    def _read_shard(path: Path) -> dict[str, int]:
+        try:
+            value = json.loads(path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return {}
+        if not isinstance(value, dict):
+            raise ValueError(f"Expected object in {path}")
+        return {str(key): int(count) for key, count in value.items()}
+
+    @contextmanager
+    def _file_lock(self) -> Iterator[None]:
+        # flock locks an open file description; re-opening in the same process
+        # would self-deadlock, so nested entries only count depth.
+        if fcntl is None or self._file_lock_depth:
+            self._file_lock_depth += 1
+            try:
+                yield
+            finally:
+                self._file_lock_depth -= 1
+            return
+        with self._lock_path.open("a+") as handle:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+            self._file_lock_depth += 1
+            try:
+                yield
+            finally:
+                self._file_lock_depth -= 1
+                fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+
+
+def _is_ref(value: Any) -> bool:
+    return isinstance(value, dict) and len(value) == 1 and CHUNK_MARKER in value
+
+
+def _targets(document: Any, path: ChunkPath) -> Iterator[tuple[Any, Any]]:
+    """Yield ``(container, key)`` for every slot matched by ``path``.
+
+    ``"*"`` matches every element of a list or every value of a dict.
+    """
+    if not path:
+        return
+    head, rest = path[0], path[1:]
+    if head == "*":
+        if isinstance(document, list):
+            keys: Iterable[Any] = range(len(document))
+        elif isinstance(document, dict):
+            keys = list(document)
+        else:
+            return
+    elif isinstance(document, dict) and head in document:
+        keys = [head]
+    else:
+        return
+    for key in keys:
+        if rest:
+            yield from _targets(document[key], rest)
+        else:
+            yield document, key
+
+
+def _read_json(path: Path) -> Any:
+    with path.open(encoding="utf-8") as handle:
+        return json.load(handle)
+
+
+def _write_text_atomic(path: Path, text: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with temp.open("w", encoding="utf-8") as handle:
+            handle.write(text)
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(temp, path)
+    finally:
+        if temp.exists():
+            temp.unlink()
+
+
+_stores: dict[str, ContentChunkStore] = {}
+_stores_guard = threading.Lock()
+
+
+def chunk_store_for(repository_root: str | Path) -> ContentChunkStore:
+    """The store shared by every repository whose root is a sibling of ``content_chunks``.
+
+    ``DATA_DIR/course_versions``, ``DATA_DIR/question_banks`` … all resolve to
+    ``DATA_DIR/content_chunks``, so identical sections and items are stored
+    once across repositories.
+    """
+    root = (Path(repository_root).resolve().parent / "content_chunks")
+    key = os.fspath(root)
+    with _stores_guard:
+        store = _stores.get(key)
+        if store is None:
+            store = _stores[key] = ContentChunkStore(root)
+        return store
+
+
+def chunk_cache_stats() -> dict[str, int]:
+    """Payload cache counters summed over every store opened through :func:`chunk_store_for`."""
+    with _stores_guard:
+        stores = list(_stores.values())
+    totals = {"cache_hits": 0, "cache_misses": 0}
+    for store in stores:
+        for name, value in store.cache_stats().items():
+            totals[name] += value
+    return totals
+
+
+__all__ = [
+    "CHUNK_MARKER",
+    "MANIFEST_SCHEMA",
+    "ContentChunkStore",
+    "canonical_json",
+    "chunk_cache_stats",
+    "chunk_hash",
+    "chunk_store_for",
+    "is_manifest",
+    "split_document",
+]
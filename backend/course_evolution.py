@@ -32,7 +32,9 @@ from learning_events import load_learning_events
 from learning_records import learning_record_repository
 from product_runtime_policy import demo_overrides_enabled
 from practice_attempts import practice_attempt_repository
+from store_watermarks import bump_watermark, file_watermark
 from teaching_representations import teaching_representation_repository
+from worker_coordination import ProcessLock, ProcessLockRegistry
 
 COURSE_EVOLUTION_SCHEMA = "course_evolution_v2"
 COURSE_COMMAND_GROUP_SCHEMA = "course_evolution_command_group_v1"
@@ -264,14 +266,17 @@ class CourseEvolutionRepository:
             root = Path(DATA_DIR) / "course_evolution"
         self.root = Path(root)
         self.root.mkdir(parents=True, exist_ok=True)
-        self._locks: dict[str, threading.RLock] = {}
-        self._guard = threading.Lock()
+        self._locks = ProcessLockRegistry(self.root)
 
     def load(self, user_id: str, course_id: str) -> CourseEvolutionState:
         key = self._key(user_id, course_id)
         with self._lock(key):
             return self._load_unlocked(user_id, course_id, key)
 
+    def watermark(self, user_id: str, course_id: str) -> tuple[int, int, int, int]:
+        """Change token for one learner-course state file; see ``store_watermarks``."""
+        return file_watermark(self.root / f"{self._key(user_id, course_id)}.json")
+
     def save(self, state: CourseEvolutionState) -> CourseEvolutionState:
         key = self._key(state.user_id, state.course_id)
         with self._lock(key):
@@ -333,6 +338,7 @@ class CourseEvolutionRepository:
                 handle.flush()
                 os.fsync(handle.fileno())
             os.replace(temp, path)
+            bump_watermark(path)
         finally:
             if temp.exists():
                 temp.unlink()
@@ -342,9 +348,8 @@ class CourseEvolutionRepository:
     def _key(user_id: str, course_id: str) -> str:
         return hashlib.sha256(f"{user_id}\0{course_id}".encode()).hexdigest()
 
-    def _lock(self, key: str) -> threading.RLock:
-        with self._guard:
-            return self._locks.setdefault(key, threading.RLock())
+    def _lock(self, key: str) -> ProcessLock:
+        return self._locks.get(key)
 
     @staticmethod
     def _refresh(state: CourseEvolutionState) -> CourseEvolutionState:
@@ -4,12 +4,14 @@ from __future__ import annotations
 
 import re
 from copy import deepcopy
+from functools import lru_cache
 from typing import Any
 
 from content_blocks import set_node_content_blocks
 from course_knowledge_map import normalize_knowledge_structure
 from course_versioning import stable_hash
 from evidence_package import evidence_for_keys, load_frozen_package
+from term_automaton import TermAutomaton
 
 COURSE_KNOWLEDGE_BASE_SCHEMA = "course_knowledge_base_v2"
 COURSE_KNOWLEDGE_VIEW_SCHEMA = "knowledge_library_view_v3"
@@ -1865,6 +1867,7 @@ def _compile_course_object_bindings(
     assets: dict[str, list[dict[str, Any]]],
 ) -> None:
     by_id = {str(item.get("knowledge_id") or ""): item for item in points}
+    matcher = _point_term_matcher(_point_terms_key(by_id))
     for section in sections:
         section_id = str(section.get("node_id") or "")
         candidate_ids = section_point_ids.get(section_id, [])
@@ -1895,10 +1898,7 @@ def _compile_course_object_bindings(
             searchable = _normalize_search_text(
                 f"{block.get('title') or ''} {block.get('content') or ''} {block.get('summary') or ''}"
             )
-            semantic_matches = [
-                point_id for point_id in candidate_ids
-                if _point_matches_text(by_id.get(point_id) or {}, searchable)
-            ]
+            semantic_matches = matcher.matches(candidate_ids, searchable)
             matched = explicit or semantic_matches
             method = "knowledge_blueprint_anchor" if explicit else "semantic_name_match"
             if not matched:
@@ -2197,6 +2197,63 @@ def _point_matches_text(point: dict[str, Any], searchable: str) -> bool:
     )
 
 
+def _point_terms_key(by_id: dict[str, dict[str, Any]]) -> tuple[tuple[str, tuple[str, ...]], ...]:
+    return tuple(
+        (point_id, tuple(str(term or "") for term in [point.get("name"), *(point.get("aliases") or [])]))
+        for point_id, point in by_id.items()
+    )
+
+
+# 逐词 ``in`` 在 C 里跑，候选词少时比纯 Python 的自动机扫描快；实测两者在每块
+# 约 250 个候选词处交叉，且与块长基本无关。
+_AUTOMATON_MIN_TERMS = 256
+
+
+class _PointTermMatcher:
+    """Normalized names and aliases of one knowledge base, compiled once.
+
+    Accepts exactly what :func:`_point_matches_text` accepts: normalized terms
+    of at least two characters, as substrings of the normalized block text.
+    Blocks with many candidate terms are scanned once by a
+    :class:`TermAutomaton` over every point; the rest test their candidates'
+    pre-normalized terms directly.
+    """
+
+    def __init__(self, key: tuple[tuple[str, tuple[str, ...]], ...]) -> None:
+        self.terms = {
+            point_id: tuple(dict.fromkeys(
+                normalized for term in terms
+                if len(normalized := _normalize_search_text(term)) >= 2
+            ))
+            for point_id, terms in key
+        }
+        self._automaton: TermAutomaton | None = None
+
+    @property
+    def automaton(self) -> TermAutomaton:
+        if self._automaton is None:
+            self._automaton = TermAutomaton(
+                (term, point_id) for point_id, terms in self.terms.items() for term in terms
+            )
+        return self._automaton
+
+    def matches(self, candidate_ids: list[str], searchable: str) -> list[str]:
+        empty: tuple[str, ...] = ()
+        if sum(len(self.terms.get(point_id, empty)) for point_id in candidate_ids) >= _AUTOMATON_MIN_TERMS:
+            found = self.automaton.labels_in(searchable)
+            return [point_id for point_id in candidate_ids if point_id in found]
+        return [
+            point_id for point_id in candidate_ids
+            if any(term in searchable for term in self.terms.get(point_id, empty))
+        ]
+
+
+@lru_cache(maxsize=32)
+def _point_term_matcher(key: tuple[tuple[str, tuple[str, ...]], ...]) -> _PointTermMatcher:
+    # 键是全部知识点的原始名称与别名：知识库不变时重编译直接复用。
+    return _PointTermMatcher(key)
+
+
 def _view_path_node(
     knowledge_id: str,
     parent_id: str | None,
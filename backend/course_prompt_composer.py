@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 import json
+import os
 import re
 from typing import Any
 
@@ -29,6 +30,36 @@ from course_teaching_guidance import (
 
 PROMPT_CONTRACT_VERSION = "course_prompt_v26"
 
+# ``sectioned`` 是历来的阅读顺序；``prefix_stable`` 把同一作业内逐字不变的段落
+# 排到最前，让带自动前缀缓存的 provider（DeepSeek 磁盘缓存、OpenAI 兼容前缀
+# 缓存）能命中。两种布局内容相同，只有段落顺序和个别把变量挪出共享段的措辞不同。
+PROMPT_LAYOUTS = ("sectioned", "prefix_stable")
+
+# 段落共享等级：数字越小，在越多次调用之间逐字相同。
+_SHARED_BY_ALL = 0
+_SHARED_BY_JOB = 1
+_SHARED_BY_CHAPTER = 2
+_PER_CALL = 3
+
+
+def configured_prompt_layout() -> str:
+    layout = os.getenv("COURSE_PROMPT_LAYOUT", "").strip().lower()
+    return layout if layout in PROMPT_LAYOUTS else "sectioned"
+
+
+def _assemble_segments(
+    segments: list[tuple[int, str]],
+    *,
+    prefix_stable: bool,
+) -> str:
+    """按布局拼接 ``(共享等级, 段落)``；``sorted`` 稳定，同级保持原顺序。"""
+    ordered = (
+        sorted(segments, key=lambda item: item[0])
+        if prefix_stable
+        else segments
+    )
+    return "\n\n".join(text for _rank, text in ordered).strip()
+
 
 def _course_type_planning_rules(brief: dict[str, Any]) -> str:
     course_type = str(brief.get("course_type") or "systematic")
@@ -90,7 +121,171 @@ def _course_coverage_rules(verdict: dict[str, Any] | None) -> str:
     return "\n".join(lines)
 
 
+_OUTLINE_BATCH_V2_SCHEMA = """## JSON Schema
+{
+  "sections": [
+    {
+      "node_id": "L2-章号-节号",
+      "section_number": "章号.节号",
+      "title": "小节名",
+      "learning_objective": "学完后能完成的任务",
+      "prerequisite_node_ids": [],
+      "assessment": ["验收标准或任务"],
+      "scope_boundary": "本节负责什么，以及明确不提前展开什么",
+      "learning_path_role": "focus|standard|compressed|verify_in_project|milestone",
+      "path_reason": "该小节为何出现在当前学习路径"
+    }
+  ]
+}"""
+
+
+_TEACHING_PLAN_BATCH_V3_CONSTRAINTS = """## 约束
+1. `sections` 必须按批次指定顺序返回，`knowledge_details` 必须按本节
+   `owned_knowledge_keys` 顺序逐个展开，不能展开复用键。
+2. 每个知识详情必须给出成立条件或边界、可观察能力、至少一个可信易错点和可验证
+   掌握标准；易错点必须包含具体错误表现、判别方法与修复策略。
+3. `knowledge_type` 只能取以下七类之一，取值不在表内会被系统**静默改写成
+   `definition`**，不会报错也不会提示，所以必须选准：
+   `definition` 定义；`principle` 原理；`rule` 规则判据；`method` 方法；
+   `condition` 成立条件；`procedure` 操作流程；
+   `representation` **表示法**（同一对象的另一种写法/记号/形式，
+   例如解析式与图像、数表与公式）。不要自造词表外的取值。
+4. 掌握标准要能被判定：`observable_performance` 写清用什么任务、做到什么程度算
+   达标（能数的就写数量，如"3 道变式题全对"），`verification_method` 写清用什么
+   题、看什么作答表现判定。不要写"理解××""掌握××"这类无法判定的话。
+   `required_independence` 取 `scaffolded`/`guided`/`independent`（给范例/给追问/
+   完全独立），`required_transfer` 取 `recall`/`procedure`/`variation`/`novel`
+   （复述/照流程/变式/新情境）。两项按本知识点实际要求选，不要所有标准都填同一个值。
+5. `concept_group` 是本节知识点的分组，不是知识点的别名：同一小节里彼此相关的
+   知识点必须共用同一个组名，每组通常聚合 2-4 个知识点。组名写知识问题域
+   （例如"容量与扩容"），不要写成某个知识点的改写；一节通常 1-2 个组，只有确实
+   互不相关时才增加。不要为了让组数变多而硬拆，也不要给每个知识点各起一个组名。
+6. 关系端点只能使用全局注册表中的键。当前批次不得把未来知识当作已经掌握的复用，
+   也不得修改骨架冻结的前置关系。
+7. `relation_type` 按语义从六类中选，不要一律写 `prerequisite`；缺必填字段的关系整条丢弃。
+   `prerequisite` 学习顺序依赖；`applies_to` source 是方法或原理、target 是应用对象；
+   `generalizes` source 是一般情形、target 是其特例；`equivalent_to` 同一实质不同表述（对称）；
+   `derives` target 可由 source 推出，必填 `derivation_steps`（有序关键步骤，不可为空）；
+   `contrasts_with` 两者易混需辨析（对称），必填 `distinction`（凭什么区分两者）。
+   本节教学上确实成立的前置之外关系都要给出，但不要为凑数编造。
+   **关系写在引入该知识的那一节，不要攒到批次最后一节再一起写。** 本批次包含
+   多个小节，每一节都要各自写出连接**本节新知识**的关系；一节新引入了知识却
+   一条关系都不给，等于把这些知识孤立地丢进知识网。逐节检查：本批次每个小节的
+   `knowledge_relations` 是否都非空。
+   寻找关系时按下面的信号逐个自查，这三类最容易被漏掉：
+   - 写了某个知识点的易错点 `confused_with` 字段时，该易错对象若也是本节知识，
+     两者之间就应有一条 `contrasts_with`——学生会混淆，正是需要辨析的信号。
+   - 同一个对象在本节出现了两种表述（定义式与图像、文字规则与符号公式、
+     递推式与通项式），两者之间是 `equivalent_to`，不是前置。**尤其检查
+     `knowledge_type` 标成 `representation` 的知识点**：表示法本身不是新内容，
+     它一定是某个已有对象的另一种写法，那个对象若也在本节，就该连一条
+     `equivalent_to`。判据是"两边说的是同一件事，只是换了写法/记号/形式"，
+     而不是"两边有关系"。
+   - 一个知识点是另一个的特例（参数取特定值、条件更强、只适用于更窄的范围），
+     方向是一般 → 特例的 `generalizes`，不要写成 `prerequisite`。
+   某一类自查后确实不成立就不写那一类，宁缺毋滥；本节只有两三个知识点时
+   缺少上面这几类是正常的。但"某一类没有"不等于"整节没有关系"——覆盖要求仍然要满足。
+8. `teaching_modules` 只能使用当前小节允许的模块 ID；知识键只能来自本节负责或复用
+   集合。必需块即使省略也会由系统恢复，返回的模块只表达具体局部职责。
+9. `teaching_purpose` 与 `teaching_guidance` 必须把总体教案的课程成果、教学主线和
+   评价策略落实到本节，但不得复述总体教案，也不得改变冻结的目录、知识身份或模块集合。
+10. 每节的 `lesson_archetype` 是当前学科课型合同。详细教案必须落实其教学目的、
+   成果证据与质量底线；不能把同一学科的所有小节写成相同课堂流程，也不能越权创造课型外模块。
+11. 若总体教案给出课堂交付约束，每节应给出可执行的时长、重点难点、师生活动、资源、
+   课堂检查、作业或备注；这些字段必须与教学场景和总课时相容，未知内容可以省略，不能编造资料来源。
+8. 「本批次可依据的资料证据」是本节已确认的教师资料与联网来源。写成立条件、边界、
+   易错点与掌握标准时**必须优先依据这些证据**，不得与证据冲突；证据未覆盖的部分
+   照常用学科通识补足，但不得把通识伪装成资料结论，也不得编造证据里没有的来源、
+   数据或结论。该段为空时说明本节无可用证据，据实按通识展开即可。"""
+
+_TEACHING_PLAN_BATCH_V3_SCHEMA = """## JSON Schema
+{
+  "sections": [
+    {
+      "node_id": "L2-1-1",
+      "knowledge_details": [
+        {
+          "knowledge_key": "K001",
+          "concept_group": "知识问题域；本节相关知识点共用同一组名，通常每组 2-4 个知识点",
+          "group_description": "本组作用与边界；描述整组，不是描述单个知识点",
+          "knowledge_type": "definition",
+          "conditions": ["成立条件"],
+          "boundaries": ["不适用范围"],
+          "counterexamples": [],
+          "capability_points": [{
+            "name": "能力名称",
+            "observable_behavior": "独立可观察动作",
+            "required_evidence_types": ["practice_attempt"]
+          }],
+          "misconceptions": [{
+            "name": "错误模式",
+            "observable_error_pattern": "具体错误表现",
+            "confused_with": "易混对象",
+            "discrimination": "判别方法",
+            "repair_strategy": "修复策略"
+          }],
+          "mastery_criteria": [{
+            "name": "掌握标准",
+            "observable_performance": "独立表现；写清用什么任务、做到什么程度算达标，能数的就给数量",
+            "required_independence": "scaffolded|guided|independent 三选一，按本知识点实际要求选",
+            "required_transfer": "recall|procedure|variation|novel 四选一，按本知识点实际要求选",
+            "verification_method": "验证方法；写清用什么题、看什么作答表现判定",
+            "required_evidence_types": ["practice_attempt"]
+          }],
+          "aliases": []
+        }
+      ],
+      "knowledge_relations": [{
+        "source_key": "K001", "target_key": "K002",
+        "relation_type": "prerequisite", "reason": "具体语义理由"
+      }, {
+        "source_key": "K002", "target_key": "K003",
+        "relation_type": "derives", "reason": "K003 由 K002 推出",
+        "derivation_steps": ["从 K002 出发", "代入成立条件", "整理得到 K003"]
+      }, {
+        "source_key": "K003", "target_key": "K004",
+        "relation_type": "contrasts_with", "reason": "两者常被混同",
+        "distinction": "K003 是瞬时变化率，K004 是累积总量"
+      }, {
+        "source_key": "K002", "target_key": "K005",
+        "relation_type": "applies_to", "reason": "K002 是解 K005 这类问题的方法"
+      }, {
+        "source_key": "K005", "target_key": "K006",
+        "relation_type": "equivalent_to", "reason": "同一结论的两种表述，给定条件下可互相推出（对称）"
+      }, {
+        "source_key": "K006", "target_key": "K001",
+        "relation_type": "generalizes", "reason": "K006 是一般情形，K001 是它在参数取特定值时的特例"
+      }],
+      "teaching_modules": [{
+        "module_id": "core_explanation",
+        "teaching_purpose": "本节具体教学职责",
+        "knowledge_keys": ["K001"],
+        "teaching_guidance": "正文必须体现的讲法或学习者行动",
+        "planned_minutes": 15,
+        "teacher_activity": "教师演示或追问的具体动作",
+        "student_activity": "学生完成的可观察动作"
+      }],
+      "planned_minutes": 45,
+      "key_difficulties": ["需要重点突破的概念或操作"],
+      "teacher_activities": ["教师组织的关键活动"],
+      "student_activities": ["学生完成的关键活动"],
+      "resource_refs": ["已给定资源的名称或标识"],
+      "in_class_checks": ["可观察的课堂检查"],
+      "homework": ["课后练习或迁移任务"],
+      "teaching_notes": ["实施提醒"]
+    }
+  ]
+}"""
+
+
 class CoursePromptComposer:
+    def __init__(self, *, layout: str | None = None) -> None:
+        self.layout = layout if layout in PROMPT_LAYOUTS else configured_prompt_layout()
+
+    @property
+    def prefix_stable(self) -> bool:
+        return self.layout == "prefix_stable"
+
     def build_outline_skeleton_v2_prompt(
         self,
         *,
@@ -286,57 +481,50 @@ class CoursePromptComposer:
             )
         start = int(batch_spec.get("start_section_index") or 1)
         end = int(batch_spec.get("end_section_index") or start)
-        return f"""## 章节小节目录批次 V2
-
-全课章节骨架已经冻结。你只展开当前章节的第 {start}-{end} 个小节；不得修改课程
-定位、章节边界、其他章节或已经完成的当前章小节。只输出有效 JSON。
-
-## 课程
+        if self.prefix_stable:
+            # 批次范围与数量只出现在"当前批次"段，开头说明与约束因此全课逐字不变。
+            scope_text = "「当前批次」列出的当前章节小节"
+            count_rule = "必须严格返回「当前批次」`expected_node_ids` 中的全部小节"
+            batch_text = (
+                f"- 小节范围：当前章第 {start}-{end} 个，共 {end - start + 1} 个\n"
+                f"{json.dumps(batch_spec, ensure_ascii=False)}"
+            )
+        else:
+            scope_text = f"当前章节的第 {start}-{end} 个小节"
+            count_rule = f"必须严格返回 {end - start + 1} 个小节"
+            batch_text = json.dumps(batch_spec, ensure_ascii=False)
+        return _assemble_segments(
+            [
+                (_SHARED_BY_ALL, f"""## 章节小节目录批次 V2
+
+全课章节骨架已经冻结。你只展开{scope_text}；不得修改课程
+定位、章节边界、其他章节或已经完成的当前章小节。只输出有效 JSON。"""),
+                (_SHARED_BY_JOB, f"""## 课程
 - 名称：{course_title}
 - 定位：{positioning}
 - 全课成果：{json.dumps(learning_objectives, ensure_ascii=False)}
-- 章节骨架修订：{skeleton_revision_id}
-
-## 当前章节
-{json.dumps(chapter, ensure_ascii=False)}
-
-## 相邻章节边界
-{json.dumps(neighbor_chapters, ensure_ascii=False)}
-
-## 当前批次
-{json.dumps(batch_spec, ensure_ascii=False)}
-
-## 当前章已完成的前序小节
-{json.dumps(previous_sections, ensure_ascii=False)}
-
-## 当前章限量证据提示
-{json.dumps(evidence_hints, ensure_ascii=False)}
-
-## 约束
-1. 必须严格返回 {end - start + 1} 个小节，并按 `expected_node_ids` 的顺序逐一对应。
+- 章节骨架修订：{skeleton_revision_id}"""),
+                (_SHARED_BY_CHAPTER, f"""## 当前章节
+{json.dumps(chapter, ensure_ascii=False)}"""),
+                (_SHARED_BY_CHAPTER, f"""## 相邻章节边界
+{json.dumps(neighbor_chapters, ensure_ascii=False)}"""),
+                (_PER_CALL, f"""## 当前批次
+{batch_text}"""),
+                (_PER_CALL, f"""## 当前章已完成的前序小节
+{json.dumps(previous_sections, ensure_ascii=False)}"""),
+                (_PER_CALL, f"""## 当前章限量证据提示
+{json.dumps(evidence_hints, ensure_ascii=False)}"""),
+                (_SHARED_BY_ALL, f"""## 约束
+1. {count_rule}，并按 `expected_node_ids` 的顺序逐一对应。
 2. 每节只承担一个可观察且互不重复的责任，给出目标、范围和可检查验收任务。
 3. 当前章内部只能引用编号更早的小节。第一节只有确需承接时才可引用
    `previous_chapter_anchor_id`；不得引用其他章节或未来小节。
 4. 当前批次不得重新解释整个章节，不得提前承担下一批次或相邻章节的核心责任。
-5. 不输出知识点、知识关系、教案、正文、题目答案或 Markdown 围栏。
-
-## JSON Schema
-{{
-  "sections": [
-    {{
-      "node_id": "L2-章号-节号",
-      "section_number": "章号.节号",
-      "title": "小节名",
-      "learning_objective": "学完后能完成的任务",
-      "prerequisite_node_ids": [],
-      "assessment": ["验收标准或任务"],
-      "scope_boundary": "本节负责什么，以及明确不提前展开什么",
-      "learning_path_role": "focus|standard|compressed|verify_in_project|milestone",
-      "path_reason": "该小节为何出现在当前学习路径"
-    }}
-  ]
-}}""".strip()
-
+5. 不输出知识点、知识关系、教案、正文、题目答案或 Markdown 围栏。"""),
+                (_SHARED_BY_ALL, _OUTLINE_BATCH_V2_SCHEMA),
+            ],
+            prefix_stable=self.prefix_stable,
+        )
     def build_outline_batch_v2_correction_prompt(
         self,
         *,
@@ -633,174 +821,35 @@ class CoursePromptComposer:
                 max_list_items=8,
                 max_depth=2,
             )
-        return f"""## 详细小节教案批次 V3
+        return _assemble_segments(
+            [
+                (_SHARED_BY_ALL, """## 详细小节教案批次 V3
 
 全课知识身份已经冻结。你只展开当前批次，不得新增、删除、改名或迁移知识键；不得
-修改其他批次。只输出有效 JSON，不输出正文、题目、评分、解释或 Markdown 围栏。
-
-## 课程
+修改其他批次。只输出有效 JSON，不输出正文、题目、评分、解释或 Markdown 围栏。"""),
+                (_SHARED_BY_JOB, f"""## 课程
 - 课程：{course_title}
-- 定位：{positioning}
-
-## 共享课程块目录（只出现一次）
-{json.dumps(module_catalog, ensure_ascii=False)}
-
-## 总体教案引领（与教师视图同源，只读）
-{json.dumps(overall_guidance, ensure_ascii=False)}
-
-## 当前批次
+- 定位：{positioning}"""),
+                (_SHARED_BY_JOB, f"""## 共享课程块目录（只出现一次）
+{json.dumps(module_catalog, ensure_ascii=False)}"""),
+                (_SHARED_BY_JOB, f"""## 总体教案引领（与教师视图同源，只读）
+{json.dumps(overall_guidance, ensure_ascii=False)}"""),
+                (_PER_CALL, f"""## 当前批次
 - 批次：{json.dumps(batch_spec, ensure_ascii=False)}
-- 骨架修订：{skeleton_revision_id}
-
-## 当前小节（已去重）
-{json.dumps(batch_sections, ensure_ascii=False)}
-
-## 本批次可依据的资料证据（只读，来自教师上传资料与已确认联网来源）
-{json.dumps(batch_evidence, ensure_ascii=False)}
-
-## 当前批次知识与直接依赖闭包（只读）
-{json.dumps(knowledge_registry, ensure_ascii=False)}
-
-## 当前批次知识职责（只读）
-{json.dumps(section_identities, ensure_ascii=False)}
-
-## 约束
-1. `sections` 必须按批次指定顺序返回，`knowledge_details` 必须按本节
-   `owned_knowledge_keys` 顺序逐个展开，不能展开复用键。
-2. 每个知识详情必须给出成立条件或边界、可观察能力、至少一个可信易错点和可验证
-   掌握标准；易错点必须包含具体错误表现、判别方法与修复策略。
-3. `knowledge_type` 只能取以下七类之一，取值不在表内会被系统**静默改写成
-   `definition`**，不会报错也不会提示，所以必须选准：
-   `definition` 定义；`principle` 原理；`rule` 规则判据；`method` 方法；
-   `condition` 成立条件；`procedure` 操作流程；
-   `representation` **表示法**（同一对象的另一种写法/记号/形式，
-   例如解析式与图像、数表与公式）。不要自造词表外的取值。
-4. 掌握标准要能被判定：`observable_performance` 写清用什么任务、做到什么程度算
-   达标（能数的就写数量，如"3 道变式题全对"），`verification_method` 写清用什么
-   题、看什么作答表现判定。不要写"理解××""掌握××"这类无法判定的话。
-   `required_independence` 取 `scaffolded`/`guided`/`independent`（给范例/给追问/
-   完全独立），`required_transfer` 取 `recall`/`procedure`/`variation`/`novel`
-   （复述/照流程/变式/新情境）。两项按本知识点实际要求选，不要所有标准都填同一个值。
-5. `concept_group` 是本节知识点的分组，不是知识点的别名：同一小节里彼此相关的
-   知识点必须共用同一个组名，每组通常聚合 2-4 个知识点。组名写知识问题域
-   （例如"容量与扩容"），不要写成某个知识点的改写；一节通常 1-2 个组，只有确实
-   互不相关时才增加。不要为了让组数变多而硬拆，也不要给每个知识点各起一个组名。
-6. 关系端点只能使用全局注册表中的键。当前批次不得把未来知识当作已经掌握的复用，
-   也不得修改骨架冻结的前置关系。
-7. `relation_type` 按语义从六类中选，不要一律写 `prerequisite`；缺必填字段的关系整条丢弃。
-   `prerequisite` 学习顺序依赖；`applies_to` source 是方法或原理、target 是应用对象；
-   `generalizes` source 是一般情形、target 是其特例；`equivalent_to` 同一实质不同表述（对称）；
-   `derives` target 可由 source 推出，必填 `derivation_steps`（有序关键步骤，不可为空）；
-   `contrasts_with` 两者易混需辨析（对称），必填 `distinction`（凭什么区分两者）。
-   本节教学上确实成立的前置之外关系都要给出，但不要为凑数编造。
-   **关系写在引入该知识的那一节，不要攒到批次最后一节再一起写。** 本批次包含
-   多个小节，每一节都要各自写出连接**本节新知识**的关系；一节新引入了知识却
-   一条关系都不给，等于把这些知识孤立地丢进知识网。逐节检查：本批次每个小节的
-   `knowledge_relations` 是否都非空。
-   寻找关系时按下面的信号逐个自查，这三类最容易被漏掉：
-   - 写了某个知识点的易错点 `confused_with` 字段时，该易错对象若也是本节知识，
-     两者之间就应有一条 `contrasts_with`——学生会混淆，正是需要辨析的信号。
-   - 同一个对象在本节出现了两种表述（定义式与图像、文字规则与符号公式、
-     递推式与通项式），两者之间是 `equivalent_to`，不是前置。**尤其检查
-     `knowledge_type` 标成 `representation` 的知识点**：表示法本身不是新内容，
-     它一定是某个已有对象的另一种写法，那个对象若也在本节，就该连一条
-     `equivalent_to`。判据是"两边说的是同一件事，只是换了写法/记号/形式"，
-     而不是"两边有关系"。
-   - 一个知识点是另一个的特例（参数取特定值、条件更强、只适用于更窄的范围），
-     方向是一般 → 特例的 `generalizes`，不要写成 `prerequisite`。
-   某一类自查后确实不成立就不写那一类，宁缺毋滥；本节只有两三个知识点时
-   缺少上面这几类是正常的。但"某一类没有"不等于"整节没有关系"——覆盖要求仍然要满足。
-8. `teaching_modules` 只能使用当前小节允许的模块 ID；知识键只能来自本节负责或复用
-   集合。必需块即使省略也会由系统恢复，返回的模块只表达具体局部职责。
-9. `teaching_purpose` 与 `teaching_guidance` 必须把总体教案的课程成果、教学主线和
-   评价策略落实到本节，但不得复述总体教案，也不得改变冻结的目录、知识身份或模块集合。
-10. 每节的 `lesson_archetype` 是当前学科课型合同。详细教案必须落实其教学目的、
-   成果证据与质量底线；不能把同一学科的所有小节写成相同课堂流程，也不能越权创造课型外模块。
-11. 若总体教案给出课堂交付约束，每节应给出可执行的时长、重点难点、师生活动、资源、
-   课堂检查、作业或备注；这些字段必须与教学场景和总课时相容，未知内容可以省略，不能编造资料来源。
-8. 「本批次可依据的资料证据」是本节已确认的教师资料与联网来源。写成立条件、边界、
-   易错点与掌握标准时**必须优先依据这些证据**，不得与证据冲突；证据未覆盖的部分
-   照常用学科通识补足，但不得把通识伪装成资料结论，也不得编造证据里没有的来源、
-   数据或结论。该段为空时说明本节无可用证据，据实按通识展开即可。
-
-## JSON Schema
-{{
-  "sections": [
-    {{
-      "node_id": "L2-1-1",
-      "knowledge_details": [
-        {{
-          "knowledge_key": "K001",
-          "concept_group": "知识问题域；本节相关知识点共用同一组名，通常每组 2-4 个知识点",
-          "group_description": "本组作用与边界；描述整组，不是描述单个知识点",
-          "knowledge_type": "definition",
-          "conditions": ["成立条件"],
-          "boundaries": ["不适用范围"],
-          "counterexamples": [],
-          "capability_points": [{{
-            "name": "能力名称",
-            "observable_behavior": "独立可观察动作",
-            "required_evidence_types": ["practice_attempt"]
-          }}],
-          "misconceptions": [{{
-            "name": "错误模式",
-            "observable_error_pattern": "具体错误表现",
-            "confused_with": "易混对象",
-            "discrimination": "判别方法",
-            "repair_strategy": "修复策略"
-          }}],
-          "mastery_criteria": [{{
-            "name": "掌握标准",
-            "observable_performance": "独立表现；写清用什么任务、做到什么程度算达标，能数的就给数量",
-            "required_independence": "scaffolded|guided|independent 三选一，按本知识点实际要求选",
-            "required_transfer": "recall|procedure|variation|novel 四选一，按本知识点实际要求选",
-            "verification_method": "验证方法；写清用什么题、看什么作答表现判定",
-            "required_evidence_types": ["practice_attempt"]
-          }}],
-          "aliases": []
-        }}
-      ],
-      "knowledge_relations": [{{
-        "source_key": "K001", "target_key": "K002",
-        "relation_type": "prerequisite", "reason": "具体语义理由"
-      }}, {{
-        "source_key": "K002", "target_key": "K003",
-        "relation_type": "derives", "reason": "K003 由 K002 推出",
-        "derivation_steps": ["从 K002 出发", "代入成立条件", "整理得到 K003"]
-      }}, {{
-        "source_key": "K003", "target_key": "K004",
-        "relation_type": "contrasts_with", "reason": "两者常被混同",
-        "distinction": "K003 是瞬时变化率，K004 是累积总量"
-      }}, {{
-        "source_key": "K002", "target_key": "K005",
-        "relation_type": "applies_to", "reason": "K002 是解 K005 这类问题的方法"
-      }}, {{
-        "source_key": "K005", "target_key": "K006",
-        "relation_type": "equivalent_to", "reason": "同一结论的两种表述，给定条件下可互相推出（对称）"
-      }}, {{
-        "source_key": "K006", "target_key": "K001",
-        "relation_type": "generalizes", "reason": "K006 是一般情形，K001 是它在参数取特定值时的特例"
-      }}],
-      "teaching_modules": [{{
-        "module_id": "core_explanation",
-        "teaching_purpose": "本节具体教学职责",
-        "knowledge_keys": ["K001"],
-        "teaching_guidance": "正文必须体现的讲法或学习者行动",
-        "planned_minutes": 15,
-        "teacher_activity": "教师演示或追问的具体动作",
-        "student_activity": "学生完成的可观察动作"
-      }}],
-      "planned_minutes": 45,
-      "key_difficulties": ["需要重点突破的概念或操作"],
-      "teacher_activities": ["教师组织的关键活动"],
-      "student_activities": ["学生完成的关键活动"],
-      "resource_refs": ["已给定资源的名称或标识"],
-      "in_class_checks": ["可观察的课堂检查"],
-      "homework": ["课后练习或迁移任务"],
-      "teaching_notes": ["实施提醒"]
-    }}
-  ]
-}}""".strip()
+- 骨架修订：{skeleton_revision_id}"""),
+                (_PER_CALL, f"""## 当前小节（已去重）
+{json.dumps(batch_sections, ensure_ascii=False)}"""),
+                (_PER_CALL, f"""## 本批次可依据的资料证据（只读，来自教师上传资料与已确认联网来源）
+{json.dumps(batch_evidence, ensure_ascii=False)}"""),
+                (_PER_CALL, f"""## 当前批次知识与直接依赖闭包（只读）
+{json.dumps(knowledge_registry, ensure_ascii=False)}"""),
+                (_PER_CALL, f"""## 当前批次知识职责（只读）
+{json.dumps(section_identities, ensure_ascii=False)}"""),
+                (_SHARED_BY_ALL, _TEACHING_PLAN_BATCH_V3_CONSTRAINTS),
+                (_SHARED_BY_ALL, _TEACHING_PLAN_BATCH_V3_SCHEMA),
+            ],
+            prefix_stable=self.prefix_stable,
+        )
 
     def build_teaching_plan_batch_v3_correction_prompt(
         self,
@@ -830,7 +879,19 @@ class CoursePromptComposer:
         context: str,
         existing_draft: str = "",
         detail_level: str = "full",
+        shared_context: str = "",
     ) -> tuple[str, str]:
+        """Return ``(user_prompt, system_prompt)`` for one node.
+
+        ``shared_context`` is course-level context (source cards, custom
+        instruction) that every node of the job receives verbatim. The
+        sectioned layout appends it to ``context`` as before; the
+        prefix-stable layout sends it ahead of the node brief, with a fixed
+        clip budget so it stays byte-identical from node to node.
+        """
+        if not self.prefix_stable and shared_context:
+            context = "\n\n".join(part for part in (context, shared_context) if part)
+            shared_context = ""
         profile = course_data.get("subject_pedagogy_profile") or {}
         difficulty_profile = course_data.get("difficulty_profile") or {}
         difficulty_contract = node.get("difficulty_contract") or {}
@@ -869,10 +930,16 @@ class CoursePromptComposer:
                 max_list_items=4 if detail_level == "compact" else 2,
                 max_depth=2,
             )
-            context = clip_text(
-                context,
-                4200 if detail_level == "compact" else 700,
-            )
+            context_budget = 4200 if detail_level == "compact" else 700
+            if shared_context:
+                shared_context = clip_text(shared_context, context_budget // 2)
+                context_budget -= len(shared_context)
+            context = clip_text(context, context_budget)
+        shared_brief = (
+            f"## 课程共享上下文\n{shared_context.strip()}\n\n"
+            if shared_context.strip()
+            else ""
+        )
         if detail_level == "minimal":
             module_contract = "\n".join(
                 f"- `## {clip_text(item.get('label') or item.get('module_id'), 48)}`："
@@ -984,7 +1051,7 @@ class CoursePromptComposer:
                 if continuation
                 else f"撰写「{node_name}」正文，只输出 Markdown。"
             )
-            return f"{node_brief}\n\n{instruction}", system_prompt
+            return f"{shared_brief}{node_brief}\n\n{instruction}", system_prompt
 
         course_name = (
             clip_text(course_data.get("course_name"), 180)
@@ -1115,7 +1182,7 @@ class CoursePromptComposer:
             if continuation
             else f"撰写「{node_name}」完整正文，只输出 Markdown。"
         )
-        user_prompt = f"{node_brief}\n\n{instruction}"
+        user_prompt = f"{shared_brief}{node_brief}\n\n{instruction}"
         return user_prompt, system_prompt
 
     @staticmethod
@@ -1257,6 +1324,8 @@ def get_course_prompt_composer() -> CoursePromptComposer:
 
 __all__ = [
     "PROMPT_CONTRACT_VERSION",
+    "PROMPT_LAYOUTS",
     "CoursePromptComposer",
+    "configured_prompt_layout",
     "get_course_prompt_composer",
 ]
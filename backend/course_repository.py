@@ -2,7 +2,6 @@
 
 from __future__ import annotations
 
-import asyncio
 import inspect
 import threading
 from copy import deepcopy
@@ -26,6 +25,7 @@ from course_revisions import (
     revision_vector_for_document,
 )
 from course_teaching_plan_projection import project_course_teaching_plan
+from worker_coordination import AsyncProcessLock, lock_file_path, multi_worker_enabled
 
 _GENERATED_METADATA_EXCLUDES = {
     "nodes",
@@ -36,7 +36,7 @@ _GENERATED_METADATA_EXCLUDES = {
     "course_operation_log",
     "current_course_version_id",
 }
-_COMMAND_LOCKS: dict[tuple[int, str], asyncio.Lock] = {}
+_COMMAND_LOCKS: dict[tuple[int, str], AsyncProcessLock] = {}
 _COMMAND_LOCKS_GUARD = threading.Lock()
 _COURSE_REVISION_LISTENERS: set[Callable[[str, dict[str, Any]], None]] = set()
 
@@ -742,10 +742,19 @@ class CourseDocumentRepository:
         _publish_course_revision(course_id, receipt)
         return receipt
 
-    def _command_lock(self, course_id: str) -> asyncio.Lock:
+    def _command_lock(self, course_id: str) -> AsyncProcessLock:
         key = (id(self.storage), course_id)
         with _COMMAND_LOCKS_GUARD:
-            return _COMMAND_LOCKS.setdefault(key, asyncio.Lock())
+            lock = _COMMAND_LOCKS.get(key)
+            if lock is None:
+                # 多 worker 模式下，同一课程的读改写命令还要跨进程串行。
+                data_dir = getattr(self.storage, "_data_dir", None)
+                path = (
+                    lock_file_path(data_dir, f"course-command:{course_id}")
+                    if data_dir and multi_worker_enabled() else None
+                )
+                lock = _COMMAND_LOCKS[key] = AsyncProcessLock(path)
+            return lock
 
     async def repair_block_semantics(
         self,
@@ -1267,6 +1267,9 @@ class CourseService(AIBase):
                 total = max(1, int(detail.get("item_total") or 1))
                 index = max(1, int(detail.get("item_index") or 1))
                 completed_credit = 1 if detail.get("status") in {"parsed", "degraded", "failed", "metadata_only"} else 0
+                if not completed_credit and detail.get("page_total"):
+                    # 大 PDF 分片解析时按已完成页数给出当前资料的部分进度。
+                    completed_credit = min(0.99, int(detail.get("pages_done") or 0) / int(detail["page_total"]))
                 phase_progress = min(100, int(((index - 1 + completed_credit) / total) * 100))
                 global_progress = 5 + int(phase_progress * 0.2)
                 await self._notify_phase(
@@ -5861,10 +5864,12 @@ class CourseService(AIBase):
         source_context, citation_map, source_cards = (
             build_course_source_context(persisted)
         )
-        if source_context:
-            context = f"{context}\n\n{source_context}"
+        # 资料卡与自定义指令全课各节一致，单独交给编排器，前缀稳定布局会把它
+        # 排在节点内容之前。
+        shared_context = source_context or ""
         if config.custom_instruction:
-            context += f"\n\n## 用户自定义指令\n{config.custom_instruction}"
+            shared_context += f"\n\n## 用户自定义指令\n{config.custom_instruction}"
+        shared_context = shared_context.strip("\n")
         content_levels = prompt_detail_levels_for_source(
             {
                 "course_name": persisted.get("course_name") or "",
@@ -5878,6 +5883,7 @@ class CourseService(AIBase):
                 ),
                 "node": node,
                 "context": context,
+                "shared_context": shared_context,
                 "existing_draft": existing_draft,
             },
             max_input_chars=self._generation_budget.max_input_chars,
@@ -5897,6 +5903,7 @@ class CourseService(AIBase):
                         context=context,
                         existing_draft=existing_draft,
                         detail_level=detail_level,
+                        shared_context=shared_context,
                     )
                 ]
             ),
@@ -6057,7 +6064,9 @@ class CourseService(AIBase):
         self._record_generation_quality(
             output_type="node_content_stream",
             output_text=full_content,
-            context_text=context,
+            context_text="\n\n".join(
+                part for part in (context, shared_context) if part
+            ),
             source="course_service.generate_node_content_stream",
             course_id=course_id,
             node_id=node_id,
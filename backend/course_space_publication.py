@@ -18,17 +18,26 @@ Three properties this module owes the caller, in priority order:
 3. **Legible layout.** Artifacts land in the school template's own folders
    (教学大纲 / 教案 / PPT) under an ``AI 生成`` subdirectory, so they match how
    teachers already archive while staying visually separable from their uploads.
+
+Publication is incremental. :func:`plan_course_artifacts` lists every artifact
+with an ``input_revision`` -- a hash of exactly the course fields its renderer
+reads -- without rendering anything. A generated asset that already carries the
+same ``input_revision`` is reported unchanged without re-rendering, so
+regenerating one section renders and writes that section's files only. All
+changes land in one manifest save at the end.
 """
 
 from __future__ import annotations
 
 import hashlib
-import json
 import logging
+import time
+import uuid
+from collections.abc import Callable
 from pathlib import Path, PurePosixPath
 from typing import Any
-import uuid
 
+from course_document import stable_hash
 from teacher_course_space import (
     MaterialStorageError,
     classify_path,
@@ -39,6 +48,9 @@ from teacher_course_space import (
 logger = logging.getLogger(__name__)
 
 PUBLISH_SCHEMA_VERSION = "course_artifact_publication_v1"
+# Part of every ``input_revision``. Bump it when a renderer's output changes for
+# the same inputs, otherwise published files keep the old rendering.
+ARTIFACT_RENDERER_REVISION = "course_artifact_render_v1"
 
 # The generated-artifact subdirectory. Kept as one constant because it is the
 # marker that separates "the system wrote this" from "the teacher uploaded this",
@@ -97,28 +109,77 @@ def build_course_artifact_documents(course_data: dict[str, Any]) -> list[dict[st
     ``content`` pairs so the layout can be asserted in tests without touching a
     repository, and so callers can diff what *would* be written.
     """
-    documents: list[dict[str, Any]] = []
-    course_name = _safe_segment(course_data.get("course_name"), fallback="课程")
+    documents = []
+    for artifact in plan_course_artifacts(course_data):
+        document = {key: value for key, value in artifact.items() if key != "render"}
+        document["content"] = artifact["render"]()
+        documents.append(document)
+    return documents
 
-    outline = _render_outline(course_data)
-    if outline:
-        documents.append({
-            "relative_path": f"{_OUTLINE_FOLDER}/{GENERATED_DIR}/{course_name}-课程大纲.md",
-            "content": outline,
-            "artifact_type": "course_outline",
-        })
 
-    teaching_plan = _render_teaching_plan(course_data)
-    if teaching_plan:
-        documents.append({
-            "relative_path": f"{_LESSON_FOLDER}/{GENERATED_DIR}/{course_name}-全课教案.md",
-            "content": teaching_plan,
-            "artifact_type": "course_teaching_plan",
-        })
+def plan_course_artifacts(course_data: dict[str, Any]) -> list[dict[str, Any]]:
+    """List the artifacts this course publishes, with deferred renderers.
 
-    documents.extend(_render_section_documents(course_data))
-    documents.extend(_render_slide_documents(course_data))
-    return documents
+    Each entry has ``relative_path``, ``artifact_type``, ``input_revision`` and
+    ``render`` (a zero-argument callable), plus ``node_id`` for per-section
+    files. Deciding *which* artifacts exist only looks at the fields that gate
+    them, so planning a large course costs a few hashes, not a full render.
+    """
+    artifacts: list[dict[str, Any]] = []
+    course_name = _safe_segment(course_data.get("course_name"), fallback="课程")
+
+    plan = course_data.get("course_outline") or course_data.get("course_plan") or {}
+    chapters = plan.get("chapters") if isinstance(plan, dict) else None
+    if isinstance(chapters, list) and chapters:
+        verdict = (
+            (course_data.get("generation_stage_artifacts") or {}).get("outline") or {}
+        ).get("course_coverage_verdict")
+        artifacts.append(_artifact(
+            f"{_OUTLINE_FOLDER}/{GENERATED_DIR}/{course_name}-课程大纲.md",
+            "course_outline",
+            inputs={"course_name": course_data.get("course_name"), "plan": plan, "coverage": verdict},
+            render=lambda: _render_outline(course_data),
+        ))
+
+    teaching_plan = course_data.get("course_teaching_plan")
+    sections = teaching_plan.get("sections") if isinstance(teaching_plan, dict) else None
+    if isinstance(sections, list) and sections:
+        artifacts.append(_artifact(
+            f"{_LESSON_FOLDER}/{GENERATED_DIR}/{course_name}-全课教案.md",
+            "course_teaching_plan",
+            inputs={"course_name": course_data.get("course_name"), "plan": teaching_plan},
+            render=lambda: _render_teaching_plan(course_data),
+        ))
+
+    artifacts.extend(_section_artifacts(course_data))
+    artifacts.extend(_slide_artifacts(course_data))
+    return artifacts
+
+
+def _artifact(
+    relative_path: str,
+    artifact_type: str,
+    *,
+    inputs: dict[str, Any],
+    render: Callable[[], str],
+    node_id: str = "",
+) -> dict[str, Any]:
+    artifact = {
+        "relative_path": relative_path,
+        "artifact_type": artifact_type,
+        "input_revision": stable_hash(
+            {
+                "renderer": ARTIFACT_RENDERER_REVISION,
+                "relative_path": relative_path,
+                "inputs": inputs,
+            },
+            prefix="cai_",
+        ),
+        "render": render,
+    }
+    if node_id:
+        artifact["node_id"] = node_id
+    return artifact
 
 
 def _render_outline(course_data: dict[str, Any]) -> str:
@@ -210,7 +271,7 @@ def _render_teaching_plan(course_data: dict[str, Any]) -> str:
     return "\n".join(lines).rstrip() + "\n"
 
 
-def _render_section_documents(course_data: dict[str, Any]) -> list[dict[str, Any]]:
+def _section_artifacts(course_data: dict[str, Any]) -> list[dict[str, Any]]:
     """One markdown file per section, filed under its chapter."""
     nodes = [item for item in course_data.get("nodes") or [] if isinstance(item, dict)]
     chapters = {
@@ -218,7 +279,7 @@ def _render_section_documents(course_data: dict[str, Any]) -> list[dict[str, Any
         for item in nodes
         if int(item.get("node_level") or 0) == 1
     }
-    documents: list[dict[str, Any]] = []
+    artifacts: list[dict[str, Any]] = []
     for node in nodes:
         if int(node.get("node_level") or 0) != 2:
             continue
@@ -233,25 +294,24 @@ def _render_section_documents(course_data: dict[str, Any]) -> list[dict[str, Any
             node.get("node_name") or node.get("node_id"),
             fallback=str(node.get("node_id") or "小节"),
         )
-        documents.append({
-            "relative_path": (
-                f"{_LESSON_FOLDER}/{GENERATED_DIR}/{chapter_name}/{section_name}.md"
-            ),
-            "content": f"# {node.get('node_name') or ''}\n\n{content}\n",
-            "artifact_type": "section_content",
-            "node_id": str(node.get("node_id") or ""),
-        })
-    return documents
+        artifacts.append(_artifact(
+            f"{_LESSON_FOLDER}/{GENERATED_DIR}/{chapter_name}/{section_name}.md",
+            "section_content",
+            inputs={"node_name": node.get("node_name"), "content": content},
+            render=lambda node=node, content=content: f"# {node.get('node_name') or ''}\n\n{content}\n",
+            node_id=str(node.get("node_id") or ""),
+        ))
+    return artifacts
 
 
-def _render_slide_documents(course_data: dict[str, Any]) -> list[dict[str, Any]]:
+def _slide_artifacts(course_data: dict[str, Any]) -> list[dict[str, Any]]:
     """Export slide decks as markdown outlines.
 
     The built decks are HTML/binary artifacts owned by the slide pipeline; what
     belongs here is a readable per-section outline the teacher can archive
     alongside them.
     """
-    documents: list[dict[str, Any]] = []
+    artifacts: list[dict[str, Any]] = []
     for node in course_data.get("nodes") or []:
         if not isinstance(node, dict) or int(node.get("node_level") or 0) != 2:
             continue
@@ -263,21 +323,26 @@ def _render_slide_documents(course_data: dict[str, Any]) -> list[dict[str, Any]]
             node.get("node_name") or node.get("node_id"),
             fallback=str(node.get("node_id") or "小节"),
         )
-        lines = [f"# {node.get('node_name') or ''}｜讲义大纲", ""]
-        for index, slide in enumerate(slides, start=1):
-            if not isinstance(slide, dict):
-                continue
-            lines.append(f"## {index}. {slide.get('title') or ''}".rstrip())
-            for bullet in slide.get("bullets") or []:
-                lines.append(f"- {bullet}")
-            lines.append("")
-        documents.append({
-            "relative_path": f"{_SLIDES_FOLDER}/{GENERATED_DIR}/{section_name}.md",
-            "content": "\n".join(lines).rstrip() + "\n",
-            "artifact_type": "slide_outline",
-            "node_id": str(node.get("node_id") or ""),
-        })
-    return documents
+        artifacts.append(_artifact(
+            f"{_SLIDES_FOLDER}/{GENERATED_DIR}/{section_name}.md",
+            "slide_outline",
+            inputs={"node_name": node.get("node_name"), "slides": slides},
+            render=lambda node=node, slides=slides: _render_slide_outline(node, slides),
+            node_id=str(node.get("node_id") or ""),
+        ))
+    return artifacts
+
+
+def _render_slide_outline(node: dict[str, Any], slides: list[Any]) -> str:
+    lines = [f"# {node.get('node_name') or ''}｜讲义大纲", ""]
+    for index, slide in enumerate(slides, start=1):
+        if not isinstance(slide, dict):
+            continue
+        lines.append(f"## {index}. {slide.get('title') or ''}".rstrip())
+        for bullet in slide.get("bullets") or []:
+            lines.append(f"- {bullet}")
+        lines.append("")
+    return "\n".join(lines).rstrip() + "\n"
 
 
 def publish_course_artifacts(
@@ -291,7 +356,10 @@ def publish_course_artifacts(
 
     Never raises: every failure mode is folded into the returned report so the
     caller can surface it without rolling back a course that generated fine.
+    ``artifacts`` in the report lists each planned file with its outcome and
+    timings; the package manifest is saved once, and only if something changed.
     """
+    started = time.perf_counter()
     report: dict[str, Any] = {
         "schema_version": PUBLISH_SCHEMA_VERSION,
         "status": "skipped",
@@ -300,11 +368,12 @@ def publish_course_artifacts(
         "unchanged": [],
         "conflicts": [],
         "failures": [],
+        "artifacts": [],
     }
     repo = repository or teacher_course_space_repository
     try:
-        documents = build_course_artifact_documents(course_data)
-        if not documents:
+        artifacts = plan_course_artifacts(course_data)
+        if not artifacts:
             report["reason"] = "no_publishable_artifact"
             report["message"] = SKIP_MESSAGES["no_publishable_artifact"]
             return report
@@ -319,9 +388,22 @@ def publish_course_artifacts(
             report["message"] = SKIP_MESSAGES.get(skip_reason, "")
             return report
         report["package_id"] = str(package.get("package_id") or "")
-        for document in documents:
-            _publish_one(document, package=package, repository=repo, report=report)
-        repo.save(package)
+        assets_by_path = {
+            str(item.get("relative_path") or ""): item
+            for item in package.setdefault("assets", [])
+            if isinstance(item, dict)
+        }
+        changed = False
+        for artifact in artifacts:
+            changed = _publish_one(
+                artifact,
+                package=package,
+                repository=repo,
+                report=report,
+                assets_by_path=assets_by_path,
+            ) or changed
+        if changed:
+            repo.save(package)
         report["status"] = "failed" if report["failures"] else "completed"
     except Exception as exc:  # noqa: BLE001 - publishing must never fail generation
         logger.exception("Publishing course artifacts to the course space failed")
@@ -330,9 +412,14 @@ def publish_course_artifacts(
             "relative_path": "",
             "error": f"{type(exc).__name__}: {exc}",
         })
+    report["elapsed_ms"] = _elapsed_ms(started)
     return report
 
 
+def _elapsed_ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 3)
+
+
 def _resolve_package(
     course_data: dict[str, Any],
     *,
@@ -404,28 +491,50 @@ def _split_academic_term(value: str) -> tuple[str, str]:
 
 
 def _publish_one(
-    document: dict[str, Any],
+    artifact: dict[str, Any],
     *,
     package: dict[str, Any],
     repository: Any,
     report: dict[str, Any],
-) -> None:
-    relative_path = str(document.get("relative_path") or "")
-    content = str(document.get("content") or "")
+    assets_by_path: dict[str, dict[str, Any]],
+) -> bool:
+    """Publish one planned artifact; returns whether the manifest changed."""
+    started = time.perf_counter()
+    relative_path = str(artifact.get("relative_path") or "")
+    input_revision = str(artifact.get("input_revision") or "")
+    timing: dict[str, Any] = {
+        "relative_path": relative_path,
+        "artifact_type": str(artifact.get("artifact_type") or ""),
+        "outcome": "failed",
+        "render_ms": 0.0,
+    }
     try:
         relative_path = normalize_relative_path(relative_path)
+        existing = assets_by_path.get(relative_path)
+        if (
+            existing is not None
+            and str(existing.get("origin") or "") == "course_generation"
+            and str(existing.get("input_revision") or "") == input_revision
+        ):
+            # Rendered from these exact inputs last time: skip the render too.
+            report["unchanged"].append(relative_path)
+            timing["outcome"] = "unchanged"
+            return False
+        render_started = time.perf_counter()
+        content = str(artifact["render"]() or "")
+        timing["render_ms"] = _elapsed_ms(render_started)
         digest = _digest(content)
-        assets = package.setdefault("assets", [])
-        existing = next(
-            (item for item in assets if item.get("relative_path") == relative_path),
-            None,
-        )
         if existing is not None:
             if str(existing.get("sha256") or "") == digest:
                 # Same bytes already there: nothing to do, and nothing to report
                 # as a change. This is what makes re-generation idempotent.
                 report["unchanged"].append(relative_path)
-                return
+                timing["outcome"] = "unchanged"
+                if str(existing.get("origin") or "") != "course_generation":
+                    return False
+                # Record the inputs so the next publication skips the render.
+                existing["input_revision"] = input_revision
+                return True
             if str(existing.get("origin") or "") != "course_generation":
                 # A teacher-uploaded file lives here. Never overwrite it -- the
                 # teacher's own material outranks a regenerated artifact.
@@ -433,23 +542,31 @@ def _publish_one(
                     "relative_path": relative_path,
                     "reason": "manual_upload_present",
                 })
-                return
-        _write_asset(
+                timing["outcome"] = "conflict"
+                return False
+        assets_by_path[relative_path] = _write_asset(
             package=package,
             repository=repository,
             relative_path=relative_path,
             content=content,
             digest=digest,
             existing=existing,
-            artifact_type=str(document.get("artifact_type") or ""),
-            node_id=str(document.get("node_id") or ""),
+            artifact_type=str(artifact.get("artifact_type") or ""),
+            node_id=str(artifact.get("node_id") or ""),
+            input_revision=input_revision,
         )
         report["written"].append(relative_path)
+        timing["outcome"] = "written"
+        return True
     except (MaterialStorageError, OSError, ValueError) as exc:
         report["failures"].append({
             "relative_path": relative_path,
             "error": f"{type(exc).__name__}: {exc}",
         })
+        return False
+    finally:
+        timing["elapsed_ms"] = _elapsed_ms(started)
+        report["artifacts"].append(timing)
 
 
 def _write_asset(
@@ -462,7 +579,8 @@ def _write_asset(
     existing: dict[str, Any] | None,
     artifact_type: str,
     node_id: str,
-) -> None:
+    input_revision: str = "",
+) -> dict[str, Any]:
     package_id = str(package.get("package_id") or "")
     payload = content.encode("utf-8")
     asset_id = str((existing or {}).get("asset_id") or f"tca-{uuid.uuid4().hex}")
@@ -498,12 +616,15 @@ def _write_asset(
     }
     if node_id:
         asset["node_id"] = node_id
+    if input_revision:
+        asset["input_revision"] = input_revision
     assets = package.setdefault("assets", [])
     if existing is not None:
         assets[assets.index(existing)] = asset
     else:
         assets.append(asset)
     _ensure_folder_entries(package, relative_path)
+    return asset
 
 
 def _ensure_folder_entries(package: dict[str, Any], relative_path: str) -> None:
@@ -536,6 +657,7 @@ def _now() -> str:
 
 
 __all__ = [
+    "ARTIFACT_RENDERER_REVISION",
     "GENERATED_DIR",
     "MISSING_COURSE_ID",
     "MISSING_TEACHER_IDENTITY",
@@ -543,5 +665,6 @@ __all__ = [
     "SKIP_MESSAGES",
     "PUBLISH_SCHEMA_VERSION",
     "build_course_artifact_documents",
+    "plan_course_artifacts",
     "publish_course_artifacts",
 ]
@@ -6,12 +6,12 @@ import json
 import os
 import re
 import shutil
-import threading
 import uuid
 from copy import deepcopy
 from pathlib import Path
 from typing import Any
 
+from content_chunks import ContentChunkStore, chunk_store_for, is_manifest
 from course_versioning import (
     blueprint_revision_id,
     build_blueprint_draft,
@@ -19,10 +19,15 @@ from course_versioning import (
     compare_course_snapshots,
 )
 from storage import DATA_DIR
+from worker_coordination import ProcessLock, ProcessLockRegistry
 
 
 MANIFEST_SCHEMA = "course_version_manifest_v1"
 _SAFE_ID = re.compile(r"^[A-Za-z0-9._-]+$")
+# Sections and learning-asset items repeat across versions; they are stored
+# once in the shared content chunk store.
+VERSION_CHUNK_PATHS = (("nodes", "*"), ("learning_assets", "*", "*"))
+CANDIDATE_CHUNK_PATHS = tuple(("course_data", *path) for path in VERSION_CHUNK_PATHS)
 
 
 class CourseVersionConflict(RuntimeError):
@@ -30,11 +35,16 @@ class CourseVersionConflict(RuntimeError):
 
 
 class CourseVersionRepository:
-    def __init__(self, root_dir: str | Path | None = None) -> None:
+    def __init__(
+        self,
+        root_dir: str | Path | None = None,
+        *,
+        chunk_store: ContentChunkStore | None = None,
+    ) -> None:
         self.root_dir = Path(root_dir or Path(DATA_DIR) / "course_versions")
         self.root_dir.mkdir(parents=True, exist_ok=True)
-        self._locks: dict[str, threading.RLock] = {}
-        self._locks_guard = threading.RLock()
+        self._chunks = chunk_store or chunk_store_for(self.root_dir)
+        self._locks = ProcessLockRegistry(self.root_dir)
 
     def ensure_initial_version(self, course_id: str, course_data: dict[str, Any]) -> dict[str, Any]:
         with self._lock(course_id):
@@ -109,10 +119,10 @@ class CourseVersionRepository:
                 / "versions"
                 / f"{version_id}.json"
             )
-            snapshot = self._read_json(snapshot_path)
+            snapshot = self._read_document(snapshot_path)
             snapshot["current_course_version_id"] = version_id
             snapshot["blueprint_revision_id"] = entry["blueprint_revision_id"]
-            self._atomic_write(snapshot_path, snapshot)
+            self._write_document(snapshot_path, snapshot, VERSION_CHUNK_PATHS)
             self._atomic_write(self._manifest_path(course_id), manifest)
             return deepcopy(entry)
 
@@ -129,7 +139,7 @@ class CourseVersionRepository:
         path = self._course_dir(course_id) / "versions" / f"{version_id}.json"
         if not path.exists():
             raise KeyError(f"Unknown course version: {version_id}")
-        return self._read_json(path)
+        return self._read_document(path)
 
     def compare_versions(self, course_id: str, left_version_id: str, right_version_id: str) -> dict[str, Any]:
         left = self.get_version_snapshot(course_id, left_version_id)
@@ -203,10 +213,7 @@ class CourseVersionRepository:
         self._validate_id(candidate_id)
         with self._lock(course_id):
             path = self.root_dir / course_id / "candidates" / f"{candidate_id}.json"
-            if not path.exists():
-                return False
-            path.unlink()
-            return True
+            return self._chunks.discard(path)
 
     def delete_course(self, course_id: str) -> bool:
         """Delete all version-side state after the formal course is deleted."""
@@ -215,6 +222,7 @@ class CourseVersionRepository:
             directory = self.root_dir / course_id
             if not directory.exists():
                 return False
+            self._chunks.discard_tree(directory)
             shutil.rmtree(directory)
             return True
 
@@ -239,18 +247,22 @@ class CourseVersionRepository:
                 "impact_report": deepcopy(impact_report),
                 "course_data": deepcopy(course_data),
             }
-            self._atomic_write(self._candidate_path(course_id, candidate_id), candidate)
+            self._write_document(
+                self._candidate_path(course_id, candidate_id), candidate, CANDIDATE_CHUNK_PATHS,
+            )
             return deepcopy(candidate)
 
     def load_candidate(self, course_id: str, candidate_id: str) -> dict[str, Any]:
         path = self._candidate_path(course_id, candidate_id)
         if not path.exists():
             raise KeyError(f"Unknown candidate: {candidate_id}")
-        return self._read_json(path)
+        return self._read_document(path)
 
     def save_candidate(self, course_id: str, candidate_id: str, candidate: dict[str, Any]) -> dict[str, Any]:
         with self._lock(course_id):
-            self._atomic_write(self._candidate_path(course_id, candidate_id), candidate)
+            self._write_document(
+                self._candidate_path(course_id, candidate_id), candidate, CANDIDATE_CHUNK_PATHS,
+            )
             return deepcopy(candidate)
 
     def list_candidates(self, course_id: str) -> list[dict[str, Any]]:
@@ -259,7 +271,10 @@ class CourseVersionRepository:
             return []
         result = []
         for path in sorted(directory.glob("candidate_*.json")):
+            # The summary drops course_data, so a manifest never needs reassembly.
             item = self._read_json(path)
+            if is_manifest(item):
+                item = item["document"]
             result.append({key: deepcopy(value) for key, value in item.items() if key != "course_data"})
         return result
 
@@ -335,7 +350,9 @@ class CourseVersionRepository:
         manifest["next_sequence"] = sequence + 1
         snapshot["current_course_version_id"] = version_id if activate else manifest.get("current_version_id")
         snapshot["blueprint_revision_id"] = entry["blueprint_revision_id"]
-        self._atomic_write(self._course_dir(course_id) / "versions" / f"{version_id}.json", snapshot)
+        self._write_document(
+            self._course_dir(course_id) / "versions" / f"{version_id}.json", snapshot, VERSION_CHUNK_PATHS,
+        )
         self._atomic_write(self._manifest_path(course_id), manifest)
         return deepcopy(entry)
 
@@ -366,16 +383,24 @@ class CourseVersionRepository:
         self._validate_id(candidate_id)
         return self._course_dir(course_id) / "candidates" / f"{candidate_id}.json"
 
-    def _lock(self, course_id: str) -> threading.RLock:
+    def _lock(self, course_id: str) -> ProcessLock:
         self._validate_id(course_id)
-        with self._locks_guard:
-            return self._locks.setdefault(course_id, threading.RLock())
+        return self._locks.get(course_id)
 
     @staticmethod
     def _validate_id(value: str) -> None:
         if not value or not _SAFE_ID.match(value):
             raise ValueError("Invalid repository identifier")
 
+    def _read_document(self, path: Path) -> dict[str, Any]:
+        value = self._chunks.read(path)
+        if not isinstance(value, dict):
+            raise ValueError(f"Expected object in {path}")
+        return value
+
+    def _write_document(self, path: Path, data: dict[str, Any], paths: tuple[tuple[str, ...], ...]) -> None:
+        self._chunks.write(path, data, paths, writer=self._atomic_write)
+
     @staticmethod
     def _read_json(path: Path) -> dict[str, Any]:
         with path.open(encoding="utf-8") as handle:
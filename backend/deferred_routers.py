@@ -0,0 +1,155 @@
+"""按需挂载的路由：冷启动只导入常用路由，少用的路由在第一次被请求时才导入。
+
+``main`` 启动时导入全部路由模块，连带加载它们的 Pydantic 模型与依赖链，
+拖慢滚动重启与扩容。教师端工具、治理与验收这类低频路由登记在
+:class:`DeferredRouterRegistry` 里，只声明会命中它们的路径前缀：
+
+* :class:`DeferredRouterMiddleware` 看到请求路径落在某个前缀下，就在线程里
+  导入模块（不阻塞事件循环），再回到事件循环把路由插回登记时的位置：
+  全部常驻路由之后、WebSocket 与静态站点的兜底路由之前；
+* 请求 OpenAPI 文档时一次性加载全部延迟路由，文档保持完整；
+* ``LINGZHI_DEFER_ROUTERS=0`` 时登记即加载，挂载位置与延迟时相同。
+
+延迟路由在路由表里的位置与原先逐个挂载时不同（原先它们与常驻路由交错），
+匹配结果仍然一致的前提是两组路由互不重叠。前缀里的 ``{参数}`` 匹配一个
+路径段。声明的前缀必须覆盖模块里的全部路由，且延迟路由与常驻路由在同一
+方法上不能互相匹配，这两点由测试对照真实路由表检查。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import importlib
+import logging
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+def defer_routers_enabled() -> bool:
+    return os.getenv("LINGZHI_DEFER_ROUTERS", "1").strip().lower() not in {"0", "false", "no", "off"}
+
+
+@dataclass(frozen=True)
+class DeferredRouter:
+    """一个延迟挂载的路由模块。"""
+
+    module: str
+    paths: tuple[str, ...]
+    attributes: tuple[str, ...] = ("router",)
+    prefix: str = "/api"
+
+
+def path_prefix_pattern(paths: tuple[str, ...]) -> re.Pattern[str]:
+    """把 ``/api/courses/{course_id}/x`` 这类前缀编译成按路径段匹配的正则。"""
+    alternatives = []
+    for path in paths:
+        parts = re.split(r"(\{[^}]+\})", path.rstrip("/"))
+        alternatives.append("".join(
+            "[^/]+" if part.startswith("{") else re.escape(part) for part in parts if part
+        ))
+    return re.compile(rf"^(?:{'|'.join(alternatives)})(?:/|$)")
+
+
+class DeferredRouterRegistry:
+    """登记延迟路由，并负责在需要时导入、插回路由表。"""
+
+    def __init__(self, app: Any, routers: tuple[DeferredRouter, ...] = ()) -> None:
+        self.app = app
+        # 延迟路由插在登记时路由表的末尾，之后挂载的路由（兜底路由等）仍排在它们后面。
+        self._position = len(app.router.routes)
+        self._pending: dict[str, DeferredRouter] = {}
+        self._patterns: list[tuple[re.Pattern[str], DeferredRouter]] = []
+        self._lock = threading.Lock()
+        self.load_ms: dict[str, float] = {}
+        for router in routers:
+            self.register(router)
+
+    @property
+    def pending(self) -> bool:
+        return bool(self._pending)
+
+    def register(self, router: DeferredRouter) -> None:
+        self._pending[router.module] = router
+        self._patterns.append((path_prefix_pattern(router.paths), router))
+
+    def pending_for(self, path: str) -> list[DeferredRouter]:
+        """请求 ``path`` 之前需要挂上的路由；文档路径需要全部路由。"""
+        if path in {self.app.openapi_url, self.app.docs_url, self.app.redoc_url}:
+            return list(self._pending.values())
+        return [
+            router for pattern, router in self._patterns
+            if router.module in self._pending and pattern.match(path)
+        ]
+
+    def mount(self, router: DeferredRouter, module: Any, import_ms: float = 0.0) -> bool:
+        """把已导入模块的路由插回登记位置；已挂载过则返回 ``False``。
+
+        只应在事件循环线程（或启动期的主线程）里调用，避免与路由匹配并发修改列表。
+        """
+        with self._lock:
+            if self._pending.pop(router.module, None) is None:
+                return False
+            routes = self.app.router.routes
+            before = len(routes)
+            for attribute in router.attributes:
+                self.app.include_router(getattr(module, attribute), prefix=router.prefix)
+            added = routes[before:]
+            del routes[before:]
+            routes[self._position:self._position] = added
+            self._position += len(added)
+            # 旧版 FastAPI 只按是否为空判断文档缓存，显式清掉。
+            self.app.openapi_schema = None
+        self.load_ms[router.module] = round(import_ms, 1)
+        logger.info("Mounted deferred router %s (import %.0f ms)", router.module, import_ms)
+        return True
+
+    def load(self, router: DeferredRouter) -> bool:
+        started = time.perf_counter()
+        module = importlib.import_module(router.module)
+        return self.mount(router, module, (time.perf_counter() - started) * 1000)
+
+    def load_all(self) -> None:
+        for router in list(self._pending.values()):
+            self.load(router)
+
+    async def ensure_loaded(self, routers: list[DeferredRouter]) -> None:
+        for router in routers:
+            started = time.perf_counter()
+            module = await asyncio.to_thread(importlib.import_module, router.module)
+            self.mount(router, module, (time.perf_counter() - started) * 1000)
+
+    def stats(self) -> dict[str, Any]:
+        return {"pending": sorted(self._pending), "loaded_ms": dict(self.load_ms)}
+
+
+class DeferredRouterMiddleware:
+    """请求命中延迟路由的前缀时，先把对应路由挂上再往下传。
+
+    要放在按路由表做判断的中间件（生成路由转发）外层，它们才能看到新挂上的路由。
+    """
+
+    def __init__(self, app: Any, registry: DeferredRouterRegistry) -> None:
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope: dict, receive: Any, send: Any) -> None:
+        if self.registry.pending and scope["type"] in {"http", "websocket"}:
+            routers = self.registry.pending_for(scope["path"])
+            if routers:
+                await self.registry.ensure_loaded(routers)
+        await self.app(scope, receive, send)
+
+
+__all__ = [
+    "DeferredRouter",
+    "DeferredRouterMiddleware",
+    "DeferredRouterRegistry",
+    "defer_routers_enabled",
+    "path_prefix_pattern",
+]
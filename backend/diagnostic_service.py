@@ -114,6 +114,12 @@ def workflow_view(user_id: str, course_id: str, *, node_id: str | None = None) -
     }
 
 
+def workflow_watermark(user_id: str, course_id: str) -> tuple[int, int, int, int] | None:
+    """Change token for the state behind ``workflow_view``; ``None`` if unknown."""
+    watermark = getattr(diagnostic_workflow_repository, "watermark", None)
+    return watermark(user_id, course_id) if watermark else None
+
+
 def invalidate_stale_workflows(course: dict[str, Any], *, user_id: str) -> int:
     course_id = str(course.get("course_id") or "")
     current_version = str(course.get("current_course_version_id") or "")
@@ -22,6 +22,8 @@ from diagnostic_probes import (
 )
 from hint_leakage import mentions_answer_value
 from storage import storage
+from store_watermarks import bump_watermark, file_watermark
+from worker_coordination import ProcessLock, ProcessLockRegistry
 
 
 logger = logging.getLogger(__name__)
@@ -42,14 +44,17 @@ class DiagnosticWorkflowRepository:
     def __init__(self, root: str | Path):
         self.root = Path(root)
         self.root.mkdir(parents=True, exist_ok=True)
-        self._locks: dict[str, threading.RLock] = {}
-        self._guard = threading.Lock()
+        self._locks = ProcessLockRegistry(self.root)
 
     def load(self, user_id: str, course_id: str) -> dict[str, Any]:
         key = self._key(user_id, course_id)
         with self._lock(key):
             return deepcopy(self._read(self._path(key)))
 
+    def watermark(self, user_id: str, course_id: str) -> tuple[int, int, int, int]:
+        """Change token for one learner-course file; see ``store_watermarks``."""
+        return file_watermark(self._path(self._key(user_id, course_id)))
+
     def list_cases(self, user_id: str, course_id: str) -> list[dict[str, Any]]:
         return self.load(user_id, course_id)["cases"]
 
@@ -226,9 +231,8 @@ class DiagnosticWorkflowRepository:
     def _path(self, key: str) -> Path:
         return self.root / f"{key}.json"
 
-    def _lock(self, key: str) -> threading.RLock:
-        with self._guard:
-            return self._locks.setdefault(key, threading.RLock())
+    def _lock(self, key: str) -> ProcessLock:
+        return self._locks.get(key)
 
     @staticmethod
     def _read(path: Path) -> dict[str, Any]:
@@ -259,6 +263,7 @@ class DiagnosticWorkflowRepository:
                 handle.flush()
                 os.fsync(handle.fileno())
             os.replace(temp, path)
+            bump_watermark(path)
         finally:
             if temp.exists():
                 temp.unlink()
@@ -23,6 +23,13 @@
 切块后的 ``(块指纹, 该块 token 数)`` 列表。同一份上下文被反复发送时，同一
 指纹会在多条记录里重复出现，离线一聚合就能算出"重复上下文占多少 token"
 （验收③），不需要在运行时保留 prompt 原文。
+
+**常开的实时账单**：落 JSONL 仍然默认关闭，但每次调用都会进入
+``generation_telemetry_live`` 的滚动账单（按任务聚合，按阶段 / 小节 / 模型
+拆分，延迟分位数流式估计），生成跑到一半也能通过 :func:`job_bill` 查看。
+调用线程只负责取标签、推断调用点、入队；切块、估算、聚合与写文件都在
+后台线程里成批完成，所以常开的代价只剩入队那几微秒。
+``LINGZHI_GENERATION_AGGREGATE=0`` 可以整体关掉。
 """
 
 from __future__ import annotations
@@ -36,6 +43,7 @@ import re
 import sys
 import threading
 import time
+from collections import OrderedDict
 from contextlib import contextmanager
 from contextvars import ContextVar
 from dataclasses import dataclass, field
@@ -43,12 +51,15 @@ from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any, Iterator
 
+from generation_telemetry_live import BufferedRecordWriter, GenerationBills
+
 # ============================================================================
 # 开关与路径
 # ============================================================================
 
 _ENV_ENABLED = "LINGZHI_GENERATION_TELEMETRY"
 _ENV_DIR = "LINGZHI_GENERATION_TELEMETRY_DIR"
+_ENV_AGGREGATE = "LINGZHI_GENERATION_AGGREGATE"
 
 # 默认落在仓库外的运行目录，避免把账单写进版本库。
 _DEFAULT_DIR = Path(
@@ -73,12 +84,19 @@ _NORMALIZE_WS = re.compile(r"\s+")
 
 
 def telemetry_enabled() -> bool:
-    """埋点默认关闭；只有显式打开时才有运行时开销。"""
+    """JSONL 落盘默认关闭；只有显式打开时才写文件。"""
     return os.getenv(_ENV_ENABLED, "").strip().lower() in {
         "1", "true", "yes", "on",
     }
 
 
+def aggregation_enabled() -> bool:
+    """进程内实时账单默认开启，显式设成关闭值才停。"""
+    return os.getenv(_ENV_AGGREGATE, "").strip().lower() not in {
+        "0", "false", "no", "off",
+    }
+
+
 def _telemetry_dir() -> Path:
     configured = os.getenv(_ENV_DIR, "").strip()
     return Path(configured) if configured else _DEFAULT_DIR
@@ -221,7 +239,9 @@ def estimate_tokens(text: str) -> int:
     """
     if not text:
         return 0
-    ascii_chars = sum(character.isascii() for character in text)
+    # 丢掉非 ASCII 字符后的长度就是 ASCII 字符数；逐字符 isascii 在
+    # 几万字的 prompt 上要毫秒级，这样在 C 里一遍数完。
+    ascii_chars = len(text.encode("ascii", "ignore"))
     non_ascii_chars = len(text) - ascii_chars
     return max(1, math.ceil(ascii_chars / 3.2 + non_ascii_chars * 1.2))
 
@@ -328,6 +348,9 @@ def generation_run(run_id: str) -> Iterator[Path]:
         _RUN.reset(token)
         with _GLOBAL_LOCK:
             _GLOBAL_RUN = previous_global
+        # 记录在后台线程里落盘；run 结束时等它写完，出了 with 文件就是全的。
+        if telemetry_enabled():
+            flush()
 
 
 def _active_run() -> _Run:
@@ -368,6 +391,33 @@ def current_run_path() -> Path | None:
     return run.path if run is not None else None
 
 
+# ============================================================================
+# 实时账单与后台写入
+# ============================================================================
+
+# 在途事件上限。事件只引用 prompt 字符串（调用方本来就持有），不复制。
+# 模型调用按秒计，后台线程每秒能处理上千条，正常永远填不满；真填满了说明
+# 后台线程卡住，此时宁可丢账也不能让业务调用排队。
+_MAX_PENDING_CALLS = 2048
+# 没有任务标签也没有 run 的调用（例如工具脚本直接打模型）归到这里。
+UNASSIGNED_JOB = "(未归属)"
+
+
+@dataclass(slots=True)
+class _PendingCall:
+    """调用线程交给后台线程的原料：只含热路径上已经拿到的东西。"""
+
+    call: dict[str, Any]
+    label: dict[str, str]
+    caller: tuple[str, str, int]
+    run: _Run | None
+    seq: int
+    elapsed_s: float | None
+    ended_at: float
+    write_jsonl: bool
+    aggregate: bool
+
+
 def record_call(
     *,
     model_id: str,
@@ -385,79 +435,215 @@ def record_call(
     input_tokens: int | None = None,
     output_tokens: int | None = None,
     tokens_source: str = "estimate",
+    cached_input_tokens: int | None = None,
     retry_reason: str = "",
     error_code: str = "",
     physical_request_count: int = 1,
     provider_scope: str = "",
     extra: dict[str, Any] | None = None,
 ) -> None:
-    """写一条调用记录。**任何异常都不得影响业务调用。**"""
-    if not telemetry_enabled():
+    """记一次调用。**任何异常都不得影响业务调用。**
+
+    这里只取必须在调用现场拿的东西（标签、调用帧、run 序号、时间），然后
+    入队返回；记录的组装、聚合与落盘见 :func:`_finish_batch`。
+    """
+    write_jsonl = telemetry_enabled()
+    aggregate = aggregation_enabled()
+    if not write_jsonl and not aggregate:
         return
     try:
-        run = _active_run()
-        label = current_label()
-        caller_module, caller_func, caller_line = _infer_caller()
-        # 阶段名的优先级：显式标注 > 调用帧 > 发起调用的服务类。
-        #
-        # 第三档是给真实服务器结构兜底的：生成任务的协程在一处创建、由工作
-        # 线程的新事件循环驱动，业务帧根本不在这个 task 的帧链上（链条第二格
-        # 就是事件循环）。此时帧归因只能留空，但 ``self.__class__`` 至少能说
-        # 清是哪个服务在打模型——``CourseService`` 和 ``AssessmentOrchestrator``
-        # 分得开，账单的阶段维度就不会整块塌成一个值。
-        stage_name = label.get("stage") or caller_module or service
-        with run.lock:
-            run.seq += 1
-            seq = run.seq
-        record = {
-            "seq": seq,
-            "run_id": run.run_id,
-            "ts": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
-            "elapsed_s": round(time.perf_counter() - run.started_at, 3),
-            "stage": stage_name,
-            "section": label.get("section", ""),
-            "purpose": label.get("purpose", "") or caller_func,
-            "caller": f"{caller_module}.{caller_func}:{caller_line}",
-            "service": service,
-            "model_id": model_id,
-            "model_role": model_role,
-            "provider_scope": provider_scope,
-            "stream": stream,
-            "status": status,
-            "attempt": attempt,
-            "is_retry": attempt > 1,
-            "retry_reason": retry_reason,
-            "error_code": error_code,
-            "queue_wait_ms": int(round(queue_wait_ms)),
-            "duration_ms": int(round(duration_ms)),
-            "ttfb_ms": None if ttfb_ms is None else int(round(ttfb_ms)),
-            "physical_request_count": physical_request_count,
-            "input_tokens": (
-                int(input_tokens)
-                if input_tokens is not None
-                else estimate_tokens(prompt) + estimate_tokens(system_prompt)
-            ),
-            "output_tokens": (
-                int(output_tokens)
-                if output_tokens is not None
-                else estimate_tokens(output_text)
-            ),
-            "tokens_source": tokens_source,
-            "prompt_chars": len(prompt) + len(system_prompt),
-            "system_sha": _digest(system_prompt) if system_prompt else "",
-            "prompt_sha": _digest(prompt) if prompt else "",
-            # 真实生成里**上下文几乎全在 system_prompt 里**，user prompt 常常只
-            # 是一句二十来字的指令。只切 prompt 会让覆盖率掉到 1%，③失去意义
-            # （真实跑课时就是这么发现的）。所以两段都要切。
-            "context_blocks": (
-                context_blocks(system_prompt) + context_blocks(prompt)
-            ),
-        }
-        if extra:
-            record.update(extra)
-        line = json.dumps(record, ensure_ascii=False)
-        with run.lock:
-            with run.path.open("a", encoding="utf-8") as handle:
-                handle.write(line + "\n")
+        caller = _infer_caller()
+        # 只在要落盘时才自动开 run：自动 run 会建目录、占文件名。
+        run = _active_run() if write_jsonl else _RUN.get()
+        seq = 0
+        elapsed_s = None
+        if run is not None:
+            with run.lock:
+                run.seq += 1
+                seq = run.seq
+            elapsed_s = round(time.perf_counter() - run.started_at, 3)
+        _WRITER.submit(_PendingCall(
+            call={
+                "model_id": model_id,
+                "model_role": model_role,
+                "status": status,
+                "stream": stream,
+                "service": service,
+                "attempt": attempt,
+                "queue_wait_ms": queue_wait_ms,
+                "duration_ms": duration_ms,
+                "ttfb_ms": ttfb_ms,
+                "prompt": prompt,
+                "system_prompt": system_prompt,
+                "output_text": output_text,
+                "input_tokens": input_tokens,
+                "output_tokens": output_tokens,
+                "tokens_source": tokens_source,
+                "cached_input_tokens": cached_input_tokens,
+                "retry_reason": retry_reason,
+                "error_code": error_code,
+                "physical_request_count": physical_request_count,
+                "provider_scope": provider_scope,
+                "extra": extra,
+            },
+            label=current_label(),
+            caller=caller,
+            run=run,
+            seq=seq,
+            elapsed_s=elapsed_s,
+            ended_at=time.time(),
+            write_jsonl=write_jsonl,
+            aggregate=aggregate,
+        ))
     except Exception:  # pragma: no cover - 埋点永远不能拖垮生成
         pass
+
+
+_SYSTEM_BLOCKS: OrderedDict[str, list[list[Any]]] = OrderedDict()
+_MAX_CACHED_SYSTEM_PROMPTS = 64
+
+
+def _system_blocks(system_prompt: str, system_sha: str) -> list[list[Any]]:
+    """同一份 system prompt 会被整批调用反复发送，切块结果按指纹复用。
+
+    只在后台线程里调用，不需要加锁。
+    """
+    if not system_prompt:
+        return []
+    blocks = _SYSTEM_BLOCKS.get(system_sha)
+    if blocks is None:
+        blocks = _SYSTEM_BLOCKS[system_sha] = context_blocks(system_prompt)
+        if len(_SYSTEM_BLOCKS) > _MAX_CACHED_SYSTEM_PROMPTS:
+            _SYSTEM_BLOCKS.popitem(last=False)
+    else:
+        _SYSTEM_BLOCKS.move_to_end(system_sha)
+    return blocks
+
+
+def _build_record(pending: _PendingCall) -> dict[str, Any]:
+    call = pending.call
+    label = pending.label
+    caller_module, caller_func, caller_line = pending.caller
+    prompt = call["prompt"]
+    system_prompt = call["system_prompt"]
+    attempt = call["attempt"]
+    ttfb_ms = call["ttfb_ms"]
+    input_tokens = call["input_tokens"]
+    output_tokens = call["output_tokens"]
+    cached_input_tokens = call["cached_input_tokens"]
+    system_sha = _digest(system_prompt) if system_prompt else ""
+    # 阶段名的优先级：显式标注 > 调用帧 > 发起调用的服务类。
+    #
+    # 第三档是给真实服务器结构兜底的：生成任务的协程在一处创建、由工作
+    # 线程的新事件循环驱动，业务帧根本不在这个 task 的帧链上（链条第二格
+    # 就是事件循环）。此时帧归因只能留空，但 ``self.__class__`` 至少能说
+    # 清是哪个服务在打模型——``CourseService`` 和 ``AssessmentOrchestrator``
+    # 分得开，账单的阶段维度就不会整块塌成一个值。
+    stage_name = label.get("stage") or caller_module or call["service"]
+    record = {
+        "seq": pending.seq,
+        "run_id": pending.run.run_id if pending.run is not None else "",
+        "ts": datetime.fromtimestamp(pending.ended_at, timezone.utc).isoformat(
+            timespec="milliseconds"
+        ),
+        "elapsed_s": pending.elapsed_s,
+        "stage": stage_name,
+        "section": label.get("section", ""),
+        "purpose": label.get("purpose", "") or caller_func,
+        "caller": f"{caller_module}.{caller_func}:{caller_line}",
+        "service": call["service"],
+        "model_id": call["model_id"],
+        "model_role": call["model_role"],
+        "provider_scope": call["provider_scope"],
+        "stream": call["stream"],
+        "status": call["status"],
+        "attempt": attempt,
+        "is_retry": attempt > 1,
+        "retry_reason": call["retry_reason"],
+        "error_code": call["error_code"],
+        "queue_wait_ms": int(round(call["queue_wait_ms"])),
+        "duration_ms": int(round(call["duration_ms"])),
+        "ttfb_ms": None if ttfb_ms is None else int(round(ttfb_ms)),
+        "physical_request_count": call["physical_request_count"],
+        "input_tokens": (
+            int(input_tokens)
+            if input_tokens is not None
+            else estimate_tokens(prompt) + estimate_tokens(system_prompt)
+        ),
+        "output_tokens": (
+            int(output_tokens)
+            if output_tokens is not None
+            else estimate_tokens(call["output_text"])
+        ),
+        "tokens_source": call["tokens_source"],
+        # provider 前缀缓存命中的输入 token；None 表示 provider 没报，
+        # 不等于零命中，账单算命中率时只统计报了的调用。
+        "cached_input_tokens": (
+            None if cached_input_tokens is None else int(cached_input_tokens)
+        ),
+        "prompt_chars": len(prompt) + len(system_prompt),
+        "system_sha": system_sha,
+        "prompt_sha": _digest(prompt) if prompt else "",
+        # 真实生成里**上下文几乎全在 system_prompt 里**，user prompt 常常只
+        # 是一句二十来字的指令。只切 prompt 会让覆盖率掉到 1%，③失去意义
+        # （真实跑课时就是这么发现的）。所以两段都要切。
+        "context_blocks": (
+            _system_blocks(system_prompt, system_sha) + context_blocks(prompt)
+        ),
+    }
+    # 标签上的附加字段（task_id / course_id 等）一并落盘，账单据此按任务分组。
+    for key, value in label.items():
+        record.setdefault(key, value)
+    if call["extra"]:
+        record.update(call["extra"])
+    return record
+
+
+def _finish_batch(batch: list[_PendingCall]) -> None:
+    """后台线程：组装记录、更新实时账单，每个 JSONL 文件一批只打开一次。"""
+    lines: dict[Path, list[str]] = {}
+    for pending in batch:
+        try:
+            record = _build_record(pending)
+            if pending.aggregate:
+                job_id = record.get("task_id") or record["run_id"] or UNASSIGNED_JOB
+                _BILLS.add(job_id, record, ended_s=pending.ended_at)
+            if pending.write_jsonl and pending.run is not None:
+                lines.setdefault(pending.run.path, []).append(
+                    json.dumps(record, ensure_ascii=False)
+                )
+        except Exception:  # pragma: no cover - 单条坏记录不影响同批其他记录
+            continue
+    for path, chunk in lines.items():
+        try:
+            with path.open("a", encoding="utf-8") as handle:
+                handle.write("\n".join(chunk) + "\n")
+        except OSError:  # pragma: no cover - 磁盘问题只丢账，不影响生成
+            continue
+
+
+_BILLS = GenerationBills()
+_WRITER = BufferedRecordWriter(_finish_batch, max_pending=_MAX_PENDING_CALLS)
+
+
+def flush(timeout: float = 5.0) -> bool:
+    """等后台线程把已记下的调用全部聚合、落盘；超时返回 ``False``。"""
+    return _WRITER.flush(timeout)
+
+
+def job_bill(job_id: str) -> dict[str, Any] | None:
+    """某个生成任务到目前为止的实时账单；没有记过调用时返回 ``None``。
+
+    ``job_id`` 是任务标签里的 ``task_id``，没有任务标签时是 run_id。账单
+    落后于调用现场的只是后台队列里尚未处理的那几条，见 :func:`writer_stats`。
+    """
+    return _BILLS.snapshot(job_id)
+
+
+def live_job_ids() -> list[str]:
+    """有实时账单的任务，最近活跃的在前。"""
+    return _BILLS.job_ids()
+
+
+def writer_stats() -> dict[str, int]:
+    return _WRITER.stats()
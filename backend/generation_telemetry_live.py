@@ -0,0 +1,452 @@
+"""生成账单的常驻聚合与后台落盘。
+
+``generation_telemetry`` 原先只能事后分析：每次模型调用在调用线程里切块、
+算指纹、序列化，再加锁以追加模式打开 JSONL 写一行，开销让它只能默认关闭；
+账单要等一次生成跑完后用 ``tools/generation_bill.py`` 离线汇总。
+
+本模块把这两件事拆开，让埋点可以常开：
+
+* :class:`BufferedRecordWriter`——有界队列 + 单个后台线程。调用线程只把一份
+  轻量事件放进队列，切块、估算 token、聚合、写 JSONL 都在后台线程里批量做，
+  不占事件循环；队列满了就丢弃并计数，绝不反压业务调用。
+* :class:`GenerationBill`——一个生成任务的滚动账单：总计以及按阶段、小节、
+  模型的汇总（次数、token、忙时/排队、重试失败、缓存命中、重复上下文），
+  延迟与首 token 延迟用 :class:`QuantileSketch` 流式估计分位数。
+* :class:`GenerationBills`——按任务归档账单，LRU 上限，供 API 实时查看。
+
+口径与离线账单工具一致，输入是同一份记录字典，所以两边的数字可以互相核对。
+本模块不依赖 ``generation_telemetry``，记录的组装留在那边。
+"""
+
+from __future__ import annotations
+
+import atexit
+import logging
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from collections.abc import Callable
+from datetime import datetime, timezone
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+# 同一任务里的小节可能有几百个，超出部分并进一个桶，账单大小有上限。
+_MAX_SECTIONS = 256
+_OVERFLOW_SECTION = "(其他小节)"
+# 重复上下文按块指纹计数；超出上限的新指纹只计入总量，不再追踪重复。
+_MAX_TRACKED_BLOCKS = 20000
+
+
+# ============================================================================
+# 流式分位数
+# ============================================================================
+
+class QuantileSketch:
+    """对数分桶的流式分位数估计（DDSketch 的做法）。
+
+    值 ``v`` 落进编号为 ``ceil(log_γ v)`` 的桶，``γ = (1+α)/(1-α)``，任何
+    分位数的估计值相对误差不超过 ``α``。桶数超过上限时合并最小的两个桶，
+    只牺牲低分位的精度，高分位（p90/p99）仍然准确。
+    """
+
+    __slots__ = (
+        "_gamma", "_log_gamma", "_max_buckets", "_buckets",
+        "count", "zero_count", "total", "min", "max",
+    )
+
+    def __init__(self, relative_accuracy: float = 0.01, max_buckets: int = 1024) -> None:
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be between 0 and 1")
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self._max_buckets = max_buckets
+        self._buckets: dict[int, int] = {}
+        self.count = 0
+        self.zero_count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        if value <= 0:
+            self.zero_count += 1
+            return
+        key = math.ceil(math.log(value) / self._log_gamma)
+        buckets = self._buckets
+        buckets[key] = buckets.get(key, 0) + 1
+        if len(buckets) > self._max_buckets:
+            lowest, second = sorted(buckets)[:2]
+            buckets[second] += buckets.pop(lowest)
+
+    def quantile(self, q: float) -> float | None:
+        if not self.count:
+            return None
+        if q >= 1:
+            return self.max
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for key in sorted(self._buckets):
+            seen += self._buckets[key]
+            if rank < seen:
+                estimate = 2 * self._gamma ** key / (self._gamma + 1)
+                return min(max(estimate, self.min), self.max)
+        return self.max
+
+    def summary(self) -> dict[str, float] | None:
+        if not self.count:
+            return None
+        return {
+            "p50": round(self.quantile(0.5), 1),
+            "p90": round(self.quantile(0.9), 1),
+            "p99": round(self.quantile(0.99), 1),
+            "max": round(self.max, 1),
+            "mean": round(self.total / self.count, 1),
+        }
+
+
+# ============================================================================
+# 滚动账单
+# ============================================================================
+
+class _Summary:
+    """一个维度（总计 / 某阶段 / 某小节 / 某模型）的累计数。"""
+
+    __slots__ = (
+        "calls", "physical_requests", "failures", "retries",
+        "input_tokens", "output_tokens", "cached_input_tokens",
+        "cache_reported_input", "busy_ms", "queue_ms",
+        "context_tokens", "repeated_tokens", "first_s", "last_s",
+        "latency", "ttfb",
+    )
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.physical_requests = 0
+        self.failures = 0
+        self.retries = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.cached_input_tokens = 0
+        self.cache_reported_input = 0
+        self.busy_ms = 0
+        self.queue_ms = 0
+        self.context_tokens = 0.0
+        self.repeated_tokens = 0.0
+        self.first_s: float | None = None
+        self.last_s: float | None = None
+        self.latency = QuantileSketch()
+        self.ttfb = QuantileSketch()
+
+    def add(
+        self,
+        record: dict[str, Any],
+        *,
+        ended_s: float,
+        context_tokens: float,
+        repeated_tokens: float,
+    ) -> None:
+        duration_ms = record.get("duration_ms", 0)
+        self.calls += 1
+        self.physical_requests += record.get("physical_request_count", 1)
+        self.busy_ms += duration_ms
+        self.queue_ms += record.get("queue_wait_ms", 0)
+        self.input_tokens += record.get("input_tokens", 0)
+        self.output_tokens += record.get("output_tokens", 0)
+        if record.get("cached_input_tokens") is not None:
+            self.cache_reported_input += record.get("input_tokens", 0)
+            self.cached_input_tokens += record["cached_input_tokens"]
+        if record.get("is_retry"):
+            self.retries += 1
+        if record.get("status") != "completed":
+            self.failures += 1
+        self.context_tokens += context_tokens
+        self.repeated_tokens += repeated_tokens
+        started_s = ended_s - duration_ms / 1000
+        if self.first_s is None or started_s < self.first_s:
+            self.first_s = started_s
+        if self.last_s is None or ended_s > self.last_s:
+            self.last_s = ended_s
+        self.latency.add(duration_ms)
+        if record.get("ttfb_ms") is not None:
+            self.ttfb.add(record["ttfb_ms"])
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "physical_requests": self.physical_requests,
+            "busy_s": round(self.busy_ms / 1000, 1),
+            "wall_s": round((self.last_s or 0) - (self.first_s or 0), 1),
+            "queue_s": round(self.queue_ms / 1000, 1),
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "retries": self.retries,
+            "failures": self.failures,
+            "cached_input_tokens": self.cached_input_tokens,
+            "cache_hit_ratio": _ratio(self.cached_input_tokens, self.cache_reported_input),
+            "repeated_tokens": round(self.repeated_tokens),
+            "repeated_share_of_input": (
+                round(self.repeated_tokens / self.input_tokens, 4) if self.input_tokens else 0
+            ),
+            "latency_ms": self.latency.summary(),
+            "ttfb_ms": self.ttfb.summary(),
+        }
+
+
+def _ratio(part: float, whole: float) -> float | None:
+    return round(part / whole, 4) if whole else None
+
+
+def _iso(timestamp: float | None) -> str | None:
+    if timestamp is None:
+        return None
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat(timespec="milliseconds")
+
+
+class GenerationBill:
+    """一个生成任务的滚动账单，逐条吃进与 JSONL 同构的调用记录。
+
+    重复上下文的口径与 ``tools/generation_bill.py`` 相同：块 token 按
+    ``真实输入 / 估算合计``（不超过 1）标定，同一指纹第二次及以后的发送计为
+    重复。离线工具用每个指纹最后一次的标定值乘以 ``n-1``，这里按每次发送时
+    的标定值累加；同一份上下文的标定系数一致时两者相等。重复量记在**重发
+    它的那次调用**所属的阶段、小节与模型上。
+    """
+
+    def __init__(self, job_id: str) -> None:
+        self.job_id = job_id
+        self.total = _Summary()
+        self.stages: dict[str, _Summary] = {}
+        self.sections: dict[str, _Summary] = {}
+        self.models: dict[str, _Summary] = {}
+        self.tokens_from_provider = 0
+        self._block_sends: dict[str, int] = {}
+        self.untracked_blocks = 0
+        self.queue_wait_reasons: dict[str, int] = {}
+
+    def add(self, record: dict[str, Any], *, ended_s: float) -> None:
+        context_tokens, repeated_tokens = self._account_blocks(record)
+        if record.get("tokens_source") == "provider":
+            self.tokens_from_provider += 1
+        reason = record.get("queue_wait_reason") or ""
+        if reason:
+            self.queue_wait_reasons[reason] = self.queue_wait_reasons.get(reason, 0) + 1
+        section = record.get("section") or ""
+        if section and section not in self.sections and len(self.sections) >= _MAX_SECTIONS:
+            section = _OVERFLOW_SECTION
+        targets = [
+            self.total,
+            _bucket(self.stages, record.get("stage") or "(未标注)"),
+            _bucket(self.models, record.get("model_id") or "(未知模型)"),
+        ]
+        if section:
+            targets.append(_bucket(self.sections, section))
+        for summary in targets:
+            summary.add(
+                record,
+                ended_s=ended_s,
+                context_tokens=context_tokens,
+                repeated_tokens=repeated_tokens,
+            )
+
+    def _account_blocks(self, record: dict[str, Any]) -> tuple[float, float]:
+        blocks = record.get("context_blocks") or ()
+        if not blocks:
+            return 0.0, 0.0
+        estimated_sum = sum(int(tokens) for _, tokens in blocks) or 1
+        real_input = record.get("input_tokens") or 0
+        scale = (
+            real_input / estimated_sum
+            if record.get("tokens_source") == "provider" and real_input
+            else 1.0
+        )
+        scale = min(scale, 1.0)
+        sends = self._block_sends
+        measured = repeated = 0.0
+        for digest, tokens in blocks:
+            scaled = int(tokens) * scale
+            measured += scaled
+            seen = sends.get(digest)
+            if seen is not None:
+                sends[digest] = seen + 1
+                repeated += scaled
+            elif len(sends) < _MAX_TRACKED_BLOCKS:
+                sends[digest] = 1
+            else:
+                self.untracked_blocks += 1
+        return measured, repeated
+
+    def to_dict(self) -> dict[str, Any]:
+        total = self.total
+        return {
+            "job_id": self.job_id,
+            "started_at": _iso(total.first_s),
+            "updated_at": _iso(total.last_s),
+            **total.to_dict(),
+            "tokens_from_provider": self.tokens_from_provider,
+            "stages": _ranked(self.stages),
+            "sections": _ranked(self.sections),
+            "models": _ranked(self.models),
+            "repeated_context": {
+                "measured_context_tokens": round(total.context_tokens),
+                "repeated_tokens": round(total.repeated_tokens),
+                "repeated_share_of_input": (
+                    round(total.repeated_tokens / total.input_tokens, 4)
+                    if total.input_tokens
+                    else 0
+                ),
+                "distinct_blocks": len(self._block_sends),
+                "untracked_blocks": self.untracked_blocks,
+            },
+            "queue_wait_reasons": dict(
+                sorted(self.queue_wait_reasons.items(), key=lambda kv: kv[1], reverse=True)
+            ),
+        }
+
+
+def _bucket(groups: dict[str, _Summary], name: str) -> _Summary:
+    summary = groups.get(name)
+    if summary is None:
+        summary = groups[name] = _Summary()
+    return summary
+
+
+def _ranked(groups: dict[str, _Summary]) -> dict[str, dict[str, Any]]:
+    return {
+        name: summary.to_dict()
+        for name, summary in sorted(groups.items(), key=lambda kv: kv[1].busy_ms, reverse=True)
+    }
+
+
+class GenerationBills:
+    """按任务归档的滚动账单；只保留最近活跃的 ``max_jobs`` 个任务。"""
+
+    def __init__(self, max_jobs: int = 32) -> None:
+        self._max_jobs = max_jobs
+        self._bills: OrderedDict[str, GenerationBill] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, job_id: str, record: dict[str, Any], *, ended_s: float) -> None:
+        with self._lock:
+            bill = self._bills.get(job_id)
+            if bill is None:
+                bill = self._bills[job_id] = GenerationBill(job_id)
+                while len(self._bills) > self._max_jobs:
+                    self._bills.popitem(last=False)
+            else:
+                self._bills.move_to_end(job_id)
+            bill.add(record, ended_s=ended_s)
+
+    def snapshot(self, job_id: str) -> dict[str, Any] | None:
+        with self._lock:
+            bill = self._bills.get(job_id)
+            return bill.to_dict() if bill is not None else None
+
+    def job_ids(self) -> list[str]:
+        with self._lock:
+            return list(reversed(self._bills))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._bills.clear()
+
+
+# ============================================================================
+# 有界缓冲的后台写入
+# ============================================================================
+
+class BufferedRecordWriter:
+    """有界队列 + 单个后台线程，按批处理调用线程提交的事件。
+
+    :meth:`submit` 只做一次加锁入队，永不阻塞；队列满时丢弃并计入
+    ``dropped``。后台线程每次把队列里攒下的事件整批交给 ``handle_batch``，
+    写文件也就是一批一次，而不是一条调用一次 ``open``。线程按需启动，
+    fork 出的子进程里会重新启动；进程退出前尽量把剩余事件处理完。
+    """
+
+    def __init__(
+        self,
+        handle_batch: Callable[[list[Any]], None],
+        *,
+        max_pending: int = 4096,
+        name: str = "generation-telemetry-writer",
+    ) -> None:
+        self._handle_batch = handle_batch
+        self._max_pending = max_pending
+        self._name = name
+        self._items: deque[Any] = deque()
+        self._cond = threading.Condition()
+        self._busy = False
+        self._thread: threading.Thread | None = None
+        self._pid: int | None = None
+        self._counters = {"submitted": 0, "processed": 0, "dropped": 0, "failed_batches": 0}
+
+    def submit(self, item: Any) -> bool:
+        with self._cond:
+            if len(self._items) >= self._max_pending:
+                self._counters["dropped"] += 1
+                return False
+            self._items.append(item)
+            self._counters["submitted"] += 1
+            if self._thread is None or self._pid != os.getpid():
+                self._start_locked()
+            self._cond.notify_all()
+        return True
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """等到已提交的事件全部处理完；超时返回 ``False``。"""
+        if threading.current_thread() is self._thread:
+            return False
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._items or self._busy:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def stats(self) -> dict[str, int]:
+        with self._cond:
+            return {**self._counters, "pending": len(self._items) + (1 if self._busy else 0)}
+
+    def _start_locked(self) -> None:
+        if self._pid is None:
+            atexit.register(self.flush, 2.0)
+        self._pid = os.getpid()
+        self._busy = False
+        self._thread = threading.Thread(target=self._run, name=self._name, daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._items:
+                    self._cond.wait()
+                batch = list(self._items)
+                self._items.clear()
+                self._busy = True
+            try:
+                self._handle_batch(batch)
+            except Exception:
+                # 埋点永远不能拖垮生成；整批失败只计数。
+                logger.debug("generation telemetry batch failed", exc_info=True)
+                failed = True
+            else:
+                failed = False
+            with self._cond:
+                self._busy = False
+                self._counters["processed"] += len(batch)
+                if failed:
+                    self._counters["failed_batches"] += 1
+                self._cond.notify_all()
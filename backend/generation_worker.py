@@ -0,0 +1,361 @@
+"""多 worker 模式下唯一的生成进程：选举、接管 TaskManager、转发其他 worker 的请求。
+
+``TaskManager`` 把整张任务表放在内存里并整体写回 ``generation_jobs.json``，
+生成进度也只从持有任务的进程推送。多 worker 部署时只能有一个进程运行它：
+
+* 各 worker 启动时抢 :class:`~worker_coordination.GenerationWorkerElection`
+  的文件锁，抢到的成为生成进程，启动 ``TaskManager`` 与表示层对账服务，
+  并在本机 Unix 套接字上再开一个只供其他 worker 访问的 HTTP 入口；
+* 其余 worker 周期性重试选举，生成进程退出后由其中一个接任并从磁盘重新
+  加载任务表；
+* :class:`GenerationRouteForwarder` 让非生成进程把依赖 ``TaskManager`` 的路由
+  原样转发给生成进程，其他只读/按课程加锁的路由在本进程处理；
+* WebSocket 推送经 :class:`~worker_coordination.WorkerBus` 转给所有 worker，
+  连在任意 worker 上的客户端都能收到进度；客户端命令转给生成进程执行。
+
+单进程部署（默认）不经过这里的任何逻辑，启动顺序与原来一致。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import os
+from collections.abc import AsyncIterator, Iterator
+from pathlib import Path
+from typing import Any
+
+from worker_coordination import (
+    GenerationWorkerElection,
+    WorkerBus,
+    multi_worker_enabled,
+    socket_dir,
+    worker_count,
+)
+
+logger = logging.getLogger(__name__)
+
+GENERATION_SOCKET_NAME = "generation.sock"
+GENERATION_LOCK_NAME = "generation.lock"
+_HOP_BY_HOP_HEADERS = {
+    b"connection",
+    b"keep-alive",
+    b"proxy-connection",
+    b"transfer-encoding",
+    b"upgrade",
+}
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+class GenerationWorkerRuntime:
+    """决定本进程是否运行 TaskManager，并接好多 worker 之间的通知。"""
+
+    def __init__(
+        self,
+        *,
+        task_manager: Any,
+        reconciliation_service: Any,
+        storage: Any,
+        ws_service: Any,
+        data_dir: str | Path,
+        enabled: bool | None = None,
+        contend_interval_s: float | None = None,
+    ) -> None:
+        self.task_manager = task_manager
+        self.reconciliation_service = reconciliation_service
+        self.storage = storage
+        self.ws_service = ws_service
+        self.enabled = multi_worker_enabled() if enabled is None else enabled
+        self.contend_interval_s = (
+            _env_float("LINGZHI_GENERATION_WORKER_CONTEND_S", 2.0)
+            if contend_interval_s is None else contend_interval_s
+        )
+        directory = socket_dir(data_dir)
+        self.socket_path = directory / GENERATION_SOCKET_NAME
+        self.election = GenerationWorkerElection(directory / GENERATION_LOCK_NAME)
+        self.bus = WorkerBus(directory / "bus")
+        self.role = "single"
+        self.counters = {"forwarded": 0, "forward_failures": 0, "promotions": 0}
+        self._contender: asyncio.Task[None] | None = None
+        self._server: Any = None
+        self._server_task: asyncio.Task[None] | None = None
+        self._http_client: Any = None
+
+    @property
+    def is_generation_worker(self) -> bool:
+        return self.role in {"single", "leader"}
+
+    async def start(self, app: Any) -> None:
+        if not self.enabled:
+            await self._start_owned()
+            return
+        self.bus.start()
+        self.storage.attach_worker_bus(self.bus)
+        self.bus.subscribe("ws", self._on_relayed_push)
+        self.bus.subscribe("ws-command", self._on_relayed_command)
+        if self.ws_service is not None:
+            self.ws_service.set_relay(self._relay_push)
+            self.ws_service.set_command_handler(self._handle_command)
+        if self.election.try_acquire():
+            await self._promote(app, reload_tasks=False)
+        else:
+            self.role = "follower"
+            logger.info("Worker %d follows the generation worker at %s", os.getpid(), self.socket_path)
+            self._contender = asyncio.create_task(self._contend(app))
+
+    async def shutdown(self) -> None:
+        if self._contender and not self._contender.done():
+            self._contender.cancel()
+            await asyncio.gather(self._contender, return_exceptions=True)
+        self._contender = None
+        if self.is_generation_worker:
+            await self._stop_internal_server()
+            await self._stop_owned()
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+        if self.enabled:
+            self.election.release()
+            self.bus.stop()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "mode": self.role,
+            "pid": os.getpid(),
+            "workers": worker_count() if self.enabled else 1,
+            **self.counters,
+            "bus": self.bus.stats() if self.enabled else None,
+        }
+
+    def http_client(self) -> Any:
+        """连到生成进程内部入口的 HTTP 客户端；首次转发时才导入 httpx。"""
+        if self._http_client is None:
+            import httpx
+
+            self._http_client = httpx.AsyncClient(
+                transport=httpx.AsyncHTTPTransport(uds=str(self.socket_path)),
+                base_url="http://generation-worker",
+                timeout=None,
+            )
+        return self._http_client
+
+    async def _start_owned(self) -> None:
+        if self.reconciliation_service:
+            await self.reconciliation_service.start()
+        if self.task_manager:
+            await self.task_manager.start()
+
+    async def _stop_owned(self) -> None:
+        if self.task_manager:
+            await self.task_manager.shutdown()
+        if self.reconciliation_service:
+            await self.reconciliation_service.shutdown()
+
+    async def _promote(self, app: Any, *, reload_tasks: bool) -> None:
+        self.role = "leader"
+        self.counters["promotions"] += 1
+        if reload_tasks and self.task_manager:
+            # 接任时本进程的任务表还是导入期读到的快照，以前任写回的为准。
+            self.task_manager.load_tasks()
+        await self._start_owned()
+        await self._start_internal_server(app)
+        logger.info("Worker %d is the generation worker (%s)", os.getpid(), self.socket_path)
+
+    async def _contend(self, app: Any) -> None:
+        try:
+            while True:
+                await asyncio.sleep(self.contend_interval_s)
+                if self.election.try_acquire():
+                    await self._promote(app, reload_tasks=True)
+                    return
+        except asyncio.CancelledError:
+            return
+
+    async def _start_internal_server(self, app: Any) -> None:
+        import uvicorn
+
+        class _InternalServer(uvicorn.Server):
+            # 外层 uvicorn 已经接管信号；这里不能覆盖它的处理函数。
+            @contextlib.contextmanager
+            def capture_signals(self) -> Iterator[None]:
+                yield
+
+        self.socket_path.unlink(missing_ok=True)
+        config = uvicorn.Config(
+            app,
+            uds=str(self.socket_path),
+            lifespan="off",
+            log_level="warning",
+            access_log=False,
+        )
+        self._server = _InternalServer(config)
+        self._server_task = asyncio.create_task(self._server.serve())
+
+    async def _stop_internal_server(self) -> None:
+        if self._server is None:
+            return
+        self._server.should_exit = True
+        if self._server_task is not None:
+            await asyncio.gather(self._server_task, return_exceptions=True)
+        self._server = None
+        self._server_task = None
+        self.socket_path.unlink(missing_ok=True)
+
+    def _relay_push(self, course_id: str | None, message: dict[str, Any]) -> None:
+        self.bus.publish("ws", course_id or "", {"course_id": course_id, "message": message})
+
+    def _on_relayed_push(self, _key: str, payload: Any) -> None:
+        if isinstance(payload, dict) and isinstance(payload.get("message"), dict):
+            asyncio.get_running_loop().create_task(
+                self.ws_service.deliver_relayed(payload.get("course_id"), payload["message"])
+            )
+
+    async def _handle_command(self, cmd_type: str, data: dict) -> None:
+        if self.is_generation_worker:
+            await self.task_manager.handle_command(cmd_type, data)
+        else:
+            self.bus.publish("ws-command", cmd_type, data)
+
+    def _on_relayed_command(self, cmd_type: str, payload: Any) -> None:
+        if self.is_generation_worker and self.task_manager and isinstance(payload, dict):
+            asyncio.get_running_loop().create_task(self.task_manager.handle_command(cmd_type, payload))
+
+
+class GenerationRouteForwarder:
+    """非生成进程把依赖 ``TaskManager`` 的 HTTP 路由转发给生成进程。
+
+    哪些路由归生成进程，由路由的依赖树里是否出现 ``owner_dependencies`` 决定，
+    新增路由只要照常声明依赖就会被正确转发。
+    """
+
+    def __init__(self, app: Any, runtime: GenerationWorkerRuntime, owner_dependencies: tuple[Any, ...]) -> None:
+        self.app = app
+        self.runtime = runtime
+        self.owner_dependencies = owner_dependencies
+        self._owned_routes: list[Any] = []
+        self._owned_routes_key: int | None = None
+
+    async def __call__(self, scope: dict, receive: Any, send: Any) -> None:
+        if (
+            scope["type"] != "http"
+            or self.runtime.is_generation_worker
+            or not self._is_owned(scope)
+        ):
+            await self.app(scope, receive, send)
+            return
+        await self._forward(scope, receive, send)
+
+    def _is_owned(self, scope: dict) -> bool:
+        # 按需加载的路由会在运行中挂上来，路由表长度变了就重新收集。
+        routes = scope["app"].routes
+        if self._owned_routes_key != len(routes):
+            self._owned_routes = owned_routes(routes, self.owner_dependencies)
+            self._owned_routes_key = len(routes)
+        path = scope["path"]
+        method = scope.get("method")
+        return any(
+            route.path_regex.match(path) and (not route.methods or method in route.methods)
+            for route in self._owned_routes
+        )
+
+    async def _forward(self, scope: dict, receive: Any, send: Any) -> None:
+        import httpx
+
+        async def body() -> AsyncIterator[bytes]:
+            while True:
+                message = await receive()
+                if message["type"] != "http.request":
+                    return
+                if message.get("body"):
+                    yield message["body"]
+                if not message.get("more_body"):
+                    return
+
+        target = (scope.get("raw_path") or scope["path"].encode("utf-8")).decode("latin-1")
+        if scope.get("query_string"):
+            target += "?" + scope["query_string"].decode("latin-1")
+        headers = [(name, value) for name, value in scope["headers"] if name.lower() not in _HOP_BY_HOP_HEADERS]
+        client = self.runtime.http_client()
+        try:
+            response = await client.send(
+                client.build_request(scope["method"], target, headers=headers, content=body()),
+                stream=True,
+            )
+        except httpx.TransportError as exc:
+            self.runtime.counters["forward_failures"] += 1
+            logger.warning("Generation worker unreachable for %s %s: %s", scope["method"], scope["path"], exc)
+            await _send_unavailable(send)
+            return
+        self.runtime.counters["forwarded"] += 1
+        try:
+            await send({
+                "type": "http.response.start",
+                "status": response.status_code,
+                "headers": [
+                    (name, value) for name, value in response.headers.raw
+                    if name.lower() not in _HOP_BY_HOP_HEADERS
+                ],
+            })
+            async for chunk in response.aiter_raw():
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            await response.aclose()
+
+
+def _flatten_routes(routes: list[Any]) -> Any:
+    """展开 ``include_router`` 挂上的子路由。
+
+    新版 FastAPI 在 ``app.routes`` 里只放一个代表整棵子路由的条目，
+    带前缀的完整路径与依赖树要从它的 ``effective_route_contexts()`` 取。
+    """
+    for route in routes:
+        contexts = getattr(route, "effective_route_contexts", None)
+        if contexts is None:
+            yield route
+        else:
+            yield from contexts()
+
+
+def owned_routes(routes: list[Any], owner_dependencies: tuple[Any, ...]) -> list[Any]:
+    """依赖树里含有 ``owner_dependencies`` 任一项的路由（已展开子路由）。"""
+
+    def depends_on(dependant: Any) -> bool:
+        return any(
+            item.call in owner_dependencies or depends_on(item)
+            for item in getattr(dependant, "dependencies", ())
+        )
+
+    return [
+        route for route in _flatten_routes(routes)
+        if getattr(route, "path_regex", None) is not None
+        and depends_on(getattr(route, "dependant", None))
+    ]
+
+
+async def _send_unavailable(send: Any) -> None:
+    body = '{"detail":"生成服务暂不可用，请稍后重试"}'.encode()
+    await send({
+        "type": "http.response.start",
+        "status": 503,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode("ascii")),
+            (b"retry-after", b"1"),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+__all__ = [
+    "GenerationRouteForwarder",
+    "GenerationWorkerRuntime",
+    "owned_routes",
+]
@@ -13,11 +13,19 @@ import time
 from typing import Any, Callable
 import uuid
 
+from content_chunks import ContentChunkStore, chunk_store_for
 from storage import DATA_DIR
+from worker_coordination import ProcessLock, ProcessLockRegistry
 
 
 GENERATION_WORKSPACE_SCHEMA = "generation_workspace_v1"
 GENERATION_NODE_DRAFT_SCHEMA = "generation_node_draft_v1"
+# Each commit rewrites the workspace; chunking by section means only the
+# sections that changed are written again.
+WORKSPACE_CHUNK_PATHS = (
+    ("course_data", "nodes", "*"),
+    ("course_data", "learning_assets", "*", "*"),
+)
 _SAFE_ID = re.compile(r"^[A-Za-z0-9._-]+$")
 
 
@@ -30,11 +38,16 @@ class GenerationWorkspaceConflict(RuntimeError):
 
 
 class GenerationWorkspaceRepository:
-    def __init__(self, root_dir: str | Path | None = None) -> None:
+    def __init__(
+        self,
+        root_dir: str | Path | None = None,
+        *,
+        chunk_store: ContentChunkStore | None = None,
+    ) -> None:
         self.root_dir = Path(root_dir or Path(DATA_DIR) / "generation_workspaces")
         self.root_dir.mkdir(parents=True, exist_ok=True)
-        self._locks: dict[str, threading.RLock] = {}
-        self._locks_guard = threading.Lock()
+        self._chunks = chunk_store or chunk_store_for(self.root_dir)
+        self._locks = ProcessLockRegistry(self.root_dir)
 
     def create(
         self,
@@ -48,7 +61,7 @@ class GenerationWorkspaceRepository:
         with self._lock(workspace_id):
             path = self._path(workspace_id)
             if path.exists():
-                existing = self._read(path)
+                existing = self._read_document(path)
                 if existing.get("course_id") != course_id:
                     raise GenerationWorkspaceConflict("Generation workspace belongs to another course")
                 return deepcopy(existing)
@@ -63,7 +76,7 @@ class GenerationWorkspaceRepository:
                 "updated_at": now,
                 "result": {},
             }
-            self._atomic_write(path, workspace)
+            self._write_workspace(path, workspace)
             return deepcopy(workspace)
 
     def exists(self, workspace_id: str) -> bool:
@@ -86,7 +99,7 @@ class GenerationWorkspaceRepository:
         path = self._path(workspace_id)
         if not path.exists():
             raise GenerationWorkspaceNotFound(workspace_id)
-        return self._read(path)
+        return self._read_document(path)
 
     def load_course(self, workspace_id: str) -> dict[str, Any]:
         workspace = self.load(workspace_id)
@@ -169,7 +182,7 @@ class GenerationWorkspaceRepository:
                 raise GenerationWorkspaceConflict("Generation workspace updater returned invalid data")
             workspace["course_data"] = current
             workspace["updated_at"] = datetime.now(timezone.utc).isoformat()
-            self._atomic_write(self._path(workspace_id), workspace)
+            self._write_workspace(self._path(workspace_id), workspace)
             return deepcopy(current)
 
     def set_status(
@@ -186,7 +199,7 @@ class GenerationWorkspaceRepository:
             workspace["updated_at"] = datetime.now(timezone.utc).isoformat()
             if result is not None:
                 workspace["result"] = deepcopy(result)
-            self._atomic_write(self._path(workspace_id), workspace)
+            self._write_workspace(self._path(workspace_id), workspace)
             if status in {"published", "cancelled", "deleted"}:
                 self.clear_node_drafts(workspace_id)
             return deepcopy(workspace)
@@ -213,7 +226,7 @@ class GenerationWorkspaceRepository:
             workspace["status"] = "active"
             workspace["recovery_history"] = history[-50:]
             workspace["updated_at"] = now
-            self._atomic_write(self._path(workspace_id), workspace)
+            self._write_workspace(self._path(workspace_id), workspace)
             return deepcopy(workspace)
 
     def delete(self, workspace_id: str) -> bool:
@@ -221,7 +234,8 @@ class GenerationWorkspaceRepository:
         self._validate_id(workspace_id)
         with self._lock(workspace_id):
             path = self._path(workspace_id)
-            removed = self._unlink_with_temp(path)
+            removed = self._chunks.discard(path)
+            self._unlink_with_temp(path)
             removed_drafts = self.clear_node_drafts(workspace_id)
             return removed or removed_drafts > 0
 
@@ -272,15 +286,23 @@ class GenerationWorkspaceRepository:
             if isinstance(runtime, dict) and runtime:
                 node["generation_runtime"] = deepcopy(runtime)
 
-    def _lock(self, workspace_id: str) -> threading.RLock:
-        with self._locks_guard:
-            return self._locks.setdefault(workspace_id, threading.RLock())
+    def _lock(self, workspace_id: str) -> ProcessLock:
+        return self._locks.get(workspace_id)
 
     @staticmethod
     def _validate_id(value: str) -> None:
         if not value or not _SAFE_ID.match(value):
             raise ValueError("Invalid generation workspace identifier")
 
+    def _read_document(self, path: Path) -> dict[str, Any]:
+        value = self._chunks.read(path)
+        if not isinstance(value, dict):
+            raise GenerationWorkspaceConflict("Generation workspace must contain an object")
+        return value
+
+    def _write_workspace(self, path: Path, workspace: dict[str, Any]) -> None:
+        self._chunks.write(path, workspace, WORKSPACE_CHUNK_PATHS, writer=self._atomic_write)
+
     @staticmethod
     def _read(path: Path) -> dict[str, Any]:
         with path.open(encoding="utf-8") as handle:
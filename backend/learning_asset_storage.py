@@ -9,14 +9,24 @@ from copy import deepcopy
 from pathlib import Path
 from typing import Any
 
+from content_chunks import ContentChunkStore, chunk_store_for
 from course_versioning import stable_hash
 from storage import DATA_DIR
 
+# Every asset item is a chunk: revisions differ in a few items, not all of them.
+BUNDLE_CHUNK_PATHS = (("assets", "*", "*"),)
+
 
 class LearningAssetRepository:
-    def __init__(self, root_dir: str | Path | None = None) -> None:
+    def __init__(
+        self,
+        root_dir: str | Path | None = None,
+        *,
+        chunk_store: ContentChunkStore | None = None,
+    ) -> None:
         self.root_dir = Path(root_dir or Path(DATA_DIR) / "learning_assets")
         self.root_dir.mkdir(parents=True, exist_ok=True)
+        self._chunks = chunk_store or chunk_store_for(self.root_dir)
 
     def save_bundle(
         self,
@@ -31,7 +41,7 @@ class LearningAssetRepository:
         directory = self.root_dir / course_id
         path = directory / "revisions" / f"{bundle_id}.json"
         if not path.exists():
-            self._atomic_write(path, stored)
+            self._chunks.write(path, stored, BUNDLE_CHUNK_PATHS, writer=self._atomic_write)
         if activate:
             self.activate_bundle(course_id, bundle_id)
         return stored
@@ -53,7 +63,7 @@ class LearningAssetRepository:
                 return None
             bundle_revision_id = self._read(pointer).get("bundle_revision_id")
         path = directory / "revisions" / f"{bundle_revision_id}.json"
-        return self._read(path) if path.exists() else None
+        return self._read_document(path) if path.exists() else None
 
     def delete_bundle(self, course_id: str, bundle_revision_id: str) -> bool:
         """Delete an inactive bundle; the active bundle is always preserved."""
@@ -62,18 +72,22 @@ class LearningAssetRepository:
         if pointer.exists() and self._read(pointer).get("bundle_revision_id") == bundle_revision_id:
             return False
         path = directory / "revisions" / f"{bundle_revision_id}.json"
-        if not path.exists():
-            return False
-        path.unlink()
-        return True
+        return self._chunks.discard(path)
 
     def delete_course(self, course_id: str) -> bool:
         directory = self.root_dir / course_id
         if not directory.exists():
             return False
+        self._chunks.discard_tree(directory / "revisions")
         shutil.rmtree(directory)
         return True
 
+    def _read_document(self, path: Path) -> dict[str, Any]:
+        value = self._chunks.read(path)
+        if not isinstance(value, dict):
+            raise ValueError("Learning asset repository expected a JSON object")
+        return value
+
     @staticmethod
     def _read(path: Path) -> dict[str, Any]:
         with path.open(encoding="utf-8") as handle:
@@ -7,18 +7,24 @@ instead of introducing a database.
 
 from __future__ import annotations
 
-import threading
 import uuid
 from dataclasses import asdict, dataclass, field
 from datetime import datetime
 from typing import Any
 
 from learner_context import DEFAULT_USER_ID
-from storage import storage
+from storage import DATA_DIR, storage
+from worker_coordination import shared_lock
 
 LEARNING_EVENTS_FILE = "learning_events.json"
 SCHEMA_VERSION = 8
-_event_lock = threading.RLock()
+_event_lock = shared_lock(DATA_DIR, "learning_events")
+
+# Change tokens for one learner-course slice of the shared ledger. Appends made
+# here bump only their own slice; any other write of the ledger file (governance
+# deletes, tests, migrations through storage) moves a shared epoch instead.
+_slice_generations: dict[tuple[str, str], int] = {}
+_ledger_marks = {"own": 0, "foreign": 0}
 
 
 @dataclass
@@ -155,7 +161,9 @@ def record_learning_event(
             if existing:
                 return dict(existing)
         events.append(event)
+        before = _ledger_generation()
         storage.save_data(LEARNING_EVENTS_FILE, events)
+        _note_append(user_id, course_id, before)
     _maybe_trigger_evidence_evaluation(event)
     return event
 
@@ -195,6 +203,41 @@ def _maybe_trigger_evidence_evaluation(event: dict[str, Any]) -> None:
         pass
 
 
+def learning_events_watermark(user_id: str, course_id: str) -> tuple[int, int] | None:
+    """Change token for one learner-course slice of the ledger.
+
+    ``None`` when the storage backend cannot report write generations; callers
+    must then treat the slice as changed.
+    """
+    if not hasattr(storage, "data_generation"):
+        return None
+    with _event_lock:
+        current = storage.data_generation(LEARNING_EVENTS_FILE)
+        if current != _ledger_marks["own"]:
+            _ledger_marks["foreign"] = current
+        return (_ledger_marks["foreign"], _slice_generations.get((user_id, course_id or ""), 0))
+
+
+def _ledger_generation() -> int | None:
+    if not hasattr(storage, "data_generation"):
+        return None
+    return storage.data_generation(LEARNING_EVENTS_FILE)
+
+
+def _note_append(user_id: str, course_id: str | None, before: int | None) -> None:
+    after = _ledger_generation()
+    if before is None or after is None:
+        return
+    if before != _ledger_marks["own"]:
+        _ledger_marks["foreign"] = before
+    if after != before + 1:
+        # Someone else wrote between our read and our write.
+        _ledger_marks["foreign"] = after
+    _ledger_marks["own"] = after
+    key = (user_id, course_id or "")
+    _slice_generations[key] = _slice_generations.get(key, 0) + 1
+
+
 def load_learning_events(
     *,
     user_id: str | None = None,
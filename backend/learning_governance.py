@@ -25,7 +25,6 @@ from __future__ import annotations
 
 import json
 import os
-import threading
 import uuid
 from copy import deepcopy
 from datetime import datetime, timezone
@@ -33,7 +32,8 @@ from pathlib import Path
 from typing import Any
 
 from learning_events import LEARNING_EVENTS_FILE, load_learning_events
-from storage import storage
+from storage import DATA_DIR, storage
+from worker_coordination import shared_lock
 
 SCHEMA_VERSION = "learning_governance_v1"
 DELETION_RECEIPTS_FILE = "learning_deletion_receipts.json"
@@ -71,7 +71,7 @@ _RECEIPT_EVENT_ALLOWED_KEYS = {
     "created_at",
 }
 
-_governance_lock = threading.RLock()
+_governance_lock = shared_lock(DATA_DIR, "learning_governance")
 
 
 class DeletionReceiptLeak(AssertionError):
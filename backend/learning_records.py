@@ -15,6 +15,8 @@ import uuid
 from content_blocks import project_course_content_blocks, resolve_content_anchor
 from learning_progress import objective_for_node
 from storage import storage
+from store_watermarks import bump_watermark, file_watermark
+from worker_coordination import ProcessLock, ProcessLockRegistry
 
 
 SCHEMA_VERSION = 1
@@ -66,14 +68,17 @@ class LearningRecordRepository:
     def __init__(self, root: str | Path):
         self.root = Path(root)
         self.root.mkdir(parents=True, exist_ok=True)
-        self._locks: dict[str, threading.RLock] = {}
-        self._locks_guard = threading.Lock()
+        self._locks = ProcessLockRegistry(self.root)
 
     def list(self, user_id: str, course_id: str) -> list[dict[str, Any]]:
         key = self._key(user_id, course_id)
         with self._lock(key):
             return deepcopy(self._read(self._path(key)))
 
+    def watermark(self, user_id: str, course_id: str) -> tuple[int, int, int, int]:
+        """Change token for one learner-course file; see ``store_watermarks``."""
+        return file_watermark(self._path(self._key(user_id, course_id)))
+
     def create(
         self,
         user_id: str,
@@ -170,9 +175,8 @@ class LearningRecordRepository:
     def _path(self, key: str) -> Path:
         return self.root / f"{key}.json"
 
-    def _lock(self, key: str) -> threading.RLock:
-        with self._locks_guard:
-            return self._locks.setdefault(key, threading.RLock())
+    def _lock(self, key: str) -> ProcessLock:
+        return self._locks.get(key)
 
     def _read(self, path: Path) -> list[dict[str, Any]]:
         if not path.exists():
@@ -197,6 +201,7 @@ class LearningRecordRepository:
                 handle.flush()
                 os.fsync(handle.fileno())
             os.replace(temp, path)
+            bump_watermark(path)
         finally:
             if temp.exists():
                 temp.unlink()
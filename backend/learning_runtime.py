@@ -2,6 +2,10 @@
 
 from __future__ import annotations
 
+import os
+import threading
+import time
+from collections import OrderedDict
 from copy import deepcopy
 from datetime import datetime, timedelta, timezone
 from typing import Any
@@ -15,9 +19,9 @@ from course_evolution import (
 from course_learning_availability import project_course_learning_availability
 from course_revisions import revision_vector_for_document
 from course_versioning import stable_hash
-from diagnostic_service import workflow_view
+from diagnostic_service import workflow_view, workflow_watermark
 from learning_continuation import build_learning_continuation
-from learning_events import load_learning_events
+from learning_events import learning_events_watermark, load_learning_events
 from learner_model import build_learner_model, learner_model_summary
 from learning_progress import build_learning_progress, project_learning_objective_bindings
 from learning_records import learning_record_repository
@@ -26,6 +30,122 @@ from practice_attempts import practice_attempt_repository
 
 SCHEMA_VERSION = "learning_runtime_v1"
 ACTIVE_ATTEMPT_STATUSES = {"in_progress", "submitted", "grading"}
+DEFAULT_MEMO_MAX_ENTRIES = 512
+DEFAULT_MEMO_MAX_AGE_SECONDS = 60.0
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(0, int(os.getenv(name, str(default))))
+    except ValueError:
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return max(0.0, float(os.getenv(name, str(default))))
+    except ValueError:
+        return default
+
+
+class LearningRuntimeMemo:
+    """Last runtime per ``(user, course, node)``, valid while its inputs are.
+
+    An entry is reused only when the course revision and every store watermark
+    still match the ones read before it was built. ``max_age_seconds`` bounds
+    the parts that depend on the clock rather than on stored facts (expiry
+    stamps, recency decay).
+    """
+
+    def __init__(
+        self,
+        *,
+        max_entries: int = DEFAULT_MEMO_MAX_ENTRIES,
+        max_age_seconds: float = DEFAULT_MEMO_MAX_AGE_SECONDS,
+    ) -> None:
+        self.max_entries = max_entries
+        self.max_age_seconds = max_age_seconds
+        self._entries: OrderedDict[tuple[str, str, str], tuple[Any, float, dict[str, Any]]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "bypassed": 0}
+
+    @classmethod
+    def from_env(cls) -> LearningRuntimeMemo:
+        return cls(
+            max_entries=_env_int("LEARNING_RUNTIME_MEMO_MAX_ENTRIES", DEFAULT_MEMO_MAX_ENTRIES),
+            max_age_seconds=_env_float(
+                "LEARNING_RUNTIME_MEMO_MAX_AGE_SECONDS", DEFAULT_MEMO_MAX_AGE_SECONDS,
+            ),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.max_entries and self.max_age_seconds)
+
+    def get(self, key: tuple[str, str, str], signature: Any) -> dict[str, Any] | None:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != signature or now - entry[1] > self.max_age_seconds:
+                self._counters["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._counters["hits"] += 1
+            runtime = entry[2]
+        return deepcopy(runtime)
+
+    def put(self, key: tuple[str, str, str], signature: Any, runtime: dict[str, Any]) -> None:
+        stored = deepcopy(runtime)
+        with self._lock:
+            self._entries[key] = (signature, time.monotonic(), stored)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def bypass(self) -> None:
+        with self._lock:
+            self._counters["bypassed"] += 1
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {**self._counters, "entries": len(self._entries)}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            for name in self._counters:
+                self._counters[name] = 0
+
+
+learning_runtime_memo = LearningRuntimeMemo.from_env()
+
+
+def runtime_input_watermarks(user_id: str, course_id: str) -> tuple[Any, ...] | None:
+    """Cheap stand-in for the input half of the revision vector.
+
+    Every store behind ``build_runtime_revision_vector`` reports a change token
+    without being read. ``None`` means a store cannot tell, so nothing may be
+    reused.
+    """
+    events = learning_events_watermark(user_id, course_id)
+    if events is None:
+        return None
+    marks: list[Any] = [events]
+    for store in (
+        learning_snapshot_repository,
+        learning_record_repository,
+        practice_attempt_repository,
+        course_evolution_repository,
+    ):
+        watermark = getattr(store, "watermark", None)
+        if watermark is None:
+            return None
+        marks.append(watermark(user_id, course_id))
+    workflow = workflow_watermark(user_id, course_id)
+    if workflow is None:
+        return None
+    marks.append(workflow)
+    return tuple(marks)
 
 
 def build_learning_runtime(
@@ -34,7 +154,35 @@ def build_learning_runtime(
     user_id: str,
     node_id: str | None = None,
 ) -> dict[str, Any]:
-    """Build all coordination projections from one immutable source batch."""
+    """Build all coordination projections from one immutable source batch.
+
+    Repeated calls with an unchanged course and unchanged learner stores
+    return a copy of the memoized runtime instead of rebuilding it.
+    """
+    memo = learning_runtime_memo
+    course_id = str(course_data.get("course_id") or "")
+    watermarks = runtime_input_watermarks(user_id, course_id) if memo.enabled else None
+    if watermarks is None:
+        memo.bypass()
+        return _build_learning_runtime(course_data, user_id=user_id, node_id=node_id)
+    key = (user_id, course_id, str(node_id or ""))
+    # Watermarks are read before the build: a write racing the build leaves the
+    # entry under the older signature, so the next call rebuilds.
+    signature = (stable_hash(course_data, prefix="lcr_"), watermarks)
+    cached = memo.get(key, signature)
+    if cached is not None:
+        return cached
+    runtime = _build_learning_runtime(course_data, user_id=user_id, node_id=node_id)
+    memo.put(key, signature, runtime)
+    return runtime
+
+
+def _build_learning_runtime(
+    course_data: dict[str, Any],
+    *,
+    user_id: str,
+    node_id: str | None,
+) -> dict[str, Any]:
     course = project_learning_objective_bindings(course_data)
     course_id = str(course.get("course_id") or "")
     events = load_learning_events(user_id=user_id, course_id=course_id)
@@ -423,4 +571,11 @@ def build_runtime_revision_vector(
     }
 
 
-__all__ = ["SCHEMA_VERSION", "build_learning_runtime", "build_runtime_revision_vector"]
+__all__ = [
+    "SCHEMA_VERSION",
+    "LearningRuntimeMemo",
+    "build_learning_runtime",
+    "build_runtime_revision_vector",
+    "learning_runtime_memo",
+    "runtime_input_watermarks",
+]
@@ -12,6 +12,7 @@ from pathlib import Path
 from typing import Any
 
 from storage import storage
+from store_watermarks import bump_watermark, file_watermark
 
 SCHEMA_VERSION = 2
 
@@ -36,6 +37,10 @@ class LearningSnapshotRepository:
         with self._lock(key):
             return self._read(self._path(key))
 
+    def watermark(self, user_id: str, course_id: str) -> tuple[int, int, int, int]:
+        """Change token for one learner-course file; see ``store_watermarks``."""
+        return file_watermark(self._path(self._key(user_id, course_id)))
+
     def save(
         self,
         user_id: str,
@@ -73,6 +78,7 @@ class LearningSnapshotRepository:
             if not path.exists():
                 return False
             path.unlink()
+            bump_watermark(path)
             return True
 
     def _key(self, user_id: str, course_id: str) -> str:
@@ -108,6 +114,7 @@ class LearningSnapshotRepository:
                 handle.flush()
                 os.fsync(handle.fileno())
             os.replace(temp, path)
+            bump_watermark(path)
         finally:
             if temp.exists():
                 temp.unlink()
@@ -0,0 +1,281 @@
+"""LLM 响应缓存与录制 / 回放（opt-in）。
+
+挂在 ``AIBase._call_llm`` / ``_stream_llm`` 这个请求统一出口上，按请求内容寻址：
+同一个（模型路由、system prompt、prompt、json_mode、thinking、输出与输入上限）请求
+得到同一个键。默认关闭，由 ``LLM_RESPONSE_CACHE`` 选择模式：
+
+* ``cache``：读穿缓存。命中且未过期直接返回，未命中才打 provider 并写回。
+* ``record``：照常打 provider，把每次成功响应写下来（覆盖旧记录）。
+* ``replay``：只读记录，不联网；未命中按 provider 不可用处理，生成链路会像
+  没配 key 时一样走本地降级。压测和回归基准可以在断网的机器上跑。
+
+``LLM_RESPONSE_CACHE_STAGES`` 是逗号分隔的启用列表，匹配
+``generation_telemetry`` 的阶段标签或发起调用的服务类名；留空表示全部阶段。
+下游校验失败后的原样重试会拿到同一份响应，所以只在结果可复用的阶段打开。
+
+只保存成功且未截断的完整响应。落盘格式是每个键一个 JSON 文件，分两级目录
+存放；超过条目或字节上限时按最久未写入的顺序淘汰。``AIBase`` 在事件循环上
+用 :meth:`LLMResponseCache.alookup` / :meth:`LLMResponseCache.astore`，读写与
+定期淘汰都放到工作线程里。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+CACHE_MODES = ("off", "cache", "record", "replay")
+KEY_SCHEMA_VERSION = 2
+
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+DEFAULT_MAX_ENTRIES = 5000
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+# 淘汰要遍历整个目录，隔若干次写入才做一次。
+_PRUNE_EVERY = 32
+
+
+def _default_dir() -> Path:
+    base = os.getenv("LINGZHI_DATA_DIR") or Path(__file__).resolve().parent / "data"
+    return Path(base) / "llm_response_cache"
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return max(0.0, float(os.getenv(name, str(default))))
+    except ValueError:
+        return default
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(0, int(os.getenv(name, str(default))))
+    except ValueError:
+        return default
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    chunks: tuple[str, ...]
+    stored_at: float
+
+    @property
+    def content(self) -> str:
+        return "".join(self.chunks)
+
+
+class LLMResponseCache:
+    def __init__(
+        self,
+        directory: str | Path,
+        *,
+        mode: str = "cache",
+        stages: tuple[str, ...] = (),
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ) -> None:
+        self.directory = Path(directory)
+        self.mode = mode if mode in CACHE_MODES else "off"
+        self.stages = frozenset(item for item in stages if item)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._counters = {"hits": 0, "misses": 0, "stores": 0, "expired": 0, "evictions": 0}
+
+    @classmethod
+    def from_env(cls) -> LLMResponseCache:
+        mode = os.getenv("LLM_RESPONSE_CACHE", "off").strip().lower()
+        return cls(
+            os.getenv("LLM_RESPONSE_CACHE_DIR", "").strip() or _default_dir(),
+            mode=mode,
+            stages=tuple(
+                item.strip()
+                for item in os.getenv("LLM_RESPONSE_CACHE_STAGES", "").split(",")
+            ),
+            ttl_seconds=_env_float("LLM_RESPONSE_CACHE_TTL_SECONDS", DEFAULT_TTL_SECONDS),
+            max_entries=_env_int("LLM_RESPONSE_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES),
+            max_bytes=_env_int("LLM_RESPONSE_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+    @property
+    def replay_only(self) -> bool:
+        return self.mode == "replay"
+
+    def applies_to(self, *names: str) -> bool:
+        if not self.enabled:
+            return False
+        return not self.stages or any(name in self.stages for name in names if name)
+
+    @staticmethod
+    def request_key(
+        *,
+        models: list[str] | tuple[str, ...],
+        model_role: str | None,
+        system_prompt: str,
+        prompt: str,
+        json_mode: bool,
+        enable_thinking: bool,
+        max_tokens: int,
+        max_input_tokens: int | None = None,
+        max_input_chars: int | None = None,
+    ) -> str:
+        payload = {
+            "v": KEY_SCHEMA_VERSION,
+            "models": list(models),
+            "model_role": model_role or "",
+            "system": system_prompt,
+            "prompt": prompt,
+            "json_mode": bool(json_mode),
+            "enable_thinking": bool(enable_thinking),
+            "max_tokens": int(max_tokens),
+            "max_input_tokens": max_input_tokens,
+            "max_input_chars": max_input_chars,
+        }
+        text = json.dumps(payload, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json"
+
+    def lookup(self, key: str) -> CachedResponse | None:
+        """``record`` 模式永远不读；``replay`` 忽略 TTL，录下的就是基准。"""
+        if self.mode not in {"cache", "replay"}:
+            return None
+        path = self._path(key)
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+            response = CachedResponse(
+                chunks=tuple(str(item) for item in data["chunks"]),
+                stored_at=float(data["stored_at"]),
+            )
+        except (OSError, ValueError, KeyError, TypeError):
+            self._count("misses")
+            return None
+        if (
+            self.mode == "cache"
+            and self.ttl_seconds
+            and time.time() - response.stored_at > self.ttl_seconds
+        ):
+            path.unlink(missing_ok=True)
+            self._count("expired")
+            self._count("misses")
+            return None
+        self._count("hits")
+        return response
+
+    def store(self, key: str, chunks: list[str], *, stage: str = "") -> None:
+        if self.mode not in {"cache", "record"} or not "".join(chunks):
+            return
+        path = self._path(key)
+        document = {
+            "key": key,
+            "stage": stage,
+            "stored_at": time.time(),
+            "chunks": chunks,
+        }
+        temp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            temp.write_text(json.dumps(document, ensure_ascii=False), encoding="utf-8")
+            os.replace(temp, path)
+        except OSError:
+            temp.unlink(missing_ok=True)
+            logger.debug("LLM response cache write failed", exc_info=True)
+            return
+        self._count("stores")
+        with self._lock:
+            self._writes += 1
+            should_prune = self._writes % _PRUNE_EVERY == 0
+        if should_prune:
+            self.prune()
+
+    async def alookup(self, key: str) -> CachedResponse | None:
+        """Like :meth:`lookup`, but the file read runs in a worker thread."""
+        if self.mode not in {"cache", "replay"}:
+            return None
+        return await asyncio.to_thread(self.lookup, key)
+
+    async def astore(self, key: str, chunks: list[str], *, stage: str = "") -> None:
+        """Like :meth:`store`, but the write and the periodic prune run in a worker thread."""
+        if self.mode not in {"cache", "record"} or not "".join(chunks):
+            return
+        await asyncio.to_thread(self.store, key, chunks, stage=stage)
+
+    def prune(self) -> int:
+        files: list[tuple[float, int, Path]] = []
+        for path in self.directory.glob("*/*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        files.sort()
+        total_bytes = sum(size for _mtime, size, _path in files)
+        removed = 0
+        while files and (
+            (self.max_entries and len(files) > self.max_entries)
+            or (self.max_bytes and total_bytes > self.max_bytes)
+        ):
+            _mtime, size, path = files.pop(0)
+            path.unlink(missing_ok=True)
+            total_bytes -= size
+            removed += 1
+        if removed:
+            self._count("evictions", removed)
+        return removed
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self._counters[name] += amount
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "stages": sorted(self.stages),
+                **self._counters,
+            }
+
+
+_cache: LLMResponseCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_response_cache() -> LLMResponseCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = LLMResponseCache.from_env()
+        return _cache
+
+
+def reset_llm_response_cache() -> None:
+    """测试与切换模式用：下次访问时按当前环境变量重建。"""
+    global _cache
+    with _cache_lock:
+        _cache = None
+
+
+__all__ = [
+    "CACHE_MODES",
+    "CachedResponse",
+    "LLMResponseCache",
+    "get_llm_response_cache",
+    "reset_llm_response_cache",
+]
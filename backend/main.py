@@ -3,19 +3,31 @@
 # 初始化 FastAPI 应用，配置中间件，注册路由模块，管理 WebSocket 连接。
 # =============================================================================
 
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import PlainTextResponse
 from contextlib import asynccontextmanager
 import sys
 import os
 import logging
 import json
+import hmac
+from datetime import datetime
 
 try:
-    from static_serving import ImmutableStaticFiles, frontend_file_response
+    from static_serving import (
+        ImmutableStaticFiles,
+        PrecompressedAwareGZipMiddleware,
+        frontend_file_response,
+        has_precompressed_files,
+    )
 except ImportError:
-    from backend.static_serving import ImmutableStaticFiles, frontend_file_response
+    from backend.static_serving import (
+        ImmutableStaticFiles,
+        PrecompressedAwareGZipMiddleware,
+        frontend_file_response,
+        has_precompressed_files,
+    )
 
 # 设置日志
 logging.basicConfig(level=logging.INFO)
@@ -30,9 +42,19 @@ try:
     from course_repository import CourseDocumentRepository, register_course_revision_listener
     from representation_reconciliation import RepresentationReconciliationService
     from teaching_representations import teaching_representation_repository
-    from dependencies import init_task_manager
+    from dependencies import get_task_manager_optional, init_task_manager, require_task_manager
     from websocket_service import WebSocketService
     from course_service import get_course_service
+    from generation_worker import GenerationRouteForwarder, GenerationWorkerRuntime
+    from deferred_routers import DeferredRouterMiddleware, DeferredRouterRegistry, defer_routers_enabled
+    from metrics import (
+        CONTENT_TYPE as METRICS_CONTENT_TYPE,
+        metrics_enabled,
+        registry as metrics_registry,
+        task_manager_collector,
+        websocket_collector,
+    )
+    from retrieval_cache import retrieval_cache_stats
 except ImportError:
     try:
         from backend.storage import storage
@@ -40,46 +62,45 @@ except ImportError:
         from backend.course_repository import CourseDocumentRepository, register_course_revision_listener
         from backend.representation_reconciliation import RepresentationReconciliationService
         from backend.teaching_representations import teaching_representation_repository
-        from backend.dependencies import init_task_manager
+        from backend.dependencies import get_task_manager_optional, init_task_manager, require_task_manager
         from backend.websocket_service import WebSocketService
         from backend.course_service import get_course_service
+        from backend.generation_worker import GenerationRouteForwarder, GenerationWorkerRuntime
+        from backend.deferred_routers import DeferredRouterMiddleware, DeferredRouterRegistry, defer_routers_enabled
+        from backend.metrics import (
+            CONTENT_TYPE as METRICS_CONTENT_TYPE,
+            metrics_enabled,
+            registry as metrics_registry,
+            task_manager_collector,
+            websocket_collector,
+        )
+        from backend.retrieval_cache import retrieval_cache_stats
     except ImportError as e:
         logger.error(f"Failed to import required modules: {e}")
         raise
 
-# 导入路由模块
+# 导入路由模块；低频路由登记在 routers.DEFERRED_ROUTERS，第一次被请求时才导入。
 from routers import (
     courses, course_baseline, nodes, assistant, ai_teacher,
     review,
     code_execution, diagrams, tasks,
     markdown_import, materials, course_versions, learning_assets,
     learning_snapshots, learning_progress, learning_records, learning_continuation, learning_runtime, practice, diagnostics,
-    learning_governance,
     question_bank,
-    course_acceptance, block_regeneration, learner_model, change_proposals,
-    knowledge_libraries, teaching_representations, course_evolution,
-    teaching_plan_workbench,
-    teacher_course_space,
-    teacher_authoring,
-    teacher_lesson_authoring,
-    teaching_calendar,
-    ppt_template_packs,
+    block_regeneration, learner_model, change_proposals,
+    course_evolution,
     usage_events,
+    DEFERRED_ROUTERS,
 )
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup
-    if representation_reconciliation_service:
-        await representation_reconciliation_service.start()
-    if task_manager:
-        await task_manager.start()
+    # Startup：单进程时直接启动对账服务与 TaskManager；多 worker 时只有选出的
+    # 生成进程启动它们，其余 worker 转发生成相关请求。
+    await generation_worker_runtime.start(app)
     yield
     # Shutdown
-    if task_manager:
-        await task_manager.shutdown()
-    if representation_reconciliation_service:
-        await representation_reconciliation_service.shutdown()
+    await generation_worker_runtime.shutdown()
 
 app = FastAPI(lifespan=lifespan)
 
@@ -102,9 +123,18 @@ try:
     ws_service.set_command_handler(task_manager.handle_command)
     init_task_manager(task_manager)
 except NameError:
+    ws_service = None
     task_manager = None
     representation_reconciliation_service = None
 
+generation_worker_runtime = GenerationWorkerRuntime(
+    task_manager=task_manager,
+    reconciliation_service=representation_reconciliation_service,
+    storage=storage,
+    ws_service=ws_service,
+    data_dir=storage._data_dir,
+)
+
 # ============================================================================
 # Middleware Configuration
 # ============================================================================
@@ -112,7 +142,19 @@ except NameError:
 from rate_limiter import RateLimitMiddleware
 
 app.add_middleware(RateLimitMiddleware)
-app.add_middleware(GZipMiddleware, minimum_size=1000)
+# 构建期已预压缩的哈希资源直接返回 .br/.gz 文件，不再经过动态 gzip。
+_static_assets_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "assets")
+app.add_middleware(
+    PrecompressedAwareGZipMiddleware,
+    minimum_size=1000,
+    bypass_prefixes=("/assets/",) if has_precompressed_files(_static_assets_dir) else (),
+)
+# 限流与压缩之外：非生成进程把依赖 TaskManager 的请求原样交给生成进程处理。
+app.add_middleware(
+    GenerationRouteForwarder,
+    runtime=generation_worker_runtime,
+    owner_dependencies=(require_task_manager, get_task_manager_optional),
+)
 
 app.add_middleware(
     CORSMiddleware,
@@ -138,7 +180,6 @@ app.add_middleware(
 # Health Check Endpoints
 # ============================================================================
 
-from datetime import datetime
 from web_retrieval import retrieval_feature_state
 
 @app.get("/health")
@@ -157,10 +198,32 @@ def read_root():
             "provider_configured": retrieval[
                 "provider_configured"
             ],
+            "query_cache": retrieval_cache_stats(),
         },
+        "representation_reconciliation": (
+            representation_reconciliation_service.stats()
+            if representation_reconciliation_service else None
+        ),
+        "workers": generation_worker_runtime.stats(),
+        "deferred_routers": deferred_routers.stats(),
     }
 
 
+if task_manager is not None:
+    metrics_registry.register_collector("task_manager", task_manager_collector(task_manager))
+if ws_service is not None:
+    metrics_registry.register_collector("websocket", websocket_collector(ws_service))
+
+if metrics_enabled():
+    @app.get("/metrics", include_in_schema=False)
+    def read_metrics(request: Request) -> PlainTextResponse:
+        token = os.getenv("LINGZHI_METRICS_TOKEN", "").strip()
+        supplied = request.headers.get("authorization", "")
+        if token and not hmac.compare_digest(supplied.encode(), f"Bearer {token}".encode()):
+            raise HTTPException(status_code=401, detail="Metrics token required")
+        return PlainTextResponse(metrics_registry.render(), media_type=METRICS_CONTENT_TYPE)
+
+
 # ============================================================================
 # Register Routers
 # ============================================================================
@@ -184,26 +247,24 @@ app.include_router(learning_records.router, prefix="/api")
 app.include_router(learning_continuation.router, prefix="/api")
 app.include_router(learning_runtime.router, prefix="/api")
 app.include_router(learner_model.router, prefix="/api")
-app.include_router(learning_governance.router, prefix="/api")
 app.include_router(practice.router, prefix="/api")
 app.include_router(question_bank.router, prefix="/api")
 app.include_router(diagnostics.router, prefix="/api")
-app.include_router(course_acceptance.router, prefix="/api")
-app.include_router(ppt_template_packs.router, prefix="/api")
 app.include_router(block_regeneration.router, prefix="/api")
 app.include_router(change_proposals.router, prefix="/api")
 app.include_router(change_proposals.authoring_router, prefix="/api")
-app.include_router(knowledge_libraries.router, prefix="/api")
-app.include_router(teaching_representations.router, prefix="/api")
 app.include_router(course_evolution.router, prefix="/api")
 app.include_router(course_evolution.personal_router, prefix="/api")
-app.include_router(teaching_plan_workbench.router, prefix="/api")
-app.include_router(teacher_course_space.router, prefix="/api")
-app.include_router(teacher_authoring.router, prefix="/api")
-app.include_router(teacher_lesson_authoring.router, prefix="/api")
-app.include_router(teaching_calendar.router, prefix="/api")
 app.include_router(usage_events.router, prefix="/api")
 
+# 延迟路由插在这里，排在后面注册的 WebSocket 与静态站点兜底路由之前。
+deferred_routers = DeferredRouterRegistry(app, DEFERRED_ROUTERS)
+if defer_routers_enabled():
+    # 加在生成路由转发外层：先挂上路由，转发判断才能看到它们的依赖。
+    app.add_middleware(DeferredRouterMiddleware, registry=deferred_routers)
+else:
+    deferred_routers.load_all()
+
 
 # ============================================================================
 # WebSocket Endpoints
@@ -257,18 +318,18 @@ if os.path.exists(static_dir) and os.path.exists(index_html):
         )
 
     @app.get("/")
-    async def serve_root():
-        return frontend_file_response(index_html, entrypoint=True)
+    async def serve_root(request: Request):
+        return frontend_file_response(index_html, entrypoint=True, request_headers=request.headers)
 
     @app.get("/{full_path:path}")
-    async def serve_frontend(full_path: str):
+    async def serve_frontend(full_path: str, request: Request):
         from fastapi import HTTPException
         if full_path.startswith("api/"):
             raise HTTPException(status_code=404, detail="API endpoint not found")
         file_path = os.path.join(static_dir, full_path)
         if os.path.exists(file_path) and os.path.isfile(file_path):
-            return frontend_file_response(file_path)
-        return frontend_file_response(index_html, entrypoint=True)
+            return frontend_file_response(file_path, request_headers=request.headers)
+        return frontend_file_response(index_html, entrypoint=True, request_headers=request.headers)
 else:
     @app.get("/")
     async def root():
@@ -0,0 +1,271 @@
+"""``<root>/<prefix>*/manifest.json`` 形态仓库的持久化二级索引。
+
+资料库、幻灯片图片库这类仓库每个资产一个目录、一份 manifest。按字段查找
+（sha256 去重、asset_url 复用、批次计数）原本要 glob 并解析全部 manifest，
+资产越多越慢。这里把每份 manifest 投影成一小段摘要，落成根目录下
+``.index/manifest_index.json``，内存里再按字段建倒排表。
+
+一致性约束：
+
+* 写入方在 save / promote / delete 之后调用 :meth:`ManifestIndex.upsert` /
+  :meth:`ManifestIndex.remove`；进程内用 ``RLock``，跨进程用 ``.index/lock``
+  上的 ``fcntl.flock``（平台不支持时退化为仅进程内锁）。
+* 其他进程写过索引时，读取方靠索引文件的 ``mtime_ns`` 发现并重新加载。
+* 根目录的 ``mtime_ns`` 会随资产目录的增删变化。它与索引记录的值不一致，
+  说明有写入绕过了索引（手工删除、写到一半崩溃），这时整体重建。
+* 首次打开时还会比对一次目录名集合，启动期发现陈旧索引就重建。
+
+索引只负责缩小候选集；调用方命中后仍要读取真实 manifest 复核。索引文件放在
+``.index/`` 子目录里，写它不会改动根目录的 ``mtime_ns``。
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any
+
+try:  # pragma: no cover - 平台相关
+    import fcntl
+except ImportError:  # pragma: no cover - Windows 开发机
+    fcntl = None  # type: ignore[assignment]
+
+INDEX_DIRNAME = ".index"
+INDEX_FILENAME = "manifest_index.json"
+INDEX_SCHEMA_VERSION = 1
+
+Projector = Callable[[dict[str, Any]], dict[str, Any]]
+
+
+class ManifestIndex:
+    """按 ``keys`` 中的字段维护 ``value -> [asset_id]`` 倒排表的持久化索引。"""
+
+    def __init__(
+        self,
+        root: Path | str,
+        *,
+        prefix: str,
+        project: Projector,
+        keys: tuple[str, ...],
+        version: str = "",
+    ) -> None:
+        self.root = Path(root)
+        self.prefix = prefix
+        self.keys = keys
+        # ``version`` 由调用方声明投影规则的版本；规则变了旧索引直接作废。
+        self.version = f"{INDEX_SCHEMA_VERSION}:{version}"
+        self._project = project
+        self._dir = self.root / INDEX_DIRNAME
+        self._path = self._dir / INDEX_FILENAME
+        self._lock_path = self._dir / "lock"
+        self._lock = threading.RLock()
+        self._entries: dict[str, dict[str, Any]] = {}
+        self._postings: dict[str, dict[str, list[str]]] = {key: {} for key in keys}
+        self._root_mtime_ns = -1
+        self._file_mtime_ns = -1
+        self._file_lock_depth = 0
+        self._dir.mkdir(parents=True, exist_ok=True)
+        with self._lock, self._file_lock():
+            self._load_from_disk()
+            if not self._matches_directory_listing():
+                self._rebuild_locked()
+
+    # ------------------------------------------------------------------
+    # 查询
+    # ------------------------------------------------------------------
+
+    def lookup(self, key: str, value: Any) -> list[str]:
+        """返回字段 ``key`` 等于 ``value`` 的资产 ID，按首次登记顺序。"""
+        if key not in self._postings:
+            raise KeyError(f"Field is not indexed: {key}")
+        with self._lock:
+            self._refresh_locked()
+            return list(self._postings[key].get(str(value), ()))
+
+    def entry(self, asset_id: str) -> dict[str, Any] | None:
+        with self._lock:
+            self._refresh_locked()
+            entry = self._entries.get(asset_id)
+            return dict(entry) if entry is not None else None
+
+    def entries_for(self, key: str, value: Any) -> list[dict[str, Any]]:
+        """一次取出某个倒排键下的全部摘要，供批次计数这类聚合使用。"""
+        with self._lock:
+            self._refresh_locked()
+            return [
+                dict(self._entries[asset_id])
+                for asset_id in self._postings[key].get(str(value), ())
+                if asset_id in self._entries
+            ]
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._refresh_locked()
+            return len(self._entries)
+
+    # ------------------------------------------------------------------
+    # 维护
+    # ------------------------------------------------------------------
+
+    def upsert(self, asset_id: str, manifest: dict[str, Any]) -> None:
+        with self._lock, self._file_lock():
+            self._refresh_locked(check_root=False)
+            self._drop_locked(asset_id)
+            self._add_locked(asset_id, self._project(manifest))
+            self._persist_locked()
+
+    def remove(self, asset_id: str) -> None:
+        with self._lock, self._file_lock():
+            self._refresh_locked(check_root=False)
+            if asset_id not in self._entries:
+                self._persist_locked()
+                return
+            self._drop_locked(asset_id)
+            self._persist_locked()
+
+    def rebuild(self) -> None:
+        """丢弃现有索引，从全部 manifest 重新投影。"""
+        with self._lock, self._file_lock():
+            self._rebuild_locked()
+
+    # ------------------------------------------------------------------
+    # 内部实现
+    # ------------------------------------------------------------------
+
+    @contextmanager
+    def _file_lock(self) -> Iterator[None]:
+        # flock 锁的是打开的文件描述，同一进程重复打开再加锁会自锁，所以按深度重入。
+        if fcntl is None or self._file_lock_depth:
+            self._file_lock_depth += 1
+            try:
+                yield
+            finally:
+                self._file_lock_depth -= 1
+            return
+        self._dir.mkdir(parents=True, exist_ok=True)
+        with self._lock_path.open("a+") as handle:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+            self._file_lock_depth += 1
+            try:
+                yield
+            finally:
+                self._file_lock_depth -= 1
+                fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+
+    def _stat_mtime(self, path: Path) -> int:
+        try:
+            return path.stat().st_mtime_ns
+        except OSError:
+            return -1
+
+    def _refresh_locked(self, *, check_root: bool = True) -> None:
+        # 写入方自己刚增删过资产目录，根目录 mtime 必然变化；写路径只追平
+        # 别的进程写过的索引文件，不能因此触发整体重建。
+        file_mtime = self._stat_mtime(self._path)
+        if file_mtime != self._file_mtime_ns:
+            with self._file_lock():
+                self._load_from_disk()
+        if check_root and self._stat_mtime(self.root) != self._root_mtime_ns:
+            with self._file_lock():
+                # 拿到文件锁后再看一次：可能只是别的进程刚写完索引。
+                self._load_from_disk()
+                if self._stat_mtime(self.root) != self._root_mtime_ns:
+                    self._rebuild_locked()
+
+    def _load_from_disk(self) -> None:
+        self._entries = {}
+        self._postings = {key: {} for key in self.keys}
+        self._root_mtime_ns = -1
+        self._file_mtime_ns = self._stat_mtime(self._path)
+        try:
+            data = json.loads(self._path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        if not isinstance(data, dict) or data.get("version") != self.version:
+            return
+        entries = data.get("entries")
+        if not isinstance(entries, dict):
+            return
+        for asset_id, entry in entries.items():
+            if isinstance(entry, dict):
+                self._add_locked(str(asset_id), entry)
+        self._root_mtime_ns = int(data.get("root_mtime_ns") or -1)
+
+    def _matches_directory_listing(self) -> bool:
+        try:
+            names = {
+                entry.name
+                for entry in os.scandir(self.root)
+                if entry.name.startswith(self.prefix)
+                and entry.is_dir()
+                and os.path.exists(os.path.join(entry.path, "manifest.json"))
+            }
+        except OSError:
+            return False
+        return names == set(self._entries) and self._root_mtime_ns == self._stat_mtime(self.root)
+
+    def _rebuild_locked(self) -> None:
+        self._entries = {}
+        self._postings = {key: {} for key in self.keys}
+        for manifest in sorted(self.root.glob(f"{self.prefix}*/manifest.json")):
+            try:
+                data = json.loads(manifest.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                continue
+            if not isinstance(data, dict):
+                continue
+            try:
+                projected = self._project(data)
+            except (TypeError, ValueError):
+                continue
+            self._add_locked(manifest.parent.name, projected)
+        self._persist_locked()
+
+    def _add_locked(self, asset_id: str, entry: dict[str, Any]) -> None:
+        self._entries[asset_id] = entry
+        for key in self.keys:
+            value = entry.get(key)
+            if value is None:
+                continue
+            bucket = self._postings[key].setdefault(str(value), [])
+            if asset_id not in bucket:
+                bucket.append(asset_id)
+
+    def _drop_locked(self, asset_id: str) -> None:
+        entry = self._entries.pop(asset_id, None)
+        if entry is None:
+            return
+        for key in self.keys:
+            value = entry.get(key)
+            if value is None:
+                continue
+            bucket = self._postings[key].get(str(value))
+            if not bucket:
+                continue
+            if asset_id in bucket:
+                bucket.remove(asset_id)
+            if not bucket:
+                self._postings[key].pop(str(value), None)
+
+    def _persist_locked(self) -> None:
+        self._root_mtime_ns = self._stat_mtime(self.root)
+        payload = {
+            "version": self.version,
+            "root_mtime_ns": self._root_mtime_ns,
+            "entries": self._entries,
+        }
+        self._dir.mkdir(parents=True, exist_ok=True)
+        temp = self._path.with_name(f"{self._path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with temp.open("w", encoding="utf-8") as handle:
+            json.dump(payload, handle, ensure_ascii=False, separators=(",", ":"))
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(temp, self._path)
+        self._file_mtime_ns = self._stat_mtime(self._path)
+
+
+__all__ = ["INDEX_DIRNAME", "ManifestIndex"]
@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 import hashlib
+import heapq
 import re
 import uuid
 from collections import defaultdict
@@ -169,6 +170,7 @@ def attach_evidence_to_plan(
     ]
     assigned_by_asset: dict[str, list[str]] = defaultdict(list)
     node_contracts: dict[str, NodeGroundingContract] = {}
+    index = EvidenceKeywordIndex(factual)
 
     for section_index, section in enumerate(sections, start=1):
         node_id = str(section.get("node_id") or f"L2-auto-{section_index}")
@@ -178,12 +180,7 @@ def attach_evidence_to_plan(
             " ".join(str(item) for item in section.get("key_points") or []),
             " ".join(str(item) for item in section.get("assessment") or []),
         ])
-        ranked = sorted(
-            ((item, _relevance(query, item)) for item in factual),
-            key=lambda pair: pair[1],
-            reverse=True,
-        )
-        selected = [item for item, score in ranked if score > 0][:4]
+        selected = index.top(query, 4)
         required = [
             item["evidence_id"]
             for item in selected
@@ -214,7 +211,7 @@ def attach_evidence_to_plan(
         for item in selected:
             assigned_by_asset[str(item.get("asset_id"))].append(node_id)
 
-    _ensure_must_use_assignment(sections, factual, binding_map, assigned_by_asset, node_contracts)
+    _ensure_must_use_assignment(sections, index, binding_map, assigned_by_asset, node_contracts)
     conflicts = _detect_conflicts(factual)
     gaps: list[CoverageGap] = []
     if sections and not factual:
@@ -282,28 +279,36 @@ def evidence_bundle_for_node(course_data: dict[str, Any], node: dict[str, Any])
 
 def _ensure_must_use_assignment(
     sections: list[dict[str, Any]],
-    evidence: list[dict[str, Any]],
+    index: EvidenceKeywordIndex,
     binding_map: dict[str, dict[str, Any]],
     assigned_by_asset: dict[str, list[str]],
     node_contracts: dict[str, NodeGroundingContract],
 ) -> None:
     if not sections:
         return
+    title_scores: list[dict[int, float]] | None = None
     for asset_id, binding in binding_map.items():
         if binding.get("usage_policy") != "must_use" or assigned_by_asset.get(asset_id):
             continue
-        candidates = [item for item in evidence if item.get("asset_id") == asset_id]
-        if not candidates:
+        positions = index.positions_for_asset(asset_id)
+        if not positions:
             continue
-        best_section = max(
-            sections,
-            key=lambda section: max(
-                (_relevance(str(section.get("title") or ""), item) for item in candidates),
+        if title_scores is None:
+            title_scores = [index.scores(str(section.get("title") or "")) for section in sections]
+        best_index = max(
+            range(len(sections)),
+            key=lambda section_index: max(
+                (
+                    score
+                    for position, score in title_scores[section_index].items()
+                    if position in positions
+                ),
                 default=0,
             ),
         )
+        best_section = sections[best_index]
         node_id = str(best_section.get("node_id") or "")
-        evidence_id = candidates[0]["evidence_id"]
+        evidence_id = index.items[min(positions)]["evidence_id"]
         contract_data = best_section.get("grounding_contract") or {}
         required = list(contract_data.get("required_evidence_ids") or [])
         if evidence_id not in required:
@@ -347,6 +352,68 @@ def _detect_conflicts(evidence: list[dict[str, Any]]) -> list[EvidenceConflict]:
     return conflicts
 
 
+class EvidenceKeywordIndex:
+    """一份证据目录的关键词倒排索引，与 :func:`_relevance` 给出逐位相同的分数。
+
+    逐节打分原本是 小节 × 证据 次集合构造加一次全量排序。这里在目录上建一次
+    ``term -> [证据序号]`` 倒排表，并把优先级 / 权威度加分预先算好；每个小节
+    只沿命中的倒排链累加重合数，再用堆取 top-k。同分按目录原顺序，和稳定排序
+    的结果一致。
+    """
+
+    def __init__(self, evidence: list[dict[str, Any]]) -> None:
+        self.items = evidence
+        self._postings: dict[str, list[int]] = defaultdict(list)
+        self._boosts: list[tuple[bool, bool, bool]] = []
+        self._by_asset: dict[str, set[int]] = defaultdict(set)
+        for position, item in enumerate(evidence):
+            for term in {str(value).lower() for value in item.get("keywords") or []}:
+                self._postings[term].append(position)
+            self._boosts.append((
+                item.get("priority") == "core",
+                item.get("authority") == "primary",
+                item.get("purpose") == "question_source",
+            ))
+            self._by_asset[str(item.get("asset_id"))].add(position)
+
+    def positions_for_asset(self, asset_id: str) -> set[int]:
+        return self._by_asset.get(asset_id, set())
+
+    def scores(self, query: str) -> dict[int, float]:
+        """返回分数大于 0 的证据序号及分数。"""
+        query_terms = set(_keywords(query))
+        if not query_terms:
+            return {}
+        overlaps: dict[int, int] = defaultdict(int)
+        for term in query_terms:
+            for position in self._postings.get(term, ()):
+                overlaps[position] += 1
+        if not overlaps:
+            return {}
+        question_query = any(marker in query for marker in ("练习", "题", "应用", "验收"))
+        scores: dict[int, float] = {}
+        for position, overlap in overlaps.items():
+            # 加分顺序与 _relevance 保持一致，浮点结果才逐位相同。
+            score = overlap / max(1, len(query_terms))
+            core, primary, question_source = self._boosts[position]
+            if core:
+                score += 0.15
+            if primary:
+                score += 0.1
+            if question_source and question_query:
+                score += 0.2
+            scores[position] = score
+        return scores
+
+    def top(self, query: str, limit: int) -> list[dict[str, Any]]:
+        ranked = heapq.nsmallest(
+            limit,
+            self.scores(query).items(),
+            key=lambda pair: (-pair[1], pair[0]),
+        )
+        return [self.items[position] for position, _score in ranked]
+
+
 def _relevance(query: str, item: dict[str, Any]) -> float:
     query_terms = set(_keywords(query))
     evidence_terms = set(str(value).lower() for value in item.get("keywords") or [])
@@ -508,6 +575,7 @@ def _clip(text: str, limit: int) -> str:
 
 
 __all__ = [
+    "EvidenceKeywordIndex",
     "attach_evidence_to_plan",
     "build_evidence_catalog_summary",
     "build_evidence_units",
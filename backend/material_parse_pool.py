@@ -0,0 +1,110 @@
+"""资料解析工作池：把 Docling / MarkItDown / OCR 的阻塞解析放到受限的工作者里。
+
+之前每份资料各自 ``asyncio.to_thread`` 一次，并发不受控，解析器和 OCR 引擎
+也是每份文档重新创建。这里统一成一个池：
+
+* ``MATERIAL_PARSE_POOL=thread``（默认）：线程池，单测里的 monkeypatch 仍然生效。
+* ``MATERIAL_PARSE_POOL=process``：spawn 出的进程池。进程常驻，解析器依赖在
+  初始化时导入，OCR 引擎与 MarkItDown 实例在首次使用后留在进程里复用；大 PDF
+  的分页切片可以真正并行（pdfium 在单进程内有全局锁）。线程池下不切片：各片
+  抢的是同一把 GIL 与 pdfium 锁，切了只会把同一份文档多打开几遍。
+* ``MATERIAL_PARSE_WORKERS`` 控制工作者数量，同时也是排队提交的并发上限。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import inspect
+import multiprocessing
+import os
+import threading
+from collections.abc import Awaitable, Callable
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any
+
+MaterialProgressCallback = Callable[[dict[str, Any]], Awaitable[None] | None]
+
+DEFAULT_PARSE_WORKERS = max(1, min(4, os.cpu_count() or 1))
+
+
+async def notify_material_progress(
+    callback: MaterialProgressCallback | None,
+    detail: dict[str, Any],
+) -> None:
+    if not callback:
+        return
+    result = callback(detail)
+    if inspect.isawaitable(result):
+        await result
+
+
+def _warm_worker() -> None:
+    """进程池初始化：提前付掉解析依赖的导入成本。"""
+    try:
+        import material_parser  # noqa: F401
+    except ImportError:
+        return
+    try:
+        from docling.backend.pypdfium2_backend import PyPdfiumDocumentBackend  # noqa: F401
+    except ImportError:
+        pass
+
+
+class MaterialParserPool:
+    def __init__(self, *, workers: int | None = None, kind: str | None = None) -> None:
+        self.workers = max(1, int(workers or os.getenv("MATERIAL_PARSE_WORKERS") or DEFAULT_PARSE_WORKERS))
+        self.kind = (kind or os.getenv("MATERIAL_PARSE_POOL") or "thread").strip().lower()
+        if self.kind not in {"thread", "process"}:
+            self.kind = "thread"
+        self._executor: Executor | None = None
+        self._guard = threading.Lock()
+        self._semaphores: dict[int, asyncio.Semaphore] = {}
+
+    def _get_executor(self) -> Executor:
+        with self._guard:
+            if self._executor is None:
+                if self.kind == "process":
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                        initializer=_warm_worker,
+                    )
+                else:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.workers,
+                        thread_name_prefix="material-parse",
+                    )
+            return self._executor
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        # 信号量绑定事件循环；测试里每个用例一个循环，按循环分别持有。
+        loop = asyncio.get_running_loop()
+        key = id(loop)
+        semaphore = self._semaphores.get(key)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.workers)
+            self._semaphores = {key: semaphore}
+        return semaphore
+
+    async def run(self, function: Callable[..., Any], /, *args: Any) -> Any:
+        async with self._semaphore():
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), function, *args)
+
+    def shutdown(self) -> None:
+        with self._guard:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+material_parser_pool = MaterialParserPool()
+
+
+__all__ = [
+    "DEFAULT_PARSE_WORKERS",
+    "MaterialParserPool",
+    "MaterialProgressCallback",
+    "material_parser_pool",
+    "notify_material_progress",
+]
@@ -5,16 +5,29 @@ from __future__ import annotations
 import asyncio
 import hashlib
 import importlib.metadata
+import os
 import re
+import threading
 import uuid
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any, Protocol
 
 from material_models import DocumentBlock, DocumentLocator, MaterialAsset, ParsedDocument
+from material_parse_pool import (
+    MaterialParserPool,
+    MaterialProgressCallback,
+    material_parser_pool,
+    notify_material_progress,
+)
 from material_storage import IMAGE_EXTENSIONS, TEXT_EXTENSIONS, MaterialRepository
 
 PARSE_OPTIONS_VERSION = "material_parse_v1"
+# 超过这个页数的 PDF 按页切片提交给解析池，逐片上报进度。
+DEFAULT_PDF_PAGES_PER_SHARD = 24
+
+# OCR 引擎与 MarkItDown 实例创建成本高，按工作线程缓存复用。
+_warm_converters = threading.local()
 
 
 class DocumentParser(Protocol):
@@ -224,6 +237,9 @@ class DoclingDocumentParser:
         else:
             document = backend.convert()
             blocks = _blocks_from_docling(document.export_to_dict(), asset.extension)
+        return self.document_from_blocks(asset, blocks)
+
+    def document_from_blocks(self, asset: MaterialAsset, blocks: list[DocumentBlock]) -> ParsedDocument:
         if not blocks:
             raise RuntimeError("Docling 没有提取到可用文本；图片型 PDF 需要另行配置 OCR")
         return ParsedDocument(
@@ -258,7 +274,11 @@ class MarkItDownFallbackParser:
             from markitdown import MarkItDown
         except ImportError as exc:
             raise RuntimeError("MarkItDown 未安装") from exc
-        result = MarkItDown().convert(str(source_path))
+        converter = getattr(_warm_converters, "markitdown", None)
+        if converter is None:
+            converter = MarkItDown()
+            _warm_converters.markitdown = converter
+        result = converter.convert(str(source_path))
         text = str(getattr(result, "text_content", "") or "").strip()
         blocks = TextDocumentParser._to_blocks(text)
         if not blocks:
@@ -281,13 +301,15 @@ class MarkItDownFallbackParser:
 async def parse_material_asset(
     repository: MaterialRepository,
     asset: MaterialAsset,
+    *,
+    on_progress: MaterialProgressCallback | None = None,
+    pool: MaterialParserPool | None = None,
 ) -> ParsedDocument:
     cached = repository.load_parsed_document(asset.asset_id)
     if cached and cached.source_sha256 == asset.sha256 and cached.parse_status in {"parsed", "degraded"}:
         return cached
 
-    repository.update_status(asset.asset_id, "parsing")
-    source = repository.source_path(asset)
+    workers = pool or material_parser_pool
     parsers: list[DocumentParser]
     if asset.extension in TEXT_EXTENSIONS:
         parsers = [TextDocumentParser()]
@@ -296,22 +318,38 @@ async def parse_material_asset(
     else:
         parsers = [DoclingDocumentParser(), MarkItDownFallbackParser()]
 
+    # 同一份文件（同 sha256）被另一门课再次上传成新资产时，直接复用解析结果。
+    for parser in parsers:
+        if not parser.supports(asset.extension):
+            continue
+        shared = repository.load_shared_parse(
+            asset.sha256,
+            parser.name,
+            _options_hash(parser.name),
+            parser_version=parser.version,
+        )
+        if shared is not None:
+            document = shared.model_copy(update={
+                "document_id": f"doc-{uuid.uuid4().hex}",
+                "asset_id": asset.asset_id,
+                "created_at": _now(),
+            })
+            _record_parsed(repository, document)
+            return document
+
+    repository.update_status(asset.asset_id, "parsing")
+    source = repository.source_path(asset)
     errors: list[str] = []
     for parser in parsers:
         if not parser.supports(asset.extension):
             continue
         try:
-            document = await asyncio.to_thread(parser.parse, asset, source)
-            repository.save_parsed_document(document)
-            repository.update_status(
-                asset.asset_id,
-                document.parse_status,
-                warnings=document.warnings,
-                parser_name=document.parser_name,
-                parser_version=document.parser_version,
-                parse_options_hash=document.parse_options_hash,
-                parse_quality=document.quality,
-            )
+            if isinstance(parser, DoclingDocumentParser) and asset.extension == ".pdf":
+                document = await _parse_pdf_in_shards(parser, asset, source, workers, on_progress)
+            else:
+                document = await workers.run(parser.parse, asset, source)
+            _record_parsed(repository, document)
+            repository.save_shared_parse(document)
             return document
         except Exception as exc:
             errors.append(f"{parser.name}: {exc}")
@@ -335,6 +373,56 @@ async def parse_material_asset(
     return failed
 
 
+def _record_parsed(repository: MaterialRepository, document: ParsedDocument) -> None:
+    repository.save_parsed_document(document)
+    repository.update_status(
+        document.asset_id,
+        document.parse_status,
+        warnings=document.warnings,
+        parser_name=document.parser_name,
+        parser_version=document.parser_version,
+        parse_options_hash=document.parse_options_hash,
+        parse_quality=document.quality,
+    )
+
+
+async def _parse_pdf_in_shards(
+    parser: DoclingDocumentParser,
+    asset: MaterialAsset,
+    source: Path,
+    pool: MaterialParserPool,
+    on_progress: MaterialProgressCallback | None,
+) -> ParsedDocument:
+    """大 PDF 按页切片交给解析池，切片完成一个就上报一次进度。
+
+    只有多进程的池才切片；线程池里的切片受 GIL 与 pdfium 全局锁限制，并不
+    并行，整份解析更省。
+    """
+    if pool.kind != "process" or pool.workers < 2:
+        return await pool.run(parser.parse, asset, source)
+    shard_size = max(1, int(os.getenv("MATERIAL_PDF_PAGES_PER_SHARD") or DEFAULT_PDF_PAGES_PER_SHARD))
+    page_total = await pool.run(_pdf_page_count, source)
+    if page_total <= shard_size:
+        return await pool.run(parser.parse, asset, source)
+    ranges = [(start, min(page_total, start + shard_size)) for start in range(0, page_total, shard_size)]
+    pending = [asyncio.ensure_future(pool.run(_pdf_page_shard, source, start, stop)) for start, stop in ranges]
+    page_texts: list[tuple[int, str]] = []
+    try:
+        for finished in asyncio.as_completed(pending):
+            page_texts.extend(await finished)
+            await notify_material_progress(on_progress, {
+                "asset_id": asset.asset_id,
+                "status": "parsing",
+                "pages_done": len(page_texts),
+                "page_total": page_total,
+            })
+    finally:
+        for task in pending:
+            task.cancel()
+    page_texts.sort(key=lambda item: item[0])
+    return parser.document_from_blocks(asset, _blocks_from_pdf_page_texts(page_texts))
+
+
 def _blocks_from_docling(data: dict[str, Any], extension: str) -> list[DocumentBlock]:
     blocks: list[DocumentBlock] = []
     visited: set[str] = set()
@@ -400,30 +488,75 @@ def _blocks_from_docling(data: dict[str, Any], extension: str) -> list[DocumentB
 
 
 def _blocks_from_pdf_backend(backend: Any) -> list[DocumentBlock]:
-    blocks: list[DocumentBlock] = []
     try:
-        for page_number, page in enumerate(backend.iter_pages(), start=1):
-            try:
-                text = "\n".join(
-                    re.sub(r"\s+", " ", str(cell.text or "")).strip()
-                    for cell in page.get_text_cells()
-                    if str(cell.text or "").strip()
-                ).strip()
-                if text:
-                    blocks.append(DocumentBlock(
-                        block_id=f"blk-{len(blocks) + 1}",
-                        kind=_detect_block_kind(text),
-                        text=text,
-                        order=len(blocks),
-                        locator=DocumentLocator(page=page_number),
-                    ))
-            finally:
-                page.unload()
+        page_texts = _pdf_page_texts(backend, 0, backend.page_count())
     finally:
         backend.unload()
+    return _blocks_from_pdf_page_texts(page_texts)
+
+
+def _pdf_page_texts(backend: Any, start: int, stop: int) -> list[tuple[int, str]]:
+    """按 0 基页序抽取 ``[start, stop)`` 的页文本，返回 1 基页码。"""
+    texts: list[tuple[int, str]] = []
+    for page_index in range(start, stop):
+        page = backend.load_page(page_index)
+        try:
+            text = "\n".join(
+                re.sub(r"\s+", " ", str(cell.text or "")).strip()
+                for cell in page.get_text_cells()
+                if str(cell.text or "").strip()
+            ).strip()
+        finally:
+            page.unload()
+        texts.append((page_index + 1, text))
+    return texts
+
+
+def _blocks_from_pdf_page_texts(page_texts: list[tuple[int, str]]) -> list[DocumentBlock]:
+    blocks: list[DocumentBlock] = []
+    for page_number, text in page_texts:
+        if not text:
+            continue
+        blocks.append(DocumentBlock(
+            block_id=f"blk-{len(blocks) + 1}",
+            kind=_detect_block_kind(text),
+            text=text,
+            order=len(blocks),
+            locator=DocumentLocator(page=page_number),
+        ))
     return blocks
 
 
+def _open_pdf_backend(source_path: Path) -> Any:
+    try:
+        from docling.backend.pypdfium2_backend import PyPdfiumDocumentBackend
+        from docling.datamodel.base_models import InputFormat
+        from docling.datamodel.document import InputDocument
+    except ImportError as exc:
+        raise RuntimeError("Docling 未安装") from exc
+    input_document = InputDocument(source_path, format=InputFormat.PDF, backend=PyPdfiumDocumentBackend)
+    if not input_document.valid:
+        raise RuntimeError("Docling 文件后端无法打开该资料")
+    return input_document._backend
+
+
+def _pdf_page_count(source_path: Path) -> int:
+    backend = _open_pdf_backend(source_path)
+    try:
+        return int(backend.page_count())
+    finally:
+        backend.unload()
+
+
+def _pdf_page_shard(source_path: Path, start: int, stop: int) -> list[tuple[int, str]]:
+    """解析池工作者入口：独立打开文档，只抽取一段页。"""
+    backend = _open_pdf_backend(source_path)
+    try:
+        return _pdf_page_texts(backend, start, stop)
+    finally:
+        backend.unload()
+
+
 def _docling_kind(label: str, text: str) -> str:
     mapping = {
         "title": "title",
@@ -470,7 +603,10 @@ def _ocr_image(path: Path) -> list[dict[str, Any]]:
             "图片 OCR 组件未安装；请安装 rapidocr-onnxruntime 后重试"
         ) from exc
 
-    engine = RapidOCR()
+    engine = getattr(_warm_converters, "rapidocr", None)
+    if engine is None:
+        engine = RapidOCR()
+        _warm_converters.rapidocr = engine
     raw_result, _elapsed = engine(str(path))
     if not raw_result:
         return []
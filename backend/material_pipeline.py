@@ -2,18 +2,16 @@
 
 from __future__ import annotations
 
-import inspect
+import asyncio
 import re
-from collections.abc import Awaitable, Callable
 from typing import Any
 
 from material_evidence import build_evidence_units
 from material_models import MaterialBinding
+from material_parse_pool import MaterialProgressCallback, notify_material_progress
 from material_parser import parse_material_asset
 from material_storage import MaterialRepository, MaterialStorageError, material_repository
 
-MaterialProgressCallback = Callable[[dict[str, Any]], Awaitable[None] | None]
-
 
 async def ingest_legacy_material_inputs(
     materials: list[Any] | None,
@@ -90,50 +88,84 @@ async def prepare_course_materials(
     evidence_catalog: list[dict[str, Any]] = []
     cards: list[dict[str, Any]] = []
     total = len(bindings)
+    bound_assets = [repository.bind_asset(binding.asset_id, course_id) for binding in bindings]
+    current = {"index": 0}
 
-    for index, binding in enumerate(bindings, start=1):
-        asset = repository.bind_asset(binding.asset_id, course_id)
-        await _notify(on_progress, {
-            "asset_id": asset.asset_id,
-            "filename": asset.filename,
-            "item_index": index,
-            "item_total": total,
-            "status": "parsing",
-            "message": f"正在解析 {asset.filename}",
-        })
-        document = await parse_material_asset(repository, asset)
-        units = build_evidence_units(document, binding)
-        repository.save_evidence(asset.asset_id, [item.model_dump(mode="json") for item in units])
-        refreshed = repository.get_asset(asset.asset_id) or asset
-        public_asset = repository.public_asset(refreshed)
-        assets.append(public_asset)
-        evidence_data = [item.model_dump(mode="json") for item in units]
-        evidence_catalog.extend(evidence_data)
-        parsed_summaries.append({
-            "document_id": document.document_id,
-            "asset_id": document.asset_id,
-            "parse_status": document.parse_status,
-            "parser_name": document.parser_name,
-            "parser_version": document.parser_version,
-            "quality": document.quality,
-            "warnings": document.warnings,
-            "error": document.error,
-        })
-        cards.append(_card_from_asset(public_asset, binding))
-        await _notify(on_progress, {
-            "asset_id": asset.asset_id,
-            "filename": asset.filename,
-            "item_index": index,
-            "item_total": total,
-            "status": document.parse_status,
-            "message": (
-                f"已解析 {asset.filename}"
-                if document.parse_status == "parsed"
-                else f"{asset.filename}：{document.parse_status}"
-            ),
-            "page_count": document.quality.get("page_count", 0),
-            "block_count": document.quality.get("block_count", 0),
-        })
+    def page_progress(index: int, asset: Any) -> MaterialProgressCallback:
+        async def forward(detail: dict[str, Any]) -> None:
+            # 解析池会提前解析后面的资料；进度只转发当前这一份，保证上报单调。
+            if current["index"] != index:
+                return
+            pages_done = int(detail.get("pages_done") or 0)
+            page_total = int(detail.get("page_total") or 0)
+            await _notify(on_progress, {
+                **detail,
+                "filename": asset.filename,
+                "item_index": index,
+                "item_total": total,
+                "message": f"正在解析 {asset.filename}（{pages_done}/{page_total} 页）",
+            })
+
+        return forward
+
+    # 所有资料一次性交给解析池（并发由池的工作者数限制），下面仍按绑定顺序收结果。
+    parse_tasks = [
+        asyncio.ensure_future(
+            parse_material_asset(repository, asset, on_progress=page_progress(index, asset))
+        )
+        for index, asset in enumerate(bound_assets, start=1)
+    ]
+
+    try:
+        for index, (binding, asset, parse_task) in enumerate(
+            zip(bindings, bound_assets, parse_tasks),
+            start=1,
+        ):
+            current["index"] = index
+            await _notify(on_progress, {
+                "asset_id": asset.asset_id,
+                "filename": asset.filename,
+                "item_index": index,
+                "item_total": total,
+                "status": "parsing",
+                "message": f"正在解析 {asset.filename}",
+            })
+            document = await parse_task
+            units = build_evidence_units(document, binding)
+            repository.save_evidence(asset.asset_id, [item.model_dump(mode="json") for item in units])
+            refreshed = repository.get_asset(asset.asset_id) or asset
+            public_asset = repository.public_asset(refreshed)
+            assets.append(public_asset)
+            evidence_data = [item.model_dump(mode="json") for item in units]
+            evidence_catalog.extend(evidence_data)
+            parsed_summaries.append({
+                "document_id": document.document_id,
+                "asset_id": document.asset_id,
+                "parse_status": document.parse_status,
+                "parser_name": document.parser_name,
+                "parser_version": document.parser_version,
+                "quality": document.quality,
+                "warnings": document.warnings,
+                "error": document.error,
+            })
+            cards.append(_card_from_asset(public_asset, binding))
+            await _notify(on_progress, {
+                "asset_id": asset.asset_id,
+                "filename": asset.filename,
+                "item_index": index,
+                "item_total": total,
+                "status": document.parse_status,
+                "message": (
+                    f"已解析 {asset.filename}"
+                    if document.parse_status == "parsed"
+                    else f"{asset.filename}：{document.parse_status}"
+                ),
+                "page_count": document.quality.get("page_count", 0),
+                "block_count": document.quality.get("block_count", 0),
+            })
+    finally:
+        for parse_task in parse_tasks:
+            parse_task.cancel()
 
     cards.extend(legacy_metadata)
     return {
@@ -206,12 +238,7 @@ def _web_filename(candidate: dict[str, Any], index: int) -> str:
     return f"web-{index:02d}-{domain or 'source'}.md"[:120]
 
 
-async def _notify(callback: MaterialProgressCallback | None, detail: dict[str, Any]) -> None:
-    if not callback:
-        return
-    result = callback(detail)
-    if inspect.isawaitable(result):
-        await result
+_notify = notify_material_progress
 
 
 def _normalize_binding(raw: Any) -> MaterialBinding:
@@ -293,4 +320,4 @@ def _as_dict(raw: Any) -> dict[str, Any]:
     raise MaterialStorageError("资料绑定格式无效")
 
 
-__all__ = ["ingest_legacy_material_inputs", "prepare_course_materials"]
+__all__ = ["MaterialProgressCallback", "ingest_legacy_material_inputs", "prepare_course_materials"]
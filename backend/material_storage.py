@@ -13,6 +13,7 @@ from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any
 
+from manifest_index import ManifestIndex
 from material_models import MaterialAsset, ParsedDocument
 
 MATERIALS_DIR = Path(__file__).resolve().parent / "data" / "materials"
@@ -64,6 +65,14 @@ def _now() -> str:
     return datetime.now(timezone.utc).isoformat()
 
 
+def _index_projection(manifest: dict[str, Any]) -> dict[str, Any]:
+    return {
+        "sha256": str(manifest.get("sha256") or ""),
+        "upload_batch_id": str(manifest.get("upload_batch_id") or ""),
+        "size_bytes": int(manifest.get("size_bytes") or 0),
+    }
+
+
 def _atomic_json(path: Path, data: dict[str, Any] | list[Any]) -> None:
     path.parent.mkdir(parents=True, exist_ok=True)
     temp = path.with_suffix(path.suffix + ".tmp")
@@ -79,6 +88,14 @@ class MaterialRepository:
         self.root = Path(root)
         self.root.mkdir(parents=True, exist_ok=True)
         self._upload_lock = asyncio.Lock()
+        # sha256 去重与批次计数走二级索引，上传不再随资料库规模线性变慢。
+        self.index = ManifestIndex(
+            self.root,
+            prefix="mat-",
+            project=_index_projection,
+            keys=("sha256", "upload_batch_id"),
+            version="material-v1",
+        )
 
     def _asset_dir(self, asset_id: str) -> Path:
         if not asset_id or any(char not in "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789-_" for char in asset_id):
@@ -110,7 +127,9 @@ class MaterialRepository:
 
     def save_asset(self, asset: MaterialAsset) -> None:
         asset.updated_at = _now()
-        _atomic_json(self._manifest_path(asset.asset_id), asset.model_dump(mode="json"))
+        data = asset.model_dump(mode="json")
+        _atomic_json(self._manifest_path(asset.asset_id), data)
+        self.index.upsert(asset.asset_id, data)
 
     async def save_upload(
         self,
@@ -286,6 +305,46 @@ class MaterialRepository:
         except (OSError, ValueError, json.JSONDecodeError):
             return None
 
+    def _shared_parse_path(self, sha256: str, parser_name: str, parse_options_hash: str) -> Path:
+        key = f"{sha256}-{parser_name}-{parse_options_hash}"
+        if any(char not in "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789-_" for char in key):
+            raise MaterialStorageError("解析缓存键不合法")
+        return self.root / ".parse_cache" / f"{key}.json"
+
+    def load_shared_parse(
+        self,
+        sha256: str,
+        parser_name: str,
+        parse_options_hash: str,
+        *,
+        parser_version: str = "",
+    ) -> ParsedDocument | None:
+        """按 (sha256, 解析器, 解析参数) 取跨资产共享的解析结果。"""
+        path = self._shared_parse_path(sha256, parser_name, parse_options_hash)
+        if not path.exists():
+            return None
+        try:
+            document = ParsedDocument.model_validate_json(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError, json.JSONDecodeError):
+            return None
+        if document.source_sha256 != sha256 or document.parse_status not in {"parsed", "degraded"}:
+            return None
+        if parser_version and document.parser_version != parser_version:
+            return None
+        return document
+
+    def save_shared_parse(self, document: ParsedDocument) -> None:
+        if document.parse_status not in {"parsed", "degraded"}:
+            return
+        _atomic_json(
+            self._shared_parse_path(
+                document.source_sha256,
+                document.parser_name,
+                document.parse_options_hash,
+            ),
+            document.model_dump(mode="json"),
+        )
+
     def save_evidence(self, asset_id: str, evidence: list[dict[str, Any]]) -> None:
         _atomic_json(self._asset_dir(asset_id) / "evidence.json", evidence)
 
@@ -306,32 +365,21 @@ class MaterialRepository:
         if asset.bound_course_ids:
             raise MaterialStorageError("资料已被课程使用，不能直接删除")
         shutil.rmtree(self._asset_dir(asset_id))
+        self.index.remove(asset_id)
         return True
 
     def _batch_stats(self, upload_batch_id: str) -> tuple[int, int]:
         """统计同一个上传批次（upload_batch_id）下已有的资产数量与总字节数。"""
-        count = 0
-        total_bytes = 0
-        for path in self.root.glob("mat-*/manifest.json"):
-            try:
-                data = json.loads(path.read_text(encoding="utf-8"))
-            except (OSError, json.JSONDecodeError):
-                continue
-            if data.get("upload_batch_id") == upload_batch_id:
-                count += 1
-                total_bytes += int(data.get("size_bytes") or 0)
-        return count, total_bytes
+        entries = self.index.entries_for("upload_batch_id", upload_batch_id)
+        return len(entries), sum(int(entry.get("size_bytes") or 0) for entry in entries)
 
     def _find_by_hash(self, sha256: str) -> MaterialAsset | None:
-        for path in self.root.glob("mat-*/manifest.json"):
-            try:
-                data = json.loads(path.read_text(encoding="utf-8"))
-                if data.get("sha256") == sha256:
-                    asset = MaterialAsset.model_validate(data)
-                    if (path.parent / asset.source_name).exists():
-                        return asset
-            except (OSError, ValueError, json.JSONDecodeError):
+        for asset_id in self.index.lookup("sha256", sha256):
+            asset = self.get_asset(asset_id)
+            if asset is None or asset.sha256 != sha256:
                 continue
+            if (self._asset_dir(asset_id) / asset.source_name).exists():
+                return asset
         return None
 
     @staticmethod
@@ -0,0 +1,473 @@
+"""进程内的运行指标，按 Prometheus 文本格式从 ``/metrics`` 导出。
+
+性能数据原先分散在各处：容量控制器的 ``snapshot()`` 只在内存里，生成遥测要
+显式打开才写 JSONL，账单与时间线工具都是事后离线分析。这里把它们汇到一处，
+不依赖任何外部服务：
+
+* 热路径上只做计数与直方图分桶（一次加锁、一次 ``bisect``），常开；
+* 队列深度、AIMD 上限、连接数、缓存命中这类“当前值”不在热路径上维护，
+  由 :meth:`MetricsRegistry.register_collector` 登记的回调在抓取时读取；
+* 多 worker 部署时每个进程各报各的，生成相关的指标只在生成进程里有值。
+
+``LINGZHI_METRICS=0`` 关闭端点；设置 ``LINGZHI_METRICS_TOKEN`` 后抓取需要带
+``Authorization: Bearer <token>``。
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import os
+import sys
+import threading
+from bisect import bisect_left
+from collections.abc import Callable, Iterable, Sequence
+from dataclasses import dataclass, field
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# 模型调用从几百毫秒到几分钟不等；排队与存储 I/O 要看到毫秒级。
+LLM_LATENCY_BUCKETS = (0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, 120, 300)
+QUEUE_WAIT_BUCKETS = (0.005, 0.05, 0.25, 1, 2.5, 5, 10, 30, 60, 120)
+FAST_IO_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1)
+
+
+def metrics_enabled() -> bool:
+    return os.getenv("LINGZHI_METRICS", "1").strip().lower() not in {"0", "false", "no", "off"}
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _label_text(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)) + "}"
+
+
+@dataclass
+class Sample:
+    """采集回调返回的一个样本：``name{labels} value``。"""
+
+    name: str
+    value: float
+    labels: dict[str, str] = field(default_factory=dict)
+
+
+@dataclass
+class MetricFamily:
+    """采集回调返回的一组同名指标。"""
+
+    name: str
+    kind: str
+    help: str
+    samples: list[Sample] = field(default_factory=list)
+
+    def add(self, value: float, **labels: Any) -> MetricFamily:
+        self.samples.append(Sample(self.name, value, {key: str(item) for key, item in labels.items()}))
+        return self
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict[str, Any]) -> tuple[str, ...]:
+        if len(labels) == len(self.label_names):
+            try:
+                return tuple(str(labels[name]) for name in self.label_names)
+            except KeyError:
+                pass
+        raise ValueError(f"{self.name} expects labels {self.label_names}, got {tuple(labels)}")
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._render_samples())
+        return lines
+
+    def _render_samples(self) -> list[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()) -> None:
+        super().__init__(name, help, labels)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: Any) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def _render_samples(self) -> list[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_label_text(self.label_names, key)} {_format_value(value)}" for key, value in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: Sequence[str] = (),
+        *,
+        buckets: Sequence[float] = LLM_LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        # 每个标签组合：各桶的非累计计数（最后一格是 +Inf）、总和、总数。
+        self._series: dict[tuple[str, ...], list[Any]] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, **labels: Any) -> int:
+        series = self._series.get(self._key(labels))
+        return series[2] if series else 0
+
+    def _render_samples(self) -> list[str]:
+        with self._lock:
+            items = sorted((key, (list(counts), total, count)) for key, (counts, total, count) in self._series.items())
+        lines: list[str] = []
+        names = self.label_names + ("le",)
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                lines.append(
+                    f"{self.name}_bucket{_label_text(names, key + (_format_value(bound),))} {cumulative}"
+                )
+            labels = _label_text(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(round(total, 6))}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+Collector = Callable[[], Iterable[MetricFamily]]
+
+
+class MetricsRegistry:
+    """登记的指标与采集回调；:meth:`render` 输出完整的抓取结果。"""
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, _Metric] = {}
+        self._collectors: dict[str, Collector] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> Any:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.label_names != metric.label_names:
+                    raise ValueError(f"metric {metric.name} already registered with a different shape")
+                return existing
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help, labels))
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labels: Sequence[str] = (),
+        *,
+        buckets: Sequence[float] = LLM_LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, help, labels, buckets=buckets))
+
+    def register_collector(self, name: str, collector: Collector) -> None:
+        """按名字登记抓取时调用的回调；同名再次登记会替换旧的。"""
+        with self._lock:
+            self._collectors[name] = collector
+
+    def unregister_collector(self, name: str) -> None:
+        with self._lock:
+            self._collectors.pop(name, None)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors.items())
+        lines: list[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        for name, collector in collectors:
+            try:
+                families = list(collector())
+            except Exception:
+                # 一个子系统读不出来不能让整个抓取失败。
+                logger.warning("Metrics collector %s failed", name, exc_info=True)
+                continue
+            for family in families:
+                lines.append(f"# HELP {family.name} {family.help}")
+                lines.append(f"# TYPE {family.name} {family.kind}")
+                for sample in family.samples:
+                    lines.append(
+                        f"{sample.name}{_label_text(tuple(sample.labels), tuple(sample.labels.values()))} "
+                        f"{_format_value(sample.value)}"
+                    )
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+# ----------------------------------------------------------------------------
+# 模型调用
+# ----------------------------------------------------------------------------
+
+llm_request_seconds = registry.histogram(
+    "lingzhi_llm_request_duration_seconds",
+    "Model call duration per attempt, from attempt start (capacity queue wait included).",
+    ("model", "role", "stream", "status"),
+)
+llm_first_token_seconds = registry.histogram(
+    "lingzhi_llm_time_to_first_token_seconds",
+    "Time from attempt start to the first streamed token.",
+    ("model", "role", "stream"),
+)
+llm_tokens = registry.counter(
+    "lingzhi_llm_tokens_total",
+    "Tokens per model and role; source is provider-reported usage or the local estimate.",
+    ("model", "role", "direction", "source"),
+)
+llm_queue_wait_seconds = registry.histogram(
+    "lingzhi_llm_queue_wait_seconds",
+    "Time spent waiting for provider capacity, by the first reason the request had to wait.",
+    ("provider", "reason"),
+    buckets=QUEUE_WAIT_BUCKETS,
+)
+
+# ----------------------------------------------------------------------------
+# WebSocket 与存储
+# ----------------------------------------------------------------------------
+
+websocket_send_seconds = registry.histogram(
+    "lingzhi_websocket_send_duration_seconds",
+    "Time to hand one push message to a WebSocket client.",
+    ("type",),
+    buckets=FAST_IO_BUCKETS,
+)
+websocket_send_failures = registry.counter(
+    "lingzhi_websocket_send_failures_total",
+    "Push messages that failed and dropped the connection.",
+    ("type",),
+)
+storage_io_seconds = registry.histogram(
+    "lingzhi_storage_io_duration_seconds",
+    "JSON storage file read/write latency.",
+    ("op",),
+    buckets=FAST_IO_BUCKETS,
+)
+storage_io_bytes = registry.counter(
+    "lingzhi_storage_io_bytes_total",
+    "Bytes read from or written to JSON storage files.",
+    ("op",),
+)
+
+
+def observe_llm_call(
+    *,
+    model_id: str,
+    model_role: str,
+    stream: bool,
+    status: str,
+    duration_s: float,
+    ttfb_s: float | None,
+    input_tokens: int,
+    output_tokens: int,
+    tokens_source: str,
+) -> None:
+    """``ai_base`` 请求统一出口的常开打点；与生成遥测同一批出口。"""
+    role = model_role or "default"
+    stream_label = "true" if stream else "false"
+    llm_request_seconds.observe(duration_s, model=model_id, role=role, stream=stream_label, status=status)
+    if ttfb_s is not None:
+        llm_first_token_seconds.observe(ttfb_s, model=model_id, role=role, stream=stream_label)
+    if input_tokens:
+        llm_tokens.inc(input_tokens, model=model_id, role=role, direction="input", source=tokens_source)
+    if output_tokens:
+        llm_tokens.inc(output_tokens, model=model_id, role=role, direction="output", source=tokens_source)
+
+
+# ----------------------------------------------------------------------------
+# 抓取时读取的当前值
+# ----------------------------------------------------------------------------
+
+
+def collect_provider_capacity() -> list[MetricFamily]:
+    """AIMD 上限与在途数；同一 provider 跨事件循环时上限取最大、在途相加。"""
+    capacity = sys.modules.get("ai_capacity")
+    if capacity is None:
+        return []
+    providers: dict[str, dict[str, float]] = {}
+    models: dict[tuple[str, str], dict[str, float]] = {}
+    for snapshot in capacity.provider_capacity_snapshots():
+        provider = snapshot["provider"]
+        totals = providers.setdefault(provider, {"limit": 0, "in_flight": 0, "waiting": 0})
+        totals["limit"] = max(totals["limit"], snapshot["limit"])
+        totals["in_flight"] += snapshot["in_flight"]
+        totals["waiting"] += snapshot["waiting"]
+        for model_id, state in snapshot["models"].items():
+            entry = models.setdefault((provider, model_id), {
+                "limit": 0, "in_flight": 0, "rate_limited": 0,
+            })
+            entry["limit"] = max(entry["limit"], state["limit"])
+            entry["in_flight"] += state["in_flight"]
+            entry["rate_limited"] += state["rate_limited"]
+    provider_limit = MetricFamily("lingzhi_provider_concurrency_limit", "gauge", "Provider-wide AIMD concurrency limit.")
+    provider_in_flight = MetricFamily("lingzhi_provider_in_flight", "gauge", "Provider requests currently admitted.")
+    provider_waiting = MetricFamily("lingzhi_provider_waiting", "gauge", "Requests queued for provider capacity.")
+    for provider, totals in sorted(providers.items()):
+        provider_limit.add(totals["limit"], provider=provider)
+        provider_in_flight.add(totals["in_flight"], provider=provider)
+        provider_waiting.add(totals["waiting"], provider=provider)
+    model_limit = MetricFamily("lingzhi_model_concurrency_limit", "gauge", "Per-model AIMD concurrency limit.")
+    model_in_flight = MetricFamily("lingzhi_model_in_flight", "gauge", "Per-model requests currently admitted.")
+    model_rate_limited = MetricFamily(
+        "lingzhi_model_rate_limited_total", "counter", "Rate-limit responses that shrank the model limit.",
+    )
+    for (provider, model_id), entry in sorted(models.items()):
+        model_limit.add(entry["limit"], provider=provider, model=model_id)
+        model_in_flight.add(entry["in_flight"], provider=provider, model=model_id)
+        model_rate_limited.add(entry["rate_limited"], provider=provider, model=model_id)
+    return [provider_limit, provider_in_flight, provider_waiting, model_limit, model_in_flight, model_rate_limited]
+
+
+# 自带计数的进程内缓存：(模块, 带 ``stats()`` 的实例名或返回计数的函数名, 指标里的缓存名,
+# 命中计数键, 未命中计数键)。
+_STATS_CACHES = (
+    ("storage", "storage", "storage_data", ("data_cache_hits",), ("data_cache_misses",)),
+    ("retrieval_cache", "retrieval_query_cache", "retrieval_query", ("hits", "disk_hits"), ("misses",)),
+    ("slide_page_render_cache", "slide_page_render_cache", "slide_page_render", ("hits",), ("misses",)),
+    ("learning_runtime", "learning_runtime_memo", "learning_runtime", ("hits",), ("misses",)),
+    ("ai_teacher_index", "ai_teacher_index_cache", "ai_teacher_index", ("index_hits",), ("index_builds",)),
+    ("llm_response_cache", "_cache", "llm_response", ("hits",), ("misses",)),
+    # 分块存储的 ``stats()`` 要遍历磁盘，抓取只读内存里的命中计数。
+    ("content_chunks", "chunk_cache_stats", "content_chunks", ("cache_hits",), ("cache_misses",)),
+)
+
+
+def collect_caches() -> list[MetricFamily]:
+    """读各缓存自己的计数。只看已导入的模块，抓取不会把延迟加载的模块拉进来。"""
+    lookups = MetricFamily("lingzhi_cache_lookups_total", "counter", "Lookups against in-process caches.")
+    ratio = MetricFamily("lingzhi_cache_hit_ratio", "gauge", "Hits over lookups since process start.")
+    for module_name, attribute, cache, hit_keys, miss_keys in _STATS_CACHES:
+        source = getattr(sys.modules.get(module_name), attribute, None)
+        if source is None:
+            continue
+        stats = source.stats() if hasattr(source, "stats") else source()
+        hits = sum(stats.get(key, 0) for key in hit_keys)
+        misses = sum(stats.get(key, 0) for key in miss_keys)
+        lookups.add(hits, cache=cache, result="hit")
+        lookups.add(misses, cache=cache, result="miss")
+        if hits + misses:
+            ratio.add(round(hits / (hits + misses), 4), cache=cache)
+    return [lookups, ratio]
+
+
+def collect_generation_telemetry() -> list[MetricFamily]:
+    """实时账单后台写入的积压与丢弃；丢弃非零说明后台线程跟不上。"""
+    telemetry = sys.modules.get("generation_telemetry")
+    if telemetry is None:
+        return []
+    stats = telemetry.writer_stats()
+    return [
+        MetricFamily("lingzhi_generation_telemetry_pending", "gauge", "Call records waiting for the telemetry writer.")
+        .add(stats["pending"]),
+        MetricFamily(
+            "lingzhi_generation_telemetry_dropped_total", "counter", "Call records dropped because the writer queue was full.",
+        ).add(stats["dropped"]),
+    ]
+
+
+def task_manager_collector(task_manager: Any) -> Collector:
+    """``TaskManager`` 的队列深度与运行中的作业；只在持有它的进程里登记。"""
+
+    def collect() -> list[MetricFamily]:
+        statuses: dict[str, int] = {}
+        for task in list(task_manager.tasks.values()):
+            status = str(task.get("status") or "unknown")
+            statuses[status] = statuses.get(status, 0) + 1
+        tasks = MetricFamily("lingzhi_tasks", "gauge", "Generation tasks by status.")
+        for status, count in sorted(statuses.items()):
+            tasks.add(count, status=status)
+        return [
+            MetricFamily("lingzhi_task_queue_depth", "gauge", "Tasks waiting in the TaskManager queue.")
+            .add(task_manager._task_queue.qsize()),
+            MetricFamily("lingzhi_task_running_jobs", "gauge", "Generation jobs currently executing.")
+            .add(len(task_manager._running_job_tasks)),
+            MetricFamily("lingzhi_task_running_nodes", "gauge", "Node generation tasks currently executing.")
+            .add(sum(len(nodes) for nodes in list(task_manager._running_node_tasks.values()))),
+            tasks,
+        ]
+
+    return collect
+
+
+def websocket_collector(ws_service: Any) -> Collector:
+    def collect() -> list[MetricFamily]:
+        return [
+            MetricFamily("lingzhi_websocket_connections", "gauge", "WebSocket clients connected to this process.")
+            .add(ws_service.connection_count),
+        ]
+
+    return collect
+
+
+registry.register_collector("provider_capacity", collect_provider_capacity)
+registry.register_collector("caches", collect_caches)
+registry.register_collector("generation_telemetry", collect_generation_telemetry)
+
+
+__all__ = [
+    "CONTENT_TYPE",
+    "Counter",
+    "Histogram",
+    "MetricFamily",
+    "MetricsRegistry",
+    "llm_queue_wait_seconds",
+    "metrics_enabled",
+    "observe_llm_call",
+    "registry",
+    "storage_io_bytes",
+    "storage_io_seconds",
+    "task_manager_collector",
+    "websocket_collector",
+    "websocket_send_failures",
+    "websocket_send_seconds",
+]
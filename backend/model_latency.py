@@ -0,0 +1,244 @@
+"""每个模型的滚动延迟画像：首 token 时延（TTFT）与整次调用时长。
+
+``AIBase`` 在每次真实请求拿到首个正文分片、以及完整结束时各记一笔，按
+（provider 作用域, model_id）保留最近 ``AI_LATENCY_WINDOW`` 个样本。两处用它：
+
+* ``_models_for`` 的排序：当前首选模型的 p50 明显慢于同组另一个模型时
+  （比值超过 ``AI_LATENCY_ROUTING_RATIO`` 且差值超过
+  ``AI_LATENCY_ROUTING_MARGIN_MS``），把更快的那个提到最前。样本不足
+  ``AI_LATENCY_MIN_SAMPLES`` 的模型不参与比较，冷启动时顺序与配置一致。
+* 对冲请求（``AI_HEDGE_REQUESTS``，默认关闭）：首 token 迟迟不到、超过主模型
+  学到的 ``AI_HEDGE_PERCENTILE`` 分位时，向下一个模型补发一次，先出正文的
+  一方胜出，另一方被取消。分位样本不足时不对冲——没有依据就不投机。
+
+对冲只花空闲容量：补发前要求 ``ProviderCapacityController.has_headroom``，
+补发本身也照常排队领取租约，所以不会越过并发与起速预算。
+"""
+
+from __future__ import annotations
+
+import math
+import os
+import threading
+from collections import deque
+from typing import Any
+
+LATENCY_METRICS = ("ttft", "total")
+
+DEFAULT_WINDOW = 64
+DEFAULT_MIN_SAMPLES = 8
+DEFAULT_ROUTING_RATIO = 1.5
+DEFAULT_ROUTING_MARGIN_MS = 1000.0
+DEFAULT_HEDGE_PERCENTILE = 0.95
+DEFAULT_HEDGE_MIN_DELAY_MS = 250.0
+DEFAULT_HEDGE_MAX_DELAY_MS = 30000.0
+
+
+def _env_flag(name: str, default: bool) -> bool:
+    value = os.getenv(name, "").strip().lower()
+    if not value:
+        return default
+    return value in {"1", "true", "yes", "on"}
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return max(0.0, float(os.getenv(name, str(default))))
+    except ValueError:
+        return default
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(1, int(os.getenv(name, str(default))))
+    except ValueError:
+        return default
+
+
+def _quantile(ordered: list[float], fraction: float) -> float:
+    index = min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+class ModelLatencyTracker:
+    def __init__(
+        self,
+        *,
+        window: int = DEFAULT_WINDOW,
+        min_samples: int = DEFAULT_MIN_SAMPLES,
+        routing: bool = True,
+        routing_ratio: float = DEFAULT_ROUTING_RATIO,
+        routing_margin_ms: float = DEFAULT_ROUTING_MARGIN_MS,
+        hedging: bool = False,
+        hedge_percentile: float = DEFAULT_HEDGE_PERCENTILE,
+        hedge_min_delay_ms: float = DEFAULT_HEDGE_MIN_DELAY_MS,
+        hedge_max_delay_ms: float = DEFAULT_HEDGE_MAX_DELAY_MS,
+    ) -> None:
+        self.window = window
+        self.min_samples = min_samples
+        self.routing = routing
+        self.routing_ratio = routing_ratio
+        self.routing_margin_ms = routing_margin_ms
+        self.hedging = hedging
+        self.hedge_percentile = min(1.0, hedge_percentile)
+        self.hedge_min_delay_ms = hedge_min_delay_ms
+        self.hedge_max_delay_ms = max(hedge_min_delay_ms, hedge_max_delay_ms)
+        self._lock = threading.Lock()
+        self._samples: dict[tuple[str, str, str], deque[float]] = {}
+        self._hedges = {"started": 0, "won": 0, "lost": 0, "skipped_no_headroom": 0}
+
+    @classmethod
+    def from_env(cls) -> ModelLatencyTracker:
+        return cls(
+            window=_env_int("AI_LATENCY_WINDOW", DEFAULT_WINDOW),
+            min_samples=_env_int("AI_LATENCY_MIN_SAMPLES", DEFAULT_MIN_SAMPLES),
+            routing=_env_flag("AI_LATENCY_ROUTING", True),
+            routing_ratio=_env_float("AI_LATENCY_ROUTING_RATIO", DEFAULT_ROUTING_RATIO),
+            routing_margin_ms=_env_float(
+                "AI_LATENCY_ROUTING_MARGIN_MS", DEFAULT_ROUTING_MARGIN_MS,
+            ),
+            hedging=_env_flag("AI_HEDGE_REQUESTS", False),
+            hedge_percentile=_env_float("AI_HEDGE_PERCENTILE", DEFAULT_HEDGE_PERCENTILE),
+            hedge_min_delay_ms=_env_float(
+                "AI_HEDGE_MIN_DELAY_MS", DEFAULT_HEDGE_MIN_DELAY_MS,
+            ),
+            hedge_max_delay_ms=_env_float(
+                "AI_HEDGE_MAX_DELAY_MS", DEFAULT_HEDGE_MAX_DELAY_MS,
+            ),
+        )
+
+    def observe(
+        self,
+        scope: str,
+        model_id: str,
+        metric: str,
+        value_ms: float,
+        *,
+        censored: bool = False,
+    ) -> None:
+        """记一笔样本。
+
+        ``censored=True`` 表示调用在出结果前被取消，真实耗时只知道不小于
+        ``value_ms``。这种下界只在不低于当前 ``hedge_percentile`` 分位时才记入，
+        所以只会抬高路由与对冲用的分位，不会因为早早落败而显得更快；分位样本
+        不足时直接丢弃。
+        """
+        if metric not in LATENCY_METRICS or value_ms < 0:
+            return
+        key = (scope, model_id, metric)
+        with self._lock:
+            samples = self._samples.get(key)
+            if censored:
+                if samples is None or len(samples) < self.min_samples:
+                    return
+                if value_ms < _quantile(sorted(samples), self.hedge_percentile):
+                    return
+            if samples is None:
+                samples = self._samples[key] = deque(maxlen=self.window)
+            samples.append(float(value_ms))
+
+    def quantile(
+        self,
+        scope: str,
+        model_id: str,
+        metric: str,
+        fraction: float,
+    ) -> float | None:
+        """样本不足 ``min_samples`` 时返回 ``None``。"""
+        with self._lock:
+            samples = list(self._samples.get((scope, model_id, metric), ()))
+        if len(samples) < self.min_samples:
+            return None
+        return _quantile(sorted(samples), fraction)
+
+    def order(self, scope: str, models: list[str]) -> list[str]:
+        """首选模型明显更慢时，把最快的候选提到最前；其余顺序不变。"""
+        if not self.routing or len(models) < 2:
+            return list(models)
+        head_p50 = self.quantile(scope, models[0], "ttft", 0.5)
+        if head_p50 is None:
+            return list(models)
+        best: str | None = None
+        best_p50 = head_p50
+        for model in models[1:]:
+            p50 = self.quantile(scope, model, "ttft", 0.5)
+            if (
+                p50 is not None
+                and p50 < best_p50
+                and head_p50 > p50 * self.routing_ratio
+                and head_p50 - p50 > self.routing_margin_ms
+            ):
+                best, best_p50 = model, p50
+        if best is None:
+            return list(models)
+        return [best, *(model for model in models if model != best)]
+
+    def hedge_delay_seconds(self, scope: str, model_id: str, metric: str) -> float | None:
+        """等多久还没动静就补发；未启用或缺少分位依据时返回 ``None``。"""
+        if not self.hedging:
+            return None
+        learned = self.quantile(scope, model_id, metric, self.hedge_percentile)
+        if learned is None:
+            return None
+        delay_ms = min(
+            self.hedge_max_delay_ms,
+            max(self.hedge_min_delay_ms, learned),
+        )
+        return delay_ms / 1000
+
+    def count_hedge(self, outcome: str) -> None:
+        with self._lock:
+            self._hedges[outcome] = self._hedges.get(outcome, 0) + 1
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            items = {key: sorted(samples) for key, samples in self._samples.items()}
+            hedges = dict(self._hedges)
+        models: dict[str, dict[str, Any]] = {}
+        for (scope, model_id, metric), ordered in items.items():
+            if not ordered:
+                continue
+            entry = models.setdefault(f"{scope}|{model_id}", {
+                "provider_scope": scope,
+                "model_id": model_id,
+            })
+            entry[metric] = {
+                "samples": len(ordered),
+                "p50_ms": round(_quantile(ordered, 0.50), 1),
+                "p95_ms": round(_quantile(ordered, 0.95), 1),
+                "max_ms": round(ordered[-1], 1),
+            }
+        return {
+            "routing": self.routing,
+            "hedging": self.hedging,
+            "hedge_percentile": self.hedge_percentile,
+            "hedges": hedges,
+            "models": list(models.values()),
+        }
+
+
+_tracker: ModelLatencyTracker | None = None
+_tracker_lock = threading.Lock()
+
+
+def get_model_latency_tracker() -> ModelLatencyTracker:
+    global _tracker
+    with _tracker_lock:
+        if _tracker is None:
+            _tracker = ModelLatencyTracker.from_env()
+        return _tracker
+
+
+def reset_model_latency_tracker() -> None:
+    """测试与切换配置用：下次访问时按当前环境变量重建，样本清空。"""
+    global _tracker
+    with _tracker_lock:
+        _tracker = None
+
+
+__all__ = [
+    "LATENCY_METRICS",
+    "ModelLatencyTracker",
+    "get_model_latency_tracker",
+    "reset_model_latency_tracker",
+]
@@ -13,6 +13,7 @@ from typing import Any
 import uuid
 
 from storage import storage
+from store_watermarks import bump_watermark, file_watermark
 
 
 SCHEMA_VERSION = 2
@@ -45,6 +46,10 @@ class PracticeAttemptRepository:
         with self._lock(key):
             return deepcopy(self._read(self._path(key)))
 
+    def watermark(self, user_id: str, course_id: str) -> tuple[int, int, int, int]:
+        """Change token for one learner-course file; see ``store_watermarks``."""
+        return file_watermark(self._path(self._key(user_id, course_id)))
+
     def get(self, user_id: str, course_id: str, attempt_id: str) -> dict[str, Any]:
         attempt = next(
             (item for item in self.list(user_id, course_id) if item.get("attempt_id") == attempt_id),
@@ -408,6 +413,7 @@ class PracticeAttemptRepository:
                 handle.flush()
                 os.fsync(handle.fileno())
             os.replace(temp, path)
+            bump_watermark(path)
         finally:
             if temp.exists():
                 temp.unlink()
@@ -10,7 +10,6 @@ from __future__ import annotations
 
 import os
 import re
-import threading
 import uuid
 from collections import Counter, defaultdict
 from collections.abc import Iterable
@@ -18,7 +17,8 @@ from copy import deepcopy
 from datetime import datetime, timedelta, timezone
 from typing import Any
 
-from storage import storage
+from storage import DATA_DIR, storage
+from worker_coordination import shared_lock
 
 USAGE_EVENTS_FILE = "usage_events.json"
 SCHEMA_VERSION = 1
@@ -49,7 +49,7 @@ _NAVIGATION_KINDS = {"initial", "route"}
 _ERROR_KINDS = {"window_error", "unhandled_rejection", "router_error"}
 _SAFE_NAME = re.compile(r"^[A-Za-z0-9_.:-]{1,160}$")
 _SAFE_ROUTE_TEMPLATE = re.compile(r"^/api/[A-Za-z0-9_{}:./-]{1,235}$")
-_usage_lock = threading.RLock()
+_usage_lock = shared_lock(DATA_DIR, "product_usage")
 
 
 def _now() -> datetime:
@@ -31,6 +31,7 @@ from assessment_diversity import (
     compare_diversity_signatures,
 )
 from assessment_generation import generate_universal_question_contract
+from content_chunks import ContentChunkStore, chunk_store_for
 from course_versioning import stable_hash
 from hint_leakage import measure_deepest_hint_overlap
 from practice_contracts import (
@@ -60,6 +61,7 @@ QUESTION_REVIEW_TIERS = {
 }
 QUESTION_REVIEW_POLICY_SCHEMA = "exception_driven_question_quality_v1"
 QUESTION_RISK_MIGRATION_SCHEMA = "item_level_question_risk_v1"
+BUNDLE_CHUNK_PATHS = (("items", "*"),)
 _LEGACY_SUBJECT_RISK_FLAGS = {
     "high_stakes_domain",
 }
@@ -1626,11 +1628,21 @@ def _deduplicate_quality_issues(
 
 
 class QuestionBankRepository:
-    """Immutable per-course bundle storage with an explicit active pointer."""
+    """Immutable per-course bundle storage with an explicit active pointer.
 
-    def __init__(self, root_dir: str | Path | None = None) -> None:
+    Items are stored as content chunks, so a revision that edits one item does
+    not duplicate the rest of the bank.
+    """
+
+    def __init__(
+        self,
+        root_dir: str | Path | None = None,
+        *,
+        chunk_store: ContentChunkStore | None = None,
+    ) -> None:
         self.root_dir = Path(root_dir or Path(DATA_DIR) / "question_banks")
         self.root_dir.mkdir(parents=True, exist_ok=True)
+        self._chunks = chunk_store or chunk_store_for(self.root_dir)
 
     def save_bundle(
         self,
@@ -1646,7 +1658,7 @@ class QuestionBankRepository:
         revision_id = str(stored["bundle_revision_id"])
         path = self.root_dir / normalized_course_id / "revisions" / f"{revision_id}.json"
         if not path.exists():
-            self._atomic_write(path, stored)
+            self._chunks.write(path, stored, BUNDLE_CHUNK_PATHS, writer=self._atomic_write)
         if activate:
             self.activate_bundle(normalized_course_id, revision_id)
         return stored
@@ -1676,7 +1688,7 @@ class QuestionBankRepository:
             bundle_revision_id = str(self._read(pointer).get("bundle_revision_id") or "")
         bundle_revision_id = _storage_id(bundle_revision_id)
         path = directory / "revisions" / f"{bundle_revision_id}.json"
-        value = self._read(path) if path.exists() else None
+        value = self._read_document(path) if path.exists() else None
         if value and str(value.get("course_id") or "") != str(course_id):
             raise ValueError("question bank course scope is invalid")
         return value
@@ -1689,19 +1701,23 @@ class QuestionBankRepository:
         if pointer.exists() and self._read(pointer).get("bundle_revision_id") == bundle_revision_id:
             return False
         path = directory / "revisions" / f"{bundle_revision_id}.json"
-        if not path.exists():
-            return False
-        path.unlink()
-        return True
+        return self._chunks.discard(path)
 
     def delete_course(self, course_id: str) -> bool:
         course_id = _storage_id(course_id)
         directory = self.root_dir / course_id
         if not directory.exists():
             return False
+        self._chunks.discard_tree(directory / "revisions")
         shutil.rmtree(directory)
         return True
 
+    def _read_document(self, path: Path) -> dict[str, Any]:
+        value = self._chunks.read(path)
+        if not isinstance(value, dict):
+            raise ValueError("question bank repository expected a JSON object")
+        return value
+
     @staticmethod
     def _read(path: Path) -> dict[str, Any]:
         with path.open(encoding="utf-8") as handle:
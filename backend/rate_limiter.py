@@ -1,59 +1,44 @@
 # =============================================================================
-# 轻量级内存速率限制器
-# 基于滑动窗口算法，无外部依赖。
-# 适用于单进程部署（Uvicorn 单 worker）。
+# 轻量级速率限制器
+# 滑动窗口近似算法：每个键只保存 (窗口序号, 上一窗口计数, 本窗口计数)，按
+# 上一窗口在滑动窗口里剩余的比例加权，避免固定窗口在窗口交界处放过 2 倍突发。
+# 计数存放在可替换的后端里：
+#   - LocalRateLimitBackend：进程内，按键分段加锁，过期键随所在分段惰性清理；
+#   - SharedMemoryRateLimitBackend：数据目录下的 mmap 定长表，按分段加
+#     fcntl 字节区间锁，多 worker 部署（LINGZHI_WORKERS > 1）时各 worker
+#     共享同一份计数，限额对整个部署生效。
+# 无外部依赖。
 # =============================================================================
 
-import time
-import threading
+from __future__ import annotations
+
+import hashlib
 import logging
+import math
+import mmap
+import os
 import re
-from collections import defaultdict
-from typing import Dict, Tuple
-from fastapi import Request, HTTPException
-from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
-from starlette.responses import Response, JSONResponse
-
-logger = logging.getLogger(__name__)
-
+import struct
+import threading
+import time
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Protocol
 
-class SlidingWindowCounter:
-    """滑动窗口计数器"""
-
-    def __init__(self):
-        self._lock = threading.Lock()
-        # key -> (window_start, count)
-        self._windows: Dict[str, Tuple[float, int]] = {}
-
-    def is_allowed(self, key: str, max_requests: int, window_seconds: int) -> bool:
-        now = time.time()
-        with self._lock:
-            if key in self._windows:
-                window_start, count = self._windows[key]
-                if now - window_start < window_seconds:
-                    if count >= max_requests:
-                        return False
-                    self._windows[key] = (window_start, count + 1)
-                    return True
-                else:
-                    # 窗口过期，重置
-                    self._windows[key] = (now, 1)
-                    return True
-            else:
-                self._windows[key] = (now, 1)
-                return True
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
 
-    def cleanup(self, max_age: int = 300):
-        """清理过期条目，防止内存泄漏"""
-        now = time.time()
-        with self._lock:
-            expired = [k for k, (t, _) in self._windows.items() if now - t > max_age]
-            for k in expired:
-                del self._windows[k]
+from storage import DATA_DIR
+from worker_coordination import WORKERS_DIRNAME, multi_worker_enabled
 
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows 开发机
+    fcntl = None  # type: ignore[assignment]
 
-# 全局计数器实例
-_counter = SlidingWindowCounter()
+logger = logging.getLogger(__name__)
 
 # 速率限制配置：路径前缀 -> (max_requests, window_seconds)
 # AI 相关端点更严格，普通读取端点更宽松
@@ -70,22 +55,228 @@ RATE_LIMITS = {
 QUESTION_BANK_REBUILD_STATUS_RE = re.compile(
     r"^/api/courses/[^/]+/question-bank/rebuilds/[^/]+$"
 )
+_EXEMPT_PATHS = frozenset({"/health", "/api/health", "/metrics"})
+
+
+@dataclass(frozen=True, slots=True)
+class RateLimitDecision:
+    allowed: bool
+    retry_after: float = 0.0
+
+
+_ALLOWED = RateLimitDecision(True)
+
+
+def _roll(
+    state: Sequence | None,
+    index: int,
+) -> tuple[int, int]:
+    """把 ``(窗口序号, 上一窗口计数, 本窗口计数, ...)`` 推进到第 ``index`` 个窗口。"""
+    if state is None:
+        return 0, 0
+    stored_index, previous, current = state[0], state[1], state[2]
+    if stored_index == index:
+        return previous, current
+    if stored_index == index - 1:
+        return current, 0
+    return 0, 0
+
+
+def _retry_after(previous: int, current: int, now: float, index: int, limit: int, window: float) -> float:
+    """被拒绝后要等多久才能再放行一次。
+
+    本窗口已满时要等到下一个窗口；否则等上一窗口的权重降到刚好能放行一次。
+    """
+    free = limit - 1 - current
+    if free < 0 or previous <= 0:
+        return (index + 1) * window - now
+    return max(0.0, (1.0 - free / previous) - (now / window - index)) * window
+
+
+class RateLimitBackend(Protocol):
+    def hit(self, key: str, limit: int, window: float, now: float) -> RateLimitDecision:
+        ...
+
+
+class LocalRateLimitBackend:
+    """进程内计数。键按哈希分到各自带锁的分段，互不争用同一把全局锁。
+
+    每个键只存 ``[窗口序号, 上一窗口计数, 本窗口计数, 失效时刻]``。分段超过
+    水位时只清理该分段里已不影响判定的键（两个窗口以前的计数），水位随存活
+    键数翻倍，摊到每次请求上是常数开销。
+    """
+
+    def __init__(self, *, stripes: int = 64, min_purge_size: int = 1024) -> None:
+        self._stripes = [
+            (threading.Lock(), {}) for _ in range(max(1, stripes))
+        ]
+        self._min_purge_size = max(1, min_purge_size)
+        self._purge_at = [self._min_purge_size] * len(self._stripes)
+
+    def hit(self, key: str, limit: int, window: float, now: float) -> RateLimitDecision:
+        index = int(now // window)
+        stripe = hash(key) % len(self._stripes)
+        lock, entries = self._stripes[stripe]
+        with lock:
+            entry = entries.get(key)
+            previous, current = _roll(entry, index)
+            # 滑动窗口近似：上一窗口的计数按它仍落在滑动窗口里的比例计入。
+            if previous * (index + 1 - now / window) + current + 1 > limit:
+                return RateLimitDecision(
+                    False, _retry_after(previous, current, now, index, limit, window),
+                )
+            if entry is None:
+                entries[key] = [index, previous, current + 1, (index + 2) * window]
+                if len(entries) > self._purge_at[stripe]:
+                    self._purge(stripe, now)
+            else:
+                entry[0] = index
+                entry[1] = previous
+                entry[2] = current + 1
+                entry[3] = (index + 2) * window
+        return _ALLOWED
+
+    def _purge(self, stripe: int, now: float) -> None:
+        _, entries = self._stripes[stripe]
+        for key in [key for key, entry in entries.items() if entry[3] <= now]:
+            del entries[key]
+        self._purge_at[stripe] = max(self._min_purge_size, 2 * len(entries))
+
+    def __len__(self) -> int:
+        return sum(len(entries) for _, entries in self._stripes)
+
+
+class SharedMemoryRateLimitBackend:
+    """多个 worker 共享的定长计数表，映射自数据目录下的一个文件。
+
+    每个槽位 32 字节：键摘要、窗口序号、两个计数和失效时间。表按分段组织，
+    键在所属分段内线性探测 ``probe`` 个槽位；找不到时占用空槽、已失效的槽，
+    都没有就挤掉最早失效的槽（被挤掉的键相当于重新开始计数）。分段同时持有
+    进程内锁和 ``fcntl.lockf`` 字节区间锁：后者只在进程之间互斥。
+    """
+
+    _SLOT = struct.Struct("<QqIId")
+
+    def __init__(
+        self,
+        path: str | Path,
+        *,
+        slots: int = 65536,
+        stripes: int = 64,
+        probe: int = 8,
+    ) -> None:
+        if fcntl is None:  # pragma: no cover - Windows 开发机
+            raise RuntimeError("shared rate limiting requires fcntl")
+        self.path = Path(path)
+        self._stripe_count = max(1, stripes)
+        self._stripe_slots = max(probe, slots // self._stripe_count)
+        self._probe = probe
+        self._stripe_bytes = self._stripe_slots * self._SLOT.size
+        size = self._stripe_bytes * self._stripe_count
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        if os.fstat(self._fd).st_size < size:
+            os.ftruncate(self._fd, size)
+        self._map = mmap.mmap(self._fd, size)
+        self._locks = [threading.Lock() for _ in range(self._stripe_count)]
+
+    def hit(self, key: str, limit: int, window: float, now: float) -> RateLimitDecision:
+        digest = int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little") or 1
+        stripe = digest % self._stripe_count
+        base = stripe * self._stripe_bytes
+        start = (digest // self._stripe_count) % self._stripe_slots
+        with self._locks[stripe]:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, self._stripe_bytes, base)
+            try:
+                offset, state = self._find(base, start, digest, now)
+                index = int(now // window)
+                previous, current = _roll(state, index)
+                if previous * (index + 1 - now / window) + current + 1 > limit:
+                    return RateLimitDecision(
+                        False, _retry_after(previous, current, now, index, limit, window),
+                    )
+                self._SLOT.pack_into(
+                    self._map, offset, digest, index, previous, current + 1, (index + 2) * window,
+                )
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, self._stripe_bytes, base)
+        return _ALLOWED
+
+    def _find(
+        self, base: int, start: int, digest: int, now: float,
+    ) -> tuple[int, tuple[int, int, int] | None]:
+        victim = None
+        victim_expires = math.inf
+        for step in range(self._probe):
+            offset = base + ((start + step) % self._stripe_slots) * self._SLOT.size
+            slot_digest, index, previous, current, expires = self._SLOT.unpack_from(self._map, offset)
+            if slot_digest == digest:
+                return offset, (index, previous, current)
+            if slot_digest == 0 or expires <= now:
+                expires = -math.inf
+            if expires < victim_expires:
+                victim, victim_expires = offset, expires
+        return victim, None
+
+    def close(self) -> None:
+        self._map.close()
+        os.close(self._fd)
+
+
+def rate_limit_backend_from_env() -> RateLimitBackend:
+    """``RATE_LIMIT_BACKEND`` 为 local / shared；未设置时多 worker 部署用共享表。"""
+    choice = os.getenv("RATE_LIMIT_BACKEND", "").strip().lower()
+    if not choice:
+        choice = "shared" if multi_worker_enabled() else "local"
+    if choice == "shared" and fcntl is not None:
+        try:
+            return SharedMemoryRateLimitBackend(Path(DATA_DIR) / WORKERS_DIRNAME / "rate_limits.bin")
+        except OSError as e:
+            logger.warning(f"Shared rate limit table unavailable, counting per worker: {e}")
+    return LocalRateLimitBackend()
 
 
-def _get_client_ip(request: Request) -> str:
+class RateLimiter:
+    """把时钟与后端组合起来；中间件只依赖 ``hit``。"""
+
+    def __init__(self, backend: RateLimitBackend | None = None, clock: Callable[[], float] = time.time) -> None:
+        self.backend = backend or LocalRateLimitBackend()
+        self._clock = clock
+
+    def hit(self, key: str, limit: int, window: float) -> RateLimitDecision:
+        return self.backend.hit(key, limit, window, self._clock())
+
+
+# 全局限流器实例
+rate_limiter = RateLimiter(rate_limit_backend_from_env())
+
+
+def _get_client_ip(scope: dict) -> str:
     """获取客户端 IP，支持反向代理"""
-    forwarded = request.headers.get("x-forwarded-for")
-    if forwarded:
-        return forwarded.split(",")[0].strip()
-    if request.client:
-        return request.client.host
+    for name, value in scope.get("headers") or ():
+        if name == b"x-forwarded-for":
+            return value.decode("latin-1").split(",")[0].strip()
+    client = scope.get("client")
+    if client:
+        return client[0]
     return "unknown"
 
 
+def _compile_prefix_rules(rules: dict[str, tuple[int, int]]) -> tuple[re.Pattern, list]:
+    """把前缀规则编成一个按声明顺序择一的正则；命中的分组号即规则序号。"""
+    prefixes = [prefix for prefix in rules if prefix.startswith("/")]
+    pattern = re.compile("|".join(f"({re.escape(prefix)})" for prefix in prefixes))
+    return pattern, [rules[prefix] for prefix in prefixes]
+
+
+_PREFIX_PATTERN, _PREFIX_LIMITS = _compile_prefix_rules(RATE_LIMITS)
+
+
+@lru_cache(maxsize=8192)
 def _match_rate_limit(
     path: str,
     method: str = "",
-) -> Tuple[int, int]:
+) -> tuple[int, int]:
     """根据路径匹配速率限制规则"""
     if (
         method.upper() == "GET"
@@ -96,43 +287,38 @@ def _match_rate_limit(
     # 但不会触发 AI 生成或写入正式课程，因此与课程 CRUD 分开限流。
     if path.startswith("/api/courses/") and path.endswith("/evolution/progress"):
         return 120, 60
-    for prefix, limits in RATE_LIMITS.items():
-        if prefix.startswith("/") and path.startswith(prefix):
-            return limits
+    match = _PREFIX_PATTERN.match(path)
+    if match:
+        return _PREFIX_LIMITS[match.lastindex - 1]
     return RATE_LIMITS["_default"]
 
 
-class RateLimitMiddleware(BaseHTTPMiddleware):
-    """速率限制中间件"""
+class RateLimitMiddleware:
+    """速率限制中间件（纯 ASGI，放行的请求不经过额外的请求/响应包装）"""
 
-    _cleanup_counter = 0
+    def __init__(self, app: ASGIApp, limiter: RateLimiter | None = None) -> None:
+        self.app = app
+        self.limiter = limiter or rate_limiter
 
-    async def dispatch(
-        self, request: Request, call_next: RequestResponseEndpoint
-    ) -> Response:
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         # 跳过健康检查和静态资源
-        path = request.url.path
-        if path in ("/health", "/api/health") or not path.startswith("/api"):
-            return await call_next(request)
-
-        client_ip = _get_client_ip(request)
-        max_requests, window = _match_rate_limit(
-            path,
-            request.method,
-        )
-        key = f"{client_ip}:{path}"
-
-        if not _counter.is_allowed(key, max_requests, window):
+        path = scope["path"] if scope["type"] == "http" else ""
+        if not path.startswith("/api") or path in _EXEMPT_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        client_ip = _get_client_ip(scope)
+        max_requests, window = _match_rate_limit(path, scope["method"])
+        decision = self.limiter.hit(f"{client_ip}:{path}", max_requests, window)
+
+        if not decision.allowed:
             logger.warning(f"Rate limit exceeded: {client_ip} on {path}")
-            return JSONResponse(
+            response = JSONResponse(
                 status_code=429,
                 content={"detail": "请求过于频繁，请稍后再试"},
-                headers={"Retry-After": str(window)},
+                headers={"Retry-After": str(max(1, math.ceil(decision.retry_after)))},
             )
+            await response(scope, receive, send)
+            return
 
-        # 定期清理（每 100 次请求）
-        RateLimitMiddleware._cleanup_counter += 1
-        if RateLimitMiddleware._cleanup_counter % 100 == 0:
-            _counter.cleanup()
-
-        return await call_next(request)
+        await self.app(scope, receive, send)
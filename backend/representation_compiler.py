@@ -51,6 +51,7 @@ from slide_deck_v5 import (
     validate_slide_deck_v5,
 )
 from slide_deck_v6_renderer import export_slide_deck_v6_pptx
+from slide_page_render_cache import slide_page_render_cache
 from slide_quality_v5 import repair_render_slides_v5
 from slide_story_plan import SlideStoryPlanV2
 from slide_theme import slide_theme_version
@@ -487,7 +488,7 @@ def export_slide_deck_pptx(
         raise ValueError("Only slide deck specs can be exported to pptx")
     content = spec.payload.get("content") or {}
     if content.get("schema_version") == "slide_deck_v6":
-        return export_slide_deck_v6_pptx(content, output_path)
+        return export_slide_deck_v6_pptx(content, output_path, page_cache=slide_page_render_cache)
     template_theme = (
         (content.get("template_pack") or {}).get("compiled_theme")
         if isinstance(content.get("template_pack"), dict)
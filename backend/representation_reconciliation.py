@@ -4,6 +4,8 @@ from __future__ import annotations
 
 import asyncio
 import logging
+import os
+import time
 from typing import Any
 
 from teaching_representations import TeachingRepresentationRepository
@@ -11,31 +13,86 @@ from teaching_representations import TeachingRepresentationRepository
 logger = logging.getLogger(__name__)
 
 
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
 class RepresentationReconciliationService:
-    """Consume course revision notifications; operation logs remain the durable ledger."""
+    """Consume course revision notifications; operation logs remain the durable ledger.
+
+    Startup only enqueues courses whose stored document changed since their
+    persisted reconciliation watermark. A background sweep then reconciles
+    every course at a bounded rate, so a watermark that missed a write is
+    corrected without a boot-time replay of all history.
+    """
 
-    def __init__(self, course_repository: Any, representation_repository: TeachingRepresentationRepository) -> None:
+    def __init__(
+        self,
+        course_repository: Any,
+        representation_repository: TeachingRepresentationRepository,
+        *,
+        sweep_interval_s: float | None = None,
+        sweep_courses_per_s: float | None = None,
+    ) -> None:
         self.course_repository = course_repository
         self.representation_repository = representation_repository
+        # 0 关闭周期性全量对账；速率限制每秒最多对账的课程数。
+        self.sweep_interval_s = (
+            _env_float("REPRESENTATION_RECONCILE_SWEEP_INTERVAL_S", 3600.0)
+            if sweep_interval_s is None else sweep_interval_s
+        )
+        self.sweep_courses_per_s = (
+            _env_float("REPRESENTATION_RECONCILE_SWEEP_RATE", 2.0)
+            if sweep_courses_per_s is None else sweep_courses_per_s
+        )
         self._queue: asyncio.Queue[str] = asyncio.Queue()
         self._pending: set[str] = set()
         self._worker: asyncio.Task[None] | None = None
+        self._sweeper: asyncio.Task[None] | None = None
+        self._startup_pending: set[str] = set()
+        self._startup_started = 0.0
+        self.startup: dict[str, Any] = {}
+        self.sweeps: dict[str, Any] = {"completed": 0, "courses": 0, "failures": 0, "last_ms": 0.0}
 
     async def start(self) -> None:
         if self._worker and not self._worker.done():
             return
         self._worker = asyncio.create_task(self._run())
-        list_courses = getattr(self.course_repository.storage, "list_courses", None)
-        if callable(list_courses):
-            for course in await asyncio.to_thread(list_courses):
-                self.enqueue(str(course.get("course_id") or ""), {})
+        self._startup_started = time.perf_counter()
+        course_ids = await asyncio.to_thread(self._course_ids)
+        stale = await asyncio.to_thread(self._courses_behind_watermark, course_ids)
+        scan_ms = (time.perf_counter() - self._startup_started) * 1000
+        self.startup = {
+            "courses": len(course_ids),
+            "enqueued": len(stale),
+            "skipped": len(course_ids) - len(stale),
+            "scan_ms": round(scan_ms, 2),
+            "drain_ms": None if stale else round(scan_ms, 2),
+            "failures": 0,
+        }
+        self._startup_pending = set(stale)
+        for course_id in stale:
+            self.enqueue(course_id, {})
+        logger.info(
+            "Representation reconciliation startup: %d courses, %d behind watermark, scan %.1f ms",
+            len(course_ids),
+            len(stale),
+            scan_ms,
+        )
+        if self.sweep_interval_s > 0 and self.sweep_courses_per_s > 0:
+            self._sweeper = asyncio.create_task(self._sweep_forever())
 
     async def shutdown(self) -> None:
-        worker = self._worker
+        tasks = [task for task in (self._sweeper, self._worker) if task and not task.done()]
         self._worker = None
-        if worker and not worker.done():
-            worker.cancel()
-            await asyncio.gather(worker, return_exceptions=True)
+        self._sweeper = None
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
 
     def enqueue(self, course_id: str, _receipt: dict[str, Any] | None = None) -> None:
         course_id = str(course_id or "")
@@ -46,15 +103,75 @@ class RepresentationReconciliationService:
 
     async def reconcile_now(self, course_id: str) -> dict[str, Any]:
         def reconcile() -> dict[str, Any]:
+            # 先取戳再读课程：读之后的写入会改变戳，下次启动仍会重新对账。
+            stamp = self._course_stamp(course_id)
             raw = self.course_repository.load_raw(course_id)
             registry = self.representation_repository.reconcile_course_operation_log(
                 course_id,
                 list(raw.get("course_operation_log") or []),
+                source_stamp=stamp,
             )
             return registry.model_dump(mode="json")
 
         return await asyncio.to_thread(reconcile)
 
+    async def sweep(self) -> int:
+        """Reconcile every course once, at most ``sweep_courses_per_s`` per second."""
+        started = time.perf_counter()
+        delay = 1.0 / self.sweep_courses_per_s if self.sweep_courses_per_s > 0 else 0.0
+        reconciled = 0
+        for course_id in await asyncio.to_thread(self._course_ids):
+            try:
+                await self.reconcile_now(course_id)
+                reconciled += 1
+            except Exception as exc:
+                self.sweeps["failures"] += 1
+                logger.warning("Representation reconciliation sweep failed for %s: %s", course_id, exc)
+            if delay:
+                await asyncio.sleep(delay)
+        self.sweeps["completed"] += 1
+        self.sweeps["courses"] = reconciled
+        self.sweeps["last_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        return reconciled
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "startup": dict(self.startup),
+            "sweeps": dict(self.sweeps),
+            "queued": len(self._pending),
+        }
+
+    def _course_ids(self) -> list[str]:
+        storage = self.course_repository.storage
+        list_course_ids = getattr(storage, "list_course_ids", None)
+        if callable(list_course_ids):
+            return [str(item) for item in list_course_ids() if item]
+        list_courses = getattr(storage, "list_courses", None)
+        if callable(list_courses):
+            return [str(course.get("course_id") or "") for course in list_courses() if course.get("course_id")]
+        return []
+
+    def _course_stamp(self, course_id: str) -> str:
+        course_stamp = getattr(self.course_repository.storage, "course_stamp", None)
+        return str(course_stamp(course_id) or "") if callable(course_stamp) else ""
+
+    def _courses_behind_watermark(self, course_ids: list[str]) -> list[str]:
+        stale = []
+        for course_id in course_ids:
+            stamp = self._course_stamp(course_id)
+            watermark = self.representation_repository.reconciliation_watermark(course_id)
+            if not stamp or watermark is None or watermark.source_stamp != stamp:
+                stale.append(course_id)
+        return stale
+
+    async def _sweep_forever(self) -> None:
+        try:
+            while True:
+                await asyncio.sleep(self.sweep_interval_s)
+                await self.sweep()
+        except asyncio.CancelledError:
+            return
+
     async def _run(self) -> None:
         try:
             while True:
@@ -62,12 +179,24 @@ class RepresentationReconciliationService:
                 try:
                     await self.reconcile_now(course_id)
                 except Exception as exc:
+                    if course_id in self._startup_pending:
+                        self.startup["failures"] += 1
                     logger.warning("Representation reconciliation failed for %s: %s", course_id, exc)
                 finally:
                     self._pending.discard(course_id)
                     self._queue.task_done()
+                    self._finish_startup_item(course_id)
         except asyncio.CancelledError:
             return
 
+    def _finish_startup_item(self, course_id: str) -> None:
+        if course_id not in self._startup_pending:
+            return
+        self._startup_pending.discard(course_id)
+        if not self._startup_pending:
+            drain_ms = (time.perf_counter() - self._startup_started) * 1000
+            self.startup["drain_ms"] = round(drain_ms, 2)
+            logger.info("Representation reconciliation startup backlog drained in %.1f ms", drain_ms)
+
 
 __all__ = ["RepresentationReconciliationService"]
@@ -0,0 +1,362 @@
+"""Bounded, process-wide cache for web retrieval provider results.
+
+Course generation, question-bank enrichment and AI-teacher retrieval all go
+through :class:`web_retrieval.RetrievalGateway`, so they share this one cache.
+Entries are evicted in LRU order once either the entry or the byte budget is
+exceeded, and every reader states how stale a result it accepts, which is how
+purposes get their own TTL while still sharing entries.
+
+Setting ``WEB_RETRIEVAL_CACHE_DIR`` adds an on-disk tier. Results written there
+survive a restart and are promoted back into memory on first use.
+
+The cache is only filled once a provider call finishes, so
+:class:`RetrievalSingleFlight` covers the gap: concurrent callers that miss on
+the same key await one shared provider call instead of issuing their own.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from copy import deepcopy
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, TypeVar
+
+T = TypeVar("T")
+
+DEFAULT_MAX_ENTRIES = 2048
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+DEFAULT_MAX_DISK_ENTRIES = 20000
+# Disk pruning lists the whole directory, so it runs every N writes, not each one.
+_DISK_PRUNE_EVERY = 64
+
+
+def _env_int(name: str, default: int, *, minimum: int = 0) -> int:
+    try:
+        return max(minimum, int(os.getenv(name, str(default))))
+    except ValueError:
+        return default
+
+
+@dataclass(slots=True)
+class _Entry:
+    stored_at: float
+    expires_at: float
+    purpose: str
+    size: int
+    results: list[dict[str, Any]]
+
+
+class RetrievalQueryCache:
+    def __init__(
+        self,
+        *,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        disk_dir: str | Path | None = None,
+        max_disk_entries: int = DEFAULT_MAX_DISK_ENTRIES,
+    ) -> None:
+        self.max_entries = max(0, int(max_entries))
+        self.max_bytes = max(0, int(max_bytes))
+        self.max_disk_entries = max(0, int(max_disk_entries))
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        if self.disk_dir is not None:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._disk_writes = 0
+        self._counters = {
+            "hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "stores": 0,
+        }
+
+    @classmethod
+    def from_env(cls) -> RetrievalQueryCache:
+        return cls(
+            max_entries=_env_int("WEB_RETRIEVAL_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES),
+            max_bytes=_env_int("WEB_RETRIEVAL_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES),
+            disk_dir=os.getenv("WEB_RETRIEVAL_CACHE_DIR", "").strip() or None,
+            max_disk_entries=_env_int("WEB_RETRIEVAL_CACHE_MAX_DISK_ENTRIES", DEFAULT_MAX_DISK_ENTRIES),
+        )
+
+    def get(self, key: str, *, max_age_seconds: float) -> list[dict[str, Any]] | None:
+        """Return a deep copy of fresh results, or ``None`` on a miss."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now >= entry.expires_at:
+                self._drop_locked(key)
+                self._counters["expirations"] += 1
+                entry = None
+            if entry is not None and now - entry.stored_at <= max_age_seconds:
+                self._entries.move_to_end(key)
+                self._counters["hits"] += 1
+                return deepcopy(entry.results)
+            if entry is not None:
+                # Fresh enough for its writer, too old for this reader.
+                self._counters["misses"] += 1
+                return None
+        disk_entry = self._read_disk(key, now)
+        with self._lock:
+            if disk_entry is not None and now - disk_entry.stored_at <= max_age_seconds:
+                self._insert_locked(key, disk_entry)
+                self._counters["disk_hits"] += 1
+                return deepcopy(disk_entry.results)
+            self._counters["misses"] += 1
+            return None
+
+    def put(
+        self,
+        key: str,
+        results: list[dict[str, Any]],
+        *,
+        ttl_seconds: float,
+        purpose: str = "",
+    ) -> None:
+        entry = self._remember(key, results, ttl_seconds=ttl_seconds, purpose=purpose)
+        if entry is not None:
+            self._write_disk(key, entry)
+
+    async def aput(
+        self,
+        key: str,
+        results: list[dict[str, Any]],
+        *,
+        ttl_seconds: float,
+        purpose: str = "",
+    ) -> None:
+        """Like :meth:`put`, but the disk write and the periodic prune run in a worker thread."""
+        entry = self._remember(key, results, ttl_seconds=ttl_seconds, purpose=purpose)
+        if entry is not None and self.disk_dir is not None:
+            await asyncio.to_thread(self._write_disk, key, entry)
+
+    def _remember(
+        self,
+        key: str,
+        results: list[dict[str, Any]],
+        *,
+        ttl_seconds: float,
+        purpose: str,
+    ) -> _Entry | None:
+        if ttl_seconds <= 0:
+            return None
+        payload = json.dumps(results, ensure_ascii=False, separators=(",", ":"))
+        now = time.time()
+        entry = _Entry(
+            stored_at=now,
+            expires_at=now + ttl_seconds,
+            purpose=purpose,
+            size=len(payload.encode("utf-8")),
+            results=deepcopy(results),
+        )
+        with self._lock:
+            if self.max_entries and (not self.max_bytes or entry.size <= self.max_bytes):
+                self._insert_locked(key, entry)
+            self._counters["stores"] += 1
+        return entry
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["disk_hits"] + self._counters["misses"]
+            return {
+                **self._counters,
+                "hit_ratio": round(
+                    (self._counters["hits"] + self._counters["disk_hits"]) / lookups,
+                    4,
+                ) if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "disk_enabled": self.disk_dir is not None,
+            }
+
+    def clear(self, *, disk: bool = False) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            for name in self._counters:
+                self._counters[name] = 0
+        if disk and self.disk_dir is not None:
+            for path in self.disk_dir.glob("*.json"):
+                path.unlink(missing_ok=True)
+
+    def _insert_locked(self, key: str, entry: _Entry) -> None:
+        self._drop_locked(key)
+        self._entries[key] = entry
+        self._bytes += entry.size
+        while self._entries and (
+            len(self._entries) > self.max_entries
+            or (self.max_bytes and self._bytes > self.max_bytes)
+        ):
+            oldest = next(iter(self._entries))
+            self._drop_locked(oldest)
+            self._counters["evictions"] += 1
+
+    def _drop_locked(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
+
+    def _disk_path(self, key: str) -> Path | None:
+        if self.disk_dir is None:
+            return None
+        return self.disk_dir / f"{hashlib.sha256(key.encode('utf-8')).hexdigest()}.json"
+
+    def _read_disk(self, key: str, now: float) -> _Entry | None:
+        path = self._disk_path(key)
+        if path is None or not path.exists():
+            return None
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+            if data.get("key") != key:
+                return None
+            entry = _Entry(
+                stored_at=float(data["stored_at"]),
+                expires_at=float(data["expires_at"]),
+                purpose=str(data.get("purpose") or ""),
+                size=int(data.get("size") or 0),
+                results=list(data.get("results") or []),
+            )
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        if now >= entry.expires_at:
+            path.unlink(missing_ok=True)
+            with self._lock:
+                self._counters["expirations"] += 1
+            return None
+        return entry
+
+    def _write_disk(self, key: str, entry: _Entry) -> None:
+        path = self._disk_path(key)
+        if path is None:
+            return
+        document = {
+            "key": key,
+            "stored_at": entry.stored_at,
+            "expires_at": entry.expires_at,
+            "purpose": entry.purpose,
+            "size": entry.size,
+            "results": entry.results,
+        }
+        text = json.dumps(document, ensure_ascii=False, separators=(",", ":"))
+        temp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            temp.write_text(text, encoding="utf-8")
+            os.replace(temp, path)
+        except OSError:
+            temp.unlink(missing_ok=True)
+            return
+        with self._lock:
+            self._disk_writes += 1
+            should_prune = self._disk_writes % _DISK_PRUNE_EVERY == 0
+        if should_prune:
+            self._prune_disk()
+
+    def _prune_disk(self) -> None:
+        if self.disk_dir is None:
+            return
+        files: list[tuple[float, str]] = []
+        try:
+            with os.scandir(self.disk_dir) as entries:
+                for item in entries:
+                    if not item.name.endswith(".json"):
+                        continue
+                    try:
+                        files.append((item.stat().st_mtime, item.path))
+                    except OSError:
+                        continue
+        except OSError:
+            return
+        excess = len(files) - self.max_disk_entries
+        if excess <= 0:
+            return
+        files.sort()
+        for _mtime, path in files[:excess]:
+            Path(path).unlink(missing_ok=True)
+
+
+@dataclass(slots=True)
+class _Flight:
+    task: asyncio.Task[Any]
+    waiters: int = 0
+
+
+class RetrievalSingleFlight:
+    """Coalesce concurrent identical provider calls into one shared task.
+
+    Every caller keeps its own timeout and cancellation: a caller that gives up
+    only stops waiting. The shared call is cancelled once nobody waits on it,
+    which is what a lone caller timing out did before coalescing existed.
+    """
+
+    def __init__(self) -> None:
+        # Keyed by event loop as well, since a task cannot be awaited across loops.
+        self._flights: dict[tuple[int, str], _Flight] = {}
+        self._counters = {"leaders": 0, "coalesced": 0, "abandoned": 0}
+
+    async def run(self, key: str, call: Callable[[], Awaitable[T]]) -> tuple[T, bool]:
+        """Return ``(result, shared)``; ``shared`` is true when no new call was made."""
+        loop = asyncio.get_running_loop()
+        slot = (id(loop), key)
+        flight = self._flights.get(slot)
+        shared = flight is not None
+        if flight is None:
+            flight = _Flight(task=loop.create_task(call()))
+            self._flights[slot] = flight
+            flight.task.add_done_callback(lambda _task, slot=slot, flight=flight: self._forget(slot, flight))
+            self._counters["leaders"] += 1
+        else:
+            self._counters["coalesced"] += 1
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task), shared
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                self._forget(slot, flight)
+                flight.task.cancel()
+                self._counters["abandoned"] += 1
+
+    def _forget(self, slot: tuple[int, str], flight: _Flight) -> None:
+        if self._flights.get(slot) is flight:
+            del self._flights[slot]
+
+    def stats(self) -> dict[str, int]:
+        return {
+            **self._counters,
+            "in_flight": len(self._flights),
+            "saved_provider_calls": self._counters["coalesced"],
+        }
+
+
+retrieval_query_cache = RetrievalQueryCache.from_env()
+retrieval_single_flight = RetrievalSingleFlight()
+
+
+def retrieval_cache_stats() -> dict[str, Any]:
+    return {
+        **retrieval_query_cache.stats(),
+        "single_flight": retrieval_single_flight.stats(),
+    }
+
+
+__all__ = [
+    "RetrievalQueryCache",
+    "RetrievalSingleFlight",
+    "retrieval_cache_stats",
+    "retrieval_query_cache",
+    "retrieval_single_flight",
+]
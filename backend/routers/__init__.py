@@ -5,13 +5,11 @@ from routers import (
     assistant,
     block_regeneration,
     code_execution,
-    course_acceptance,
     course_versions,
     courses,
     diagnostics,
     diagrams,
     learner_model,
-    knowledge_libraries,
     learning_assets,
     learning_continuation,
     learning_progress,
@@ -29,3 +27,37 @@ from routers import (
 )
 
 __all__ = [name for name in globals() if not name.startswith("_")]
+
+# 低频路由不在包导入时加载，由 ``main`` 交给 DeferredRouterRegistry 按需挂载。
+# 前缀必须覆盖模块的全部路由，tests/test_deferred_routers.py 对照真实路由表检查。
+from deferred_routers import DeferredRouter  # noqa: E402
+
+DEFERRED_ROUTERS = (
+    DeferredRouter("routers.learning_governance", ("/api/learning-facts",)),
+    DeferredRouter(
+        "routers.course_acceptance",
+        ("/api/course-acceptance", "/api/courses/{course_id}/acceptance-preflight"),
+    ),
+    DeferredRouter("routers.ppt_template_packs", ("/api/ppt-template-packs",)),
+    DeferredRouter("routers.knowledge_libraries", ("/api/courses/{course_id}/knowledge-library",)),
+    DeferredRouter(
+        "routers.teaching_representations",
+        ("/api/courses/{course_id}/teaching-representations",),
+    ),
+    DeferredRouter("routers.teaching_plan_workbench", ("/api/courses/{course_id}/teaching-plan",)),
+    DeferredRouter("routers.teacher_course_space", ("/api/teacher-course-spaces",)),
+    DeferredRouter("routers.teacher_authoring", ("/api/teacher/courses/{course_id}/authoring",)),
+    DeferredRouter(
+        "routers.teacher_lesson_authoring",
+        (
+            "/api/teacher/courses/{course_id}/knowledge-evidence",
+            "/api/teacher/courses/{course_id}/lesson-authoring",
+            "/api/teacher/courses/{course_id}/lesson-jobs",
+            "/api/teacher/courses/{course_id}/lessons",
+        ),
+    ),
+    DeferredRouter(
+        "routers.teaching_calendar",
+        ("/api/courses/{course_id}/teaching-calendar", "/api/teachers/me/teaching-calendar"),
+    ),
+)
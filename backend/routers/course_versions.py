@@ -97,8 +97,11 @@ GenerationStep = Literal[
 
 
 @router.get("/blueprint")
-async def get_blueprint(course_id: str):
-    course = await _course_for_blueprint(course_id)
+async def get_blueprint(
+    course_id: str,
+    tm: TaskManager | None = Depends(get_task_manager_optional),
+):
+    course = await _course_for_blueprint(course_id, tm)
     draft = await run_in_threadpool(course_version_repository.load_draft, course_id)
     current = build_blueprint_draft(course)
     if isinstance(draft, dict):
@@ -143,8 +146,12 @@ async def retry_blueprint_retrieval(
 
 
 @router.put("/blueprint/draft")
-async def save_blueprint_draft(course_id: str, request: BlueprintDraftRequest):
-    course = await _course_for_blueprint(course_id)
+async def save_blueprint_draft(
+    course_id: str,
+    request: BlueprintDraftRequest,
+    tm: TaskManager | None = Depends(get_task_manager_optional),
+):
+    course = await _course_for_blueprint(course_id, tm)
     current_revision = blueprint_revision_id(course)
     if request.base_blueprint_revision_id and request.base_blueprint_revision_id != current_revision:
         raise HTTPException(status_code=409, detail={
@@ -265,8 +272,12 @@ async def cancel_blueprint_adjustment(
 
 
 @router.post("/blueprint/impact")
-async def preview_blueprint_impact(course_id: str, request: BlueprintDraftRequest):
-    course = await _course_for_blueprint(course_id)
+async def preview_blueprint_impact(
+    course_id: str,
+    request: BlueprintDraftRequest,
+    tm: TaskManager | None = Depends(get_task_manager_optional),
+):
+    course = await _course_for_blueprint(course_id, tm)
     draft = build_blueprint_draft(course)
     for field, value in request.model_dump(exclude_none=True).items():
         if field != "base_blueprint_revision_id":
@@ -470,10 +481,13 @@ async def list_version_candidates(course_id: str):
     return {"status": "success", "candidates": candidates}
 
 
-async def _course_for_blueprint(course_id: str) -> dict[str, Any]:
-    """Read an unpublished generation blueprint from its isolated workspace."""
+async def _course_for_blueprint(course_id: str, task_manager: TaskManager | None) -> dict[str, Any]:
+    """Read an unpublished generation blueprint from its isolated workspace.
+
+    Routes take ``task_manager`` through ``Depends(get_task_manager_optional)``
+    so the generation-route forwarder sees that they read the workspace.
+    """
     course = await get_course_or_404(course_id)
-    task_manager = get_task_manager_optional()
     if task_manager is None:
         return course
     workspace_course = task_manager.get_generation_workspace_course(course_id)
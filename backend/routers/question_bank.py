@@ -16,6 +16,7 @@ from uuid import uuid4
 from fastapi import APIRouter, Header, HTTPException, Query, status
 from pydantic import BaseModel, Field, field_validator, model_validator
 
+from ai_capacity import admission
 from assessment_orchestrator import AssessmentGenerationOrchestrator
 from assessment_generation_policy import (
     ASSESSMENT_GENERATION_POLICY_VERSION,
@@ -829,12 +830,13 @@ async def _run_rebuild_job(
     repository = question_bank_rebuild_job_repository
     try:
         repository.start(job_id)
-        result = await _execute_question_bank_rebuild(
-            course_id=course_id,
-            payload=payload,
-            course=course,
-            job_id=job_id,
-        )
+        with admission("background", course_id=course_id):
+            result = await _execute_question_bank_rebuild(
+                course_id=course_id,
+                payload=payload,
+                course=course,
+                job_id=job_id,
+            )
         repository.complete(job_id, result=result)
     except HTTPException as exc:
         detail = exc.detail
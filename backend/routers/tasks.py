@@ -4,14 +4,15 @@
 # =============================================================================
 
 from fastapi import APIRouter, Depends, HTTPException
-from typing import Literal
+from typing import Any, Literal
 import sys
 import os
 
 sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
 
-from task_manager import TaskManager, TaskRecoveryConflict, TaskStateConflict
+import generation_telemetry
 from dependencies import require_task_manager
+from task_manager import TaskManager, TaskRecoveryConflict, TaskStateConflict
 
 router = APIRouter(tags=["tasks"])
 
@@ -139,6 +140,28 @@ def get_task_recovery(
         raise HTTPException(status_code=404, detail="Task not found") from exc
 
 
+@router.get("/tasks/{task_id}/generation-bill")
+def get_task_generation_bill(
+    task_id: str,
+    tm: TaskManager = Depends(require_task_manager),
+) -> dict[str, Any]:
+    """运行中也能查看的模型调用账单：按阶段、小节、模型拆分。
+
+    账单由生成进程在内存里滚动聚合，只保留最近活跃的若干个任务；任务还没
+    发出模型调用、或账单已被淘汰时 ``bill`` 为 ``None``。
+    """
+    task = tm.get_task_summary(task_id)
+    bill = generation_telemetry.job_bill(task_id)
+    if task is None and bill is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return {
+        "task_id": task_id,
+        "task_status": (task or {}).get("status"),
+        "pending_calls": generation_telemetry.writer_stats()["pending"],
+        "bill": bill,
+    }
+
+
 @router.delete("/tasks/failed")
 async def clear_failed_tasks(
     tm: TaskManager = Depends(require_task_manager),
@@ -82,6 +82,7 @@ from slide_deck_v5 import (
 from slide_deck_v6 import build_signature_v6
 from slide_deck_v6_orchestrator import SlideDeckV6CandidateRepository
 from slide_deck_v6_renderer import export_slide_deck_v6_pptx
+from slide_page_render_cache import slide_page_render_cache
 from slide_story_plan import (
     SlideStoryPlanPrerequisiteError,
     SlideStoryPlanV2,
@@ -812,6 +813,7 @@ async def export_slide_deck_v6_shadow_candidate(
         export_slide_deck_v6_pptx,
         candidate["deck"],
         output,
+        page_cache=slide_page_render_cache,
     )
     return FileResponse(
         output,
@@ -11,9 +11,9 @@ import tempfile
 from pathlib import Path
 from typing import Literal
 
-from PIL import Image
 from pydantic import BaseModel, ConfigDict, Field
 
+from manifest_index import ManifestIndex
 from storage import DATA_DIR
 from material_storage import IMAGE_EXTENSIONS, material_repository
 from slide_image_provider import IMAGE_PROMPT_POLICY_VERSION, SlideImageProvider
@@ -52,12 +52,54 @@ class SlideVisualAsset(BaseModel):
     quality_checks: dict[str, bool] = Field(default_factory=dict)
 
 
+def generation_fingerprint(
+    *,
+    course_id: str,
+    source_fragment_ids: list[str],
+    prompt: str,
+    generation_seed: str,
+) -> str:
+    """Stable key for one website-generated illustration request."""
+    payload = json.dumps(
+        [course_id, list(dict.fromkeys(source_fragment_ids)), prompt, generation_seed],
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _index_projection(manifest: dict[str, object]) -> dict[str, object]:
+    fingerprint = ""
+    if manifest.get("kind") == "generated_illustration":
+        fingerprint = generation_fingerprint(
+            course_id=str(manifest.get("course_id") or ""),
+            source_fragment_ids=[str(item) for item in manifest.get("source_fragment_ids") or []],
+            prompt=str(manifest.get("prompt") or ""),
+            generation_seed=str(manifest.get("generation_seed") or ""),
+        )
+    return {
+        "kind": str(manifest.get("kind") or ""),
+        "sha256": str(manifest.get("sha256") or ""),
+        "asset_url": str(manifest.get("asset_url") or ""),
+        "prompt_fingerprint": fingerprint,
+    }
+
+
 class SlideAssetRepository:
     def __init__(self, root: str | Path | None = None) -> None:
         self.root = Path(root or Path(DATA_DIR) / "slide_visual_assets")
         self.root.mkdir(parents=True, exist_ok=True)
         self.staging = self.root / ".staging"
         self.staging.mkdir(parents=True, exist_ok=True)
+        # Lookups narrow candidates through this index and then re-read the
+        # real manifest, so a stale entry can only cost a miss, never a wrong hit.
+        self.index = ManifestIndex(
+            self.root,
+            prefix="sva_",
+            project=_index_projection,
+            keys=("sha256", "asset_url", "prompt_fingerprint"),
+            version="slide-visual-v1",
+        )
 
     def stage_image(
         self,
@@ -87,6 +129,8 @@ class SlideAssetRepository:
         retrieved_at: str = "",
         quality_checks: dict[str, bool] | None = None,
     ) -> SlideVisualAsset:
+        from PIL import Image
+
         source = Path(source_path)
         try:
             with Image.open(source) as image:
@@ -152,6 +196,8 @@ class SlideAssetRepository:
             if existing is None or existing.sha256 != asset.sha256:
                 raise ValueError("Slide asset hash collision")
             self.discard_staged(asset)
+            if self.index.entry(existing.asset_id) is None:
+                self.index.upsert(existing.asset_id, existing.model_dump(mode="json"))
             return existing
         staged = next(
             (
@@ -167,7 +213,9 @@ class SlideAssetRepository:
             os.replace(staged, target)
         except FileExistsError:
             shutil.rmtree(staged, ignore_errors=True)
-        return self.get(asset.asset_id) or asset
+        promoted = self.get(asset.asset_id) or asset
+        self.index.upsert(promoted.asset_id, promoted.model_dump(mode="json"))
+        return promoted
 
     def discard_staged(self, asset: SlideVisualAsset) -> None:
         staging_root = self.staging.resolve()
@@ -228,13 +276,13 @@ class SlideAssetRepository:
     ) -> SlideVisualAsset | None:
         """Reuse a published website-generated asset for an identical request."""
         expected_sources = list(dict.fromkeys(source_fragment_ids))
-        for manifest in self.root.glob("sva_*/manifest.json"):
-            try:
-                asset = SlideVisualAsset.model_validate(
-                    json.loads(manifest.read_text(encoding="utf-8"))
-                )
-            except (OSError, ValueError):
-                continue
+        fingerprint = generation_fingerprint(
+            course_id=course_id,
+            source_fragment_ids=expected_sources,
+            prompt=prompt,
+            generation_seed=generation_seed,
+        )
+        for asset in self._indexed("prompt_fingerprint", fingerprint):
             if (
                 asset.kind == "generated_illustration"
                 and asset.course_id == course_id
@@ -249,13 +297,7 @@ class SlideAssetRepository:
 
     def find_retrieved(self, *, asset_url: str) -> SlideVisualAsset | None:
         """Reuse one previously validated download without re-hotlinking it."""
-        for manifest in self.root.glob("sva_*/manifest.json"):
-            try:
-                asset = SlideVisualAsset.model_validate(
-                    json.loads(manifest.read_text(encoding="utf-8"))
-                )
-            except (OSError, ValueError):
-                continue
+        for asset in self._indexed("asset_url", asset_url):
             if (
                 asset.kind == "retrieved_image"
                 and asset.asset_url == asset_url
@@ -264,6 +306,17 @@ class SlideAssetRepository:
                 return asset
         return None
 
+    def _indexed(self, key: str, value: str) -> list[SlideVisualAsset]:
+        assets: list[SlideVisualAsset] = []
+        for asset_id in self.index.lookup(key, value):
+            try:
+                asset = self.get(asset_id)
+            except (OSError, ValueError):
+                continue
+            if asset is not None:
+                assets.append(asset)
+        return assets
+
     @staticmethod
     def _validate_id(asset_id: str) -> None:
         if not asset_id.startswith("sva_") or not all(
@@ -540,6 +593,7 @@ __all__ = [
     "SlideAssetRepository",
     "SlideVisualAsset",
     "finalize_visual_assets",
+    "generation_fingerprint",
     "resolve_visual_plan_assets",
     "slide_asset_repository",
 ]
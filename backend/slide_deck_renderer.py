@@ -7,6 +7,7 @@ import re
 import shutil
 import subprocess
 import tempfile
+from collections.abc import Mapping
 from copy import deepcopy
 from difflib import SequenceMatcher
 from functools import lru_cache
@@ -609,12 +610,194 @@ def _libreoffice_render_audit(
         return audit_rendered_slide_images(presentation, image_paths)
 
 
+def _audit_exported_slide(
+    slide: Any,
+    slide_index: int,
+    slide_width: int,
+    slide_height: int,
+) -> list[dict[str, Any]]:
+    """Object-level audit of one exported slide; issues carry ``page=slide_index``."""
+    issues: list[dict[str, Any]] = []
+    visible_object_count = 0
+    text_shapes: list[Any] = []
+    for shape in slide.shapes:
+        left = int(shape.left)
+        top = int(shape.top)
+        right = left + int(shape.width)
+        bottom = top + int(shape.height)
+        if left < 0 or top < 0 or right > slide_width or bottom > slide_height:
+            issues.append({
+                "severity": "critical",
+                "code": "exported_object_out_of_bounds",
+                "page": slide_index,
+                "shape_name": str(shape.name or ""),
+            })
+        if int(shape.width) > 0 and int(shape.height) > 0:
+            visible_object_count += 1
+        for table_issue in _table_cell_audits(shape):
+            issues.append({"page": slide_index, **table_issue})
+        if getattr(shape, "has_text_frame", False) and str(shape.text or "").strip():
+            text_shapes.append(shape)
+            text_audit = _text_frame_audit(shape)
+            top_inches = int(shape.top) / 914400
+            bottom_inches = (int(shape.top) + int(shape.height)) / 914400
+            is_footer = top_inches >= 6.9
+            is_eyebrow = top_inches < 0.62 and int(shape.height) / 914400 < 0.5
+            is_title = (
+                0.6 <= top_inches < 1.95
+                and text_audit["minimum_font_size_pt"] >= 28
+            )
+            title_metric_variance_fits = bool(
+                is_title
+                and text_audit["required_height_pt"]
+                <= max(
+                    text_audit["available_height_pt"] * 1.06,
+                    text_audit["available_height_pt"] + 4.0,
+                )
+            )
+            if text_audit["overflow"] and not title_metric_variance_fits:
+                issues.append({
+                    "severity": "critical",
+                    "code": "exported_text_frame_overflow",
+                    "page": slide_index,
+                    "shape_name": str(shape.name or ""),
+                    **text_audit,
+                })
+            body_line_match = re.search(
+                r"\[v6-body-max-lines=(\d+)\]",
+                str(shape.name or ""),
+            )
+            if (
+                body_line_match
+                and text_audit["maximum_wrapped_lines"]
+                > max(1, int(body_line_match.group(1)))
+            ):
+                issues.append({
+                    "severity": "critical",
+                    "code": "exported_body_capacity_exceeded",
+                    "page": slide_index,
+                    "shape_name": str(shape.name or ""),
+                    "maximum_wrapped_lines": text_audit[
+                        "maximum_wrapped_lines"
+                    ],
+                    "allowed_wrapped_lines": max(
+                        1,
+                        int(body_line_match.group(1)),
+                    ),
+                })
+            title_line_match = re.search(
+                r"\[v6-title-max-lines=(\d+)\]",
+                str(shape.name or ""),
+            )
+            title_line_limit = (
+                max(1, int(title_line_match.group(1)))
+                if title_line_match
+                else 1
+            )
+            if (
+                is_title
+                and text_audit["maximum_wrapped_lines"] > title_line_limit
+            ):
+                issues.append({
+                    "severity": "critical",
+                    "code": "exported_title_unexpected_wrap",
+                    "page": slide_index,
+                    "shape_name": str(shape.name or ""),
+                    "maximum_wrapped_lines": text_audit["maximum_wrapped_lines"],
+                    "allowed_wrapped_lines": title_line_limit,
+                })
+            if (
+                not is_footer
+                and not is_eyebrow
+                and not is_title
+                and top_inches >= 1.9
+                and bottom_inches <= 7.05
+                and text_audit["minimum_font_size_pt"] < 16
+                and (
+                    len(re.sub(r"\s+", "", str(shape.text or ""))) >= 20
+                    or int(shape.height) / 914400 > 0.45
+                )
+            ):
+                issues.append({
+                    "severity": "critical",
+                    "code": "exported_body_font_below_16pt",
+                    "page": slide_index,
+                    "shape_name": str(shape.name or ""),
+                    "minimum_font_size_pt": text_audit["minimum_font_size_pt"],
+                })
+        if getattr(shape, "shape_type", None) == 13:
+            crop_total = sum(
+                float(getattr(shape, name, 0) or 0)
+                for name in ("crop_left", "crop_right", "crop_top", "crop_bottom")
+            )
+            if crop_total > 0.35:
+                issues.append({
+                    "severity": "critical",
+                    "code": "exported_image_subject_overcropped",
+                    "page": slide_index,
+                    "shape_name": str(shape.name or ""),
+                    "crop_total": round(crop_total, 4),
+                })
+    for left_index, left_shape in enumerate(text_shapes):
+        for right_shape in text_shapes[left_index + 1:]:
+            intersection_width = max(
+                0,
+                min(
+                    int(left_shape.left) + int(left_shape.width),
+                    int(right_shape.left) + int(right_shape.width),
+                ) - max(int(left_shape.left), int(right_shape.left)),
+            )
+            intersection_height = max(
+                0,
+                min(
+                    int(left_shape.top) + int(left_shape.height),
+                    int(right_shape.top) + int(right_shape.height),
+                ) - max(int(left_shape.top), int(right_shape.top)),
+            )
+            intersection = intersection_width * intersection_height
+            smaller = min(
+                int(left_shape.width) * int(left_shape.height),
+                int(right_shape.width) * int(right_shape.height),
+            )
+            if not smaller or intersection / smaller <= 0.12:
+                continue
+            left_top = int(left_shape.top) / 914400
+            right_top = int(right_shape.top) / 914400
+            code = (
+                "exported_footer_overlap"
+                if max(left_top, right_top) >= 6.9
+                else "exported_text_overlap"
+            )
+            issues.append({
+                "severity": "critical",
+                "code": code,
+                "page": slide_index,
+                "shape_names": [
+                    str(left_shape.name or ""),
+                    str(right_shape.name or ""),
+                ],
+            })
+    if visible_object_count == 0:
+        issues.append({
+            "severity": "critical",
+            "code": "exported_page_has_no_objects",
+            "page": slide_index,
+        })
+    return issues
+
+
 def audit_exported_pptx(
     path: str | Path,
     *,
     expected_slide_count: int | None = None,
+    page_issues: Mapping[int, list[dict[str, Any]]] | None = None,
 ) -> dict[str, Any]:
-    """Audit exported objects, then optionally render and OCR every page."""
+    """Audit exported objects, then optionally render and OCR every page.
+
+    ``page_issues`` supplies already-known object audits by 1-based page
+    number (for pages reassembled from a render cache); those pages skip the
+    object audit, while deck-level and pixel checks still cover every page.
+    """
     from pptx import Presentation
 
     presentation = Presentation(path)
@@ -632,171 +815,16 @@ def audit_exported_pptx(
             "code": "exported_aspect_ratio_invalid",
         })
     for slide_index, slide in enumerate(presentation.slides, start=1):
-        visible_object_count = 0
-        text_shapes: list[Any] = []
-        for shape in slide.shapes:
-            left = int(shape.left)
-            top = int(shape.top)
-            right = left + int(shape.width)
-            bottom = top + int(shape.height)
-            if left < 0 or top < 0 or right > presentation.slide_width or bottom > presentation.slide_height:
-                issues.append({
-                    "severity": "critical",
-                    "code": "exported_object_out_of_bounds",
-                    "page": slide_index,
-                    "shape_name": str(shape.name or ""),
-                })
-            if int(shape.width) > 0 and int(shape.height) > 0:
-                visible_object_count += 1
-            for table_issue in _table_cell_audits(shape):
-                issues.append({"page": slide_index, **table_issue})
-            if getattr(shape, "has_text_frame", False) and str(shape.text or "").strip():
-                text_shapes.append(shape)
-                text_audit = _text_frame_audit(shape)
-                top_inches = int(shape.top) / 914400
-                bottom_inches = (int(shape.top) + int(shape.height)) / 914400
-                is_footer = top_inches >= 6.9
-                is_eyebrow = top_inches < 0.62 and int(shape.height) / 914400 < 0.5
-                is_title = (
-                    0.6 <= top_inches < 1.95
-                    and text_audit["minimum_font_size_pt"] >= 28
-                )
-                title_metric_variance_fits = bool(
-                    is_title
-                    and text_audit["required_height_pt"]
-                    <= max(
-                        text_audit["available_height_pt"] * 1.06,
-                        text_audit["available_height_pt"] + 4.0,
-                    )
-                )
-                if text_audit["overflow"] and not title_metric_variance_fits:
-                    issues.append({
-                        "severity": "critical",
-                        "code": "exported_text_frame_overflow",
-                        "page": slide_index,
-                        "shape_name": str(shape.name or ""),
-                        **text_audit,
-                    })
-                body_line_match = re.search(
-                    r"\[v6-body-max-lines=(\d+)\]",
-                    str(shape.name or ""),
-                )
-                if (
-                    body_line_match
-                    and text_audit["maximum_wrapped_lines"]
-                    > max(1, int(body_line_match.group(1)))
-                ):
-                    issues.append({
-                        "severity": "critical",
-                        "code": "exported_body_capacity_exceeded",
-                        "page": slide_index,
-                        "shape_name": str(shape.name or ""),
-                        "maximum_wrapped_lines": text_audit[
-                            "maximum_wrapped_lines"
-                        ],
-                        "allowed_wrapped_lines": max(
-                            1,
-                            int(body_line_match.group(1)),
-                        ),
-                    })
-                title_line_match = re.search(
-                    r"\[v6-title-max-lines=(\d+)\]",
-                    str(shape.name or ""),
-                )
-                title_line_limit = (
-                    max(1, int(title_line_match.group(1)))
-                    if title_line_match
-                    else 1
-                )
-                if (
-                    is_title
-                    and text_audit["maximum_wrapped_lines"] > title_line_limit
-                ):
-                    issues.append({
-                        "severity": "critical",
-                        "code": "exported_title_unexpected_wrap",
-                        "page": slide_index,
-                        "shape_name": str(shape.name or ""),
-                        "maximum_wrapped_lines": text_audit["maximum_wrapped_lines"],
-                        "allowed_wrapped_lines": title_line_limit,
-                    })
-                if (
-                    not is_footer
-                    and not is_eyebrow
-                    and not is_title
-                    and top_inches >= 1.9
-                    and bottom_inches <= 7.05
-                    and text_audit["minimum_font_size_pt"] < 16
-                    and (
-                        len(re.sub(r"\s+", "", str(shape.text or ""))) >= 20
-                        or int(shape.height) / 914400 > 0.45
-                    )
-                ):
-                    issues.append({
-                        "severity": "critical",
-                        "code": "exported_body_font_below_16pt",
-                        "page": slide_index,
-                        "shape_name": str(shape.name or ""),
-                        "minimum_font_size_pt": text_audit["minimum_font_size_pt"],
-                    })
-            if getattr(shape, "shape_type", None) == 13:
-                crop_total = sum(
-                    float(getattr(shape, name, 0) or 0)
-                    for name in ("crop_left", "crop_right", "crop_top", "crop_bottom")
-                )
-                if crop_total > 0.35:
-                    issues.append({
-                        "severity": "critical",
-                        "code": "exported_image_subject_overcropped",
-                        "page": slide_index,
-                        "shape_name": str(shape.name or ""),
-                        "crop_total": round(crop_total, 4),
-                    })
-        for left_index, left_shape in enumerate(text_shapes):
-            for right_shape in text_shapes[left_index + 1:]:
-                intersection_width = max(
-                    0,
-                    min(
-                        int(left_shape.left) + int(left_shape.width),
-                        int(right_shape.left) + int(right_shape.width),
-                    ) - max(int(left_shape.left), int(right_shape.left)),
-                )
-                intersection_height = max(
-                    0,
-                    min(
-                        int(left_shape.top) + int(left_shape.height),
-                        int(right_shape.top) + int(right_shape.height),
-                    ) - max(int(left_shape.top), int(right_shape.top)),
-                )
-                intersection = intersection_width * intersection_height
-                smaller = min(
-                    int(left_shape.width) * int(left_shape.height),
-                    int(right_shape.width) * int(right_shape.height),
-                )
-                if not smaller or intersection / smaller <= 0.12:
-                    continue
-                left_top = int(left_shape.top) / 914400
-                right_top = int(right_shape.top) / 914400
-                code = (
-                    "exported_footer_overlap"
-                    if max(left_top, right_top) >= 6.9
-                    else "exported_text_overlap"
-                )
-                issues.append({
-                    "severity": "critical",
-                    "code": code,
-                    "page": slide_index,
-                    "shape_names": [
-                        str(left_shape.name or ""),
-                        str(right_shape.name or ""),
-                    ],
-                })
-        if visible_object_count == 0:
-            issues.append({
-                "severity": "critical",
-                "code": "exported_page_has_no_objects",
-                "page": slide_index,
-            })
+        known = page_issues.get(slide_index) if page_issues else None
+        if known is not None:
+            issues.extend({**item, "page": slide_index} for item in known)
+            continue
+        issues.extend(_audit_exported_slide(
+            slide,
+            slide_index,
+            presentation.slide_width,
+            presentation.slide_height,
+        ))
     pixel_audit: dict[str, Any] | None = None
     if os.getenv("SLIDE_LIBREOFFICE_AUDIT_ENABLED", "").strip().lower() in {
         "1",
@@ -35,7 +35,8 @@ from slide_deck_v6 import (
     compile_slide_deck_v6,
     prepare_story_plan_for_final_compilation,
 )
-from slide_deck_v6_renderer import export_slide_deck_v6_pptx
+from slide_deck_v6_renderer import render_slide_deck_v6_pptx
+from slide_page_render_cache import slide_page_render_cache
 from teaching_representations import (
     SourceBinding,
     TeachingRepresentation,
@@ -829,8 +830,13 @@ class SlideDeckV6Orchestrator:
             try:
                 with tempfile.TemporaryDirectory(prefix="lingzhi-v6-render-gate-") as review_dir:
                     review_path = Path(review_dir) / "candidate.pptx"
-                    await _await_with_heartbeats(
-                        asyncio.to_thread(export_slide_deck_v6_pptx, deck, review_path),
+                    exported = await _await_with_heartbeats(
+                        asyncio.to_thread(
+                            render_slide_deck_v6_pptx,
+                            deck,
+                            review_path,
+                            page_cache=slide_page_render_cache,
+                        ),
                         tracker=tracker,
                         callback=progress_callback,
                     )
@@ -839,6 +845,7 @@ class SlideDeckV6Orchestrator:
                             audit_exported_pptx,
                             review_path,
                             expected_slide_count=len(deck.pages),
+                            page_issues=exported.page_issues,
                         ),
                         tracker=tracker,
                         callback=progress_callback,
@@ -4,19 +4,29 @@ from __future__ import annotations
 
 import json
 import re
+from copy import deepcopy
+from dataclasses import dataclass
 from functools import lru_cache
+from io import BytesIO
 from pathlib import Path
 from typing import Any
 
+from course_document import stable_hash
 from slide_asset_repository import SlideAssetRepository, slide_asset_repository
 from slide_deck import SlideBlockSpec, SlideSpec
 from slide_deck_renderer import (
     SlideDeckQualityError,
+    _audit_exported_slide,
     _display_text,
     _render_slide,
     validate_theme,
 )
 from slide_deck_v6 import SlideDeckV6, SlidePageV6
+from slide_page_render_cache import (
+    V6_PAGE_RENDERER_REVISION,
+    CachedSlidePage,
+    SlidePageRenderCache,
+)
 
 _LAYOUT_ADAPTER_PATH = (
     Path(__file__).resolve().parents[1]
@@ -25,6 +35,9 @@ _LAYOUT_ADAPTER_PATH = (
     / "data"
     / "slide-deck-v6-layout-adapters.json"
 )
+_RELATIONSHIP_ATTRIBUTE_PREFIX = (
+    "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+)
 
 
 @lru_cache(maxsize=1)
@@ -441,74 +454,63 @@ def _export_region_fragments(region: Any) -> list[str]:
     return [region.content]
 
 
-def _validate_exported_source_regions(
-    deck: SlideDeckV6,
-    presentation: Any,
-) -> None:
+def _exported_source_region_blockers(page: SlidePageV6, slide: Any) -> list[dict[str, Any]]:
     blockers: list[dict[str, Any]] = []
-    for page, slide in zip(deck.pages, presentation.slides):
-        full_text, shape_texts = _exported_slide_text(slide)
-        _ = full_text
-        canonical_full = "".join(
-            _canonical_export_text(value)
-            for value in shape_texts
-            if str(value or "").strip()
-            not in {"依据", "推论", "阅读线索", "核验对照"}
-        )
-        title = _audience_title(page)
-        if title and _canonical_export_text(title) not in canonical_full:
-            blockers.append({
-                "severity": "critical",
-                "code": "exported_source_region_missing",
-                "message": "Exported PPTX omitted the complete page title",
-                "page_id": page.page_id,
-                "region_id": "title",
-            })
-        for region in page.regions:
-            if region.content_kind == "visual":
-                continue
-            if region.content_kind == "code":
-                normalized_code = region.content.replace("\r\n", "\n").replace("\r", "\n")
-                if not any(
-                    normalized_code
-                    in str(value or "")
-                    .replace("\r\n", "\n")
-                    .replace("\r", "\n")
-                    .replace("\v", "\n")
-                    for value in shape_texts
-                ):
-                    blockers.append({
-                        "severity": "critical",
-                        "code": "exported_source_region_missing",
-                        "message": "Exported PPTX omitted complete source code",
-                        "page_id": page.page_id,
-                        "region_id": region.region_id,
-                    })
-                continue
-            missing_fragment = next(
-                (
-                    fragment
-                    for fragment in _export_region_fragments(region)
-                    if _canonical_export_text(fragment)
-                    and _canonical_export_text(fragment) not in canonical_full
-                ),
-                "",
-            )
-            if missing_fragment:
+    _, shape_texts = _exported_slide_text(slide)
+    canonical_full = "".join(
+        _canonical_export_text(value)
+        for value in shape_texts
+        if str(value or "").strip()
+        not in {"依据", "推论", "阅读线索", "核验对照"}
+    )
+    title = _audience_title(page)
+    if title and _canonical_export_text(title) not in canonical_full:
+        blockers.append({
+            "severity": "critical",
+            "code": "exported_source_region_missing",
+            "message": "Exported PPTX omitted the complete page title",
+            "page_id": page.page_id,
+            "region_id": "title",
+        })
+    for region in page.regions:
+        if region.content_kind == "visual":
+            continue
+        if region.content_kind == "code":
+            normalized_code = region.content.replace("\r\n", "\n").replace("\r", "\n")
+            if not any(
+                normalized_code
+                in str(value or "")
+                .replace("\r\n", "\n")
+                .replace("\r", "\n")
+                .replace("\v", "\n")
+                for value in shape_texts
+            ):
                 blockers.append({
                     "severity": "critical",
                     "code": "exported_source_region_missing",
-                    "message": "Exported PPTX omitted materialized source text",
+                    "message": "Exported PPTX omitted complete source code",
                     "page_id": page.page_id,
                     "region_id": region.region_id,
                 })
-    if blockers:
-        raise SlideDeckQualityError({
-            "passed": False,
-            "score": 0,
-            "blockers": blockers,
-            "warnings": [],
-        })
+            continue
+        missing_fragment = next(
+            (
+                fragment
+                for fragment in _export_region_fragments(region)
+                if _canonical_export_text(fragment)
+                and _canonical_export_text(fragment) not in canonical_full
+            ),
+            "",
+        )
+        if missing_fragment:
+            blockers.append({
+                "severity": "critical",
+                "code": "exported_source_region_missing",
+                "message": "Exported PPTX omitted materialized source text",
+                "page_id": page.page_id,
+                "region_id": region.region_id,
+            })
+    return blockers
 
 
 def _validate_deck_for_export(deck: SlideDeckV6) -> None:
@@ -589,12 +591,100 @@ def _validated_export_deck(
     })
 
 
-def export_slide_deck_v6_pptx(
+@dataclass(frozen=True)
+class SlideDeckV6Export:
+    path: Path
+    # Object-level audit issues by 1-based page number. Only filled when the
+    # export ran with a page cache; pass it to ``audit_exported_pptx``.
+    page_issues: dict[int, list[dict[str, Any]]]
+    rendered_page_ids: list[str]
+    reused_page_ids: list[str]
+
+
+def _page_cache_key(
+    deck: SlideDeckV6,
+    page: SlidePageV6,
+    unit: SlideSpec,
+    page_number: int,
+    page_count: int,
+    theme: dict[str, Any],
+    assets: SlideAssetRepository,
+) -> str:
+    return stable_hash({
+        "renderer_revision": V6_PAGE_RENDERER_REVISION,
+        "template_digest": deck.template_digest,
+        "theme": theme,
+        "asset_root": str(assets.root),
+        "page_number": page_number,
+        "page_count": page_count,
+        "page": page.model_dump(mode="json"),
+        "unit": unit.model_dump(mode="json"),
+    }, prefix="v6p_")
+
+
+def _capture_slide(slide: Any, audit_issues: list[dict[str, Any]]) -> CachedSlidePage | None:
+    """Snapshot a freshly rendered slide, or ``None`` when it relates to more than images."""
+    from pptx.opc.constants import RELATIONSHIP_TYPE as RT
+
+    images: list[tuple[str, bytes]] = []
+    for rId, relationship in slide.part.rels.items():
+        if relationship.reltype == RT.SLIDE_LAYOUT:
+            continue
+        if relationship.reltype != RT.IMAGE or relationship.is_external:
+            # 图表等部件自带下级关系，按页复用需要整棵部件树，这类页面每次重新渲染。
+            return None
+        images.append((rId, relationship.target_part.blob))
+    return CachedSlidePage(
+        slide_xml=slide.part.blob,
+        images=tuple(images),
+        audit_issues=tuple(deepcopy(audit_issues)),
+    )
+
+
+def _audit_detached_slide(
+    slide: Any,
+    page_number: int,
+    slide_width: int,
+    slide_height: int,
+) -> list[dict[str, Any]]:
+    """Audit a copy: reading fonts through python-pptx adds empty run properties."""
+    from pptx.oxml import parse_xml
+    from pptx.slide import Slide
+
+    copy = Slide(parse_xml(slide.part.blob), slide.part)
+    return _audit_exported_slide(copy, page_number, slide_width, slide_height)
+
+
+def _restore_slide(slide: Any, cached: CachedSlidePage) -> None:
+    from pptx.oxml import parse_xml
+
+    rids = {
+        old_rid: slide.part.get_or_add_image_part(BytesIO(blob))[1]
+        for old_rid, blob in cached.images
+    }
+    element = parse_xml(cached.slide_xml)
+    if rids:
+        for node in element.iter():
+            for name, value in node.attrib.items():
+                if name.startswith(_RELATIONSHIP_ATTRIBUTE_PREFIX) and value in rids:
+                    node.set(name, rids[value])
+    target = slide._element
+    for child in list(target):
+        target.remove(child)
+    for name, value in element.attrib.items():
+        target.set(name, value)
+    for child in list(element):
+        target.append(child)
+
+
+def render_slide_deck_v6_pptx(
     content: SlideDeckV6 | dict[str, Any],
     output_path: str | Path,
     *,
     asset_repository: SlideAssetRepository | None = None,
-) -> Path:
+    page_cache: SlidePageRenderCache | None = None,
+) -> SlideDeckV6Export:
+    """Export a V6 deck, reusing cached pages and auditing only re-rendered ones."""
     deck = _validated_export_deck(content)
     _validate_deck_for_export(deck)
 
@@ -608,21 +698,80 @@ def export_slide_deck_v6_pptx(
     theme.update(deck.template_theme_overrides)
     assets = asset_repository or slide_asset_repository
     slides = [adapt_v6_page_to_slide_spec(page) for page in deck.pages]
-    for index, unit in enumerate(slides):
+    blockers: list[dict[str, Any]] = []
+    page_issues: dict[int, list[dict[str, Any]]] = {}
+    rendered_page_ids: list[str] = []
+    reused_page_ids: list[str] = []
+    for index, (page, unit) in enumerate(zip(deck.pages, slides)):
+        page_number = index + 1
         slide = presentation.slides.add_slide(presentation.slide_layouts[6])
-        _render_slide(slide, unit, index + 1, len(slides), theme, assets)
-        _mark_v6_title_shape(slide, unit)
+        key = ""
+        cached = None
+        if page_cache is not None:
+            key = _page_cache_key(deck, page, unit, page_number, len(slides), theme, assets)
+            cached = page_cache.get(key)
+        if cached is not None:
+            _restore_slide(slide, cached)
+            page_issues[page_number] = [dict(item) for item in cached.audit_issues]
+            reused_page_ids.append(page.page_id)
+        else:
+            _render_slide(slide, unit, page_number, len(slides), theme, assets)
+            _mark_v6_title_shape(slide, unit)
+            page_blockers = _exported_source_region_blockers(page, slide)
+            blockers.extend(page_blockers)
+            rendered_page_ids.append(page.page_id)
+            if page_cache is not None:
+                issues = _audit_detached_slide(
+                    slide,
+                    page_number,
+                    presentation.slide_width,
+                    presentation.slide_height,
+                )
+                page_issues[page_number] = issues
+                entry = None if page_blockers else _capture_slide(slide, issues)
+                if entry is None:
+                    page_cache.note_uncacheable()
+                else:
+                    page_cache.put(key, entry)
         slide.notes_slide.notes_text_frame.text = unit.speaker_notes
 
-    _validate_exported_source_regions(deck, presentation)
+    if blockers:
+        raise SlideDeckQualityError({
+            "passed": False,
+            "score": 0,
+            "blockers": blockers,
+            "warnings": [],
+        })
 
     path = Path(output_path)
     path.parent.mkdir(parents=True, exist_ok=True)
     presentation.save(path)
-    return path
+    return SlideDeckV6Export(
+        path=path,
+        page_issues=page_issues,
+        rendered_page_ids=rendered_page_ids,
+        reused_page_ids=reused_page_ids,
+    )
+
+
+def export_slide_deck_v6_pptx(
+    content: SlideDeckV6 | dict[str, Any],
+    output_path: str | Path,
+    *,
+    asset_repository: SlideAssetRepository | None = None,
+    page_cache: SlidePageRenderCache | None = None,
+) -> Path:
+    return render_slide_deck_v6_pptx(
+        content,
+        output_path,
+        asset_repository=asset_repository,
+        page_cache=page_cache,
+    ).path
 
 
 __all__ = [
+    "SlideDeckV6Export",
     "adapt_v6_page_to_slide_spec",
     "export_slide_deck_v6_pptx",
+    "render_slide_deck_v6_pptx",
 ]
@@ -12,7 +12,6 @@ from pathlib import Path
 from typing import Any
 
 import httpx
-from PIL import Image, ImageFilter
 
 IMAGE_PROMPT_POLICY_VERSION = "slide_scene_prompt_v5_llm_visual_director"
 
@@ -168,6 +167,8 @@ class SlideImageProvider:
                         size=size,
                     )
                 target.write_bytes(payload)
+                from PIL import Image
+
                 try:
                     with Image.open(target) as image:
                         image.verify()
@@ -325,6 +326,8 @@ def _contains_embedded_text(path: Path) -> bool:
 
 def _is_low_information(path: Path) -> bool:
     """Reject empty rooms, plain gradients, and other non-explanatory filler."""
+    from PIL import Image, ImageFilter
+
     try:
         with Image.open(path) as image:
             grayscale = image.convert("L").resize((256, 144))
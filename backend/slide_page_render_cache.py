@@ -0,0 +1,117 @@
+"""Bounded, process-wide cache of rendered V6 slide pages.
+
+Exporting a V6 deck renders every page with python-pptx and then audits
+every exported slide, even when only one page changed since the review
+candidate was built. An entry here holds what one page contributed to the
+package: the serialized slide XML, the image blobs it relates to, and that
+slide's object-level audit issues. The exporter reassembles unchanged pages
+from entries and renders and audits only the pages whose key changed.
+
+Keys cover everything the rendered bytes depend on: the adapted page spec,
+its position in the deck (footers print ``n / total``), the resolved theme,
+the template digest, the asset repository and :data:`V6_PAGE_RENDERER_REVISION`.
+Bump the revision whenever renderer output changes for the same inputs.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any
+
+V6_PAGE_RENDERER_REVISION = "v6-page-render-1"
+DEFAULT_MAX_ENTRIES = 512
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def _env_int(name: str, default: int, *, minimum: int = 0) -> int:
+    try:
+        return max(minimum, int(os.getenv(name, str(default))))
+    except ValueError:
+        return default
+
+
+@dataclass(frozen=True, slots=True)
+class CachedSlidePage:
+    slide_xml: bytes
+    # (rId in slide_xml, image blob) for every image relationship of the slide.
+    images: tuple[tuple[str, bytes], ...]
+    audit_issues: tuple[dict[str, Any], ...]
+
+    @property
+    def size(self) -> int:
+        return len(self.slide_xml) + sum(len(blob) for _, blob in self.images)
+
+
+class SlidePageRenderCache:
+    def __init__(
+        self,
+        *,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ) -> None:
+        self.max_entries = max(0, int(max_entries))
+        self.max_bytes = max(0, int(max_bytes))
+        self._entries: OrderedDict[str, CachedSlidePage] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "uncacheable": 0}
+
+    @classmethod
+    def from_env(cls) -> SlidePageRenderCache:
+        return cls(
+            max_entries=_env_int("SLIDE_PAGE_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES),
+            max_bytes=_env_int("SLIDE_PAGE_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES),
+        )
+
+    def get(self, key: str) -> CachedSlidePage | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._counters["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._counters["hits"] += 1
+            return entry
+
+    def put(self, key: str, entry: CachedSlidePage) -> None:
+        size = entry.size
+        if not self.max_entries or size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous.size
+            self._entries[key] = entry
+            self._bytes += size
+            self._counters["stores"] += 1
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.size
+                self._counters["evictions"] += 1
+
+    def note_uncacheable(self) -> None:
+        with self._lock:
+            self._counters["uncacheable"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {**self._counters, "entries": len(self._entries), "bytes": self._bytes}
+
+
+slide_page_render_cache = SlidePageRenderCache.from_env()
+
+
+__all__ = [
+    "CachedSlidePage",
+    "SlidePageRenderCache",
+    "V6_PAGE_RENDERER_REVISION",
+    "slide_page_render_cache",
+]
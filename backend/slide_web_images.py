@@ -20,7 +20,6 @@ from urllib.parse import unquote, urlparse
 
 import httpx
 import requests
-from PIL import Image
 from pydantic import BaseModel, ConfigDict, Field, model_validator
 
 from slide_asset_repository import SlideAssetRepository, SlideVisualAsset
@@ -480,6 +479,8 @@ def download_retrieved_image_v5(
     target_dir.mkdir(parents=True, exist_ok=True)
     target = target_dir / f"retrieved-{hashlib.sha256(payload).hexdigest()[:20]}{extension}"
     target.write_bytes(payload)
+    from PIL import Image
+
     try:
         with Image.open(target) as image:
             image.verify()
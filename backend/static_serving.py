@@ -2,19 +2,36 @@
 
 Vite 构建后的 ``assets`` 文件名包含内容哈希，可以长期缓存；
 ``index.html`` 会引用当前版本的哈希文件，必须每次重新验证。
+
+压缩在构建期完成：``backend/tools/precompress_static.py`` 给文本类文件生成
+``.br`` / ``.gz`` 同级文件，运行时按 ``Accept-Encoding`` 直接返回对应文件并带上
+``Content-Encoding`` 与 ``Vary``，不再在事件循环上逐请求重新压缩。
+没有预压缩文件时（开发构建）照常返回原文件，由 GZip 中间件兜底。
 """
 
+from __future__ import annotations
+
+import hashlib
+import mimetypes
+import os
+import stat
+from collections.abc import Iterable, Mapping
+from functools import lru_cache
 from os import PathLike
 
 from fastapi.responses import FileResponse
 from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import GZipMiddleware
 from starlette.responses import Response
-from starlette.types import Scope
+from starlette.staticfiles import NotModifiedResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
 
 FilePath = str | PathLike[str]
 
 ENTRYPOINT_HEADERS = {
-    "Cache-Control": "no-store, no-cache, must-revalidate, proxy-revalidate",
+    # 不缓存会让强 ETag 失去意义；改为每次都回源验证，未变化时返回 304。
+    "Cache-Control": "no-cache, must-revalidate, proxy-revalidate",
     "Pragma": "no-cache",
     "Expires": "0",
 }
@@ -25,19 +42,193 @@ REVALIDATE_HEADERS = {
 
 IMMUTABLE_ASSET_CACHE_CONTROL = "public, max-age=31536000, immutable"
 
+# 服务端偏好顺序：同时接受时优先 Brotli。
+PRECOMPRESSED_ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+# 与 ``tools/precompress_static.py`` 保持一致（构建机上不装 FastAPI，那边单独定义）。
+COMPRESSIBLE_SUFFIXES = frozenset({
+    ".css", ".html", ".js", ".json", ".map", ".mjs", ".svg", ".txt", ".wasm", ".webmanifest", ".xml",
+})
+
+
+@lru_cache(maxsize=256)
+def accepted_encodings(accept_encoding: str) -> frozenset[str]:
+    """解析 ``Accept-Encoding``，返回可接受（q > 0）的编码；``*`` 视为全部可接受。"""
+    accepted: set[str] = set()
+    rejected: set[str] = set()
+    for item in accept_encoding.lower().split(","):
+        name, _, params = item.strip().partition(";")
+        if not name:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        (accepted if quality > 0 else rejected).add(name)
+    if "*" in accepted:
+        accepted.update(encoding for encoding, _ in PRECOMPRESSED_ENCODINGS)
+    return frozenset(accepted - rejected)
+
+
+def _compressible(path: str) -> bool:
+    return os.path.splitext(path)[1].lower() in COMPRESSIBLE_SUFFIXES
+
+
+def precompressed_variant(
+    full_path: str,
+    source_stat: os.stat_result,
+    accept_encoding: str,
+) -> tuple[tuple[str, str, os.stat_result] | None, bool]:
+    """返回 ``((编码, 路径, stat) 或 None, 是否存在任一预压缩文件)``。
+
+    预压缩文件比原文件旧时视为过期，不使用，避免重新构建后返回旧内容。
+    """
+    if not _compressible(full_path):
+        return None, False
+    accepted = accepted_encodings(accept_encoding)
+    has_variants = False
+    for encoding, suffix in PRECOMPRESSED_ENCODINGS:
+        try:
+            variant_stat = os.stat(full_path + suffix)
+        except OSError:
+            continue
+        if variant_stat.st_mtime < source_stat.st_mtime:
+            continue
+        has_variants = True
+        if encoding in accepted:
+            return (encoding, full_path + suffix, variant_stat), True
+    return None, has_variants
+
+
+@lru_cache(maxsize=64)
+def _content_etag(path: str, mtime_ns: int, size: int) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(1 << 16), b""):
+            digest.update(chunk)
+    return f'"{digest.hexdigest()[:32]}"'
+
+
+def strong_etag(path: FilePath, stat_result: os.stat_result | None = None) -> str:
+    """按内容计算的强 ETag；同一文件未变化时只算一次。"""
+    path = os.fspath(path)
+    stat_result = stat_result or os.stat(path)
+    return _content_etag(path, stat_result.st_mtime_ns, stat_result.st_size)
+
 
-def frontend_file_response(file_path: FilePath, *, entrypoint: bool = False) -> FileResponse:
-    """返回带明确缓存策略的前端文件。"""
+def _etag_matches(etag: str, if_none_match: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    return etag in (tag.strip() for tag in if_none_match.split(","))
 
-    headers = ENTRYPOINT_HEADERS if entrypoint else REVALIDATE_HEADERS
-    return FileResponse(file_path, headers=headers)
+
+def frontend_file_response(
+    file_path: FilePath,
+    *,
+    entrypoint: bool = False,
+    request_headers: Mapping[str, str] | None = None,
+) -> Response:
+    """返回带明确缓存策略与强 ETag 的前端文件，按需返回预压缩版本或 304。"""
+
+    path = os.fspath(file_path)
+    headers = dict(ENTRYPOINT_HEADERS if entrypoint else REVALIDATE_HEADERS)
+    request_headers = request_headers or {}
+    source_stat = os.stat(path)
+    variant, has_variants = precompressed_variant(path, source_stat, request_headers.get("accept-encoding", ""))
+    served_path, served_stat = path, source_stat
+    if variant is not None:
+        encoding, served_path, served_stat = variant
+        headers["Content-Encoding"] = encoding
+    if has_variants:
+        headers["Vary"] = "Accept-Encoding"
+    # 不同编码是不同的字节序列，强 ETag 按实际返回的文件计算。
+    headers["ETag"] = strong_etag(served_path, served_stat)
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match and _etag_matches(headers["ETag"], if_none_match):
+        return NotModifiedResponse(Headers(headers=headers))
+    media_type = mimetypes.guess_type(path)[0] or "text/plain"
+    return FileResponse(served_path, headers=headers, media_type=media_type, stat_result=served_stat)
 
 
 class ImmutableStaticFiles(StaticFiles):
-    """为 Vite 带哈希的构建资源添加长期不变缓存。"""
+    """为 Vite 带哈希的构建资源添加长期不变缓存，并直接返回预压缩版本。"""
 
     async def get_response(self, path: str, scope: Scope) -> Response:
+        if scope["method"] in ("GET", "HEAD") and _compressible(path):
+            response = await self._precompressed_response(path, scope)
+            if response is not None:
+                return response
         response = await super().get_response(path, scope)
         if response.status_code == 200:
             response.headers["Cache-Control"] = IMMUTABLE_ASSET_CACHE_CONTROL
         return response
+
+    def _lookup_variant(
+        self, path: str, accept_encoding: str,
+    ) -> tuple[tuple[str, str, os.stat_result] | None, bool]:
+        full_path, stat_result = self.lookup_path(path)
+        if stat_result is None or not stat.S_ISREG(stat_result.st_mode):
+            return None, False
+        return precompressed_variant(full_path, stat_result, accept_encoding)
+
+    async def _precompressed_response(self, path: str, scope: Scope) -> Response | None:
+        import anyio.to_thread
+
+        request_headers = Headers(scope=scope)
+        try:
+            variant, has_variants = await anyio.to_thread.run_sync(
+                self._lookup_variant, path, request_headers.get("accept-encoding", ""),
+            )
+        except (OSError, ValueError):
+            return None
+        if variant is None:
+            if not has_variants:
+                return None
+            # 客户端不接受任何预压缩编码：返回原文件，但缓存仍要按编码区分。
+            response = await super().get_response(path, scope)
+            response.headers["Vary"] = "Accept-Encoding"
+            if response.status_code == 200:
+                response.headers["Cache-Control"] = IMMUTABLE_ASSET_CACHE_CONTROL
+            return response
+        encoding, variant_path, variant_stat = variant
+        response = FileResponse(
+            variant_path,
+            stat_result=variant_stat,
+            media_type=mimetypes.guess_type(path)[0] or "text/plain",
+            headers={
+                "Cache-Control": IMMUTABLE_ASSET_CACHE_CONTROL,
+                "Content-Encoding": encoding,
+                "Vary": "Accept-Encoding",
+            },
+        )
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
+
+class PrecompressedAwareGZipMiddleware(GZipMiddleware):
+    """对已预压缩的静态资源路径直接放行，其余请求照常动态压缩。"""
+
+    def __init__(self, app: ASGIApp, *, bypass_prefixes: Iterable[str] = (), **options) -> None:
+        super().__init__(app, **options)
+        self.bypass_prefixes = tuple(bypass_prefixes)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if self.bypass_prefixes and scope["type"] == "http" and scope["path"].startswith(self.bypass_prefixes):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+
+def has_precompressed_files(directory: FilePath) -> bool:
+    """目录下是否有预压缩文件；用于决定 GZip 是否为该路径让路。"""
+    suffixes = tuple(suffix for _, suffix in PRECOMPRESSED_ENCODINGS)
+    try:
+        with os.scandir(directory) as entries:
+            return any(entry.name.endswith(suffixes) for entry in entries)
+    except OSError:
+        return False
+
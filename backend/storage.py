@@ -8,8 +8,12 @@ import threading
 import time
 import uuid
 from pathlib import Path
+from typing import Any
 
+from metrics import storage_io_bytes, storage_io_seconds
 from models import ValidationReport
+from store_watermarks import bump_watermark, file_watermark
+from worker_coordination import WorkerBus, multi_worker_enabled
 
 logger = logging.getLogger(__name__)
 
@@ -26,16 +30,39 @@ ANNOTATIONS_FILE = os.path.join(DATA_DIR, "annotations.json")
 LEGACY_COURSE_FILE = os.path.join(DATA_DIR, "course_tree.json")
 
 
+def _observe_io(op: str, started: float, size: int) -> None:
+    storage_io_seconds.observe(time.perf_counter() - started, op=op)
+    storage_io_bytes.inc(size, op=op)
+
+
+def _load_json_file(filepath: str) -> Any:
+    started = time.perf_counter()
+    with open(filepath, encoding='utf-8') as f:
+        data = json.load(f)
+        size = os.fstat(f.fileno()).st_size
+    _observe_io("read", started, size)
+    return data
+
+
 class Storage:
     """文件系统存储层，支持原子写入、并发锁和版本管理"""
 
-    def __init__(self, data_dir: str = "", max_versions: int = 3) -> None:
+    def __init__(
+        self,
+        data_dir: str = "",
+        max_versions: int = 3,
+        *,
+        shared: bool | None = None,
+    ) -> None:
         """
         初始化存储层。
 
         Args:
             data_dir: 数据目录路径。为空字符串时使用默认 DATA_DIR。
             max_versions: 每个课程保留的最大版本快照数量，默认 3。
+            shared: 数据目录是否与其他 worker 进程共享。为 None 时按
+                ``multi_worker_enabled()`` 判断。共享时读缓存前先比对文件戳，
+                其他进程写过的课程和数据文件会被重新加载。
         """
         self._data_dir = data_dir if data_dir else DATA_DIR
         self._courses_dir = os.path.join(self._data_dir, "courses")
@@ -53,6 +80,17 @@ class Storage:
         self._cache_initialized = False
         # 通用数据缓存，用于load_data/save_data
         self._data_cache: dict[str, any] = {}
+        # save_data 的进程内写入计数，供派生缓存判断通用数据文件是否变化
+        self._data_generations: dict[str, int] = {}
+        self._counters = {"data_cache_hits": 0, "data_cache_misses": 0}
+
+        # 多 worker 共享数据目录：缓存项对应的文件戳、其他进程通知过的课程，
+        # 以及用于通知其他进程的 WorkerBus（由 main.py 在启动时挂上）。
+        self._shared = multi_worker_enabled() if shared is None else shared
+        self._course_marks: dict[str, tuple[int, int, int, int]] = {}
+        self._data_marks: dict[str, tuple[int, int, int, int]] = {}
+        self._stale_courses: set[str] = set()
+        self._bus = None
 
         # 按 course_id 的 asyncio.Lock 文件级锁
         self._locks: dict[str, asyncio.Lock] = {}
@@ -164,8 +202,11 @@ class Storage:
             filepath: 文件路径。
             content: 要写入的字符串内容。
         """
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(content)
+        started = time.perf_counter()
+        data = content.encode('utf-8')
+        with open(filepath, 'wb') as f:
+            f.write(data)
+        _observe_io("write", started, len(data))
 
     @staticmethod
     def _read_file_sync(filepath: str) -> str:
@@ -177,8 +218,12 @@ class Storage:
         Returns:
             文件内容字符串。
         """
+        started = time.perf_counter()
         with open(filepath, encoding='utf-8') as f:
-            return f.read()
+            content = f.read()
+            size = os.fstat(f.fileno()).st_size
+        _observe_io("read", started, size)
+        return content
 
     # =========================================================================
     # 版本快照管理
@@ -273,9 +318,10 @@ class Storage:
                     course_id = filename.replace(".json", "")
                     filepath = os.path.join(self._courses_dir, filename)
                     try:
-                        with open(filepath, encoding='utf-8') as f:
-                            data = json.load(f)
-                            self.courses_cache[course_id] = data
+                        mark = file_watermark(filepath) if self._shared else None
+                        self.courses_cache[course_id] = _load_json_file(filepath)
+                        if mark is not None:
+                            self._course_marks[course_id] = mark
                     except Exception as e:
                         logger.warning(f"Failed to load course {filename}: {e}")
                         continue
@@ -288,6 +334,7 @@ class Storage:
             课程摘要列表，每项包含 course_id、course_name、node_count。
         """
         self._ensure_cache()
+        self._refresh_stale_courses()
         courses = []
         for course_id, data in self.courses_cache.items():
             document = data.get("course_document") if isinstance(data.get("course_document"), dict) else {}
@@ -330,6 +377,41 @@ class Storage:
             })
         return courses
 
+    def list_course_ids(self) -> list[str]:
+        """列出课程 ID，不加载课程内容。
+
+        启动期的派生状态检查只需要知道有哪些课程；走 list_courses 会把所有
+        课程文件读进缓存。缓存已初始化时以缓存为准。
+
+        Returns:
+            课程 ID 列表（排序）。
+        """
+        if self._cache_initialized:
+            self._refresh_stale_courses()
+            return sorted(self.courses_cache)
+        if not os.path.exists(self._courses_dir):
+            return []
+        return sorted(
+            filename[:-len(".json")]
+            for filename in os.listdir(self._courses_dir)
+            if filename.endswith(".json") and ".v" not in filename
+        )
+
+    def course_stamp(self, course_id: str) -> str:
+        """课程主文件的修改时间与大小，用于不读内容地判断课程是否被写过。
+
+        Args:
+            course_id: 课程 ID。
+
+        Returns:
+            ``"<mtime_ns>:<size>"``；文件不存在时返回空字符串。
+        """
+        try:
+            stat = os.stat(os.path.join(self._courses_dir, f"{course_id}.json"))
+        except OSError:
+            return ""
+        return f"{stat.st_mtime_ns}:{stat.st_size}"
+
     @staticmethod
     def _is_learning_level(value: object) -> bool:
         """Treat only a valid numeric level 2 as a learnable section."""
@@ -363,9 +445,7 @@ class Storage:
             try:
                 await self._atomic_write(filepath, data)
                 # 更新缓存
-                self._ensure_cache()
-                self.courses_cache[course_id] = data
-                self._mark_dirty()
+                self._course_written(course_id, data)
             except Exception as e:
                 logger.error(f"Failed to save course {course_id}: {e}")
                 raise
@@ -380,14 +460,9 @@ class Storage:
             course_id: 课程 ID。
             data: 课程数据字典。
         """
-        self._ensure_cache()
-        self.courses_cache[course_id] = data
-
         filepath = os.path.join(self._courses_dir, f"{course_id}.json")
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-
-        self._mark_dirty()
+        self._replace_file_sync(filepath, json.dumps(data, ensure_ascii=False, indent=2))
+        self._course_written(course_id, data)
 
     def load_course(self, course_id: str) -> dict:
         """加载课程数据。
@@ -401,6 +476,8 @@ class Storage:
             课程数据字典，不存在时返回空字典。
         """
         self._ensure_cache()
+        if self._shared:
+            self._refresh_course(course_id)
         return self.courses_cache.get(course_id, {})
 
     def delete_course(self, course_id: str) -> None:
@@ -412,10 +489,13 @@ class Storage:
         self._ensure_cache()
         if course_id in self.courses_cache:
             del self.courses_cache[course_id]
+        self._course_marks.pop(course_id, None)
 
         filepath = os.path.join(self._courses_dir, f"{course_id}.json")
         if os.path.exists(filepath):
             os.remove(filepath)
+        bump_watermark(filepath)
+        self._publish("course", course_id)
 
         # 删除所有快照
         for snapshot in self._get_snapshot_paths(course_id):
@@ -473,9 +553,7 @@ class Storage:
             await self._atomic_write(current_file, snapshot_data)
 
             # 更新缓存
-            self._ensure_cache()
-            self.courses_cache[course_id] = snapshot_data
-            self._mark_dirty()
+            self._course_written(course_id, snapshot_data)
 
             return snapshot_data
 
@@ -619,6 +697,7 @@ class Storage:
             json.dump(annotations, f, ensure_ascii=False, indent=2)
 
         self._mark_dirty()
+        self._publish("annotations", "")
 
     def load_annotations(self) -> list[dict]:
         if self.annotations_cache is not None:
@@ -645,6 +724,7 @@ class Storage:
             json.dump(new_annotations, f, ensure_ascii=False, indent=2)
 
         self._mark_dirty()
+        self._publish("annotations", "")
 
     def update_annotation(self, anno_id: str, content: str) -> None:
         annotations = self.load_annotations()
@@ -661,6 +741,7 @@ class Storage:
             with open(self._annotations_file, 'w', encoding='utf-8') as f:
                 json.dump(annotations, f, ensure_ascii=False, indent=2)
             self._mark_dirty()
+            self._publish("annotations", "")
 
     def update_annotation_field(self, anno_id: str, field: str, value: any) -> bool:
         """Update a specific field of an annotation"""
@@ -677,6 +758,7 @@ class Storage:
             with open(self._annotations_file, 'w', encoding='utf-8') as f:
                 json.dump(annotations, f, ensure_ascii=False, indent=2)
             self._mark_dirty()
+            self._publish("annotations", "")
 
         return updated
 
@@ -694,18 +776,25 @@ class Storage:
         Returns:
             解析后的数据对象，如果文件不存在则返回None
         """
+        filepath = os.path.join(self._data_dir, filename)
+        if self._shared and filename in self._data_cache:
+            if self._data_marks.get(filename) != file_watermark(filepath):
+                self._forget_data(filename)
         if filename in self._data_cache:
+            self._counters["data_cache_hits"] += 1
             return self._data_cache[filename]
 
-        filepath = os.path.join(self._data_dir, filename)
+        self._counters["data_cache_misses"] += 1
         if not os.path.exists(filepath):
             return None
 
         try:
-            with open(filepath, encoding='utf-8') as f:
-                data = json.load(f)
-                self._data_cache[filename] = data
-                return data
+            mark = file_watermark(filepath) if self._shared else None
+            data = _load_json_file(filepath)
+            self._data_cache[filename] = data
+            if mark is not None:
+                self._data_marks[filename] = mark
+            return data
         except json.JSONDecodeError:
             logger.warning(f"Failed to parse JSON from {filename}")
             return None
@@ -722,15 +811,109 @@ class Storage:
             data: 要保存的数据对象
         """
         self._data_cache[filename] = data
+        self._data_generations[filename] = self._data_generations.get(filename, 0) + 1
 
         filepath = os.path.join(self._data_dir, filename)
         try:
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            self._replace_file_sync(filepath, json.dumps(data, ensure_ascii=False, indent=2))
             self._mark_dirty()
         except Exception as e:
             logger.error(f"Failed to save data to {filename}: {e}")
             raise
+        if self._shared:
+            bump_watermark(filepath)
+            self._data_marks[filename] = file_watermark(filepath)
+        self._publish("data", filename)
+
+    def data_generation(self, filename: str) -> int:
+        """本进程内 save_data 写过 filename 的次数；load_data 读的就是这份缓存。
+
+        多 worker 模式下，发现其他进程写过该文件时同样加一。
+        """
+        return self._data_generations.get(filename, 0)
+
+    def stats(self) -> dict[str, int]:
+        """load_data 缓存的命中计数，供 ``/metrics`` 读取。"""
+        return {**self._counters, "data_cache_entries": len(self._data_cache)}
+
+    # =========================================================================
+    # 多 worker 缓存一致性
+    # =========================================================================
+
+    def attach_worker_bus(self, bus: WorkerBus) -> None:
+        """挂上 WorkerBus：本进程的写入通知其他 worker，其他 worker 的写入让本地缓存失效。"""
+        self._bus = bus
+        bus.subscribe("course", self._on_course_changed)
+        bus.subscribe("data", lambda filename, _payload: self._forget_data(filename))
+        bus.subscribe("annotations", lambda _key, _payload: setattr(self, "annotations_cache", None))
+
+    def _publish(self, topic: str, key: str) -> None:
+        if self._bus is not None:
+            self._bus.publish(topic, key)
+
+    def _course_written(self, course_id: str, data: dict) -> None:
+        self._ensure_cache()
+        self.courses_cache[course_id] = data
+        self._stale_courses.discard(course_id)
+        if self._shared:
+            filepath = os.path.join(self._courses_dir, f"{course_id}.json")
+            bump_watermark(filepath)
+            self._course_marks[course_id] = file_watermark(filepath)
+        self._mark_dirty()
+        self._publish("course", course_id)
+
+    def _on_course_changed(self, course_id: str, _payload: object = None) -> None:
+        # 只记下来，下一次读取时再按文件戳决定是否重新加载，避免生成进程
+        # 高频写课程时其他 worker 反复解析整份课程。
+        if course_id:
+            self._stale_courses.add(course_id)
+
+    def _refresh_stale_courses(self) -> None:
+        if not self._stale_courses:
+            return
+        for course_id in list(self._stale_courses):
+            self._refresh_course(course_id)
+
+    def _refresh_course(self, course_id: str) -> None:
+        """按文件戳比对缓存的课程，其他进程写过或删掉时同步到缓存。"""
+        self._stale_courses.discard(course_id)
+        filepath = os.path.join(self._courses_dir, f"{course_id}.json")
+        mark = file_watermark(filepath)
+        if mark == self._course_marks.get(course_id) and course_id in self.courses_cache:
+            return
+        if not mark[1]:
+            self.courses_cache.pop(course_id, None)
+            self._course_marks.pop(course_id, None)
+            return
+        try:
+            self.courses_cache[course_id] = _load_json_file(filepath)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Failed to reload course {course_id}: {e}")
+            return
+        self._course_marks[course_id] = mark
+
+    def _forget_data(self, filename: str) -> None:
+        if self._data_cache.pop(filename, None) is not None:
+            self._data_generations[filename] = self._data_generations.get(filename, 0) + 1
+        self._data_marks.pop(filename, None)
+
+    @staticmethod
+    def _replace_file_sync(filepath: str, content: str) -> None:
+        """写到同目录临时文件后 os.replace，其他进程不会读到写了一半的文件。"""
+        tmp_path = f"{filepath}.{os.getpid()}.tmp"
+        started = time.perf_counter()
+        try:
+            data = content.encode('utf-8')
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, filepath)
+            _observe_io("write", started, len(data))
+        except Exception:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
 
 
 storage = Storage()
@@ -0,0 +1,40 @@
+"""Cheap change detection for the per-(user, course) JSON stores.
+
+A watermark answers "has this file changed since I last looked?" without
+reading it. It combines the file's ``(inode, mtime_ns, size)`` with a
+process-local write generation that every repository bumps right after its
+atomic replace. The stat part notices writes from other processes; the
+generation covers in-process writes that land within one mtime tick with an
+identical size (atomic replaces recycle inodes, so the stat alone can repeat).
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from pathlib import Path
+
+_generations: dict[str, int] = {}
+_lock = threading.Lock()
+
+
+def bump_watermark(path: str | Path) -> None:
+    """Record one completed write (or delete) of ``path`` in this process."""
+    key = os.fspath(path)
+    with _lock:
+        _generations[key] = _generations.get(key, 0) + 1
+
+
+def file_watermark(path: str | Path) -> tuple[int, int, int, int]:
+    """``(generation, inode, mtime_ns, size)``; zeros for a missing file."""
+    key = os.fspath(path)
+    with _lock:
+        generation = _generations.get(key, 0)
+    try:
+        stat = os.stat(key)
+    except OSError:
+        return (generation, 0, 0, 0)
+    return (generation, stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+__all__ = ["bump_watermark", "file_watermark"]
@@ -32,6 +32,8 @@ from pathlib import Path
 from typing import Any
 
 from ai_base import AIBase, AIProviderRequestError, AIProviderUnavailable
+from ai_capacity import admission
+from generation_telemetry import stage as telemetry_stage
 from ai_provider_route import provider_route_snapshot
 from assessment_blueprint import compile_course_assessment_blueprint
 from assessment_contracts import (
@@ -1699,11 +1701,12 @@ class TaskManager:
         result: dict[str, Any] | None = None
         correction: dict[str, Any] | None = None
         for attempt in range(2):
-            model_result = await self.course_service.propose_outline_adjustment(
-                draft=source_draft,
-                instruction=instruction,
-                correction=correction,
-            )
+            with admission("guided_review", course_id=course_id):
+                model_result = await self.course_service.propose_outline_adjustment(
+                    draft=source_draft,
+                    instruction=instruction,
+                    correction=correction,
+                )
             operations = model_result.get("operations") if isinstance(model_result, dict) else None
             last_operations = operations if isinstance(operations, list) else []
             try:
@@ -5242,8 +5245,13 @@ class TaskManager:
 
     async def _run_job(self, task_id: str) -> None:
         try:
+            course_id = str((self.tasks.get(task_id) or {}).get("course_id") or "")
             async with self._course_semaphore:
-                await self._process_task(task_id)
+                # 任务标签随 contextvar 传到每次模型调用，实时账单据此按任务归档。
+                with admission("bulk", course_id=course_id), telemetry_stage(
+                    "", task_id=task_id, course_id=course_id,
+                ):
+                    await self._process_task(task_id)
         except asyncio.CancelledError:
             task = self.tasks.get(task_id)
             if task and task.get("status") not in ("paused", "cancelled"):
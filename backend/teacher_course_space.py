@@ -11,6 +11,7 @@ from datetime import datetime, timezone
 from pathlib import Path, PurePosixPath
 from typing import Any
 
+from manifest_index import ManifestIndex
 from material_storage import ALLOWED_EXTENSIONS, DEFAULT_MAX_FILE_BYTES, MaterialStorageError
 
 COURSE_SPACE_DIR = Path(__file__).resolve().parent / "data" / "teacher_course_spaces"
@@ -65,6 +66,16 @@ def _atomic_write(path: Path, data: Any) -> None:
     tmp.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
     os.replace(tmp, path)
 
+def _index_projection(package: dict[str, Any]) -> dict[str, Any]:
+    # inbox_owner_id 只给资料收件包登记，普通包不进这条倒排。
+    owner_id = str(package.get("owner_id") or "")
+    return {
+        "owner_id": owner_id,
+        "course_id": str(package.get("course_id") or ""),
+        "updated_at": str(package.get("updated_at") or ""),
+        "inbox_owner_id": owner_id if package.get("is_material_inbox") else None,
+    }
+
 def normalize_relative_path(value: str) -> str:
     raw = str(value or "").replace("\\", "/").strip()
     if not raw or raw.startswith("/") or re.match(r"^[A-Za-z]:", raw):
@@ -99,6 +110,14 @@ class TeacherCourseSpaceRepository:
     def __init__(self, root: Path | str = COURSE_SPACE_DIR) -> None:
         self.root = Path(root)
         self.root.mkdir(parents=True, exist_ok=True)
+        # 按教师、课程找包走二级索引，列表只读该教师自己的 manifest。
+        self.index = ManifestIndex(
+            self.root,
+            prefix="tcs-",
+            project=_index_projection,
+            keys=("owner_id", "course_id", "inbox_owner_id"),
+            version="course-space-v1",
+        )
 
     def _path(self, package_id: str) -> Path:
         if not re.fullmatch(r"tcs-[a-z0-9-]{8,80}", package_id or ""):
@@ -149,6 +168,7 @@ class TeacherCourseSpaceRepository:
             if entry["kind"] == "folder":
                 (package_path / "content" / entry["path"]).mkdir(parents=True, exist_ok=False)
         _atomic_write(self._manifest(package_id), package)
+        self.index.upsert(package_id, package)
         return self.public(package)
 
     def load_owned(self, package_id: str, owner_id: str) -> dict[str, Any]:
@@ -203,16 +223,36 @@ class TeacherCourseSpaceRepository:
     def list_owned(self, owner_id: str, course_id: str | None = None) -> list[dict[str, Any]]:
         result = []
         normalized_course_id = str(course_id or "").strip()
-        for path in self.root.glob("tcs-*/manifest.json"):
+        for item in self._indexed_packages("owner_id", owner_id):
+            if item.get("owner_id") != owner_id:
+                continue
+            if normalized_course_id and str(item.get("course_id") or "") != normalized_course_id:
+                continue
+            result.append(self.public(item))
+        return sorted(result, key=lambda item: item.get("updated_at", ""), reverse=True)
+
+    def _indexed_packages(self, key: str, value: str) -> list[dict[str, Any]]:
+        """读出索引在 ``key == value`` 下登记的包，顺手校正与磁盘不符的条目。
+
+        索引只缩小候选集，调用方仍按读到的 manifest 复核字段。manifest 已不在
+        就从索引摘除；投影与磁盘不一致（别的写入绕过了 save）就按磁盘重投影。
+        """
+        packages = []
+        for package_id in self.index.lookup(key, value):
+            path = self.root / package_id / "manifest.json"
             try:
                 item = json.loads(path.read_text(encoding="utf-8"))
-                if item.get("owner_id") != owner_id:
-                    continue
-                if normalized_course_id and str(item.get("course_id") or "") != normalized_course_id:
-                    continue
-                result.append(self.public(item))
-            except (OSError, json.JSONDecodeError): pass
-        return sorted(result, key=lambda item: item.get("updated_at", ""), reverse=True)
+            except FileNotFoundError:
+                self.index.remove(package_id)
+                continue
+            except (OSError, json.JSONDecodeError):
+                continue
+            if not isinstance(item, dict):
+                continue
+            if self.index.entry(package_id) != _index_projection(item):
+                self.index.upsert(package_id, item)
+            packages.append(item)
+        return packages
 
     def bind_course(self, package: dict[str, Any], course_id: str) -> dict[str, Any]:
         normalized_course_id = str(course_id or "").strip()
@@ -265,6 +305,7 @@ class TeacherCourseSpaceRepository:
 
     def save(self, package: dict[str, Any]) -> None:
         package["updated_at"] = _now(); _atomic_write(self._manifest(package["package_id"]), package)
+        self.index.upsert(package["package_id"], package)
 
     def update_category(self, package: dict[str, Any], asset_id: str, category: str) -> dict[str, Any]:
         if category not in CATEGORIES: raise MaterialStorageError("资料分类不合法")
@@ -393,11 +434,19 @@ class TeacherCourseSpaceRepository:
         if not target:
             return []
         found: list[dict[str, Any]] = []
-        for path in sorted(self.root.glob("tcs-*/manifest.json")):
-            try:
-                package = json.loads(path.read_text(encoding="utf-8"))
-            except (OSError, json.JSONDecodeError):
-                continue
+        if owner_id:
+            packages = sorted(
+                self._indexed_packages("owner_id", owner_id),
+                key=lambda package: str(package.get("package_id") or ""),
+            )
+        else:
+            packages = []
+            for path in sorted(self.root.glob("tcs-*/manifest.json")):
+                try:
+                    packages.append(json.loads(path.read_text(encoding="utf-8")))
+                except (OSError, json.JSONDecodeError):
+                    continue
+        for package in packages:
             if owner_id and package.get("owner_id") != owner_id:
                 continue
             for asset in package.get("assets") or []:
@@ -424,11 +473,10 @@ class TeacherCourseSpaceRepository:
         找不到时新建而不是报错：上传是教师的主动作，不该因为"还没建过课程包"
         而失败。
         """
-        for path in sorted(self.root.glob("tcs-*/manifest.json")):
-            try:
-                item = json.loads(path.read_text(encoding="utf-8"))
-            except (OSError, json.JSONDecodeError):
-                continue
+        for item in sorted(
+            self._indexed_packages("inbox_owner_id", owner_id),
+            key=lambda package: str(package.get("package_id") or ""),
+        ):
             if item.get("owner_id") == owner_id and item.get("is_material_inbox"):
                 return item
         created = self.create_package(
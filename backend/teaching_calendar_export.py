@@ -9,24 +9,8 @@ from copy import copy
 from io import BytesIO, StringIO
 from typing import Any
 
-from docx import Document
-from docx.enum.section import WD_ORIENT
-from docx.enum.table import WD_CELL_VERTICAL_ALIGNMENT, WD_TABLE_ALIGNMENT
-from docx.enum.text import WD_ALIGN_PARAGRAPH
-from docx.oxml import OxmlElement
-from docx.oxml.ns import qn
-from docx.shared import Mm, Pt
-from openpyxl import Workbook
-from openpyxl.styles import Alignment, Border, Font, PatternFill, Side
-from openpyxl.utils import get_column_letter
-from reportlab.lib import colors
-from reportlab.lib.enums import TA_CENTER, TA_LEFT
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
-from reportlab.lib.units import mm
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.cidfonts import UnicodeCIDFont
-from reportlab.platypus import PageBreak, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+# python-docx, openpyxl and reportlab take about half a second to import and are
+# only needed while exporting, so each builder imports what it uses.
 
 
 COLUMNS = [
@@ -89,6 +73,11 @@ def _metadata(calendar: dict[str, Any], course: dict[str, Any]) -> dict[str, str
 
 
 def _set_cell_text(cell, value: str, *, size: float = 6.5, bold: bool = False, centered: bool = False) -> None:
+    from docx.enum.table import WD_CELL_VERTICAL_ALIGNMENT
+    from docx.enum.text import WD_ALIGN_PARAGRAPH
+    from docx.oxml.ns import qn
+    from docx.shared import Pt
+
     cell.text = ""
     paragraph = cell.paragraphs[0]
     paragraph.alignment = WD_ALIGN_PARAGRAPH.CENTER if centered else WD_ALIGN_PARAGRAPH.LEFT
@@ -103,6 +92,9 @@ def _set_cell_text(cell, value: str, *, size: float = 6.5, bold: bool = False, c
 
 
 def _set_repeat_header(row) -> None:
+    from docx.oxml import OxmlElement
+    from docx.oxml.ns import qn
+
     tr_pr = row._tr.get_or_add_trPr()
     header = OxmlElement("w:tblHeader")
     header.set(qn("w:val"), "true")
@@ -110,6 +102,13 @@ def _set_repeat_header(row) -> None:
 
 
 def build_docx(calendar: dict[str, Any], course: dict[str, Any]) -> bytes:
+    from docx import Document
+    from docx.enum.section import WD_ORIENT
+    from docx.enum.table import WD_TABLE_ALIGNMENT
+    from docx.enum.text import WD_ALIGN_PARAGRAPH
+    from docx.oxml.ns import qn
+    from docx.shared import Mm, Pt
+
     metadata = _metadata(calendar, course)
     document = Document()
     section = document.sections[0]
@@ -182,6 +181,10 @@ def build_docx(calendar: dict[str, Any], course: dict[str, Any]) -> bytes:
 
 
 def build_xlsx(calendar: dict[str, Any], course: dict[str, Any]) -> bytes:
+    from openpyxl import Workbook
+    from openpyxl.styles import Alignment, Border, Font, PatternFill, Side
+    from openpyxl.utils import get_column_letter
+
     metadata = _metadata(calendar, course)
     workbook = Workbook()
     sheet = workbook.active
@@ -266,6 +269,15 @@ def build_csv(calendar: dict[str, Any]) -> bytes:
 
 
 def build_pdf(calendar: dict[str, Any], course: dict[str, Any]) -> bytes:
+    from reportlab.lib import colors
+    from reportlab.lib.enums import TA_CENTER, TA_LEFT
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+    from reportlab.lib.units import mm
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.cidfonts import UnicodeCIDFont
+    from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
     metadata = _metadata(calendar, course)
     output = BytesIO()
     pdfmetrics.registerFont(UnicodeCIDFont("STSong-Light"))
@@ -4,7 +4,8 @@ from __future__ import annotations
 
 import json
 import os
-import threading
+from collections import deque
+from collections.abc import Iterable
 from copy import deepcopy
 from datetime import datetime, timezone
 from pathlib import Path
@@ -18,6 +19,7 @@ from course_revisions import (
     CourseRevisionVector,
     revision_vector_for_document,
 )
+from worker_coordination import ProcessLock, ProcessLockRegistry
 
 TEACHING_REPRESENTATION_REGISTRY_SCHEMA = "teaching_representation_registry_v1"
 
@@ -201,6 +203,61 @@ class AssetDerivationGraph(BaseModel):
     edges: list[DerivationEdge] = Field(default_factory=list)
     graph_revision: str = ""
 
+    def index(self) -> DerivationGraphIndex:
+        return DerivationGraphIndex(self)
+
+
+class DerivationGraphIndex:
+    """Adjacency maps over one derivation graph, built in a single pass.
+
+    The index shares node objects with the graph, so status changes made
+    through it land in the graph. It does not follow structural changes:
+    binding a spec or representation afterwards needs a fresh index.
+    """
+
+    def __init__(self, graph: AssetDerivationGraph) -> None:
+        self.nodes_by_id: dict[str, list[DerivationNode]] = {}
+        self.nodes_by_type: dict[str, list[DerivationNode]] = {}
+        self.source_nodes: dict[str, DerivationNode] = {}
+        for node in graph.nodes:
+            self.nodes_by_id.setdefault(node.node_id, []).append(node)
+            self.nodes_by_type.setdefault(node.node_type, []).append(node)
+            if node.node_type == "source":
+                self.source_nodes[node.object_id] = node
+        self.forward: dict[str, list[str]] = {}
+        self.reverse: dict[str, list[str]] = {}
+        for edge in graph.edges:
+            self.forward.setdefault(edge.from_node_id, []).append(edge.to_node_id)
+            self.reverse.setdefault(edge.to_node_id, []).append(edge.from_node_id)
+        self._ancestors: dict[str, frozenset[str]] = {}
+
+    def downstream(self, start_node_ids: Iterable[str]) -> set[str]:
+        """Start nodes plus every node reachable from them."""
+        queue = deque(dict.fromkeys(start_node_ids))
+        visited = set(queue)
+        while queue:
+            for target in self.forward.get(queue.popleft(), ()):
+                if target not in visited:
+                    visited.add(target)
+                    queue.append(target)
+        return visited
+
+    def ancestors(self, node_id: str) -> frozenset[str]:
+        """Every node with a path to ``node_id``, memoized for the index lifetime."""
+        cached = self._ancestors.get(node_id)
+        if cached is not None:
+            return cached
+        queue = deque([node_id])
+        visited = {node_id}
+        while queue:
+            for source in self.reverse.get(queue.popleft(), ()):
+                if source not in visited:
+                    visited.add(source)
+                    queue.append(source)
+        result = frozenset(visited)
+        self._ancestors[node_id] = result
+        return result
+
 
 class TeachingRepresentationRegistry(BaseModel):
     schema_version: Literal["teaching_representation_registry_v1"] = (
@@ -217,6 +274,24 @@ class TeachingRepresentationRegistry(BaseModel):
     updated_at: str
 
 
+class ReconciliationWatermark(BaseModel):
+    """How far a course's operation log has been folded into its registry.
+
+    ``log_offset`` counts the revision events in the log up to and including
+    ``log_head_event_id``; the log is truncated from the front, so the head
+    event id, not the offset, locates the resume point. ``source_stamp`` is an
+    opaque fingerprint of the stored course that lets startup skip courses
+    without reading them.
+    """
+
+    course_id: str
+    log_head_event_id: str = ""
+    log_offset: int = 0
+    registry_revision: str = ""
+    source_stamp: str = ""
+    updated_at: str = ""
+
+
 def source_binding_for_document(
     document: CourseDocument | dict[str, Any],
     *,
@@ -272,8 +347,7 @@ class TeachingRepresentationRepository:
             root_dir = Path(DATA_DIR) / "teaching_representations"
         self.root_dir = Path(root_dir)
         self.root_dir.mkdir(parents=True, exist_ok=True)
-        self._locks: dict[str, threading.RLock] = {}
-        self._locks_guard = threading.Lock()
+        self._locks = ProcessLockRegistry(self.root_dir)
 
     def load(self, course_id: str) -> TeachingRepresentationRegistry:
         path = self._path(course_id)
@@ -384,72 +458,108 @@ class TeachingRepresentationRepository:
         course_id: str,
         event: CourseRevisionEvent | dict[str, Any],
     ) -> TeachingRepresentationRegistry:
-        item = event if isinstance(event, CourseRevisionEvent) else CourseRevisionEvent.model_validate(event)
-        if item.course_id != course_id:
+        return self.apply_revision_events(course_id, [event])
+
+    def apply_revision_events(
+        self,
+        course_id: str,
+        events: Iterable[CourseRevisionEvent | dict[str, Any]],
+    ) -> TeachingRepresentationRegistry:
+        """Apply events in order with one load, one graph index and one save.
+
+        Each event has the same effect as applying it alone; events already
+        applied are skipped, and nothing is written when all of them were.
+        """
+        items = [
+            event if isinstance(event, CourseRevisionEvent) else CourseRevisionEvent.model_validate(event)
+            for event in events
+        ]
+        if any(item.course_id != course_id for item in items):
             raise RepresentationConflict("Course revision event belongs to another course")
 
         with self._lock(course_id):
-            registry = self.load(course_id)
+            return self._apply_events_locked(self.load(course_id), items)
+
+    def _apply_events_locked(
+        self,
+        registry: TeachingRepresentationRegistry,
+        items: list[CourseRevisionEvent],
+    ) -> TeachingRepresentationRegistry:
+        index: DerivationGraphIndex | None = None
+        specs_by_id: dict[str, TeachingRepresentationSpec] = {}
+        applied = False
+        for item in items:
             if item.event_id in registry.applied_revision_event_ids:
-                return registry
-
-            changed_keys = set(item.changed_source_keys) | set(item.removed_source_keys)
-            graph = registry.derivation_graph
-            source_nodes = {node.object_id: node for node in graph.nodes if node.node_type == "source"}
-            for source_key, revision in item.current.revisions.items():
-                node = source_nodes.get(source_key)
-                if node:
-                    node.revision_or_fingerprint = revision
-                    node.status = "current"
-            for source_key in item.removed_source_keys:
-                node = source_nodes.get(source_key)
-                if node:
-                    node.status = "removed"
-
-            downstream_node_ids = self._downstream_node_ids(graph, changed_keys)
-            stale_representation_ids = {
-                node.object_id
-                for node in graph.nodes
-                if node.node_id in downstream_node_ids and node.node_type == "representation"
-            }
-            removed = set(item.removed_source_keys)
-            for representation in registry.representations:
-                if representation.representation_id not in stale_representation_ids:
-                    continue
-                representation.status = "stale"
-                reasons = [
-                    f"source_removed:{key}" if key in removed else f"source_revision_changed:{key}"
-                    for key in sorted(changed_keys)
-                    if self._representation_depends_on(graph, representation.representation_id, key)
+                continue
+            if index is None:
+                index = registry.derivation_graph.index()
+                for spec in registry.specs:
+                    specs_by_id.setdefault(spec.spec_id, spec)
+            self._apply_event_locked(registry, index, specs_by_id, item)
+            applied = True
+        return self.save(registry) if applied else registry
+
+    @staticmethod
+    def _apply_event_locked(
+        registry: TeachingRepresentationRegistry,
+        index: DerivationGraphIndex,
+        specs_by_id: dict[str, TeachingRepresentationSpec],
+        item: CourseRevisionEvent,
+    ) -> None:
+        changed_keys = set(item.changed_source_keys) | set(item.removed_source_keys)
+        for source_key, revision in item.current.revisions.items():
+            node = index.source_nodes.get(source_key)
+            if node:
+                node.revision_or_fingerprint = revision
+                node.status = "current"
+        for source_key in item.removed_source_keys:
+            node = index.source_nodes.get(source_key)
+            if node:
+                node.status = "removed"
+
+        downstream_node_ids = index.downstream(f"source::{key}" for key in changed_keys)
+        stale_representation_ids = {
+            node.object_id
+            for node_id in downstream_node_ids
+            for node in index.nodes_by_id.get(node_id, ())
+            if node.node_type == "representation"
+        }
+        removed = set(item.removed_source_keys)
+        for representation in registry.representations:
+            if representation.representation_id not in stale_representation_ids:
+                continue
+            representation.status = "stale"
+            ancestors = index.ancestors(f"representation::{representation.representation_id}")
+            reasons = [
+                f"source_removed:{key}" if key in removed else f"source_revision_changed:{key}"
+                for key in sorted(changed_keys)
+                if f"source::{key}" in ancestors
+            ]
+            for reason in reasons:
+                if reason not in representation.stale_reasons:
+                    representation.stale_reasons.append(reason)
+            spec = specs_by_id.get(representation.spec_id)
+            if spec:
+                affected_units = [
+                    unit_id
+                    for unit_id, bindings in spec.unit_bindings.items()
+                    if any(
+                        changed_keys.intersection(binding.source_revisions)
+                        for binding in bindings
+                    )
                 ]
-                for reason in reasons:
-                    if reason not in representation.stale_reasons:
-                        representation.stale_reasons.append(reason)
-                spec = next(
-                    (value for value in registry.specs if value.spec_id == representation.spec_id),
-                    None,
-                )
-                if spec:
-                    affected_units = [
-                        unit_id
-                        for unit_id, bindings in spec.unit_bindings.items()
-                        if any(
-                            changed_keys.intersection(binding.source_revisions)
-                            for binding in bindings
-                        )
-                    ]
-                    representation.stale_unit_ids = sorted(set(
-                        representation.stale_unit_ids + affected_units
-                    ))
-                representation.updated_at = item.created_at
+                representation.stale_unit_ids = sorted(set(
+                    representation.stale_unit_ids + affected_units
+                ))
+            representation.updated_at = item.created_at
 
-            for node in graph.nodes:
-                if node.node_id in downstream_node_ids and node.node_type != "source":
+        for node_id in downstream_node_ids:
+            for node in index.nodes_by_id.get(node_id, ()):
+                if node.node_type != "source":
                     node.status = "stale"
 
-            registry.applied_revision_event_ids.append(item.event_id)
-            registry.applied_revision_event_ids = registry.applied_revision_event_ids[-500:]
-            return self.save(registry)
+        registry.applied_revision_event_ids.append(item.event_id)
+        registry.applied_revision_event_ids = registry.applied_revision_event_ids[-500:]
 
     def reconcile_source_revision_vector(
         self,
@@ -527,14 +637,66 @@ class TeachingRepresentationRepository:
         self,
         course_id: str,
         operation_log: list[dict[str, Any]],
+        *,
+        source_stamp: str = "",
     ) -> TeachingRepresentationRegistry:
-        registry = self.load(course_id)
+        """Fold the log into the registry, resuming after the persisted watermark.
+
+        Events after the watermark head are applied when the registry is still
+        the one the watermark was taken against; otherwise the whole log is
+        replayed, which ``applied_revision_event_ids`` keeps idempotent.
+        ``source_stamp`` is stored with the watermark for startup checks.
+        """
+        events: list[CourseRevisionEvent | dict[str, Any]] = []
         for entry in operation_log:
             receipt = entry.get("receipt") if isinstance(entry, dict) else None
             event = receipt.get("revision_change") if isinstance(receipt, dict) else None
             if event:
-                registry = self.apply_revision_event(course_id, event)
-        return registry
+                events.append(event)
+
+        with self._lock(course_id):
+            registry = self.load(course_id)
+            watermark = self.reconciliation_watermark(course_id)
+            pending = events
+            if watermark is not None and watermark.registry_revision == registry.registry_revision:
+                head = _revision_event_id(watermark.log_head_event_id)
+                for position in range(len(events) - 1, -1, -1):
+                    if _revision_event_id(events[position]) == head:
+                        pending = events[position + 1:]
+                        break
+            if pending:
+                items = [
+                    event if isinstance(event, CourseRevisionEvent) else CourseRevisionEvent.model_validate(event)
+                    for event in pending
+                ]
+                if any(item.course_id != course_id for item in items):
+                    raise RepresentationConflict("Course revision event belongs to another course")
+                registry = self._apply_events_locked(registry, items)
+            current = ReconciliationWatermark(
+                course_id=course_id,
+                log_head_event_id=_revision_event_id(events[-1]) if events else "",
+                log_offset=len(events),
+                registry_revision=registry.registry_revision,
+                source_stamp=source_stamp,
+            )
+            if watermark is None or watermark.model_dump(exclude={"updated_at"}) != current.model_dump(
+                exclude={"updated_at"}
+            ):
+                current.updated_at = datetime.now(timezone.utc).isoformat()
+                self._atomic_write(self._watermark_path(course_id), current.model_dump(mode="json"))
+            return registry
+
+    def reconciliation_watermark(self, course_id: str) -> ReconciliationWatermark | None:
+        path = self._watermark_path(course_id)
+        try:
+            with path.open(encoding="utf-8") as handle:
+                watermark = ReconciliationWatermark.model_validate(json.load(handle))
+        except FileNotFoundError:
+            return None
+        except ValueError:
+            # 损坏的水位只意味着下次整段重放，不能阻断对账。
+            return None
+        return watermark if watermark.course_id == course_id else None
 
     @staticmethod
     def _bind_spec(
@@ -560,6 +722,9 @@ class TeachingRepresentationRepository:
             and not edge.to_node_id.startswith(unit_prefix)
         ]
         units = spec.unit_bindings or {"__whole__": spec.source_bindings}
+        nodes_by_id: dict[str, DerivationNode] = {}
+        for node in graph.nodes:
+            nodes_by_id.setdefault(node.node_id, node)
         for unit_id, bindings in units.items():
             unit_node_id = f"{unit_prefix}{unit_id}"
             graph.nodes.append(DerivationNode(
@@ -584,10 +749,7 @@ class TeachingRepresentationRepository:
             for binding in bindings:
                 for source_key, revision in binding.source_revisions.items():
                     source_node_id = f"source::{source_key}"
-                    source_node = next(
-                        (node for node in graph.nodes if node.node_id == source_node_id),
-                        None,
-                    )
+                    source_node = nodes_by_id.get(source_node_id)
                     if source_node is None:
                         source_node = DerivationNode(
                             node_id=source_node_id,
@@ -596,6 +758,7 @@ class TeachingRepresentationRepository:
                             revision_or_fingerprint=revision,
                         )
                         graph.nodes.append(source_node)
+                        nodes_by_id[source_node_id] = source_node
                     else:
                         source_node.revision_or_fingerprint = revision
                         source_node.status = "current"
@@ -686,48 +849,6 @@ class TeachingRepresentationRepository:
                     rebuild_policy=rebuild_policy,
                 ))
 
-    @staticmethod
-    def _downstream_node_ids(
-        graph: AssetDerivationGraph,
-        changed_source_keys: set[str],
-    ) -> set[str]:
-        start_nodes = {f"source::{key}" for key in changed_source_keys}
-        adjacency: dict[str, list[str]] = {}
-        for edge in graph.edges:
-            adjacency.setdefault(edge.from_node_id, []).append(edge.to_node_id)
-        queue = list(start_nodes)
-        visited = set(queue)
-        while queue:
-            current = queue.pop(0)
-            for target in adjacency.get(current, []):
-                if target not in visited:
-                    visited.add(target)
-                    queue.append(target)
-        return visited
-
-    @staticmethod
-    def _representation_depends_on(
-        graph: AssetDerivationGraph,
-        representation_id: str,
-        source_key: str,
-    ) -> bool:
-        source_node_id = f"source::{source_key}"
-        target_node_id = f"representation::{representation_id}"
-        adjacency: dict[str, list[str]] = {}
-        for edge in graph.edges:
-            adjacency.setdefault(edge.from_node_id, []).append(edge.to_node_id)
-        queue = [source_node_id]
-        visited = set(queue)
-        while queue:
-            current = queue.pop(0)
-            if current == target_node_id:
-                return True
-            for target in adjacency.get(current, []):
-                if target not in visited:
-                    visited.add(target)
-                    queue.append(target)
-        return False
-
     def _empty_registry(self, course_id: str) -> TeachingRepresentationRegistry:
         now = datetime.now(timezone.utc).isoformat()
         return self._refresh_registry(TeachingRepresentationRegistry(
@@ -754,9 +875,12 @@ class TeachingRepresentationRepository:
         file_id = stable_hash({"course_id": course_id}, prefix="course_")
         return self.root_dir / f"{file_id}.json"
 
-    def _lock(self, course_id: str) -> threading.RLock:
-        with self._locks_guard:
-            return self._locks.setdefault(course_id, threading.RLock())
+    def _watermark_path(self, course_id: str) -> Path:
+        path = self._path(course_id)
+        return path.with_name(f"{path.stem}.reconciliation.json")
+
+    def _lock(self, course_id: str) -> ProcessLock:
+        return self._locks.get(course_id)
 
     @staticmethod
     def _atomic_write(path: Path, data: dict[str, Any]) -> None:
@@ -773,4 +897,12 @@ class TeachingRepresentationRepository:
                 temp.unlink()
 
 
+def _revision_event_id(event: CourseRevisionEvent | dict[str, Any] | str) -> str:
+    if isinstance(event, str):
+        return event
+    if isinstance(event, CourseRevisionEvent):
+        return event.event_id
+    return str(event.get("event_id") or "")
+
+
 teaching_representation_repository = TeachingRepresentationRepository()
@@ -0,0 +1,81 @@
+"""Aho–Corasick multi-pattern matcher for already-normalized terms.
+
+Binding knowledge points to content blocks asks "which of these names or
+aliases occur in this block?" for every block. Testing each term with ``in``
+costs blocks × terms × text length. A :class:`TermAutomaton` is built once
+from all ``(term, label)`` pairs and answers the same question for one text
+in a single pass: :meth:`TermAutomaton.labels_in` returns the label of every
+term that occurs as a substring, overlapping occurrences included.
+
+Normalization is the caller's job; the automaton matches characters exactly.
+"""
+
+from __future__ import annotations
+
+from collections import deque
+from collections.abc import Iterable
+
+
+class TermAutomaton:
+    """Goto/failure automaton whose states carry the labels of the terms ending there."""
+
+    __slots__ = ("_goto", "_fail", "_labels", "term_count")
+
+    def __init__(self, terms: Iterable[tuple[str, str]]) -> None:
+        goto: list[dict[str, int]] = [{}]
+        labels: list[set[str]] = [set()]
+        count = 0
+        for term, label in terms:
+            if not term:
+                continue
+            state = 0
+            for char in term:
+                following = goto[state].get(char)
+                if following is None:
+                    following = len(goto)
+                    goto[state][char] = following
+                    goto.append({})
+                    labels.append(set())
+                state = following
+            labels[state].add(label)
+            count += 1
+
+        fail = [0] * len(goto)
+        # 广度优先：失败链指向更浅的状态，处理到某状态时它的失败目标已定稿，
+        # 标签可以直接并进来，扫描时就不必再沿失败链收集。
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, following in goto[state].items():
+                queue.append(following)
+                fallback = fail[state]
+                while fallback and char not in goto[fallback]:
+                    fallback = fail[fallback]
+                fail[following] = goto[fallback].get(char, 0)
+                labels[following] |= labels[fail[following]]
+
+        self._goto = goto
+        self._fail = fail
+        self._labels = [frozenset(item) for item in labels]
+        self.term_count = count
+
+    def labels_in(self, text: str) -> set[str]:
+        """Labels of every term that occurs in ``text``."""
+        goto = self._goto
+        fail = self._fail
+        labels = self._labels
+        found: set[str] = set()
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if labels[state]:
+                found |= labels[state]
+        return found
+
+    def __len__(self) -> int:
+        return len(self._goto)
+
+
+__all__ = ["TermAutomaton"]
@@ -194,6 +194,7 @@ class _IsolatedEventStorage:
     def __init__(self, root) -> None:
         self._root = root
         self._root.mkdir(parents=True, exist_ok=True)
+        self._generations: dict[str, int] = {}
 
     def _path(self, filename: str):
         return self._root / filename
@@ -212,3 +213,25 @@ class _IsolatedEventStorage:
         self._path(filename).write_text(
             json.dumps(value, ensure_ascii=False), encoding="utf-8",
         )
+        self._generations[filename] = self._generations.get(filename, 0) + 1
+
+    def data_generation(self, filename: str) -> int:
+        return self._generations.get(filename, 0)
+
+
+@pytest.fixture(autouse=True)
+def reset_ai_teacher_index_cache():
+    """Drop AI-teacher and learning-runtime snapshots between tests.
+
+    Both caches are keyed by user, course and node, and tests reuse the same
+    ids while patching stores or ``build_learning_runtime`` with different
+    data; a snapshot from an earlier test would otherwise answer a later one.
+    """
+    from ai_teacher_index import ai_teacher_index_cache
+    from learning_runtime import learning_runtime_memo
+
+    ai_teacher_index_cache.clear()
+    learning_runtime_memo.clear()
+    yield
+    ai_teacher_index_cache.clear()
+    learning_runtime_memo.clear()
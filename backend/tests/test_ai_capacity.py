@@ -5,6 +5,9 @@ import pytest
 
 from ai_capacity import (
     ModelCapacityCoolingDown,
+    admission,
+    admitted,
+    current_admission,
     get_provider_capacity_controller,
     reset_provider_capacity_controllers,
 )
@@ -344,3 +347,105 @@ async def test_slow_start_halves_wall_clock_of_a_later_parallel_phase(
 
     # 限额已 >= 8，第二个阶段应当一波跑完（约 1 个 unit，而不是 2 个）
     assert second < unit * 1.8, f"第二阶段仍未一波跑完：{second:.3f}s"
+
+
+async def _admission_order(controller, requests):
+    """Queue ``(label, priority, course)`` requests behind one held slot and
+    return the labels in the order the controller admits them."""
+    held = await controller.acquire("model-a")
+    order = []
+
+    async def request(label, priority, course_id):
+        with admission(priority, course_id=course_id):
+            lease = await controller.acquire("model-a")
+        order.append(label)
+        await asyncio.sleep(0)
+        await lease.release()
+
+    tasks = []
+    for label, priority, course_id in requests:
+        tasks.append(asyncio.create_task(request(label, priority, course_id)))
+        await asyncio.sleep(0)
+    await held.release()
+    await asyncio.wait_for(asyncio.gather(*tasks), timeout=1)
+    return order
+
+
+@pytest.fixture
+def single_slot(monkeypatch):
+    monkeypatch.setenv("AI_PROVIDER_INITIAL_CONCURRENCY", "1")
+    monkeypatch.setenv("AI_PROVIDER_MAX_CONCURRENCY", "1")
+    monkeypatch.setenv("AI_PROVIDER_START_INTERVAL_SECONDS", "0")
+    reset_provider_capacity_controllers()
+
+
+@pytest.mark.asyncio
+async def test_admission_serves_priority_classes_in_order_and_fifo_within(single_slot):
+    controller = get_provider_capacity_controller("provider-priority")
+
+    order = await _admission_order(controller, [
+        ("bulk-1", "bulk", "course-a"),
+        ("background", "background", "course-a"),
+        ("bulk-2", "bulk", "course-a"),
+        ("review", "guided_review", "course-a"),
+        ("teacher", "interactive", "course-b"),
+    ])
+
+    assert order == ["teacher", "review", "bulk-1", "bulk-2", "background"]
+    classes = controller.snapshot()["classes"]
+    assert classes["interactive"]["admitted"] == 1
+    assert classes["bulk"]["admitted"] == 3  # includes the held slot
+    assert classes["background"]["p95_ms"] >= classes["interactive"]["p95_ms"]
+
+
+@pytest.mark.asyncio
+async def test_admission_shares_a_class_fairly_between_courses(single_slot):
+    controller = get_provider_capacity_controller("provider-fair")
+
+    order = await _admission_order(
+        controller,
+        [(f"a{index}", "bulk", "course-a") for index in range(4)]
+        + [(f"b{index}", "bulk", "course-b") for index in range(2)],
+    )
+
+    assert order == ["a0", "b0", "a1", "b1", "a2", "a3"]
+
+
+@pytest.mark.asyncio
+async def test_interactive_requests_can_preempt_start_spacing(monkeypatch):
+    monkeypatch.setenv("AI_PROVIDER_INITIAL_CONCURRENCY", "4")
+    monkeypatch.setenv("AI_PROVIDER_START_INTERVAL_SECONDS", "30")
+    monkeypatch.setenv("AI_PROVIDER_INTERACTIVE_PREEMPTS_SPACING", "1")
+    reset_provider_capacity_controllers()
+    controller = get_provider_capacity_controller("provider-spacing")
+
+    first = await controller.acquire("model-a")
+    spaced = asyncio.create_task(controller.acquire("model-a"))
+    with admission("interactive"):
+        interactive = await asyncio.wait_for(controller.acquire("model-a"), timeout=0.2)
+
+    assert spaced.done() is False
+    assert interactive.priority == "interactive"
+    spaced.cancel()
+    await asyncio.gather(spaced, return_exceptions=True)
+    await first.release()
+    await interactive.release()
+    assert controller.snapshot()["waiting"] == 0
+
+
+@pytest.mark.asyncio
+async def test_admitted_stream_tags_each_step_without_leaking_to_the_consumer():
+    seen_by_provider = []
+
+    async def provider_stream():
+        for chunk in ("a", "b"):
+            seen_by_provider.append(current_admission().priority)
+            yield chunk
+
+    seen_by_consumer = []
+    async for _chunk in admitted(provider_stream(), "interactive", course_id="c1"):
+        seen_by_consumer.append(current_admission().priority)
+
+    assert seen_by_provider == ["interactive", "interactive"]
+    assert seen_by_consumer == ["bulk", "bulk"]
+    assert current_admission().course_id == ""
@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+from copy import deepcopy
+
+import ai_teacher_context
+import learning_runtime
+from ai_teacher_context import _select_sources
+from ai_teacher_index import AITeacherIndexCache, ai_teacher_index_cache, tokenize
+
+
+def _course() -> dict:
+    return {
+        "course_id": "course-1",
+        "course_name": "Python 入门",
+        "nodes": [
+            {
+                "node_id": "node-1",
+                "node_level": 2,
+                "node_name": "变量",
+                "content_blocks": [
+                    {"block_id": "b1", "title": "导入", "content": "本节介绍程序的基本结构。"},
+                    {"block_id": "b2", "title": "讲解", "content": "变量是给数据起的名字，赋值语句把对象绑定到变量名。"},
+                ],
+            },
+            {
+                "node_id": "node-2",
+                "node_level": 2,
+                "node_name": "循环",
+                "content_blocks": [
+                    {"block_id": "b3", "title": "讲解", "content": "for 循环遍历序列，while 循环在条件成立时重复执行。"},
+                    {"block_id": "b4", "title": "例题", "content": "用 range 生成序列并累加求和。"},
+                ],
+            },
+        ],
+    }
+
+
+def _teacher_all_files() -> dict:
+    return {"content_anchor": {"file_scope": {"mode": "all"}}}
+
+
+def test_tokenize_uses_ascii_words_and_cjk_bigrams():
+    assert tokenize("While 循环体") == ["while", "循环", "环体"]
+
+
+def test_all_files_scope_ranks_blocks_by_bm25():
+    indexed = AITeacherIndexCache().indexed_course(_course())
+
+    sources = _select_sources(
+        indexed,
+        node_id="",
+        question="while 循环什么时候停止？",
+        selection="",
+        perspective="teacher",
+        context_ref=_teacher_all_files(),
+    )
+
+    assert sources[0]["block_id"] == "b3"
+    assert {source["node_id"] for source in sources} <= {"node-1", "node-2"}
+
+
+def test_index_is_reused_until_the_course_changes():
+    cache = AITeacherIndexCache()
+    course = _course()
+
+    first = cache.indexed_course(course)
+    assert cache.indexed_course(deepcopy(course)) is first
+
+    edited = deepcopy(course)
+    edited["nodes"][1]["content_blocks"][1]["content"] = "用 sum 求和。"
+    rebuilt = cache.indexed_course(edited)
+
+    assert rebuilt is not first
+    assert cache.stats()["index_builds"] == 2
+    assert cache.stats()["courses"] == 1
+
+
+def test_runtime_comes_from_the_memoized_builder(monkeypatch):
+    calls: list[str] = []
+    marks = {"u1": (1,), "u2": (1,)}
+
+    def fake_build(course, *, user_id, node_id=None):
+        calls.append(user_id)
+        return {"context": {"node_id": node_id}, "learner_model": {}, "progress": {}}
+
+    monkeypatch.setattr(learning_runtime, "_build_learning_runtime", fake_build)
+    monkeypatch.setattr(
+        learning_runtime, "runtime_input_watermarks", lambda user_id, course_id: marks[user_id],
+    )
+    monkeypatch.setattr(ai_teacher_context.practice_attempt_repository, "list", lambda *a, **k: [])
+
+    for user_id, question in (("u1", "变量是什么"), ("u1", "赋值呢"), ("u2", "变量是什么")):
+        ai_teacher_context.build_ai_teacher_context(
+            _course(),
+            user_id=user_id,
+            question=question,
+            node_id="node-1",
+        )
+
+    assert calls == ["u1", "u2"]
+    assert learning_runtime.learning_runtime_memo.stats()["hits"] == 1
+    assert "runtimes" not in ai_teacher_index_cache.stats()
+
+    # A learner write moves the watermark; the very next question rebuilds.
+    marks["u1"] = (2,)
+    ai_teacher_context.build_ai_teacher_context(
+        _course(), user_id="u1", question="变量", node_id="node-1",
+    )
+    assert calls == ["u1", "u2", "u1"]
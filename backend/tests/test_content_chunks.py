@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import json
+from copy import deepcopy
+
+from content_chunks import ContentChunkStore, is_manifest
+from course_versions import CourseVersionRepository
+from generation_workspace import GenerationWorkspaceRepository
+
+
+def _course(course_id: str = "course-1") -> dict:
+    return {
+        "course_id": course_id,
+        "course_name": "Python 入门",
+        "nodes": [
+            {
+                "node_id": f"node-{index}",
+                "node_level": 2,
+                "node_name": f"第 {index} 节",
+                "content_blocks": [{"block_id": f"b{index}", "content": "正文" * 200}],
+            }
+            for index in range(1, 5)
+        ],
+    }
+
+
+def test_versions_share_unchanged_sections(tmp_path):
+    store = ContentChunkStore(tmp_path / "chunks")
+    repository = CourseVersionRepository(tmp_path / "versions", chunk_store=store)
+    course = _course()
+    first = repository.create_version("course-1", course, reason="初版", operation="initial_import")
+    edited = deepcopy(course)
+    edited["nodes"][0]["content_blocks"][0]["content"] = "改写" * 200
+    second = repository.create_version(
+        "course-1",
+        edited,
+        reason="修改第一节",
+        operation="node_edit",
+        base_version_id=first["version_id"],
+        changed_node_ids=["node-1"],
+    )
+
+    assert store.stats()["chunks"] == 5
+    raw = json.loads(
+        (tmp_path / "versions" / "course-1" / "versions" / f"{second['version_id']}.json").read_text(encoding="utf-8")
+    )
+    assert is_manifest(raw)
+    snapshot = repository.get_version_snapshot("course-1", first["version_id"])
+    assert snapshot["nodes"] == course["nodes"]
+    assert repository.get_version_snapshot("course-1", second["version_id"])["nodes"] == edited["nodes"]
+
+    assert repository.delete_course("course-1")
+    assert store.stats() == {"chunks": 0, "chunk_bytes": 0, "references": 0}
+
+
+def test_replacing_a_document_releases_only_unshared_chunks(tmp_path):
+    store = ContentChunkStore(tmp_path / "chunks")
+    paths = [("nodes", "*")]
+    path = tmp_path / "doc.json"
+
+    def writer(target, manifest):
+        target.write_text(json.dumps(manifest), encoding="utf-8")
+
+    course = _course()
+    store.write(path, course, paths, writer=writer)
+    edited = deepcopy(course)
+    edited["nodes"][3]["content_blocks"][0]["content"] = "新内容" * 200
+    store.write(path, edited, paths, writer=writer)
+
+    assert store.stats()["chunks"] == 4
+    assert store.read(path) == edited
+    assert store.discard(path)
+    assert store.stats()["chunks"] == 0
+
+
+def test_plain_documents_written_before_chunking_still_load(tmp_path):
+    repository = CourseVersionRepository(tmp_path / "versions", chunk_store=ContentChunkStore(tmp_path / "chunks"))
+    created = repository.create_version("course-1", _course(), reason="初版", operation="initial_import")
+    path = tmp_path / "versions" / "course-1" / "versions" / f"{created['version_id']}.json"
+    legacy = repository.get_version_snapshot("course-1", created["version_id"])
+    path.write_text(json.dumps(legacy, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    assert repository.get_version_snapshot("course-1", created["version_id"]) == legacy
+
+
+def test_workspace_updates_and_delete_release_chunks(tmp_path):
+    store = ContentChunkStore(tmp_path / "chunks")
+    repository = GenerationWorkspaceRepository(tmp_path / "workspaces", chunk_store=store)
+    repository.create("ws-1", course_id="course-1", course_data=_course())
+
+    def rewrite_last(course):
+        course["nodes"][-1]["content_blocks"][0]["content"] = "重写" * 200
+        return course
+
+    updated = repository.update_course("ws-1", rewrite_last)
+
+    assert repository.load_course("ws-1")["nodes"] == updated["nodes"]
+    assert store.stats()["chunks"] == 4
+    assert repository.delete("ws-1")
+    assert store.stats()["chunks"] == 0
+
+
+def test_store_opened_without_create_leaves_the_disk_untouched(tmp_path):
+    store = ContentChunkStore(tmp_path / "chunks", create=False)
+
+    assert store.stats() == {"chunks": 0, "chunk_bytes": 0, "references": 0}
+    assert not (tmp_path / "chunks").exists()
@@ -0,0 +1,111 @@
+"""前缀稳定布局：同一作业内逐字不变的段落排在最前，利于 provider 前缀缓存。"""
+
+from __future__ import annotations
+
+import os
+
+from course_prompt_composer import CoursePromptComposer
+
+
+def _outline_prompt(composer: CoursePromptComposer, start: int, end: int) -> str:
+    return composer.build_outline_batch_v2_prompt(
+        course_title="函数入门",
+        positioning="能用函数刻画变化关系",
+        learning_objectives=["能判断函数单调性"],
+        chapter={"chapter_number": 1, "title": "函数概念"},
+        neighbor_chapters=[{"chapter_number": 2, "title": "函数性质"}],
+        batch_spec={
+            "batch_id": f"b-{start}",
+            "start_section_index": start,
+            "end_section_index": end,
+            "expected_node_ids": [f"L2-1-{index}" for index in range(start, end + 1)],
+        },
+        previous_sections=[{"node_id": "L2-1-1"}] if start > 1 else [],
+        evidence_hints=[],
+        skeleton_revision_id="skeleton-1",
+    )
+
+
+def _teaching_plan_prompt(composer: CoursePromptComposer, node_id: str) -> str:
+    return composer.build_teaching_plan_batch_v3_prompt(
+        course_title="一次函数",
+        positioning="能用一次函数刻画真实情境中的线性变化",
+        batch_spec={"batch_id": f"batch-{node_id}", "section_ids": [node_id]},
+        batch_sections=[{"node_id": node_id, "title": f"小节 {node_id}"}],
+        knowledge_registry=[{"knowledge_key": "K001", "owner_node_id": node_id}],
+        section_identities=[{"node_id": node_id, "owned_knowledge_keys": ["K001"]}],
+        module_catalog=[{"module_id": "core_explanation", "label": "核心教学"}],
+        skeleton_revision_id="skeleton-1",
+    )
+
+
+def _common_prefix(left: str, right: str) -> int:
+    return len(os.path.commonprefix([left, right]))
+
+
+def test_prefix_stable_batches_share_instructions_schema_and_course():
+    sectioned = CoursePromptComposer(layout="sectioned")
+    stable = CoursePromptComposer(layout="prefix_stable")
+
+    first, second = _outline_prompt(stable, 1, 2), _outline_prompt(stable, 3, 4)
+    old_first, old_second = _outline_prompt(sectioned, 1, 2), _outline_prompt(sectioned, 3, 4)
+
+    assert _common_prefix(old_first, old_second) < 60
+    shared = first[:_common_prefix(first, second)]
+    assert "## 约束" in shared and "## JSON Schema" in shared and "## 相邻章节边界" in shared
+    assert "当前章第 3-4 个，共 2 个" in second
+    assert "第 1-2 个" not in shared
+
+    plan_a, plan_b = _teaching_plan_prompt(stable, "L2-1-1"), _teaching_plan_prompt(stable, "L2-1-2")
+    shared = plan_a[:_common_prefix(plan_a, plan_b)]
+    assert "## JSON Schema" in shared and "## 共享课程块目录" in shared
+    assert sorted(plan_a.split("\n\n")) == sorted(
+        _teaching_plan_prompt(sectioned, "L2-1-1").split("\n\n")
+    )
+
+
+def test_content_prompt_sends_shared_context_ahead_of_node_brief():
+    course = {"course_name": "函数入门", "target_audience": "高一学生"}
+    nodes = [
+        {"node_id": "L2-1-1", "node_name": "函数概念", "learning_objective": "说出定义"},
+        {"node_id": "L2-1-2", "node_name": "函数图像", "learning_objective": "画出图像"},
+    ]
+    shared_context = "## 资料卡\n函数是两个非空数集之间的对应关系。"
+    stable = CoursePromptComposer(layout="prefix_stable")
+
+    prompts = [
+        stable.build_content_prompt(
+            course_data=course,
+            node=node,
+            context=f"前序摘要 {node['node_id']}",
+            shared_context=shared_context,
+            detail_level=level,
+        )
+        for level in ("full", "minimal")
+        for node in nodes
+    ]
+
+    for user_prompt, _system in prompts:
+        assert user_prompt.startswith("## 课程共享上下文\n## 资料卡")
+    assert prompts[0][1] == prompts[1][1]
+
+    sectioned = CoursePromptComposer(layout="sectioned")
+    merged = sectioned.build_content_prompt(
+        course_data=course,
+        node=nodes[0],
+        context=f"前序摘要 L2-1-1\n\n{shared_context}",
+    )
+    split = sectioned.build_content_prompt(
+        course_data=course,
+        node=nodes[0],
+        context="前序摘要 L2-1-1",
+        shared_context=shared_context,
+    )
+    assert split == merged
+
+
+def test_layout_is_selected_from_environment(monkeypatch):
+    monkeypatch.setenv("COURSE_PROMPT_LAYOUT", "prefix_stable")
+    assert CoursePromptComposer().prefix_stable is True
+    monkeypatch.setenv("COURSE_PROMPT_LAYOUT", "unknown")
+    assert CoursePromptComposer().layout == "sectioned"
@@ -193,6 +193,53 @@ def test_changed_content_updates_in_place_without_duplicating(repo):
     assert changed["origin"] == "course_generation"
 
 
+def test_only_artifacts_with_changed_inputs_are_rendered(repo, monkeypatch):
+    """改一节只重渲染这一节；其余产物凭 input_revision 直接判未变更。"""
+    import course_space_publication as module
+
+    course = _course()
+    first = publish_course_artifacts(course, owner_id="t1", repository=repo)
+    assert {item["outcome"] for item in first["artifacts"]} == {"written"}
+    assert all("elapsed_ms" in item for item in first["artifacts"])
+
+    rendered: list[str] = []
+    real_outline = module._render_outline
+    monkeypatch.setattr(
+        module, "_render_outline",
+        lambda data: rendered.append("outline") or real_outline(data),
+    )
+    saves: list[str] = []
+    real_save = repo.save
+    monkeypatch.setattr(repo, "save", lambda package: saves.append("save") or real_save(package))
+
+    course["nodes"][2]["node_content"] = "连续性的重新表述……"
+    second = publish_course_artifacts(course, owner_id="t1", repository=repo)
+
+    assert rendered == []
+    assert len(second["written"]) == 1 and second["written"][0].endswith("1.2 连续性.md")
+    outcomes = {item["relative_path"]: item["outcome"] for item in second["artifacts"]}
+    assert sorted(outcomes.values()).count("unchanged") == len(outcomes) - 1
+    assert saves == ["save"]
+
+    third = publish_course_artifacts(course, owner_id="t1", repository=repo)
+    assert third["written"] == [] and saves == ["save"]
+
+
+def test_assets_published_before_input_revisions_are_stamped_once(repo):
+    course = _course()
+    first = publish_course_artifacts(course, owner_id="t1", repository=repo)
+    package = repo.load_owned(first["package_id"], "t1")
+    for asset in package["assets"]:
+        asset.pop("input_revision", None)
+    repo.save(package)
+
+    second = publish_course_artifacts(course, owner_id="t1", repository=repo)
+
+    assert second["written"] == []
+    stamped = repo.load_owned(first["package_id"], "t1")["assets"]
+    assert all(asset.get("input_revision", "").startswith("cai_") for asset in stamped)
+
+
 # --- 要求二：入库失败不得让生成失败 -----------------------------------------
 
 
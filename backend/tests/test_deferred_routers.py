@@ -0,0 +1,123 @@
+"""按需挂载的路由：登记的前缀覆盖全部路由、与常驻路由互不重叠，挂载后匹配结果不变。"""
+
+from __future__ import annotations
+
+import importlib
+import pkgutil
+import re
+
+import pytest
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+
+import routers
+from deferred_routers import (
+    DeferredRouter,
+    DeferredRouterMiddleware,
+    DeferredRouterRegistry,
+    path_prefix_pattern,
+)
+from generation_worker import _flatten_routes
+
+DEFERRED_MODULES = {router.module for router in routers.DEFERRED_ROUTERS}
+
+
+def _routes(router: DeferredRouter | None = None, module_name: str | None = None) -> list:
+    module = importlib.import_module(router.module if router else module_name)
+    attributes = router.attributes if router else [
+        name for name, value in vars(module).items() if isinstance(value, APIRouter)
+    ]
+    app = FastAPI()
+    for attribute in attributes:
+        included = getattr(module, attribute)
+        if router:
+            prefix = router.prefix
+        else:
+            # main 对自带 /api 前缀的路由不再加前缀。
+            prefix = "" if included.prefix.startswith("/api") else "/api"
+        app.include_router(included, prefix=prefix)
+    return [
+        route for route in _flatten_routes(app.routes)
+        if getattr(route, "methods", None) and route.path not in {"/openapi.json", "/docs", "/docs/oauth2-redirect", "/redoc"}
+    ]
+
+
+def _sample(path: str) -> str:
+    return re.sub(r"\{[^}]+\}", "x", path)
+
+
+def test_prefix_pattern_matches_whole_segments() -> None:
+    pattern = path_prefix_pattern(("/api/courses/{course_id}/teaching-plan", "/api/packs"))
+    assert pattern.match("/api/courses/c1/teaching-plan")
+    assert pattern.match("/api/courses/c1/teaching-plan/drafts/d1")
+    assert pattern.match("/api/packs/p1")
+    assert not pattern.match("/api/courses/c1/teaching-planner")
+    assert not pattern.match("/api/courses/c1/x/teaching-plan")
+    assert not pattern.match("/api/packsx")
+
+
+@pytest.mark.parametrize("router", routers.DEFERRED_ROUTERS, ids=lambda router: router.module)
+def test_declared_prefixes_cover_every_route(router: DeferredRouter) -> None:
+    pattern = path_prefix_pattern(router.paths)
+    routes = _routes(router)
+    assert routes
+    assert [route.path for route in routes if not pattern.match(_sample(route.path))] == []
+
+
+def test_resident_and_deferred_routes_never_overlap() -> None:
+    resident = [
+        route
+        for info in pkgutil.iter_modules(routers.__path__)
+        if f"routers.{info.name}" not in DEFERRED_MODULES
+        for route in _routes(module_name=f"routers.{info.name}")
+    ]
+    conflicts = []
+    for router in routers.DEFERRED_ROUTERS:
+        for route in _routes(router):
+            path = _sample(route.path)
+            conflicts.extend(
+                (route.path, other.path)
+                for other in resident
+                if other.methods & route.methods
+                and (other.path_regex.match(path) or route.path_regex.match(_sample(other.path)))
+            )
+    assert conflicts == []
+
+
+def test_registry_mounts_on_first_request_before_catch_all() -> None:
+    app = FastAPI()
+
+    @app.get("/api/resident")
+    def resident():
+        return {"router": "resident"}
+
+    registry = DeferredRouterRegistry(app, (DeferredRouter("routers.learning_governance", ("/api/learning-facts",)),))
+
+    @app.get("/{full_path:path}")
+    def catch_all(full_path: str):
+        return {"router": "catch-all"}
+
+    app.add_middleware(DeferredRouterMiddleware, registry=registry)
+    client = TestClient(app)
+    routes_before = len(app.router.routes)
+
+    assert client.get("/api/resident").json() == {"router": "resident"}
+    assert registry.pending
+    response = client.get("/api/learning-facts/export")
+    assert response.json() != {"router": "catch-all"}
+    assert not registry.pending
+    assert len(app.router.routes) > routes_before
+    assert app.router.routes[-1].path == "/{full_path:path}"
+    assert "routers.learning_governance" in registry.stats()["loaded_ms"]
+
+
+def test_openapi_request_mounts_every_deferred_router() -> None:
+    app = FastAPI()
+    registry = DeferredRouterRegistry(app, routers.DEFERRED_ROUTERS[:2])
+    app.add_middleware(DeferredRouterMiddleware, registry=registry)
+
+    paths = TestClient(app).get("/openapi.json").json()["paths"]
+
+    assert not registry.pending
+    assert "/api/learning-facts/export" in paths
+    assert "/api/course-acceptance/preflight" in paths
@@ -28,6 +28,8 @@ def telemetry_dir(tmp_path, monkeypatch):
 
 
 def _read(path: Path) -> list[dict]:
+    # 记录由后台线程落盘，读之前等它写完。
+    assert gt.flush()
     return [
         json.loads(line)
         for line in path.read_text(encoding="utf-8").splitlines()
@@ -89,6 +91,7 @@ def test_auto_run_shares_one_file_across_generations(telemetry_dir):
         await asyncio.create_task(one_generation("courseB"))
 
     asyncio.run(main())
+    assert gt.flush()
 
     files = sorted(telemetry_dir.glob("*.jsonl"))
     # 现状：两门课混在一个文件里。修好之后这里应该变成 2，届时请更新本用例。
@@ -454,3 +457,171 @@ def test_retry_is_flagged(telemetry_dir):
     record = _read(path)[0]
     assert record["is_retry"] is True
     assert record["retry_reason"] == "AIResponseTruncated"
+
+
+def test_provider_prefix_cache_hits_are_recorded_and_billed(telemetry_dir):
+    from types import SimpleNamespace
+
+    from ai_base import AIBase
+
+    deepseek = SimpleNamespace(usage=SimpleNamespace(
+        prompt_tokens=1000, completion_tokens=10, prompt_cache_hit_tokens=800,
+    ))
+    openai_style = SimpleNamespace(usage=SimpleNamespace(
+        prompt_tokens=1000,
+        completion_tokens=10,
+        prompt_tokens_details=SimpleNamespace(cached_tokens=256),
+    ))
+    silent = SimpleNamespace(usage=SimpleNamespace(prompt_tokens=1000, completion_tokens=10))
+    assert AIBase._chunk_cached_tokens(deepseek) == 800
+    assert AIBase._chunk_cached_tokens(openai_style) == 256
+    assert AIBase._chunk_cached_tokens(silent) is None
+
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "tools"))
+    import generation_bill as gb
+
+    with gt.generation_run("cache") as path:
+        with gt.stage("正文生成"):
+            for cached in (0, 800, 900):
+                gt.record_call(
+                    model_id="m",
+                    status="completed",
+                    stream=True,
+                    input_tokens=1000,
+                    output_tokens=10,
+                    tokens_source="provider",
+                    cached_input_tokens=cached,
+                )
+        with gt.stage("目录"):
+            gt.record_call(model_id="m", status="completed", stream=False, input_tokens=500)
+
+    records = _read(path)
+    assert [r["cached_input_tokens"] for r in records] == [0, 800, 900, None]
+    summary = gb.summarize(records)
+    assert summary["answer_2_stages"]["正文生成"]["cache_hit_ratio"] == pytest.approx(1700 / 3000, abs=1e-4)
+    assert summary["answer_2_stages"]["目录"]["cache_hit_ratio"] is None
+    assert summary["prompt_cache"]["reporting_calls"] == 3
+    assert "缓存命中" in gb.render(summary)
+
+
+def test_quantile_sketch_stays_within_relative_accuracy():
+    import random
+
+    from generation_telemetry_live import QuantileSketch
+
+    rng = random.Random(7)
+    values = sorted(rng.lognormvariate(8, 1.2) for _ in range(5000))
+    sketch = QuantileSketch(relative_accuracy=0.01)
+    for value in values:
+        sketch.add(value)
+
+    for q in (0.5, 0.9, 0.99):
+        exact = values[int(q * (len(values) - 1))]
+        assert sketch.quantile(q) == pytest.approx(exact, rel=0.011)
+    assert sketch.quantile(1.0) == values[-1]
+    assert sketch.summary()["max"] == round(values[-1], 1)
+
+
+def test_live_bill_matches_offline_bill(telemetry_dir):
+    """实时账单与离线账单工具吃的是同一份记录，数字必须对得上。"""
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "tools"))
+    import generation_bill as gb
+
+    shared = "## 课程上下文账本\n" + "本课程共 8 课时，面向大学一年级学生。" * 40
+    with gt.generation_run("live-vs-offline") as path:
+        with gt.stage("正文生成"):
+            for index in range(3):
+                with gt.section(f"第{index}节"):
+                    gt.record_call(
+                        model_id="writer",
+                        status="completed",
+                        stream=True,
+                        system_prompt=shared,
+                        prompt=f"请生成第 {index} 节的正文。",
+                        duration_ms=1000 + index * 500,
+                        ttfb_ms=200,
+                        queue_wait_ms=50,
+                        output_tokens=300,
+                    )
+        with gt.stage("练习"):
+            gt.record_call(
+                model_id="checker",
+                status="failed",
+                stream=False,
+                attempt=2,
+                prompt="请出三道练习题。",
+                duration_ms=800,
+                input_tokens=40,
+                tokens_source="provider",
+                cached_input_tokens=10,
+            )
+
+    offline = gb.summarize(_read(path))
+    live = gt.job_bill("live-vs-offline")
+
+    assert live["calls"] == offline["answer_1_total_calls"] == 4
+    assert live["input_tokens"] == offline["total_input_tokens"]
+    assert live["output_tokens"] == offline["total_output_tokens"]
+    assert live["retries"] == offline["retries"] == 1
+    assert live["failures"] == offline["failures"] == 1
+    for name, stage in offline["answer_2_stages"].items():
+        for key in ("calls", "busy_s", "queue_s", "input_tokens", "retries", "cache_hit_ratio"):
+            assert live["stages"][name][key] == stage[key], (name, key)
+    repeated = offline["answer_3_repeated_context"]
+    assert live["repeated_context"]["repeated_tokens"] == repeated["repeated_tokens"]
+    assert live["repeated_context"]["repeated_share_of_input"] == repeated["repeated_share_of_input"]
+    assert set(live["sections"]) == {"第0节", "第1节", "第2节"}
+    assert live["models"]["writer"]["calls"] == 3
+    assert live["stages"]["正文生成"]["latency_ms"]["max"] == pytest.approx(2000, rel=0.01)
+    assert live["stages"]["正文生成"]["ttfb_ms"]["p50"] == pytest.approx(200, rel=0.01)
+
+
+def test_live_bill_is_always_on_and_grouped_by_task(tmp_path, monkeypatch):
+    """不开 JSONL 时实时账单照样累计，按任务标签归档，也不写任何文件。"""
+    monkeypatch.delenv("LINGZHI_GENERATION_TELEMETRY", raising=False)
+    monkeypatch.setenv("LINGZHI_GENERATION_TELEMETRY_DIR", str(tmp_path))
+
+    async def job(task_id: str, calls: int) -> None:
+        with gt.stage("", task_id=task_id, course_id="c-1"):
+            await asyncio.gather(*[
+                fake_ai_layer.call_llm() for _ in range(calls)
+            ])
+
+    async def main() -> None:
+        await asyncio.gather(job("task-live-a", 2), job("task-live-b", 3))
+
+    asyncio.run(main())
+    assert gt.flush()
+
+    assert gt.job_bill("task-live-a")["calls"] == 2
+    assert gt.job_bill("task-live-b")["calls"] == 3
+    assert gt.live_job_ids()[:2] in (
+        ["task-live-a", "task-live-b"],
+        ["task-live-b", "task-live-a"],
+    )
+    assert gt.job_bill("task-missing") is None
+    assert not list(tmp_path.rglob("*.jsonl"))
+
+
+def test_writer_drops_instead_of_blocking_when_full():
+    import threading
+
+    from generation_telemetry_live import BufferedRecordWriter
+
+    release = threading.Event()
+    handled: list[int] = []
+
+    def slow(batch: list[int]) -> None:
+        release.wait(5)
+        handled.extend(batch)
+
+    writer = BufferedRecordWriter(slow, max_pending=2, name="test-writer")
+    accepted = [writer.submit(index) for index in range(6)]
+    assert not writer.flush(timeout=0.05)
+    release.set()
+
+    assert writer.flush(timeout=5)
+    stats = writer.stats()
+    assert stats["dropped"] == accepted.count(False) > 0
+    assert sorted(handled) == [i for i, ok in enumerate(accepted) if ok]
+    assert stats["pending"] == 0
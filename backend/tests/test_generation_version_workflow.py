@@ -468,8 +468,7 @@ async def test_review_mode_waits_and_confirms_same_job(tmp_path, monkeypatch):
         return {"course_id": job["course_id"], "nodes": []}
 
     monkeypatch.setattr(course_versions_router, "get_course_or_404", load_formal_shell)
-    monkeypatch.setattr(course_versions_router, "get_task_manager_optional", lambda: manager)
-    blueprint_course = await course_versions_router._course_for_blueprint(job["course_id"])
+    blueprint_course = await course_versions_router._course_for_blueprint(job["course_id"], manager)
     assert blueprint_course["nodes"][0]["node_name"] == "概念"
     edited_draft = manager._version_repository.load_draft(job["course_id"])
     edited_draft["nodes"][0]["node_name"] = "用户确认后的概念"
@@ -438,3 +438,64 @@ def test_runtime_never_projects_legacy_overlay_into_body_adaptive_blocks(monkeyp
     assert migration["schema_version"] == "legacy_overlay_migration_v1"
     assert migration["requires_migration"] is True
     assert migration["resolution_status"] == "active"
+
+
+def _isolated_stores(monkeypatch, tmp_path):
+    import diagnostic_service
+    from course_evolution import CourseEvolutionRepository
+    from diagnostic_workflows import DiagnosticWorkflowRepository
+    from learning_records import LearningRecordRepository
+    from learning_snapshots import LearningSnapshotRepository
+    from practice_attempts import PracticeAttemptRepository
+
+    snapshots = LearningSnapshotRepository(tmp_path / "snapshots")
+    monkeypatch.setattr(learning_runtime, "learning_snapshot_repository", snapshots)
+    monkeypatch.setattr(learning_runtime, "learning_record_repository", LearningRecordRepository(tmp_path / "records"))
+    monkeypatch.setattr(learning_runtime, "practice_attempt_repository", PracticeAttemptRepository(tmp_path / "attempts"))
+    monkeypatch.setattr(learning_runtime, "course_evolution_repository", CourseEvolutionRepository(tmp_path / "evolution"))
+    monkeypatch.setattr(
+        diagnostic_service, "diagnostic_workflow_repository", DiagnosticWorkflowRepository(tmp_path / "workflows"),
+    )
+    return snapshots
+
+
+def test_runtime_memo_reuses_a_build_until_an_input_store_moves(monkeypatch, tmp_path):
+    from learning_events import record_learning_event
+
+    snapshots = _isolated_stores(monkeypatch, tmp_path)
+    memo = learning_runtime.learning_runtime_memo
+    course = _course()
+
+    first = learning_runtime.build_learning_runtime(course, user_id="u1", node_id="n1")
+    first["progress"]["mutated_by_caller"] = True
+    second = learning_runtime.build_learning_runtime(deepcopy(course), user_id="u1", node_id="n1")
+    assert "mutated_by_caller" not in second["progress"]
+    assert memo.stats()["hits"] == 1
+
+    record_learning_event(event_type="node_learning_started", user_id="u2", course_id="c1", node_id="n1")
+    learning_runtime.build_learning_runtime(course, user_id="u1", node_id="n1")
+    assert memo.stats()["hits"] == 2
+
+    record_learning_event(event_type="node_learning_started", user_id="u1", course_id="c1", node_id="n1")
+    after_event = learning_runtime.build_learning_runtime(course, user_id="u1", node_id="n1")
+    assert after_event["revision_vector"]["events_revision"] != second["revision_vector"]["events_revision"]
+
+    snapshots.save("u1", "c1", expected_revision=0, payload={"node_id": "n1"})
+    after_snapshot = learning_runtime.build_learning_runtime(course, user_id="u1", node_id="n1")
+    assert after_snapshot["revision_vector"]["snapshot_revision"] == 1
+
+    edited = deepcopy(course)
+    edited["current_course_version_id"] = "cv2"
+    assert learning_runtime.build_learning_runtime(edited, user_id="u1", node_id="n1")["context"]["course_version_id"] == "cv2"
+    assert memo.stats()["hits"] == 2
+
+
+def test_runtime_memo_is_bypassed_when_a_store_cannot_report_changes(monkeypatch, tmp_path):
+    _isolated_stores(monkeypatch, tmp_path)
+    monkeypatch.setattr(learning_runtime, "learning_record_repository", _Repository([]))
+
+    learning_runtime.build_learning_runtime(_course(), user_id="u1")
+    learning_runtime.build_learning_runtime(_course(), user_id="u1")
+
+    assert learning_runtime.learning_runtime_memo.stats()["hits"] == 0
+    assert learning_runtime.learning_runtime_memo.stats()["bypassed"] == 2
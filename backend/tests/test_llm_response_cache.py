@@ -0,0 +1,233 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import generation_telemetry as gt
+from ai_base import AIBase, AIProviderUnavailable
+from llm_response_cache import LLMResponseCache, reset_llm_response_cache
+
+
+class FakeStream:
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._chunks)
+        except StopIteration as exc:
+            raise StopAsyncIteration from exc
+
+
+def _chunk(text: str):
+    return SimpleNamespace(choices=[SimpleNamespace(
+        delta=SimpleNamespace(reasoning_content=None, content=text),
+        finish_reason=None,
+    )])
+
+
+class CountingCompletions:
+    def __init__(self, parts=("ok-", "answer")):
+        self.parts = parts
+        self.calls = 0
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        return FakeStream([_chunk(part) for part in self.parts])
+
+
+@pytest.fixture
+def cache_env(monkeypatch, tmp_path):
+    def configure(mode: str, **env: str) -> None:
+        monkeypatch.setenv("LLM_RESPONSE_CACHE", mode)
+        monkeypatch.setenv("LLM_RESPONSE_CACHE_DIR", str(tmp_path / "llm"))
+        for name, value in env.items():
+            monkeypatch.setenv(name, value)
+        reset_llm_response_cache()
+
+    yield configure
+    reset_llm_response_cache()
+
+
+def _service(monkeypatch, completions, *, api_key: str | None = "test-key") -> AIBase:
+    if api_key:
+        monkeypatch.setenv("AI_API_KEY", api_key)
+    else:
+        monkeypatch.delenv("AI_API_KEY", raising=False)
+    monkeypatch.setenv("AI_API_BASE", "https://primary.example.test/v1")
+    monkeypatch.delenv("MODELSCOPE_API_KEY", raising=False)
+    service = AIBase()
+    service.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    service.smart_models = ["model-a"]
+    service.fast_models = ["model-a"]
+    service._working_model_cache.clear()
+    service._model_failure_cache.clear()
+    service._provider_failure = None
+    return service
+
+
+@pytest.mark.asyncio
+async def test_identical_request_is_served_from_cache(monkeypatch, cache_env):
+    cache_env("cache")
+    completions = CountingCompletions()
+    service = _service(monkeypatch, completions)
+
+    first = await service._call_llm("p", "s", retry_count=1)
+    second = await service._call_llm("p", "s", retry_count=1)
+    other = await service._call_llm("p", "s", retry_count=1, json_mode=True)
+
+    assert first == second == other == "ok-answer"
+    assert completions.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_stage_enable_list_limits_caching(monkeypatch, cache_env):
+    cache_env("cache", LLM_RESPONSE_CACHE_STAGES="正文生成")
+    completions = CountingCompletions()
+    service = _service(monkeypatch, completions)
+
+    for _ in range(2):
+        await service._call_llm("p", "s", retry_count=1)
+    with gt.stage("正文生成"):
+        for _ in range(2):
+            await service._call_llm("p", "s", retry_count=1)
+
+    assert completions.calls == 3
+
+
+@pytest.mark.asyncio
+async def test_recorded_stream_replays_offline_chunk_for_chunk(monkeypatch, cache_env):
+    cache_env("record")
+    completions = CountingCompletions(parts=("第一段", "第二段", "第三段"))
+    recorder = _service(monkeypatch, completions)
+    recorded = [chunk async for chunk in recorder._stream_llm("p", "s")]
+
+    cache_env("replay")
+    offline = _service(monkeypatch, CountingCompletions(), api_key=None)
+    replayed = [chunk async for chunk in offline._stream_llm("p", "s")]
+
+    assert replayed == recorded == ["第一段", "第二段", "第三段"]
+    assert await offline._call_llm("p", "s") == "第一段第二段第三段"
+    assert await offline._call_llm("unrecorded", "s") is None
+    with pytest.raises(AIProviderUnavailable):
+        await offline._call_llm("unrecorded", "s", raise_on_failure=True)
+    with pytest.raises(AIProviderUnavailable):
+        [chunk async for chunk in offline._stream_llm("unrecorded", "s")]
+
+
+@pytest.mark.asyncio
+async def test_truncated_responses_are_returned_but_not_cached(monkeypatch, cache_env):
+    cache_env("cache")
+
+    class TruncatingCompletions(CountingCompletions):
+        async def create(self, **kwargs):
+            self.calls += 1
+            last = _chunk("answer")
+            last.choices[0].finish_reason = "length"
+            return FakeStream([_chunk("ok-"), last])
+
+    completions = TruncatingCompletions()
+    service = _service(monkeypatch, completions)
+
+    assert await service._call_llm("p", "s", retry_count=1) == "ok-answer"
+    assert await service._call_llm("p", "s", retry_count=1) == "ok-answer"
+    assert completions.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_truncated_fallback_responses_are_not_cached(monkeypatch, cache_env):
+    cache_env("cache")
+    monkeypatch.setenv("MODELSCOPE_API_KEY", "fallback-test-key")
+    monkeypatch.setenv("MODELSCOPE_MODEL", "Qwen/Qwen3.5-35B-A3B")
+    monkeypatch.setenv("AI_LAST_RESORT_START_INTERVAL_SECONDS", "0")
+    monkeypatch.setenv("AI_LAST_RESORT_POST_REQUEST_INTERVAL_SECONDS", "0")
+    monkeypatch.delenv("MODELSCOPE_MODEL_CANDIDATES", raising=False)
+    monkeypatch.delenv("MODELSCOPE_MODEL_FAST_CANDIDATES", raising=False)
+
+    class TruncatingCompletions(CountingCompletions):
+        async def create(self, **kwargs):
+            self.calls += 1
+            last = _chunk("answer")
+            last.choices[0].finish_reason = "length"
+            return FakeStream([_chunk("ok-"), last])
+
+    fallback = TruncatingCompletions()
+    service = AIBase()
+    service.api_key = None
+    service.client = None
+    service.modelscope_fallback_client = SimpleNamespace(
+        chat=SimpleNamespace(completions=fallback)
+    )
+    service._provider_failure = None
+
+    assert await service._call_llm("p", "s", retry_count=1) == "ok-answer"
+    assert await service._call_llm("p", "s", retry_count=1) == "ok-answer"
+    assert fallback.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_cache_file_io_runs_off_the_event_loop(monkeypatch, cache_env):
+    cache_env("cache")
+    loop_thread = threading.get_ident()
+    io_threads: list[int] = []
+    original_lookup = LLMResponseCache.lookup
+    original_store = LLMResponseCache.store
+
+    def lookup(self, key):
+        io_threads.append(threading.get_ident())
+        return original_lookup(self, key)
+
+    def store(self, key, chunks, *, stage=""):
+        io_threads.append(threading.get_ident())
+        return original_store(self, key, chunks, stage=stage)
+
+    monkeypatch.setattr(LLMResponseCache, "lookup", lookup)
+    monkeypatch.setattr(LLMResponseCache, "store", store)
+    completions = CountingCompletions()
+    service = _service(monkeypatch, completions)
+
+    await service._call_llm("p", "s", retry_count=1)
+    assert [chunk async for chunk in service._stream_llm("p", "s")] == ["ok-answer"]
+
+    assert completions.calls == 1
+    assert len(io_threads) == 3
+    assert loop_thread not in io_threads
+
+
+@pytest.mark.asyncio
+async def test_input_budget_is_part_of_the_cache_key(monkeypatch, cache_env):
+    cache_env("cache")
+    completions = CountingCompletions()
+    service = _service(monkeypatch, completions)
+
+    await service._call_llm("p", "s", retry_count=1)
+    await service._call_llm("p", "s", retry_count=1, max_input_chars=4000)
+    await service._call_llm("p", "s", retry_count=1, max_input_tokens=2000)
+    await service._call_llm("p", "s", retry_count=1, max_input_tokens=2000)
+
+    assert completions.calls == 3
+
+
+def test_ttl_and_size_bounds(tmp_path):
+    cache = LLMResponseCache(tmp_path, mode="cache", ttl_seconds=60, max_entries=2)
+    keys = [f"{index:02d}" + "0" * 62 for index in range(3)]
+    for offset, key in enumerate(keys):
+        cache.store(key, [f"answer-{key[:2]}"])
+        path = tmp_path / key[:2] / f"{key}.json"
+        os.utime(path, (time.time() - 30 + offset, time.time() - 30 + offset))
+
+    assert cache.prune() == 1
+    assert cache.lookup(keys[0]) is None
+    assert cache.lookup(keys[2]).content == "answer-02"
+
+    cache.ttl_seconds = 0.001
+    time.sleep(0.01)
+    assert cache.lookup(keys[2]) is None
+    assert cache.stats()["expired"] == 1
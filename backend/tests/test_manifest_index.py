@@ -0,0 +1,139 @@
+"""资料库与幻灯片图片库的 manifest 二级索引。"""
+
+from __future__ import annotations
+
+import json
+import shutil
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+from manifest_index import INDEX_DIRNAME
+from material_storage import MaterialRepository
+from slide_asset_repository import SlideAssetRepository
+
+
+class FakeUpload:
+    def __init__(self, filename: str, content: bytes) -> None:
+        self.filename = filename
+        self.content_type = "text/markdown"
+        self._content = content
+        self._offset = 0
+
+    async def read(self, size: int) -> bytes:
+        chunk = self._content[self._offset:self._offset + size]
+        self._offset += len(chunk)
+        return chunk
+
+
+@pytest.mark.asyncio
+async def test_material_dedup_and_batch_stats_come_from_persisted_index(tmp_path: Path) -> None:
+    root = tmp_path / "materials"
+    repository = MaterialRepository(root)
+    first = await repository.save_upload(FakeUpload("a.md", b"alpha"), upload_batch_id="b1")
+    await repository.save_upload(FakeUpload("b.md", b"beta!"), upload_batch_id="b1")
+
+    duplicate = await repository.save_upload(FakeUpload("c.md", b"alpha"), upload_batch_id="b2")
+
+    assert duplicate.asset_id == first.asset_id
+    assert repository._batch_stats("b1") == (2, 10)
+    assert repository._batch_stats("b2") == (0, 0)
+    assert (root / INDEX_DIRNAME / "manifest_index.json").is_file()
+
+    reopened = MaterialRepository(root)
+    assert reopened.index.lookup("sha256", first.sha256) == [first.asset_id]
+    assert reopened._batch_stats("b1") == (2, 10)
+
+
+@pytest.mark.asyncio
+async def test_material_index_follows_delete_and_out_of_band_changes(tmp_path: Path) -> None:
+    root = tmp_path / "materials"
+    repository = MaterialRepository(root)
+    asset = await repository.save_upload(FakeUpload("a.md", b"alpha"), upload_batch_id="b1")
+    other = await repository.save_upload(FakeUpload("b.md", b"beta"), upload_batch_id="b1")
+
+    assert repository.delete_unbound(asset.asset_id) is True
+    assert repository.index.lookup("sha256", asset.sha256) == []
+    assert repository._batch_stats("b1") == (1, 4)
+
+    # 绕过仓库直接删掉目录：根目录 mtime 变化会触发重建。
+    shutil.rmtree(root / other.asset_id)
+    assert repository._batch_stats("b1") == (0, 0)
+
+
+@pytest.mark.asyncio
+async def test_stale_index_is_rebuilt_when_repository_opens(tmp_path: Path) -> None:
+    root = tmp_path / "materials"
+    repository = MaterialRepository(root)
+    asset = await repository.save_upload(FakeUpload("a.md", b"alpha"), upload_batch_id="b1")
+    index_path = root / INDEX_DIRNAME / "manifest_index.json"
+    payload = json.loads(index_path.read_text(encoding="utf-8"))
+    payload["entries"] = {}
+    index_path.write_text(json.dumps(payload), encoding="utf-8")
+
+    reopened = MaterialRepository(root)
+
+    assert reopened.index.lookup("sha256", asset.sha256) == [asset.asset_id]
+
+
+def test_two_repository_instances_share_index_writes(tmp_path: Path) -> None:
+    root = tmp_path / "assets"
+    writer = SlideAssetRepository(root)
+    reader = SlideAssetRepository(root)
+    source = tmp_path / "source.png"
+    Image.new("RGB", (64, 32), color=(10, 20, 30)).save(source)
+
+    staged = writer.stage_image(
+        source,
+        course_id="course-1",
+        source_fragment_ids=["f-1", "f-1", "f-2"],
+        alt_text="示意图",
+        purpose="context",
+        kind="generated_illustration",
+        prompt="[policy] scene",
+        generation_seed="abc",
+        quality_checks={"embedded_text_absent": True, "visual_detail_present": True},
+    )
+    writer.promote(staged)
+
+    found = reader.find_generated(
+        course_id="course-1",
+        source_fragment_ids=["f-1", "f-2"],
+        prompt="[policy] scene",
+        generation_seed="abc",
+    )
+    assert found is not None and found.asset_id == staged.asset_id
+    assert reader.find_generated(
+        course_id="course-2",
+        source_fragment_ids=["f-1", "f-2"],
+        prompt="[policy] scene",
+        generation_seed="abc",
+    ) is None
+    assert reader.index.lookup("sha256", staged.sha256) == [staged.asset_id]
+
+
+def test_retrieved_lookup_rechecks_license_on_real_manifest(tmp_path: Path) -> None:
+    root = tmp_path / "assets"
+    repository = SlideAssetRepository(root)
+    source = tmp_path / "source.png"
+    Image.new("RGB", (64, 32), color=(90, 20, 30)).save(source)
+    url = "https://upload.wikimedia.org/example.png"
+    staged = repository.stage_image(
+        source,
+        course_id="course-1",
+        source_fragment_ids=["f-1"],
+        alt_text="示意图",
+        purpose="structure",
+        kind="retrieved_image",
+        asset_url=url,
+    )
+    repository.promote(staged)
+    assert repository.find_retrieved(asset_url=url).asset_id == staged.asset_id
+
+    manifest_path = root / staged.asset_id / "manifest.json"
+    data = json.loads(manifest_path.read_text(encoding="utf-8"))
+    data["license_allowed"] = False
+    manifest_path.write_text(json.dumps(data), encoding="utf-8")
+
+    assert repository.find_retrieved(asset_url=url) is None
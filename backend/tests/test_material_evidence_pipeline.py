@@ -12,6 +12,8 @@ from course_generation_workflow import (
 )
 from course_quality import build_grounding_quality_report
 from material_evidence import (
+    EvidenceKeywordIndex,
+    _relevance,
     attach_evidence_to_plan,
     build_evidence_catalog_summary,
     extract_grounding_annotations,
@@ -279,3 +281,15 @@ def test_build_evidence_catalog_summary_no_truncation_needed():
     ]
     summary = build_evidence_catalog_summary(evidence, max_items=80)
     assert len(summary.splitlines()) == 5
+
+
+def test_evidence_keyword_index_ranks_exactly_like_pairwise_relevance():
+    from tools.evidence_ranking_bench import rank_by_sorting, synthetic_catalog, synthetic_queries
+
+    catalog = synthetic_catalog(600)
+    index = EvidenceKeywordIndex(catalog)
+    for query in synthetic_queries(40) + ["", "无关内容"]:
+        assert [item["evidence_id"] for item in index.top(query, 4)] == rank_by_sorting(query, catalog)
+        scores = index.scores(query)
+        for position, item in enumerate(catalog):
+            assert scores.get(position, 0.0) == _relevance(query, item)
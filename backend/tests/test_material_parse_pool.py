@@ -0,0 +1,115 @@
+"""资料解析池：跨资产解析缓存与大 PDF 分页切片。"""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+from reportlab.pdfgen import canvas
+
+import material_parser
+from material_parse_pool import MaterialParserPool
+from material_parser import parse_material_asset
+from material_storage import MaterialRepository
+
+
+class FakeUpload:
+    def __init__(self, filename: str, content: bytes, content_type: str = "text/markdown") -> None:
+        self.filename = filename
+        self.content_type = content_type
+        self._content = content
+        self._offset = 0
+
+    async def read(self, size: int) -> bytes:
+        chunk = self._content[self._offset:self._offset + size]
+        self._offset += len(chunk)
+        return chunk
+
+
+def _pdf_bytes(path: Path, pages: int) -> bytes:
+    document = canvas.Canvas(str(path))
+    for page in range(1, pages + 1):
+        document.drawString(72, 720, f"Page {page} definition of gradient descent")
+        document.showPage()
+    document.save()
+    return path.read_bytes()
+
+
+@pytest.mark.asyncio
+async def test_same_file_in_new_asset_reuses_shared_parse(monkeypatch, tmp_path):
+    repository = MaterialRepository(tmp_path / "materials")
+    calls: list[str] = []
+    original = material_parser.TextDocumentParser.parse
+
+    def counting_parse(self, asset, source_path):
+        calls.append(asset.asset_id)
+        return original(self, asset, source_path)
+
+    monkeypatch.setattr(material_parser.TextDocumentParser, "parse", counting_parse)
+    content = b"# Title\n\nGradient descent updates parameters."
+    first = await repository.save_upload(FakeUpload("a.md", content))
+    first_document = await parse_material_asset(repository, first)
+    repository.delete_unbound(first.asset_id)
+
+    second = await repository.save_upload(FakeUpload("b.md", content))
+    second_document = await parse_material_asset(repository, second)
+
+    assert second.asset_id != first.asset_id
+    assert calls == [first.asset_id]
+    assert second_document.asset_id == second.asset_id
+    assert second_document.document_id != first_document.document_id
+    assert [block.text for block in second_document.blocks] == [block.text for block in first_document.blocks]
+    assert repository.get_asset(second.asset_id).status == "parsed"
+
+
+@pytest.mark.asyncio
+async def test_large_pdf_is_parsed_in_page_shards_with_progress(monkeypatch, tmp_path):
+    monkeypatch.setenv("MATERIAL_PDF_PAGES_PER_SHARD", "2")
+    repository = MaterialRepository(tmp_path / "materials")
+    payload = _pdf_bytes(tmp_path / "deck.pdf", pages=5)
+    asset = await repository.save_upload(FakeUpload("deck.pdf", payload, "application/pdf"))
+    events: list[dict] = []
+
+    pool = MaterialParserPool(workers=2, kind="process")
+    try:
+        document = await parse_material_asset(repository, asset, on_progress=events.append, pool=pool)
+    finally:
+        pool.shutdown()
+
+    assert document.parser_name == "docling"
+    assert [block.locator.page for block in document.blocks] == [1, 2, 3, 4, 5]
+    assert [block.block_id for block in document.blocks] == [f"blk-{index}" for index in range(1, 6)]
+    assert events[-1]["pages_done"] == 5 and events[-1]["page_total"] == 5
+    assert len(events) == 3
+
+    monkeypatch.setenv("MATERIAL_PDF_PAGES_PER_SHARD", "50")
+    whole = material_parser.DoclingDocumentParser().parse(asset, repository.source_path(asset))
+    assert [block.text for block in whole.blocks] == [block.text for block in document.blocks]
+
+
+@pytest.mark.asyncio
+async def test_thread_pool_parses_large_pdf_whole(monkeypatch, tmp_path):
+    """线程池里切片不会并行，整份解析，不上报分页进度。"""
+    monkeypatch.setenv("MATERIAL_PDF_PAGES_PER_SHARD", "2")
+    shards: list[tuple[int, int]] = []
+    original = material_parser._pdf_page_shard
+    monkeypatch.setattr(
+        material_parser,
+        "_pdf_page_shard",
+        lambda source, start, stop: shards.append((start, stop)) or original(source, start, stop),
+    )
+    repository = MaterialRepository(tmp_path / "materials")
+    payload = _pdf_bytes(tmp_path / "deck.pdf", pages=5)
+    asset = await repository.save_upload(FakeUpload("deck.pdf", payload, "application/pdf"))
+    events: list[dict] = []
+
+    document = await parse_material_asset(
+        repository,
+        asset,
+        on_progress=events.append,
+        pool=MaterialParserPool(workers=2, kind="thread"),
+    )
+
+    assert [block.locator.page for block in document.blocks] == [1, 2, 3, 4, 5]
+    assert shards == []
+    assert events == []
@@ -0,0 +1,210 @@
+"""进程内指标：文本格式、热路径打点与抓取时的采集回调。"""
+
+from __future__ import annotations
+
+import asyncio
+import re
+from copy import deepcopy
+from types import SimpleNamespace
+
+import pytest
+
+import metrics
+from ai_capacity import get_provider_capacity_controller, reset_provider_capacity_controllers
+from metrics import MetricFamily, MetricsRegistry, observe_llm_call
+from storage import Storage
+from websocket_service import WebSocketService
+
+
+def _sample(text: str, name: str, **labels: str) -> float | None:
+    for line in text.splitlines():
+        if line.startswith("#"):
+            continue
+        match = re.match(r"^([a-zA-Z_:][\w:]*)(\{.*\})? (\S+)$", line)
+        if not match or match.group(1) != name:
+            continue
+        found = dict(re.findall(r'(\w+)="((?:[^"\\]|\\.)*)"', match.group(2) or ""))
+        if found == labels:
+            return float(match.group(3))
+    return None
+
+
+def test_histogram_renders_cumulative_buckets_sum_and_count() -> None:
+    registry = MetricsRegistry()
+    histogram = registry.histogram("demo_seconds", "Demo.", ("op",), buckets=(0.1, 1))
+    for value in (0.05, 0.5, 0.5, 3):
+        histogram.observe(value, op="read")
+
+    text = registry.render()
+
+    assert "# TYPE demo_seconds histogram" in text
+    assert _sample(text, "demo_seconds_bucket", op="read", le="0.1") == 1
+    assert _sample(text, "demo_seconds_bucket", op="read", le="1") == 3
+    assert _sample(text, "demo_seconds_bucket", op="read", le="+Inf") == 4
+    assert _sample(text, "demo_seconds_count", op="read") == 4
+    assert _sample(text, "demo_seconds_sum", op="read") == pytest.approx(4.05)
+
+
+def test_label_values_are_escaped_and_shapes_are_checked() -> None:
+    registry = MetricsRegistry()
+    counter = registry.counter("demo_total", "Demo.", ("model",))
+    counter.inc(model='qwen "max"\\v2')
+
+    assert 'demo_total{model="qwen \\"max\\"\\\\v2"} 1' in registry.render()
+    assert registry.counter("demo_total", "Demo.", ("model",)) is counter
+    with pytest.raises(ValueError):
+        registry.counter("demo_total", "Demo.", ("role",))
+    with pytest.raises(ValueError):
+        counter.inc(role="x")
+
+
+def test_failing_collector_does_not_break_the_scrape() -> None:
+    registry = MetricsRegistry()
+
+    def broken():
+        raise RuntimeError("boom")
+
+    registry.register_collector("broken", broken)
+    registry.register_collector(
+        "queue", lambda: [MetricFamily("demo_queue_depth", "gauge", "Demo.").add(3)],
+    )
+
+    assert _sample(registry.render(), "demo_queue_depth") == 3
+
+
+def test_llm_call_records_latency_first_token_and_tokens() -> None:
+    before = metrics.llm_tokens.value(model="m-test", role="writer", direction="output", source="provider")
+    observe_llm_call(
+        model_id="m-test",
+        model_role="writer",
+        stream=True,
+        status="completed",
+        duration_s=2.5,
+        ttfb_s=0.4,
+        input_tokens=1200,
+        output_tokens=300,
+        tokens_source="provider",
+    )
+
+    assert metrics.llm_request_seconds.count(model="m-test", role="writer", stream="true", status="completed") >= 1
+    assert metrics.llm_first_token_seconds.count(model="m-test", role="writer", stream="true") >= 1
+    assert metrics.llm_tokens.value(
+        model="m-test", role="writer", direction="output", source="provider",
+    ) == before + 300
+
+
+@pytest.mark.asyncio
+async def test_queue_wait_is_recorded_with_reason_and_aimd_limits_are_collected(monkeypatch) -> None:
+    monkeypatch.setenv("AI_PROVIDER_INITIAL_CONCURRENCY", "1")
+    monkeypatch.setenv("AI_PROVIDER_MAX_CONCURRENCY", "2")
+    monkeypatch.setenv("AI_PROVIDER_START_INTERVAL_SECONDS", "0")
+    reset_provider_capacity_controllers()
+    controller = get_provider_capacity_controller("provider-metrics")
+    first = await controller.acquire("model-a")
+    waiting = asyncio.create_task(controller.acquire("model-a"))
+    await asyncio.sleep(0.01)
+
+    text = metrics.registry.render()
+    await first.release()
+    second = await asyncio.wait_for(waiting, timeout=0.5)
+    await second.release()
+
+    assert _sample(text, "lingzhi_provider_waiting", provider="provider-metrics") == 1
+    assert _sample(text, "lingzhi_model_in_flight", provider="provider-metrics", model="model-a") == 1
+    assert _sample(text, "lingzhi_model_concurrency_limit", provider="provider-metrics", model="model-a") == 1
+    assert metrics.llm_queue_wait_seconds.count(provider="provider-metrics", reason="model_concurrency") == 1
+    assert metrics.llm_queue_wait_seconds.count(provider="provider-metrics", reason="none") == 1
+    reset_provider_capacity_controllers()
+
+
+def test_storage_records_io_and_data_cache_hits(tmp_path) -> None:
+    store = Storage(data_dir=str(tmp_path), shared=False)
+    writes = metrics.storage_io_bytes.value(op="write")
+    reads = metrics.storage_io_seconds.count(op="read")
+
+    store.save_data("demo.json", {"items": [1, 2, 3]})
+    store._data_cache.clear()
+    assert store.load_data("demo.json") == {"items": [1, 2, 3]}
+    assert store.load_data("demo.json") == {"items": [1, 2, 3]}
+
+    assert metrics.storage_io_bytes.value(op="write") > writes
+    assert metrics.storage_io_seconds.count(op="read") == reads + 1
+    assert store.stats()["data_cache_hits"] == 1
+    assert store.stats()["data_cache_misses"] == 1
+
+
+class _Socket:
+    def __init__(self, *, fail: bool = False) -> None:
+        self.fail = fail
+        self.sent: list[dict] = []
+
+    async def accept(self) -> None:
+        return None
+
+    async def send_json(self, message: dict) -> None:
+        if self.fail:
+            raise RuntimeError("closed")
+        self.sent.append(message)
+
+
+@pytest.mark.asyncio
+async def test_websocket_send_latency_failures_and_connection_gauge() -> None:
+    service = WebSocketService()
+    healthy, broken = _Socket(), _Socket(fail=True)
+    await service.connect(healthy)
+    await service.connect(broken)
+    collect = metrics.websocket_collector(service)
+    assert collect()[0].samples[0].value == 2
+    sent = metrics.websocket_send_seconds.count(type="metrics_probe")
+    failures = metrics.websocket_send_failures.value(type="metrics_probe")
+
+    await service.broadcast({"type": "metrics_probe"})
+
+    assert healthy.sent == [{"type": "metrics_probe"}]
+    assert metrics.websocket_send_seconds.count(type="metrics_probe") == sent + 1
+    assert metrics.websocket_send_failures.value(type="metrics_probe") == failures + 1
+    assert collect()[0].samples[0].value == 1
+
+
+@pytest.mark.asyncio
+async def test_task_manager_collector_reports_queue_and_running_jobs() -> None:
+    queue: asyncio.Queue[str] = asyncio.Queue()
+    await queue.put("task-2")
+    manager = SimpleNamespace(
+        tasks={"task-1": {"status": "running"}, "task-2": {"status": "pending"}},
+        _task_queue=queue,
+        _running_job_tasks={"task-1": object()},
+        _running_node_tasks={"task-1": {"n1": object(), "n2": object()}},
+    )
+    registry = MetricsRegistry()
+    registry.register_collector("task_manager", metrics.task_manager_collector(manager))
+
+    text = registry.render()
+
+    assert _sample(text, "lingzhi_task_queue_depth") == 1
+    assert _sample(text, "lingzhi_task_running_jobs") == 1
+    assert _sample(text, "lingzhi_task_running_nodes") == 2
+    assert _sample(text, "lingzhi_tasks", status="pending") == 1
+
+
+
+def test_cache_collector_reports_llm_response_and_content_chunk_caches(tmp_path, monkeypatch) -> None:
+    import content_chunks
+    import llm_response_cache
+
+    monkeypatch.setattr(llm_response_cache, "_cache", SimpleNamespace(stats=lambda: {"hits": 3, "misses": 1}))
+    monkeypatch.setattr(content_chunks, "_stores", {})
+    store = content_chunks.chunk_store_for(tmp_path / "course_versions")
+    manifest = store.put({"nodes": [{"content": "正文" * 400}]}, [("nodes", "*")])
+    store._cache.clear()
+    store.load(deepcopy(manifest))
+    store.load(deepcopy(manifest))
+
+    registry = MetricsRegistry()
+    registry.register_collector("caches", metrics.collect_caches)
+    text = registry.render()
+
+    assert _sample(text, "lingzhi_cache_lookups_total", cache="llm_response", result="hit") == 3
+    assert _sample(text, "lingzhi_cache_hit_ratio", cache="llm_response") == 0.75
+    assert _sample(text, "lingzhi_cache_lookups_total", cache="content_chunks", result="hit") == 1
+    assert _sample(text, "lingzhi_cache_lookups_total", cache="content_chunks", result="miss") == 1
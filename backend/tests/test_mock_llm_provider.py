@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from ai_base import AIBase
+from tools.capacity_mock_bench import course_script_responder
+from tools.mock_llm_provider import MockProviderConfig, MockProviderServer, parse_latency
+
+
+@pytest.fixture
+def mock_provider(monkeypatch):
+    server = MockProviderServer(
+        MockProviderConfig(latency="fixed:0.01", tokens_per_second=5000, output_tokens=24, seed=3)
+    ).start()
+    monkeypatch.setenv("AI_API_KEY", "mock-key")
+    monkeypatch.setenv("AI_API_BASE", server.base_url)
+    monkeypatch.delenv("MODELSCOPE_API_KEY", raising=False)
+    monkeypatch.setenv("LLM_RESPONSE_CACHE", "off")
+    yield server
+    server.stop()
+
+
+def _service() -> AIBase:
+    service = AIBase()
+    service.smart_models = ["mock-smart"]
+    service.fast_models = ["mock-smart"]
+    service._working_model_cache.clear()
+    service._model_failure_cache.clear()
+    service._provider_failure = None
+    return service
+
+
+@pytest.mark.asyncio
+async def test_aibase_streams_from_mock_provider(mock_provider):
+    chunks = [chunk async for chunk in _service()._stream_llm("讲一讲函数", "你是老师")]
+
+    assert len(chunks) > 1
+    assert len("".join(chunks)) == 24
+    stats = mock_provider.state.stats()
+    assert stats["completed"] == 1 and stats["output_tokens"] == 24
+
+
+@pytest.mark.asyncio
+async def test_injected_errors_map_to_capacity_failure_kinds(mock_provider):
+    from openai import APIStatusError, AsyncOpenAI
+
+    client = AsyncOpenAI(base_url=mock_provider.base_url, api_key="mock-key", max_retries=0)
+    messages = [{"role": "user", "content": "hi"}]
+    mock_provider.state.config.update({"rate_limit_ratio": 1.0, "retry_after_seconds": 7})
+    with pytest.raises(APIStatusError) as rate_limited:
+        await client.chat.completions.create(model="m", messages=messages, stream=True)
+    mock_provider.state.config.update({"rate_limit_ratio": 0.0, "quota_after_requests": 1})
+    with pytest.raises(APIStatusError) as quota:
+        await client.chat.completions.create(model="m", messages=messages, stream=True)
+
+    assert rate_limited.value.response.headers["retry-after"] == "7"
+    assert AIBase._capacity_failure_kind(rate_limited.value) == "rate_limited"
+    assert AIBase._capacity_failure_kind(quota.value) == "quota_exhausted"
+
+
+def test_course_script_answers_structured_stages_and_latency_specs():
+    batch = {"batch_id": "b-1", "expected_node_ids": ["L2-1-1", "L2-1-2"]}
+    body = {"messages": [
+        {"role": "system", "content": "## 章节小节目录批次 V2\n\n## 当前批次\n" + json.dumps(batch)},
+        {"role": "user", "content": "请输出"},
+    ]}
+    sections = json.loads(course_script_responder(body))["sections"]
+
+    assert [item["node_id"] for item in sections] == batch["expected_node_ids"]
+    assert len({item["title"] for item in sections}) == 2
+    assert course_script_responder({"messages": [{"role": "user", "content": "## 有界正文生成契约"}]}) is None
+    assert parse_latency("lognormal:-0.5,0.6") == ("lognormal", (-0.5, 0.6))
+    with pytest.raises(ValueError):
+        parse_latency("gamma:1")
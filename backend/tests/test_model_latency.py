@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from ai_base import AIBase
+from ai_capacity import admission, reset_provider_capacity_controllers
+from model_latency import (
+    ModelLatencyTracker,
+    get_model_latency_tracker,
+    reset_model_latency_tracker,
+)
+
+
+class SlowStartStream:
+    def __init__(self, text: str, first_token_delay: float) -> None:
+        self.text = text
+        self.first_token_delay = first_token_delay
+        self.sent = False
+        self.closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.sent:
+            raise StopAsyncIteration
+        await asyncio.sleep(self.first_token_delay)
+        self.sent = True
+        return SimpleNamespace(choices=[SimpleNamespace(
+            delta=SimpleNamespace(reasoning_content=None, content=self.text),
+            finish_reason=None,
+        )])
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+class PerModelCompletions:
+    def __init__(self, delays: dict[str, float]) -> None:
+        self.delays = delays
+        self.calls: list[str] = []
+        self.streams: dict[str, SlowStartStream] = {}
+
+    async def create(self, **kwargs):
+        model = kwargs["model"]
+        self.calls.append(model)
+        stream = SlowStartStream(f"from-{model}", self.delays[model])
+        self.streams[model] = stream
+        return stream
+
+
+@pytest.fixture
+def latency_env(monkeypatch):
+    monkeypatch.setenv("AI_API_KEY", "test-key")
+    monkeypatch.setenv("AI_API_BASE", "https://primary.example.test/v1")
+    monkeypatch.delenv("MODELSCOPE_API_KEY", raising=False)
+    monkeypatch.setenv("AI_PROVIDER_START_INTERVAL_SECONDS", "0")
+    monkeypatch.setenv("AI_HEDGE_REQUESTS", "1")
+    monkeypatch.setenv("AI_HEDGE_MIN_DELAY_MS", "20")
+    monkeypatch.setenv("AI_LATENCY_MIN_SAMPLES", "4")
+    reset_provider_capacity_controllers()
+    reset_model_latency_tracker()
+    yield
+    reset_provider_capacity_controllers()
+    reset_model_latency_tracker()
+
+
+def _service(completions) -> AIBase:
+    service = AIBase()
+    service.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    service.smart_models = ["model-a", "model-b"]
+    service.fast_models = ["model-a", "model-b"]
+    service._working_model_cache.clear()
+    service._model_failure_cache.clear()
+    service._provider_failure = None
+    return service
+
+
+def _seed(service: AIBase, model_id: str, metric: str, value_ms: float) -> None:
+    tracker = get_model_latency_tracker()
+    for _ in range(tracker.min_samples):
+        tracker.observe(service._primary_provider_scope(), model_id, metric, value_ms)
+
+
+def test_routing_promotes_a_clearly_faster_model_only_with_evidence():
+    tracker = ModelLatencyTracker(min_samples=3, routing_margin_ms=100)
+    models = ["a", "b", "c"]
+    for _ in range(3):
+        tracker.observe("p", "a", "ttft", 900)
+        tracker.observe("p", "b", "ttft", 700)
+    assert tracker.order("p", models) == models
+
+    for _ in range(3):
+        tracker.observe("p", "c", "ttft", 200)
+    assert tracker.order("p", models) == ["c", "a", "b"]
+    assert tracker.order("other-provider", models) == models
+    assert tracker.hedge_delay_seconds("p", "a", "ttft") is None
+
+
+def test_censored_samples_only_raise_the_learned_quantiles():
+    tracker = ModelLatencyTracker(min_samples=3, hedge_percentile=0.95)
+    tracker.observe("p", "a", "ttft", 50, censored=True)
+    assert tracker.quantile("p", "a", "ttft", 0.5) is None
+
+    for _ in range(3):
+        tracker.observe("p", "a", "ttft", 1000)
+    tracker.observe("p", "a", "ttft", 10, censored=True)
+    assert tracker.quantile("p", "a", "ttft", 0.5) == 1000
+
+    tracker.observe("p", "a", "ttft", 4000, censored=True)
+    assert tracker.quantile("p", "a", "ttft", 0.95) == 4000
+
+
+@pytest.mark.asyncio
+async def test_hedge_that_loses_quickly_does_not_look_faster(latency_env, monkeypatch):
+    monkeypatch.setenv("AI_HEDGE_MAX_DELAY_MS", "20")
+    monkeypatch.setenv("AI_LATENCY_ROUTING_MARGIN_MS", "0")
+    reset_model_latency_tracker()
+    completions = PerModelCompletions({"model-a": 0.08, "model-b": 5.0})
+    service = _service(completions)
+    _seed(service, "model-a", "ttft", 1500)
+    _seed(service, "model-b", "ttft", 1500)
+    tracker = get_model_latency_tracker()
+    scope = service._primary_provider_scope()
+
+    with admission("interactive", course_id="c1"):
+        for _ in range(tracker.min_samples):
+            chunks = [chunk async for chunk in service._stream_llm("q", "s")]
+            assert chunks == ["from-model-a"]
+
+    assert completions.streams["model-b"].closed
+    assert tracker.snapshot()["hedges"]["lost"] == tracker.min_samples
+    assert tracker.quantile(scope, "model-b", "ttft", 0.5) == 1500
+    assert service._models_for(False) == ["model-a", "model-b"]
+
+
+@pytest.mark.asyncio
+async def test_models_for_follows_learned_first_token_latency(latency_env):
+    service = _service(PerModelCompletions({}))
+    assert service._models_for(False) == ["model-a", "model-b"]
+
+    _seed(service, "model-a", "ttft", 4000)
+    _seed(service, "model-b", "ttft", 600)
+
+    assert service._models_for(False) == ["model-b", "model-a"]
+
+
+@pytest.mark.asyncio
+async def test_slow_first_token_is_hedged_and_loser_cancelled(latency_env):
+    completions = PerModelCompletions({"model-a": 5.0, "model-b": 0.0})
+    service = _service(completions)
+    _seed(service, "model-a", "ttft", 30)
+    _seed(service, "model-b", "ttft", 30)
+
+    with admission("interactive", course_id="c1"):
+        chunks = [chunk async for chunk in service._stream_llm("q", "s")]
+
+    assert chunks == ["from-model-b"]
+    assert completions.calls == ["model-a", "model-b"]
+    assert completions.streams["model-a"].closed
+    snapshot = get_model_latency_tracker().snapshot()
+    assert snapshot["hedges"]["won"] == 1
+
+
+@pytest.mark.asyncio
+async def test_short_json_calls_hedge_but_bulk_text_calls_do_not(latency_env):
+    completions = PerModelCompletions({"model-a": 5.0, "model-b": 0.0})
+    service = _service(completions)
+    _seed(service, "model-a", "total", 30)
+    _seed(service, "model-b", "total", 30)
+
+    result = await service._call_llm("q", "s", use_fast_model=True, json_mode=True)
+    assert result == "from-model-b"
+    assert completions.calls == ["model-a", "model-b"]
+    # A cancelled loser only ever raises the metric non-stream hedges rank on.
+    totals = get_model_latency_tracker().snapshot()["models"]
+    loser = next(entry for entry in totals if entry["model_id"] == "model-a")
+    assert loser["total"]["p50_ms"] >= 30
+
+    completions.delays["model-a"] = 0.05
+    completions.calls.clear()
+    assert await service._call_llm("q", "s", retry_count=1) == "from-model-a"
+    assert completions.calls == ["model-a"]
@@ -139,7 +139,7 @@ def test_apply_rejects_stale_draft_and_recompiles_instead_of_trusting_client_pla
     existing = build_blueprint_draft(course)
     repository = DraftRepository(existing)
 
-    async def load_course(_course_id):
+    async def load_course(_course_id, _task_manager):
         return course
 
     monkeypatch.setattr(course_versions, "_course_for_blueprint", load_course)
@@ -193,7 +193,7 @@ def test_adjustment_apply_is_bound_to_previewed_operations_and_ignores_tampered_
     existing = build_blueprint_draft(course)
     repository = DraftRepository(existing)
 
-    async def load_course(_course_id):
+    async def load_course(_course_id, _task_manager):
         return course
 
     monkeypatch.setattr(course_versions, "_course_for_blueprint", load_course)
@@ -270,7 +270,7 @@ def test_blueprint_endpoint_exposes_the_coverage_verdict(monkeypatch):
         },
     }
 
-    async def load_course(_course_id):
+    async def load_course(_course_id, _task_manager):
         return course
 
     monkeypatch.setattr(course_versions, "_course_for_blueprint", load_course)
@@ -296,7 +296,7 @@ def test_blueprint_endpoint_reports_unknown_coverage_for_pre_d1_courses(monkeypa
     """老课程没有判定时报 unknown，绝不能默认成"完整"。"""
     course = _canonical_course()
 
-    async def load_course(_course_id):
+    async def load_course(_course_id, _task_manager):
         return course
 
     monkeypatch.setattr(course_versions, "_course_for_blueprint", load_course)
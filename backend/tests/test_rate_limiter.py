@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import multiprocessing
+from pathlib import Path
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from rate_limiter import (
+    RATE_LIMITS,
+    LocalRateLimitBackend,
+    RateLimiter,
+    RateLimitMiddleware,
+    SharedMemoryRateLimitBackend,
+    _match_rate_limit,
+)
+
+
+def _allowed(backend, key: str, limit: int, window: float, times: list[float]) -> int:
+    return sum(backend.hit(key, limit, window, now).allowed for now in times)
+
+
+def test_sliding_window_blocks_the_fixed_window_edge_burst():
+    backend = LocalRateLimitBackend()
+    # 第一个窗口的最后一秒打满，再在下一个窗口开头继续打：固定窗口会放过 2 倍。
+    end_of_first = [59.5] * 10
+    start_of_second = [60.5] * 10
+    assert _allowed(backend, "ip:/api/x", 10, 60, end_of_first) == 10
+    assert _allowed(backend, "ip:/api/x", 10, 60, start_of_second) == 0
+
+    decision = backend.hit("ip:/api/x", 10, 60, 60.5)
+    assert not decision.allowed
+    assert 0 < decision.retry_after <= 60
+    # 上一窗口的权重随时间衰减，额度逐步恢复。
+    assert backend.hit("ip:/api/x", 10, 60, 60.5 + decision.retry_after + 1e-6).allowed
+
+
+def test_rejected_requests_do_not_consume_quota_and_keys_are_independent():
+    backend = LocalRateLimitBackend()
+    assert _allowed(backend, "a", 3, 10, [0.0] * 5) == 3
+    assert _allowed(backend, "b", 3, 10, [0.0] * 3) == 3
+    assert _allowed(backend, "a", 3, 10, [25.0] * 3) == 3
+
+
+def test_local_backend_purges_expired_keys_per_stripe():
+    backend = LocalRateLimitBackend(stripes=1, min_purge_size=8)
+    for index in range(8):
+        backend.hit(f"k{index}", 5, 1, 0.0)
+    assert len(backend) == 8
+    # 超过水位时只留下仍影响判定的键。
+    backend.hit("fresh", 5, 1, 10.0)
+    assert len(backend) == 1
+
+
+def _hit_shared(path: str, results) -> None:
+    backend = SharedMemoryRateLimitBackend(path, slots=256, stripes=4)
+    results.put(sum(backend.hit("ip:/api/x", 5, 60, 1.0).allowed for _ in range(5)))
+    backend.close()
+
+
+def test_shared_backend_enforces_one_limit_across_processes(tmp_path: Path):
+    path = tmp_path / "rate_limits.bin"
+    backend = SharedMemoryRateLimitBackend(path, slots=256, stripes=4)
+    assert _allowed(backend, "ip:/api/x", 5, 60, [1.0] * 3) == 3
+
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+    child = context.Process(target=_hit_shared, args=(str(path), results))
+    child.start()
+    child.join(10)
+
+    assert results.get(timeout=1) == 2
+    assert not backend.hit("ip:/api/x", 5, 60, 1.0).allowed
+    backend.close()
+
+
+def test_shared_backend_reuses_expired_slots_when_probe_is_full(tmp_path: Path):
+    backend = SharedMemoryRateLimitBackend(tmp_path / "rate_limits.bin", slots=4, stripes=1, probe=4)
+    for index in range(4):
+        assert backend.hit(f"old-{index}", 1, 1, 0.0).allowed
+    assert backend.hit("new", 1, 1, 5.0).allowed
+    assert not backend.hit("new", 1, 1, 5.0).allowed
+    backend.close()
+
+
+def test_compiled_matcher_keeps_first_declared_prefix_semantics():
+    def legacy(path: str) -> tuple[int, int]:
+        for prefix, limits in RATE_LIMITS.items():
+            if prefix.startswith("/") and path.startswith(prefix):
+                return limits
+        return RATE_LIMITS["_default"]
+
+    for path in (
+        "/api/course-generation/generate",
+        "/api/courses/c1/document",
+        "/api/courses",
+        "/api/execute/python",
+        "/api/diagrams",
+        "/api/tasks/t1",
+    ):
+        assert _match_rate_limit(path, "POST") == legacy(path)
+
+
+def test_middleware_returns_429_with_retry_after():
+    app = FastAPI()
+
+    @app.get("/api/ping")
+    def ping():
+        return {"ok": True}
+
+    @app.get("/health")
+    def health():
+        return {"ok": True}
+
+    app.add_middleware(RateLimitMiddleware, limiter=RateLimiter(LocalRateLimitBackend(), clock=lambda: 30.0))
+    client = TestClient(app)
+    limit, window = RATE_LIMITS["_default"]
+
+    assert all(client.get("/api/ping").status_code == 200 for _ in range(limit))
+    limited = client.get("/api/ping")
+    assert limited.status_code == 429
+    assert 1 <= int(limited.headers["Retry-After"]) <= window
+    assert client.get("/api/ping", headers={"X-Forwarded-For": "10.0.0.1"}).status_code == 200
+    assert client.get("/health").status_code == 200
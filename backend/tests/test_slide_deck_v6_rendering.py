@@ -1946,3 +1946,65 @@ def test_pptx_renderer_applies_the_frozen_template_theme_overrides(
 
     assert observed["accent"] == "315E7D"
     assert observed["title_font"] == "Noto Serif SC"
+
+
+def test_cached_v6_export_rerenders_and_reaudits_only_the_edited_page(tmp_path: Path) -> None:
+    from slide_deck_v6_renderer import render_slide_deck_v6_pptx
+    from slide_page_render_cache import SlidePageRenderCache
+
+    _document, deck = _code_deck()
+    deck.pages = [
+        deck.pages[0].model_copy(deep=True, update={"page_id": f"page-{index}", "page_ordinal": index})
+        for index in range(3)
+    ]
+    cache = SlidePageRenderCache()
+    first = render_slide_deck_v6_pptx(deck, tmp_path / "first.pptx", page_cache=cache)
+    assert first.rendered_page_ids == ["page-0", "page-1", "page-2"]
+
+    deck.pages[1].title = "Trace the validated value back to its event"
+    edited = render_slide_deck_v6_pptx(deck, tmp_path / "edited.pptx", page_cache=cache)
+    assert edited.rendered_page_ids == ["page-1"]
+    assert edited.reused_page_ids == ["page-0", "page-2"]
+
+    uncached = export_slide_deck_v6_pptx(deck, tmp_path / "uncached.pptx")
+    assert [slide.part.blob for slide in Presentation(edited.path).slides] == [
+        slide.part.blob for slide in Presentation(uncached).slides
+    ]
+    assert audit_exported_pptx(
+        edited.path,
+        expected_slide_count=3,
+        page_issues=edited.page_issues,
+    ) == audit_exported_pptx(uncached, expected_slide_count=3)
+
+
+def test_cached_slide_restore_renumbers_image_relationships(tmp_path: Path) -> None:
+    from io import BytesIO
+
+    from PIL import Image
+
+    from slide_deck_v6_renderer import _capture_slide, _restore_slide
+
+    def png(color: str) -> bytes:
+        buffer = BytesIO()
+        Image.new("RGB", (4, 4), color).save(buffer, format="PNG")
+        return buffer.getvalue()
+
+    source = Presentation()
+    slide = source.slides.add_slide(source.slide_layouts[6])
+    slide.shapes.add_picture(BytesIO(png("red")), 0, 0)
+    slide.shapes.add_picture(BytesIO(png("blue")), 100, 100)
+    cached = _capture_slide(slide, [])
+    assert cached is not None and len(cached.images) == 2
+
+    target = Presentation()
+    occupied = target.slides.add_slide(target.slide_layouts[6])
+    occupied.shapes.add_picture(BytesIO(png("green")), 0, 0)
+    restored = target.slides.add_slide(target.slide_layouts[6])
+    restored.shapes.add_picture(BytesIO(png("green")), 0, 0)
+    _restore_slide(restored, cached)
+    target.save(tmp_path / "restored.pptx")
+
+    reopened = Presentation(tmp_path / "restored.pptx").slides[1]
+    assert [shape.image.blob for shape in reopened.shapes] == [
+        shape.image.blob for shape in slide.shapes
+    ]
@@ -1,3 +1,5 @@
+import json
+import shutil
 import tempfile
 import unittest
 from pathlib import Path
@@ -14,6 +16,36 @@ class FakeUpload:
 
 
 class TeacherCourseSpaceTests(unittest.IsolatedAsyncioTestCase):
+    async def test_owner_index_tracks_writes_and_heals_from_disk(self):
+        root = Path(tempfile.mkdtemp())
+        repository = TeacherCourseSpaceRepository(root)
+        first = repository.create_package("teacher-a", "数据结构", "2025-2026", "春季")
+        second = repository.create_package("teacher-a", "算法", "2025-2026", "春季")
+        repository.create_package("teacher-b", "数据结构", "2025-2026", "春季")
+        repository.bind_course(repository.load_owned(first["package_id"], "teacher-a"), "course-1")
+
+        self.assertEqual(
+            sorted(repository.index.lookup("owner_id", "teacher-a")),
+            sorted([first["package_id"], second["package_id"]]),
+        )
+        self.assertEqual(repository.index.lookup("course_id", "course-1"), [first["package_id"]])
+        # bind_course 晚于第二个包写入，按 updated_at 倒序排在前面。
+        self.assertEqual(
+            [item["package_id"] for item in repository.list_owned("teacher-a")],
+            [first["package_id"], second["package_id"]],
+        )
+
+        manifest = root / second["package_id"] / "manifest.json"
+        edited = json.loads(manifest.read_text(encoding="utf-8"))
+        edited["owner_id"] = "teacher-c"
+        manifest.write_text(json.dumps(edited, ensure_ascii=False), encoding="utf-8")
+        self.assertEqual([item["package_id"] for item in repository.list_owned("teacher-a")], [first["package_id"]])
+        self.assertEqual(repository.index.lookup("owner_id", "teacher-c"), [second["package_id"]])
+
+        shutil.rmtree(root / first["package_id"])
+        self.assertEqual(repository.list_owned("teacher-a"), [])
+        self.assertEqual(len(TeacherCourseSpaceRepository(root).index), 2)
+
     async def test_import_is_owned_classified_and_path_safe(self):
         repository = TeacherCourseSpaceRepository(Path(tempfile.mkdtemp()))
         created = repository.create_package("teacher-a", "数据结构", "2025-2026", "春季")
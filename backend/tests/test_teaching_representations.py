@@ -237,6 +237,112 @@ def test_revision_event_replay_is_idempotent_and_course_isolated(tmp_path):
         repository.apply_revision_event("course-2", event)
 
 
+def test_operation_log_reconciliation_matches_sequential_events_with_one_write(tmp_path, monkeypatch):
+    from course_document import refresh_document_revision
+
+    documents = [document_from_legacy_course(legacy_course())]
+    for index in range(4):
+        after = documents[-1].model_copy(deep=True)
+        after.blocks[index % 2].payload["markdown"] = f"第 {index} 次修改"
+        refresh_document_revision(after)
+        documents.append(after)
+    events = [
+        revision_event_for_documents(before, after, command_id=f"command-log-{index}").model_dump(mode="json")
+        for index, (before, after) in enumerate(zip(documents, documents[1:]))
+    ]
+    log = [{"receipt": {"revision_change": event}} for event in events] + [{"receipt": {}}]
+
+    repositories = []
+    for name in ("sequential", "batched"):
+        repository = TeachingRepresentationRepository(tmp_path / name)
+        for representation_id, block in (("slides-a", 0), ("slides-b", 1)):
+            repository.register_representation(representation(
+                documents[0],
+                representation_id=representation_id,
+                block_id=documents[0].blocks[block].block_id,
+            ))
+        repositories.append(repository)
+    sequential, batched = repositories
+    for event in events:
+        expected = sequential.apply_revision_event(documents[0].course_id, event)
+
+    loads = []
+    writes = []
+    real_load = batched.load
+    real_write = batched._atomic_write
+    monkeypatch.setattr(batched, "load", lambda course_id: loads.append(course_id) or real_load(course_id))
+    monkeypatch.setattr(batched, "_atomic_write", lambda path, data: writes.append(path) or real_write(path, data))
+    reconciled = batched.reconcile_course_operation_log(documents[0].course_id, log)
+
+    course_id = documents[0].course_id
+    assert len(loads) == 1
+    assert writes == [batched._path(course_id), batched._watermark_path(course_id)]
+    assert [item.model_dump(exclude={"created_at", "updated_at"}) for item in reconciled.representations] == [
+        item.model_dump(exclude={"created_at", "updated_at"}) for item in expected.representations
+    ]
+    assert reconciled.derivation_graph.graph_revision == expected.derivation_graph.graph_revision
+    assert reconciled.applied_revision_event_ids == expected.applied_revision_event_ids
+
+    writes.clear()
+    batched.reconcile_course_operation_log(documents[0].course_id, log)
+    assert writes == []
+
+
+def test_operation_log_reconciliation_resumes_after_watermark(tmp_path, monkeypatch):
+    import teaching_representations
+    from course_document import refresh_document_revision
+
+    documents = [document_from_legacy_course(legacy_course())]
+    for index in range(3):
+        after = documents[-1].model_copy(deep=True)
+        after.blocks[0].payload["markdown"] = f"第 {index} 次修改"
+        refresh_document_revision(after)
+        documents.append(after)
+    log = [
+        {"receipt": {"revision_change": revision_event_for_documents(
+            before, after, command_id=f"command-resume-{index}",
+        ).model_dump(mode="json")}}
+        for index, (before, after) in enumerate(zip(documents, documents[1:]))
+    ]
+    course_id = documents[0].course_id
+    repository = TeachingRepresentationRepository(tmp_path)
+    repository.register_representation(representation(
+        documents[0],
+        representation_id="slides-a",
+        block_id=documents[0].blocks[0].block_id,
+    ))
+    repository.reconcile_course_operation_log(course_id, log[:2], source_stamp="stamp-1")
+    watermark = repository.reconciliation_watermark(course_id)
+    assert watermark.log_offset == 2
+    assert watermark.log_head_event_id == log[1]["receipt"]["revision_change"]["event_id"]
+    assert watermark.source_stamp == "stamp-1"
+
+    validated = []
+    real_validate = teaching_representations.CourseRevisionEvent.model_validate
+    monkeypatch.setattr(
+        teaching_representations.CourseRevisionEvent,
+        "model_validate",
+        lambda value: validated.append(value["event_id"]) or real_validate(value),
+    )
+    registry = repository.reconcile_course_operation_log(course_id, log, source_stamp="stamp-2")
+
+    assert validated == [log[2]["receipt"]["revision_change"]["event_id"]]
+    assert registry.applied_revision_event_ids == [
+        entry["receipt"]["revision_change"]["event_id"] for entry in log
+    ]
+    assert repository.reconciliation_watermark(course_id).log_offset == 3
+
+    # 注册表被其他写入改动后，水位不再可信，整段日志按已应用集合幂等重放。
+    repository.register_representation(representation(
+        documents[0],
+        representation_id="slides-b",
+        block_id=documents[0].blocks[1].block_id,
+    ))
+    validated.clear()
+    repository.reconcile_course_operation_log(course_id, log, source_stamp="stamp-2")
+    assert len(validated) == 3
+
+
 @pytest.mark.asyncio
 async def test_course_command_persists_replayable_revision_event(tmp_path):
     storage = MemoryStorage(legacy_course())
@@ -1611,6 +1717,47 @@ async def test_cancelled_build_is_not_overwritten_as_failed_by_the_late_worker(
     )
 
 
+@pytest.mark.asyncio
+async def test_startup_reconciles_only_courses_behind_their_watermark(tmp_path):
+    from representation_reconciliation import RepresentationReconciliationService
+    from storage import Storage
+
+    data_dir = str(tmp_path / "data")
+    storage = Storage(data_dir)
+    for course_id in ("course-a", "course-b"):
+        storage.save_course_sync(course_id, {"course_id": course_id, "course_operation_log": []})
+    representation_repository = TeachingRepresentationRepository(tmp_path / "representations")
+
+    async def boot(storage_obj):
+        service = RepresentationReconciliationService(
+            CourseDocumentRepository(storage_obj),
+            representation_repository,
+            sweep_interval_s=0,
+            sweep_courses_per_s=1000,
+        )
+        await service.start()
+        await service._queue.join()
+        await service.shutdown()
+        return service
+
+    first = await boot(storage)
+    assert first.startup["courses"] == 2
+    assert first.startup["enqueued"] == 2
+    assert first.startup["drain_ms"] is not None
+
+    storage.save_course_sync("course-b", {"course_id": "course-b", "course_name": "改过", "course_operation_log": []})
+    restarted = Storage(data_dir)
+    second = await boot(restarted)
+    assert second.startup["enqueued"] == 1
+    assert second.startup["skipped"] == 1
+    assert representation_repository.reconciliation_watermark("course-b").source_stamp == restarted.course_stamp(
+        "course-b"
+    )
+
+    assert await second.sweep() == 2
+    assert second.stats()["sweeps"]["completed"] == 1
+
+
 @pytest.mark.asyncio
 async def test_revision_listener_asynchronously_reconciles_stale_units(tmp_path):
     from course_repository import (
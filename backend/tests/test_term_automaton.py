@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import random
+
+import course_knowledge_base
+from course_knowledge_base import (
+    _normalize_search_text,
+    _point_matches_text,
+    _PointTermMatcher,
+    _point_terms_key,
+)
+from term_automaton import TermAutomaton
+
+
+def test_overlapping_and_nested_terms_are_all_reported():
+    automaton = TermAutomaton([("he", "a"), ("she", "b"), ("hers", "c"), ("his", "d")])
+
+    assert automaton.labels_in("ushers") == {"a", "b", "c"}
+    assert automaton.labels_in("hi") == set()
+    assert TermAutomaton([]).labels_in("anything") == set()
+
+
+def test_block_matches_agree_with_per_point_substring_checks(monkeypatch):
+    rng = random.Random(7)
+    alphabet = "容量扩容数组摊还成本ab1"
+
+    def word(low: int, high: int) -> str:
+        return "".join(rng.choice(alphabet) for _ in range(rng.randint(low, high)))
+
+    for _ in range(200):
+        by_id = {
+            f"ckp-{index}": {
+                "name": word(1, 4),
+                "aliases": [word(0, 3) for _ in range(rng.randint(0, 2))] + [None],
+            }
+            for index in range(rng.randint(1, 8))
+        }
+        candidates = list(by_id) + ["ckp-missing"]
+        rng.shuffle(candidates)
+        searchable = _normalize_search_text(word(0, 40))
+
+        expected = [
+            point_id for point_id in candidates
+            if _point_matches_text(by_id.get(point_id) or {}, searchable)
+        ]
+        matcher = _PointTermMatcher(_point_terms_key(by_id))
+        assert matcher.matches(candidates, searchable) == expected
+        # 强制走自动机分支，结果必须与逐词判断相同。
+        monkeypatch.setattr(course_knowledge_base, "_AUTOMATON_MIN_TERMS", 0)
+        assert matcher.matches(candidates, searchable) == expected
+        monkeypatch.undo()
@@ -1,7 +1,9 @@
 import json
 from pathlib import Path
 
+from content_chunks import chunk_store_for
 from course_document import CourseDocument
+from course_versions import CourseVersionRepository
 from teaching_representations import TeachingRepresentationRepository
 from video1_demo_preset import (
     BASELINE_GOAL,
@@ -98,6 +100,22 @@ def test_prepare_video1_demo_is_repeatable_after_demo_mutation(tmp_path: Path):
     assert restored["course_name"] == COURSE_TITLE
 
 
+def test_prepare_video1_demo_releases_chunks_of_removed_demo_state(tmp_path: Path):
+    data_dir = tmp_path / "data"
+    chunks = chunk_store_for(data_dir / "course_versions")
+    repository = CourseVersionRepository(data_dir / "course_versions", chunk_store=chunks)
+    course = {
+        "course_id": COURSE_ID,
+        "nodes": [{"node_id": "old-node", "content_blocks": [{"content": "旧演示正文" * 200}]}],
+    }
+    repository.create_version(COURSE_ID, course, reason="旧演示", operation="initial_import")
+    assert chunks.stats()["references"] > 0
+
+    prepare_video1_demo(data_dir)
+
+    assert chunks.stats() == {"chunks": 0, "chunk_bytes": 0, "references": 0}
+
+
 def _write_json(path: Path, payload: object) -> None:
     path.parent.mkdir(parents=True, exist_ok=True)
     path.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
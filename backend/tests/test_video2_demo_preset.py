@@ -5,6 +5,7 @@ from pathlib import Path
 
 import pytest
 
+from content_chunks import ContentChunkStore
 from course_document import CourseDocument
 from practice_grading import PracticeGrader
 from video2_demo_preset import (
@@ -116,7 +117,7 @@ def test_prepare_video2_demo_resets_only_the_dedicated_course(tmp_path: Path):
         / "revisions"
         / f"{asset_pointer['bundle_revision_id']}.json"
     )
-    bundle = json.loads(bundle_path.read_text(encoding="utf-8"))
+    bundle = ContentChunkStore(data_dir / "content_chunks").read(bundle_path)
     question = bundle["assets"]["validation_questions"][0]
     assert len(bundle["assets"]["questions"]) == 12
     assert question["node_id"] == TARGET_SECTION_ID
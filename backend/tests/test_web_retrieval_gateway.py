@@ -1,13 +1,16 @@
 from __future__ import annotations
 
+import asyncio
 import os
 from urllib.parse import parse_qs
 
 import httpx
 import pytest
 
+from retrieval_cache import RetrievalQueryCache, RetrievalSingleFlight
 from web_retrieval import (
     POLICY_VERSION,
+    PURPOSE_CACHE_TTL_SECONDS,
     ExaSearchProvider,
     RetrievalGateway,
     RetrievalProviderError,
@@ -838,3 +841,184 @@ async def test_searxng_staging_smoke_returns_public_sources():
         and source["url"].startswith("https://")
         for source in package["sources"]
     )
+
+
+def test_query_cache_evicts_least_recently_used_within_entry_and_byte_bounds():
+    cache = RetrievalQueryCache(max_entries=2, max_bytes=10_000)
+    cache.put("a", [{"url": "a"}], ttl_seconds=60)
+    cache.put("b", [{"url": "b"}], ttl_seconds=60)
+    assert cache.get("a", max_age_seconds=60) == [{"url": "a"}]
+    cache.put("c", [{"url": "c"}], ttl_seconds=60)
+
+    assert cache.get("b", max_age_seconds=60) is None
+    assert cache.get("a", max_age_seconds=60) is not None
+    stats = cache.stats()
+    assert stats["entries"] == 2
+    assert stats["evictions"] == 1
+    assert stats["hits"] == 2 and stats["misses"] == 1
+
+    small = RetrievalQueryCache(max_entries=10, max_bytes=40)
+    small.put("x", [{"text": "x" * 20}], ttl_seconds=60)
+    small.put("y", [{"text": "y" * 20}], ttl_seconds=60)
+    assert small.stats()["entries"] == 1
+    assert small.get("y", max_age_seconds=60) is not None
+
+
+def test_query_cache_honours_reader_max_age_and_disk_tier(tmp_path, monkeypatch):
+    import retrieval_cache
+
+    clock = [1000.0]
+    monkeypatch.setattr(retrieval_cache.time, "time", lambda: clock[0])
+    cache = RetrievalQueryCache(disk_dir=tmp_path / "retrieval")
+    cache.put("k", [{"url": "https://example.edu"}], ttl_seconds=3600, purpose="course")
+    clock[0] += 600
+
+    assert cache.get("k", max_age_seconds=300) is None
+    assert cache.get("k", max_age_seconds=900) == [{"url": "https://example.edu"}]
+
+    restarted = RetrievalQueryCache(disk_dir=tmp_path / "retrieval")
+    assert restarted.get("k", max_age_seconds=900) == [{"url": "https://example.edu"}]
+    assert restarted.stats()["disk_hits"] == 1
+
+    clock[0] += 3600
+    assert RetrievalQueryCache(disk_dir=tmp_path / "retrieval").get("k", max_age_seconds=99999) is None
+    assert not list((tmp_path / "retrieval").glob("*.json"))
+
+
+@pytest.mark.asyncio
+async def test_gateway_uses_per_purpose_ttl_from_shared_cache(monkeypatch):
+    monkeypatch.delenv("WEB_RETRIEVAL_CACHE_TTL_SECONDS", raising=False)
+
+    class CountingProvider:
+        name = "counting"
+        configured = True
+
+        def __init__(self):
+            self.calls = 0
+
+        async def search(self, query: str, *, limit: int):
+            self.calls += 1
+            return [{
+                "url": "https://example.edu/linear-algebra",
+                "title": "Linear algebra course",
+                "text": "Linear algebra eigenvalue course reference.",
+                "score": 0.95,
+            }]
+
+    provider = CountingProvider()
+    gateway = RetrievalGateway(
+        provider=provider,
+        cache_namespace="purpose-ttl",
+        cache=RetrievalQueryCache(),
+    )
+    assert gateway.cache_ttl_for("ai_teacher") == PURPOSE_CACHE_TTL_SECONDS["ai_teacher"]
+    assert gateway.cache_ttl_for("ppt_image") == PURPOSE_CACHE_TTL_SECONDS["ppt_image"]
+
+    await gateway.retrieve(RetrievalRequest(purpose="course", enabled=True, queries=["linear algebra eigenvalue"]))
+    package = await gateway.retrieve(
+        RetrievalRequest(purpose="assessment", enabled=True, queries=["linear algebra eigenvalue"])
+    )
+
+    assert package["receipt"]["cache_hit_count"] >= 1
+    assert gateway.cache.stats()["hits"] >= 1
+
+
+class SlowProvider:
+    name = "slow"
+    configured = True
+
+    def __init__(self, delay: float = 0.05):
+        self.delay = delay
+        self.calls = 0
+        self.cancelled = 0
+
+    async def search(self, query: str, *, limit: int):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return [{
+            "url": "https://example.edu/linear-algebra",
+            "title": "Linear algebra course",
+            "text": "Linear algebra eigenvalue course reference.",
+            "score": 0.95,
+        }]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_queries_share_one_provider_call():
+    provider = SlowProvider()
+    flights = RetrievalSingleFlight()
+    gateways = [
+        RetrievalGateway(
+            provider=provider,
+            cache_namespace="single-flight",
+            cache=RetrievalQueryCache(),
+            single_flight=flights,
+        )
+        for _ in range(2)
+    ]
+    request = RetrievalRequest(purpose="course", enabled=True, queries=["linear algebra eigenvalue"])
+
+    first, second = await asyncio.gather(*(gateway.retrieve(request) for gateway in gateways))
+
+    queries = len(first["queries"])
+    assert provider.calls == queries
+    assert [source["url"] for source in first["sources"]] == [source["url"] for source in second["sources"]]
+    assert first["receipt"]["coalesced_count"] + second["receipt"]["coalesced_count"] == queries
+    assert flights.stats()["saved_provider_calls"] == queries
+    assert flights.stats()["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_single_flight_keeps_per_caller_timeouts_and_cancellation():
+    flights = RetrievalSingleFlight()
+    provider = SlowProvider(delay=0.2)
+
+    async def call():
+        return await provider.search("q", limit=1)
+
+    # The caller that started the provider call gives up first; the other keeps waiting.
+    impatient = asyncio.create_task(asyncio.wait_for(flights.run("k", call), timeout=0.02))
+    await asyncio.sleep(0.005)
+    patient = asyncio.create_task(flights.run("k", call))
+    with pytest.raises(asyncio.TimeoutError):
+        await impatient
+    results, shared = await patient
+
+    assert shared is True
+    assert results[0]["url"] == "https://example.edu/linear-algebra"
+    assert provider.calls == 1 and provider.cancelled == 0
+
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(flights.run("k2", call), timeout=0.02)
+    await asyncio.sleep(0)
+    assert provider.cancelled == 1
+    assert flights.stats()["abandoned"] == 1
+    assert flights.stats()["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_async_store_prunes_disk_tier_off_the_event_loop(tmp_path, monkeypatch):
+    import threading
+
+    import retrieval_cache
+
+    monkeypatch.setattr(retrieval_cache, "_DISK_PRUNE_EVERY", 2)
+    cache = RetrievalQueryCache(disk_dir=tmp_path / "retrieval", max_disk_entries=2)
+    prune_threads: list[threading.Thread] = []
+    prune = cache._prune_disk
+
+    def recording_prune():
+        prune_threads.append(threading.current_thread())
+        prune()
+
+    monkeypatch.setattr(cache, "_prune_disk", recording_prune)
+    for index in range(4):
+        await cache.aput(f"k{index}", [{"url": f"https://example.edu/{index}"}], ttl_seconds=60)
+
+    assert prune_threads and all(thread is not threading.main_thread() for thread in prune_threads)
+    assert len(list((tmp_path / "retrieval").glob("*.json"))) == 2
+    assert cache.get("k3", max_age_seconds=60) == [{"url": "https://example.edu/3"}]
@@ -0,0 +1,255 @@
+"""多 worker 模式：跨进程锁、生成进程选举、失效广播与生成路由转发。"""
+
+from __future__ import annotations
+
+import asyncio
+import multiprocessing
+from pathlib import Path
+
+import pytest
+from fastapi import APIRouter, Depends, FastAPI
+
+from generation_worker import owned_routes
+from storage import Storage
+from websocket_service import WebSocketService
+from worker_coordination import (
+    AsyncProcessLock,
+    GenerationWorkerElection,
+    ProcessLock,
+    ProcessLockRegistry,
+    WorkerBus,
+    lock_file_path,
+    worker_count,
+)
+
+
+def _try_lock(path: str, results) -> None:
+    lock = ProcessLock(path)
+    acquired = lock.acquire(blocking=False)
+    results.put(acquired)
+    if acquired:
+        lock.release()
+
+
+def _try_in_child(path: Path) -> bool:
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+    child = context.Process(target=_try_lock, args=(str(path), results))
+    child.start()
+    child.join(10)
+    return results.get(timeout=1)
+
+
+def test_worker_count_reads_deployment_env(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.delenv("LINGZHI_WORKERS", raising=False)
+    monkeypatch.delenv("WEB_CONCURRENCY", raising=False)
+    assert worker_count() == 1
+    monkeypatch.setenv("WEB_CONCURRENCY", "4")
+    assert worker_count() == 4
+    monkeypatch.setenv("LINGZHI_WORKERS", "2")
+    assert worker_count() == 2
+
+
+def test_process_lock_excludes_other_processes_and_reenters_in_thread(tmp_path: Path) -> None:
+    path = lock_file_path(tmp_path, "course-1")
+    lock = ProcessLock(path)
+    with lock:
+        with lock:
+            assert _try_in_child(path) is False
+        assert _try_in_child(path) is False
+    assert _try_in_child(path) is True
+
+
+def test_registry_only_creates_lock_files_in_multi_worker_mode(tmp_path: Path) -> None:
+    local = ProcessLockRegistry(tmp_path / "local", enabled=False)
+    with local.get("a"):
+        pass
+    assert local.get("a") is local.get("a")
+    assert not (tmp_path / "local").exists()
+
+    shared = ProcessLockRegistry(tmp_path / "shared", enabled=True)
+    with shared.get("a"):
+        assert _try_in_child(lock_file_path(tmp_path / "shared", "a")) is False
+    assert _try_in_child(lock_file_path(tmp_path / "shared", "a")) is True
+
+
+@pytest.mark.asyncio
+async def test_async_process_lock_serializes_coroutines_and_processes(tmp_path: Path) -> None:
+    path = lock_file_path(tmp_path, "course-command:c1")
+    lock = AsyncProcessLock(path)
+    order: list[str] = []
+
+    async def command(name: str) -> None:
+        async with lock:
+            order.append(f"{name}:start")
+            await asyncio.sleep(0.01)
+            order.append(f"{name}:end")
+
+    async with lock:
+        assert _try_in_child(path) is False
+        pending = asyncio.gather(command("a"), command("b"))
+        await asyncio.sleep(0)
+    await pending
+
+    assert order == ["a:start", "a:end", "b:start", "b:end"]
+    assert _try_in_child(path) is True
+
+
+@pytest.mark.asyncio
+async def test_async_process_lock_cancelled_while_waiting_leaves_no_lock_behind(tmp_path: Path) -> None:
+    path = lock_file_path(tmp_path, "course-command:c1")
+    holder = ProcessLock(path)
+    holder.acquire()
+    lock = AsyncProcessLock(path)
+
+    async def command() -> None:
+        async with lock:
+            pass
+
+    waiter = asyncio.create_task(command())
+    await asyncio.sleep(0.05)
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    holder.release()
+    await asyncio.sleep(0.05)
+
+    assert lock.locked() is False
+    assert _try_in_child(path) is True
+
+
+def test_generation_worker_election_has_one_leader_until_release(tmp_path: Path) -> None:
+    first = GenerationWorkerElection(tmp_path / "generation.lock")
+    second = GenerationWorkerElection(tmp_path / "generation.lock")
+
+    assert first.try_acquire() is True
+    assert second.try_acquire() is False
+    assert first.try_acquire() is True
+
+    first.release()
+    assert second.try_acquire() is True
+    assert second.is_leader and not first.is_leader
+    second.release()
+
+
+@pytest.mark.asyncio
+async def test_worker_bus_delivers_to_peers_and_prunes_dead_sockets(tmp_path: Path) -> None:
+    directory = tmp_path / "bus"
+    sender = WorkerBus(directory, name="a")
+    receiver = WorkerBus(directory, name="b")
+    sender.start()
+    receiver.start()
+    (directory / "gone.sock").touch()
+    received: list[tuple[str, object]] = []
+    receiver.subscribe("course", lambda key, payload: received.append((key, payload)))
+    try:
+        assert sender.publish("course", "c1", {"revision": 2}) == 1
+        for _ in range(50):
+            if received:
+                break
+            await asyncio.sleep(0.01)
+    finally:
+        sender.stop()
+        receiver.stop()
+
+    assert received == [("c1", {"revision": 2})]
+    assert sender.counters["pruned"] == 1
+    assert not (directory / "gone.sock").exists()
+
+
+def test_shared_storage_sees_writes_from_another_worker(tmp_path: Path) -> None:
+    first = Storage(str(tmp_path), shared=True)
+    second = Storage(str(tmp_path), shared=True)
+    first.save_course_sync("c1", {"course_name": "v1"})
+    first.save_data("usage.json", [1])
+    assert second.load_course("c1") == {"course_name": "v1"}
+    assert second.load_data("usage.json") == [1]
+    generation = second.data_generation("usage.json")
+
+    first.save_course_sync("c1", {"course_name": "v2 with a longer name"})
+    first.save_data("usage.json", [1, 2])
+
+    assert second.load_course("c1") == {"course_name": "v2 with a longer name"}
+    assert second.load_data("usage.json") == [1, 2]
+    assert second.data_generation("usage.json") == generation + 1
+
+
+def test_course_notification_refreshes_course_listing(tmp_path: Path) -> None:
+    first = Storage(str(tmp_path), shared=True)
+    second = Storage(str(tmp_path), shared=True)
+    assert second.list_course_ids() == []
+    second.list_courses()
+
+    first.save_course_sync("c2", {"course_name": "新课程"})
+    second._on_course_changed("c2")
+
+    assert second.list_course_ids() == ["c2"]
+    first.delete_course("c2")
+    second._on_course_changed("c2")
+    assert [course["course_id"] for course in second.list_courses()] == []
+
+
+@pytest.mark.asyncio
+async def test_websocket_pushes_are_relayed_but_relayed_pushes_are_not() -> None:
+    relayed: list[tuple[str | None, dict]] = []
+    service = WebSocketService()
+    service.set_relay(lambda course_id, message: relayed.append((course_id, message)))
+
+    await service.push_progress_update("c1", {"done": 1})
+    await service.deliver_relayed("c1", {"type": "from-peer"})
+    await service.broadcast({"type": "notice"})
+
+    assert [course_id for course_id, _ in relayed] == ["c1", None]
+
+
+def test_owned_routes_follow_task_manager_dependency() -> None:
+    def require_task_manager():
+        return object()
+
+    def course_context(tm=Depends(require_task_manager)):
+        return tm
+
+    app = FastAPI()
+
+    @app.get("/api/tasks/{task_id}")
+    def get_task(task_id: str, tm=Depends(require_task_manager)):
+        return {}
+
+    @app.post("/api/courses/{course_id}/retry")
+    def retry(course_id: str, context=Depends(course_context)):
+        return {}
+
+    @app.get("/api/courses/{course_id}")
+    def get_course(course_id: str):
+        return {}
+
+    paths = {route.path for route in owned_routes(app.routes, (require_task_manager,))}
+    assert paths == {"/api/tasks/{task_id}", "/api/courses/{course_id}/retry"}
+
+    # include_router 挂上的子路由同样要展开，带上前缀。
+    included = APIRouter()
+
+    @included.post("/courses/{course_id}/lessons/{lesson_id}/generate")
+    def generate(course_id: str, lesson_id: str, tm=Depends(require_task_manager)):
+        return {}
+
+    app.include_router(included, prefix="/api/teacher")
+    paths = {route.path for route in owned_routes(app.routes, (require_task_manager,))}
+    assert "/api/teacher/courses/{course_id}/lessons/{lesson_id}/generate" in paths
+
+
+def test_blueprint_routes_that_read_the_workspace_are_owned() -> None:
+    from dependencies import get_task_manager_optional, require_task_manager
+    from routers import course_versions
+
+    app = FastAPI()
+    app.include_router(course_versions.router, prefix="/api")
+    owned = {
+        (method, route.path)
+        for route in owned_routes(app.routes, (require_task_manager, get_task_manager_optional))
+        for method in route.methods
+    }
+
+    assert ("GET", "/api/courses/{course_id}/blueprint") in owned
+    assert ("PUT", "/api/courses/{course_id}/blueprint/draft") in owned
+    assert ("POST", "/api/courses/{course_id}/blueprint/impact") in owned
@@ -0,0 +1,482 @@
+"""容量控制离线基准：整条 ``TaskManager`` 课程生成对着本地 mock provider 跑。
+
+``content_parallel_bench.py`` 和 ``scripts/qwen_concurrency_ramp.py`` 只能测真实
+远端，今天的数明天复现不了。这个脚本在进程内起 ``mock_llm_provider``，把
+``AI_API_BASE`` 指过去，然后照 ``scripts/kill_and_resume_smoke.py`` 的方式建一个
+真实的生成作业、逐个确认评审门，直到作业进入终态或超时。报告三样东西：
+
+* 端到端 makespan（建作业到终态的墙钟）与作业终态；
+* 按 ``queue_wait_reason`` 汇总的排队等待（来自生成遥测 JSONL）；
+* AIMD 上限轨迹：定时采样 ``ai_capacity.provider_capacity_snapshots()``，
+  记录 provider 级 limit / in_flight 每次变化的时刻。
+
+目录、知识骨架和教案这几个结构化阶段由 :data:`COURSE_SCRIPT` 按 prompt 标题拼出
+符合 schema 的最小 JSON，作业因此能一路走到正文和发布门；正文等自由文本是占位
+文字，质量门通常判不过（终态 ``completed_with_warnings``）。这里测的是调度与容量
+控制，不是生成质量。prompt 版式改动可能让脚本失配，所以作业终态、错误和 mock
+服务端按阶段的请求计数一并打印，回归对比时要一起看。
+
+用法::
+
+    python3 backend/tools/capacity_mock_bench.py --capacity 6 --latency uniform:0.2,0.8
+    python3 backend/tools/capacity_mock_bench.py --rate-limit-ratio 0.05 --json > run.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import statistics
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from tools.mock_llm_provider import (  # noqa: E402
+    MockProviderServer,
+    add_config_arguments,
+    config_from_args,
+    prompt_title,
+)
+
+TERMINAL_STATUSES = {"completed", "completed_with_warnings", "failed", "cancelled"}
+_DECODER = json.JSONDecoder()
+# 目录验收会把标题、目标过于相近的小节判成职责重复，所以每节各取一个不同的主题词。
+TOPICS = [
+    "判别式", "配方法", "求根公式", "韦达定理", "函数图像", "顶点坐标", "对称轴", "最值问题",
+    "不等式解集", "参数讨论", "根的分布", "整数根", "应用建模", "面积问题", "利润问题", "运动问题",
+    "数形结合", "分类讨论", "换元法", "因式分解", "待定系数", "零点存在", "区间端点", "恒成立问题",
+]
+
+
+def _topic(node_id: str) -> str:
+    _level, chapter, number = str(node_id).split("-")
+    return TOPICS[((int(chapter) - 1) * 7 + int(number) - 1) % len(TOPICS)]
+
+
+def _section_json(prompt: str, header: str, default: Any = None) -> Any:
+    """取 ``## header`` 段里第一个 JSON 值；prompt 版式变了就返回 ``default``。"""
+    start = prompt.find(f"## {header}")
+    if start < 0:
+        return default
+    match = re.search(r"[\[{]", prompt[start + len(header) + 3:])
+    if match is None:
+        return default
+    try:
+        value, _end = _DECODER.raw_decode(prompt, start + len(header) + 3 + match.start())
+    except ValueError:
+        return default
+    return value
+
+
+def _shape_number(prompt: str, label: str, default: int) -> int:
+    match = re.search(rf"{label}：(\d+)", prompt)
+    return int(match.group(1)) if match else default
+
+
+def _skeleton(prompt: str) -> dict[str, Any]:
+    chapters = _shape_number(prompt, "用户指定章数", 2)
+    sections = max(chapters, _shape_number(prompt, "用户指定小节总数", chapters * 2))
+    counts = [sections // chapters + (1 if index < sections % chapters else 0) for index in range(chapters)]
+    return {
+        "course_title": "压测课程",
+        "positioning": "在离线 mock provider 上走完整条生成链路",
+        "learning_objectives": ["能独立完成本课程的最终任务"],
+        "prerequisites": [],
+        "chapters": [
+            {
+                "chapter_number": index + 1,
+                "title": f"第 {index + 1} 章 核心能力 {index + 1}",
+                "planning_stages": [],
+                "learning_focus": f"建立第 {index + 1} 组核心能力",
+                "learning_path_role": "standard",
+                "path_reason": "课程主线必经",
+                "section_count": count,
+            }
+            for index, count in enumerate(counts)
+        ],
+    }
+
+
+def _outline_batch(prompt: str) -> dict[str, Any]:
+    batch = _section_json(prompt, "当前批次", {}) or {}
+    sections = []
+    for node_id in batch.get("expected_node_ids") or []:
+        _level, chapter, number = str(node_id).split("-")
+        topic = _topic(node_id)
+        sections.append({
+            "node_id": node_id,
+            "section_number": f"{chapter}.{number}",
+            "title": topic,
+            # 目标句保持很短：相近句式的长目标会被相似度判重。
+            "learning_objective": f"会用{topic}",
+            "prerequisite_node_ids": [],
+            "assessment": [f"{topic}变式题"],
+            "scope_boundary": f"只讲{topic}",
+            "learning_path_role": "standard",
+            "path_reason": "课程主线必经",
+        })
+    return {"sections": sections}
+
+
+def _knowledge_skeleton(prompt: str) -> dict[str, Any]:
+    context = _section_json(prompt, "已去重的规划上下文", {}) or {}
+    module_sets = context.get("module_sets") or {}
+    key = max(1, int(context.get("new_knowledge_key_start") or 1))
+    registry, sections = [], []
+    for section in context.get("sections") or []:
+        node_id = str(section.get("node_id") or "")
+        modules = list(module_sets.get(section.get("module_set_id")) or ["core_explanation"])[:1]
+        owned = []
+        for offset in range(2):
+            knowledge_key = f"K{key:03d}"
+            key += 1
+            owned.append(knowledge_key)
+            registry.append({
+                "knowledge_key": knowledge_key,
+                "name": f"{_topic(node_id)}{['的条件', '的步骤'][offset]}",
+                "statement": f"{_topic(node_id)}{['成立需要满足的条件', '的标准操作步骤'][offset]}",
+                "owner_node_id": node_id,
+                "reused_in_node_ids": [],
+                "prerequisite_keys": [],
+                "module_ids": modules,
+            })
+        sections.append({"node_id": node_id, "owned_knowledge_keys": owned, "reused_knowledge_keys": []})
+    return {"knowledge_registry": registry, "sections": sections}
+
+
+def _knowledge_detail(knowledge_key: str, index: int) -> dict[str, Any]:
+    return {
+        "knowledge_key": knowledge_key,
+        "concept_group": "核心方法",
+        "group_description": "本节方法的成立条件与使用边界",
+        "knowledge_type": ["definition", "method"][index % 2],
+        "conditions": ["在给定定义域内成立"],
+        "boundaries": ["定义域外不适用"],
+        "counterexamples": [],
+        "capability_points": [{
+            "name": f"{knowledge_key} 的应用",
+            "observable_behavior": f"独立写出 {knowledge_key} 的完整推导",
+            "required_evidence_types": ["practice_attempt"],
+        }],
+        "misconceptions": [{
+            "name": "忽略成立条件",
+            "observable_error_pattern": "直接套用结论而不检查定义域",
+            "confused_with": "无条件成立的结论",
+            "discrimination": "代入定义域边界值检验",
+            "repair_strategy": "先列条件再套用结论",
+        }],
+        "mastery_criteria": [{
+            "name": f"{knowledge_key} 掌握",
+            "observable_performance": "3 道变式题全对",
+            "required_independence": ["guided", "independent"][index % 2],
+            "required_transfer": ["procedure", "variation"][index % 2],
+            "verification_method": "用 3 道变式题，看是否先检查条件再作答",
+            "required_evidence_types": ["practice_attempt"],
+        }],
+        "aliases": [],
+    }
+
+
+def _teaching_plan_batch(prompt: str) -> dict[str, Any]:
+    identities = _section_json(prompt, "当前批次知识职责（只读）", []) or []
+    catalog = _section_json(prompt, "共享课程块目录（只出现一次）", []) or []
+    module_id = str((catalog[0] if catalog else {}).get("module_id") or "core_explanation")
+    sections = []
+    for identity in identities:
+        owned = list(identity.get("owned_knowledge_keys") or [])
+        sections.append({
+            "node_id": identity.get("node_id"),
+            "knowledge_details": [_knowledge_detail(key, index) for index, key in enumerate(owned)],
+            "knowledge_relations": (
+                [{
+                    "source_key": owned[0],
+                    "target_key": owned[1],
+                    "relation_type": "prerequisite",
+                    "reason": "先有定义才能使用方法",
+                }]
+                if len(owned) > 1 else []
+            ),
+            "teaching_modules": [{
+                "module_id": module_id,
+                "teaching_purpose": "讲清本节方法的条件与步骤",
+                "knowledge_keys": owned,
+                "teaching_guidance": "先给反例再给条件",
+                "planned_minutes": 15,
+                "teacher_activity": "演示一道完整例题",
+                "student_activity": "独立完成一道变式题",
+            }],
+            "planned_minutes": 45,
+            "key_difficulties": ["成立条件的检查"],
+            "teacher_activities": ["例题演示"],
+            "student_activities": ["变式练习"],
+            "resource_refs": [],
+            "in_class_checks": ["当堂完成 1 道变式题"],
+            "homework": ["完成 3 道变式题"],
+            "teaching_notes": ["强调先查条件"],
+        })
+    return {"sections": sections}
+
+
+# prompt 标题 → 结构化回答。未列出的阶段（正文等自由文本）用 mock 的占位文本。
+COURSE_SCRIPT = {
+    "全课章节骨架 V2": _skeleton,
+    "章节小节目录批次 V2": _outline_batch,
+    "全课知识职责骨架 V3": _knowledge_skeleton,
+    "详细小节教案批次 V3": _teaching_plan_batch,
+}
+
+
+def course_script_responder(body: dict[str, Any]) -> str | None:
+    title = prompt_title(body)
+    for prefix, build in COURSE_SCRIPT.items():
+        if title.startswith(prefix):
+            prompt = "\n".join(
+                str(message.get("content") or "")
+                for message in body.get("messages") or []
+            )
+            return json.dumps(build(prompt), ensure_ascii=False)
+    return None
+
+
+def configure_environment(base_url: str, data_root: Path, telemetry_dir: Path, args: argparse.Namespace) -> None:
+    """必须在导入 ``ai_base`` 之前调用：它在导入时读 ``AI_API_KEY``。"""
+    os.environ.update({
+        "AI_API_KEY": "mock-key",
+        "AI_API_BASE": base_url,
+        "AI_MODEL_CANDIDATES": ",".join(f"mock-smart-{index}" for index in range(1, args.models + 1)),
+        "AI_MODEL_FAST_CANDIDATES": ",".join(f"mock-fast-{index}" for index in range(1, args.models + 1)),
+        "AI_ENABLE_THINKING": "false",
+        "AI_PROVIDER_INITIAL_CONCURRENCY": str(args.initial_concurrency),
+        "AI_PROVIDER_MAX_CONCURRENCY": str(args.max_concurrency),
+        "LINGZHI_DATA_DIR": str(data_root),
+        "LINGZHI_GENERATION_TELEMETRY": "1",
+        "LINGZHI_GENERATION_TELEMETRY_DIR": str(telemetry_dir),
+        "WEB_RETRIEVAL_V2_MODE": "off",
+        "LLM_RESPONSE_CACHE": "off",
+    })
+    if args.rate_limit_cooldown is not None:
+        os.environ["AI_MODEL_RATE_LIMIT_COOLDOWN_SECONDS"] = str(args.rate_limit_cooldown)
+    for name in ("MODELSCOPE_API_KEY", "AI_PPT_API_KEY"):
+        os.environ.pop(name, None)
+
+
+async def sample_capacity(trajectory: list[dict[str, Any]], started: float, interval: float) -> None:
+    import ai_capacity
+
+    last: dict[tuple[str, int], tuple[int, int]] = {}
+    while True:
+        for snapshot in ai_capacity.provider_capacity_snapshots():
+            key = (snapshot["provider"], snapshot["loop_id"])
+            point = (snapshot["limit"], snapshot["in_flight"])
+            if last.get(key) != point:
+                last[key] = point
+                trajectory.append({
+                    "t_s": round(time.monotonic() - started, 2),
+                    "provider": snapshot["provider"],
+                    "limit": point[0],
+                    "in_flight": point[1],
+                })
+        await asyncio.sleep(interval)
+
+
+def summarize_queue_waits(telemetry_dir: Path) -> dict[str, Any]:
+    waits: dict[str, list[float]] = defaultdict(list)
+    calls = 0
+    statuses: dict[str, int] = defaultdict(int)
+    for path in telemetry_dir.rglob("*.jsonl"):
+        for line in path.read_text(encoding="utf-8").splitlines():
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            calls += 1
+            statuses[str(record.get("status") or "")] += 1
+            wait_ms = float(record.get("queue_wait_ms") or 0)
+            if wait_ms > 0:
+                waits[str(record.get("queue_wait_reason") or "unknown")].append(wait_ms)
+    by_reason = {}
+    for reason, values in sorted(waits.items()):
+        values.sort()
+        by_reason[reason] = {
+            "events": len(values),
+            "total_s": round(sum(values) / 1000, 2),
+            "p50_ms": round(statistics.median(values)),
+            "p95_ms": round(values[min(len(values) - 1, int(len(values) * 0.95))]),
+            "max_ms": round(values[-1]),
+        }
+    return {"calls": calls, "statuses": dict(statuses), "by_reason": by_reason}
+
+
+async def drive_generation(args: argparse.Namespace, data_root: Path) -> dict[str, Any]:
+    import task_manager as task_manager_module
+    from course_repository import CourseDocumentRepository
+    from course_service import CourseService
+    from course_versions import CourseVersionRepository
+    from generation_workspace import GenerationWorkspaceRepository
+    from learning_asset_storage import LearningAssetRepository
+    from material_storage import MaterialRepository
+    from question_bank import QuestionBankRepository
+    from storage import Storage
+    from task_manager import TaskManager
+
+    storage = Storage(str(data_root))
+    task_manager_module.TASKS_FILE = data_root / "tasks.json"
+    manager = TaskManager(
+        storage,
+        CourseService(materials=MaterialRepository(data_root / "materials")),
+        None,
+        version_repository=CourseVersionRepository(data_root / "course_versions"),
+        asset_repository=LearningAssetRepository(data_root / "learning_assets"),
+        workspace_repository=GenerationWorkspaceRepository(data_root / "generation_workspaces"),
+        document_repository=CourseDocumentRepository(storage),
+        question_bank_repository_override=QuestionBankRepository(data_root / "question_banks"),
+    )
+    await manager.start()
+    started = time.monotonic()
+    confirmed: list[str] = []
+    error = ""
+    try:
+        job = await manager.create_generation_job({
+            "subject": args.subject,
+            "target_audience": "大学生",
+            "difficulty": "beginner",
+            "style": "academic",
+            "requirements": args.requirements,
+            "materials": [],
+            "material_bindings": [],
+            "grounding_strategy": "general_assisted",
+            "generation_mode": "fast",
+            "course_purpose": "systematic",
+            "web_question_enrichment": {"enabled": False},
+        })
+        task_id, course_id = str(job["job_id"]), str(job["course_id"])
+        while time.monotonic() - started < args.timeout:
+            task = manager.tasks[task_id]
+            if task.get("status") in TERMINAL_STATUSES:
+                break
+            if task.get("status") == "waiting_for_review":
+                review = manager.get_generation_review(course_id) or {}
+                step = str(review.get("step") or "")
+                if review.get("can_confirm"):
+                    try:
+                        await manager.confirm_generation_step(course_id, step)
+                    except Exception as exc:  # 评审门拒绝也是一种结果，照实报告
+                        error = f"{step}: {exc}"
+                        break
+                    confirmed.append(step)
+                    continue
+                if not step or step in confirmed[-1:]:
+                    break
+            await asyncio.sleep(0.2)
+        task = manager.tasks[task_id]
+        return {
+            "makespan_s": round(time.monotonic() - started, 2),
+            "status": task.get("status"),
+            "phase": task.get("phase"),
+            "timed_out": not error and task.get("status") not in TERMINAL_STATUSES,
+            "confirmed_steps": confirmed,
+            "error": error or str(task.get("error") or ""),
+            "completed_nodes": task.get("completed_nodes"),
+            "total_nodes": task.get("total_nodes"),
+        }
+    finally:
+        await manager.shutdown(timeout=5)
+
+
+async def run(args: argparse.Namespace) -> dict[str, Any]:
+    with tempfile.TemporaryDirectory(prefix="lingzhi-capacity-bench-") as temporary:
+        data_root = Path(temporary) / "data"
+        telemetry_dir = Path(temporary) / "telemetry"
+        telemetry_dir.mkdir(parents=True)
+        with MockProviderServer(config_from_args(args), responder=course_script_responder) as server:
+            configure_environment(server.base_url, data_root, telemetry_dir, args)
+            import ai_capacity
+            import generation_telemetry
+
+            ai_capacity.reset_provider_capacity_controllers()
+            trajectory: list[dict[str, Any]] = []
+            sampler = asyncio.create_task(
+                sample_capacity(trajectory, time.monotonic(), args.sample_interval)
+            )
+            try:
+                with generation_telemetry.generation_run("capacity-mock-bench"):
+                    job = await drive_generation(args, data_root)
+            finally:
+                sampler.cancel()
+            limits = [point["limit"] for point in trajectory]
+            return {
+                "job": job,
+                "queue_waits": summarize_queue_waits(telemetry_dir),
+                "aimd": {
+                    "samples": len(trajectory),
+                    "min_limit": min(limits, default=None),
+                    "max_limit": max(limits, default=None),
+                    "final_limit": limits[-1] if limits else None,
+                    "trajectory": trajectory if args.full_trajectory else trajectory[-40:],
+                },
+                "provider_snapshots": ai_capacity.provider_capacity_snapshots(),
+                "mock": server.state.stats(),
+            }
+
+
+def render(report: dict[str, Any]) -> str:
+    job, waits, aimd, mock = report["job"], report["queue_waits"], report["aimd"], report["mock"]
+    lines = [
+        f"作业终态 {job['status']}（phase={job['phase']}，超时={'是' if job['timed_out'] else '否'}），"
+        f"makespan {job['makespan_s']} s，确认门 {job['confirmed_steps']}",
+        *([f"错误：{job['error'][:200]}"] if job["error"] else []),
+        f"模型调用 {waits['calls']} 次：{waits['statuses']}",
+        "",
+        "| 排队原因 | 次数 | 合计(s) | p50(ms) | p95(ms) | 最大(ms) |",
+        "|---|---:|---:|---:|---:|---:|",
+    ]
+    for reason, row in waits["by_reason"].items():
+        lines.append(
+            f"| {reason} | {row['events']} | {row['total_s']} | {row['p50_ms']} | "
+            f"{row['p95_ms']} | {row['max_ms']} |"
+        )
+    lines += [
+        "",
+        f"AIMD 上限：最小 {aimd['min_limit']}，最大 {aimd['max_limit']}，结束 {aimd['final_limit']}"
+        f"（{aimd['samples']} 个变化点）",
+        "轨迹（t_s:limit/in_flight）："
+        + " ".join(f"{p['t_s']}:{p['limit']}/{p['in_flight']}" for p in aimd["trajectory"]),
+        "",
+        f"mock 服务端：请求 {mock['requests']}，完成 {mock['completed']}，峰值并发 {mock['peak_in_flight']}，"
+        f"429 {mock['rate_limited']}（超并发 {mock['capacity_rejected']}），5xx {mock['server_errors']}，"
+        f"额度耗尽 {mock['quota_exhausted']}，截断 {mock['truncated']}",
+    ]
+    return "\n".join(lines)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_config_arguments(parser)
+    parser.add_argument("--subject", default="一元二次方程的判别式")
+    parser.add_argument("--requirements", default="只生成 1 章 2 节，正文简洁。")
+    parser.add_argument("--models", type=int, default=2, help="smart / fast 各配几个候选模型")
+    parser.add_argument(
+        "--rate-limit-cooldown", type=float, default=None,
+        help="覆盖 AI_MODEL_RATE_LIMIT_COOLDOWN_SECONDS；默认沿用生产值",
+    )
+    parser.add_argument("--initial-concurrency", type=int, default=4)
+    parser.add_argument("--max-concurrency", type=int, default=16)
+    parser.add_argument("--timeout", type=float, default=600.0)
+    parser.add_argument("--sample-interval", type=float, default=0.25)
+    parser.add_argument("--full-trajectory", action="store_true")
+    parser.add_argument("--json", action="store_true", help="输出完整 JSON 报告")
+    args = parser.parse_args()
+    report = asyncio.run(run(args))
+    print(json.dumps(report, ensure_ascii=False, indent=2) if args.json else render(report))
+    return 1 if report["job"]["timed_out"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,177 @@
+"""内容分块存储的磁盘占用报告：现在占多少、全部分块后能省多少。
+
+用法::
+
+    python3 backend/tools/content_store_report.py backend/data
+    python3 backend/tools/content_store_report.py /srv/lingzhi/data --json > report.json
+
+**只读**。脚本逐个扫描课程版本、学习资产、题库和生成工作区的修订文件：
+
+* 已是分块 manifest 的文件：逻辑大小按重组后的旧格式（``indent=2`` JSON）
+  计算，实际占用是 manifest 本身加上它引用、且在全局去重后的分块；
+* 分块之前写下的整份 JSON：按各仓库声明的分块路径模拟切分，得出"如果分块"
+  的 manifest 大小与新增的去重分块。
+
+分块在四个仓库之间共享，所以去重统计也是全局的：同一节正文既在课程版本里、
+又在生成工作区里时，只算一次。导入后端模块前先把 ``LINGZHI_DATA_DIR`` 指到临时
+目录，避免 ``storage`` 在导入期对被扫描的数据目录做任何初始化。
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ["LINGZHI_DATA_DIR"] = tempfile.mkdtemp(prefix="lingzhi-content-report-")
+
+from content_chunks import (  # noqa: E402
+    ContentChunkStore,
+    is_manifest,
+    split_document,
+)
+from course_versions import CANDIDATE_CHUNK_PATHS, VERSION_CHUNK_PATHS  # noqa: E402
+from generation_workspace import WORKSPACE_CHUNK_PATHS  # noqa: E402
+from learning_asset_storage import BUNDLE_CHUNK_PATHS as ASSET_CHUNK_PATHS  # noqa: E402
+from question_bank import BUNDLE_CHUNK_PATHS as QUESTION_CHUNK_PATHS  # noqa: E402
+
+# (报告名, 仓库目录, 修订文件 glob, 分块路径)
+SOURCES = [
+    ("course_versions", "course_versions", "*/versions/*.json", VERSION_CHUNK_PATHS),
+    ("course_candidates", "course_versions", "*/candidates/*.json", CANDIDATE_CHUNK_PATHS),
+    ("learning_assets", "learning_assets", "*/revisions/*.json", ASSET_CHUNK_PATHS),
+    ("question_banks", "question_banks", "*/revisions/*.json", QUESTION_CHUNK_PATHS),
+    ("generation_workspaces", "generation_workspaces", "*.json", WORKSPACE_CHUNK_PATHS),
+]
+
+
+def _legacy_size(document: Any) -> int:
+    return len(json.dumps(document, ensure_ascii=False, indent=2).encode("utf-8"))
+
+
+def build_report(data_dir: Path) -> dict[str, Any]:
+    store = ContentChunkStore(data_dir / "content_chunks", create=False)
+    stored_chunks: dict[str, int] = {}
+    projected_chunks: dict[str, int] = {}
+    sources: list[dict[str, Any]] = []
+    unreadable = 0
+
+    for name, directory, pattern, paths in SOURCES:
+        row = {
+            "source": name,
+            "files": 0,
+            "chunked_files": 0,
+            "logical_bytes": 0,
+            "stored_file_bytes": 0,
+            "projected_file_bytes": 0,
+        }
+        root = data_dir / directory
+        for path in sorted(root.glob(pattern)) if root.exists() else []:
+            try:
+                size = path.stat().st_size
+                value = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                unreadable += 1
+                continue
+            if not isinstance(value, dict):
+                continue
+            row["files"] += 1
+            row["stored_file_bytes"] += size
+            if is_manifest(value):
+                row["chunked_files"] += 1
+                row["projected_file_bytes"] += size
+                for digest in value.get("chunks") or []:
+                    chunk = store._object_path(str(digest))
+                    try:
+                        chunk_size = chunk.stat().st_size
+                    except OSError:
+                        continue
+                    stored_chunks[str(digest)] = chunk_size
+                    projected_chunks[str(digest)] = chunk_size
+                try:
+                    row["logical_bytes"] += _legacy_size(store.load(value))
+                except KeyError:
+                    unreadable += 1
+                continue
+            row["logical_bytes"] += size
+            skeleton, chunks = split_document(value, paths, min_chunk_bytes=store.min_chunk_bytes)
+            manifest = {
+                "schema_version": "content_manifest_v1",
+                "paths": [list(item) for item in paths],
+                "chunks": sorted(chunks),
+                "document": skeleton,
+            }
+            row["projected_file_bytes"] += _legacy_size(manifest)
+            for digest, payload in chunks.items():
+                projected_chunks[digest] = len(payload.encode("utf-8"))
+        sources.append(row)
+
+    logical = sum(row["logical_bytes"] for row in sources)
+    stored = sum(row["stored_file_bytes"] for row in sources) + sum(stored_chunks.values())
+    projected = sum(row["projected_file_bytes"] for row in sources) + sum(projected_chunks.values())
+    return {
+        "data_dir": str(data_dir),
+        "sources": sources,
+        "unreadable_files": unreadable,
+        "chunks": {
+            "stored": len(stored_chunks),
+            "stored_bytes": sum(stored_chunks.values()),
+            "projected": len(projected_chunks),
+            "projected_bytes": sum(projected_chunks.values()),
+        },
+        "totals": {
+            "logical_bytes": logical,
+            "stored_bytes": stored,
+            "projected_bytes": projected,
+            "saved_now_ratio": round(1 - stored / logical, 4) if logical else 0.0,
+            "saved_if_chunked_ratio": round(1 - projected / logical, 4) if logical else 0.0,
+        },
+    }
+
+
+def _mb(value: int) -> str:
+    return f"{value / 1024 / 1024:.2f}"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="内容分块存储的磁盘占用报告（只读）")
+    parser.add_argument("data_dir", type=Path, help="要扫描的数据目录，例如 backend/data")
+    parser.add_argument("--json", action="store_true", help="输出 JSON 而不是表格")
+    args = parser.parse_args()
+
+    report = build_report(args.data_dir.resolve())
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        return 0
+
+    print(f"数据目录：{report['data_dir']}")
+    print(f"{'来源':<24}{'文件':>8}{'已分块':>8}{'逻辑(MB)':>12}{'文件(MB)':>12}{'分块后(MB)':>12}")
+    for row in report["sources"]:
+        print(
+            f"{row['source']:<24}{row['files']:>8}{row['chunked_files']:>8}"
+            f"{_mb(row['logical_bytes']):>12}{_mb(row['stored_file_bytes']):>12}"
+            f"{_mb(row['projected_file_bytes']):>12}"
+        )
+    chunks = report["chunks"]
+    totals = report["totals"]
+    print(
+        f"\n去重分块：现有 {chunks['stored']} 个 / {_mb(chunks['stored_bytes'])} MB，"
+        f"全部分块后 {chunks['projected']} 个 / {_mb(chunks['projected_bytes'])} MB"
+    )
+    print(
+        f"合计：逻辑 {_mb(totals['logical_bytes'])} MB，"
+        f"当前占用 {_mb(totals['stored_bytes'])} MB（节省 {totals['saved_now_ratio']:.1%}），"
+        f"全部分块后 {_mb(totals['projected_bytes'])} MB（节省 {totals['saved_if_chunked_ratio']:.1%}）"
+    )
+    if report["unreadable_files"]:
+        print(f"跳过无法解析的文件 {report['unreadable_files']} 个")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,111 @@
+"""逐节证据排序基准：倒排索引 vs. 逐对 ``_relevance`` 全量排序。
+
+``attach_evidence_to_plan`` 给每个小节挑证据。旧实现对每个小节把全部事实证据
+逐条过一遍 ``_relevance`` 再整体排序；新实现在目录上建一次
+:class:`material_evidence.EvidenceKeywordIndex`，每节沿倒排链累加后用堆取
+top-k。这个脚本用合成目录把两者放在一起跑，同时逐节核对排序结果一致。
+
+用法::
+
+    python3 backend/tools/evidence_ranking_bench.py --evidence 10000 --sections 60
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Any
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from material_evidence import EvidenceKeywordIndex, _keywords, _relevance  # noqa: E402
+
+VOCABULARY = [
+    "梯度下降", "学习率", "损失函数", "反向传播", "正则化", "过拟合", "交叉熵",
+    "卷积", "池化", "注意力", "归一化", "激活函数", "批量大小", "优化器",
+    "gradient", "descent", "dropout", "softmax", "embedding", "tokenizer",
+    "transformer", "attention", "convolution", "momentum", "adam", "kernel",
+]
+
+
+def synthetic_catalog(count: int, *, seed: int = 7) -> list[dict[str, Any]]:
+    rng = random.Random(seed)
+    catalog: list[dict[str, Any]] = []
+    for index in range(count):
+        text = "，".join(rng.sample(VOCABULARY, rng.randint(2, 6)))
+        catalog.append({
+            "evidence_id": f"ev-{index:05d}",
+            "asset_id": f"mat-{index % 40:02d}",
+            "keywords": _keywords(text),
+            "priority": rng.choice(["core", "supporting", "weak"]),
+            "authority": rng.choice(["primary", "secondary"]),
+            "purpose": rng.choice(["content_source", "content_source", "question_source"]),
+            "factual_allowed": True,
+        })
+    return catalog
+
+
+def synthetic_queries(count: int, *, seed: int = 11) -> list[str]:
+    rng = random.Random(seed)
+    suffixes = ["", " 练习", " 应用", ""]
+    return [
+        " ".join(rng.sample(VOCABULARY, rng.randint(2, 5))) + rng.choice(suffixes)
+        for _ in range(count)
+    ]
+
+
+def rank_by_sorting(query: str, catalog: list[dict[str, Any]], limit: int = 4) -> list[str]:
+    ranked = sorted(
+        ((item, _relevance(query, item)) for item in catalog),
+        key=lambda pair: pair[1],
+        reverse=True,
+    )
+    return [item["evidence_id"] for item, score in ranked if score > 0][:limit]
+
+
+def run(evidence: int, sections: int) -> dict[str, Any]:
+    catalog = synthetic_catalog(evidence)
+    queries = synthetic_queries(sections)
+
+    started = time.perf_counter()
+    baseline = [rank_by_sorting(query, catalog) for query in queries]
+    sorting_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    index = EvidenceKeywordIndex(catalog)
+    build_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    indexed = [[item["evidence_id"] for item in index.top(query, 4)] for query in queries]
+    query_seconds = time.perf_counter() - started
+
+    return {
+        "evidence": evidence,
+        "sections": sections,
+        "identical": baseline == indexed,
+        "sorting_ms": round(sorting_seconds * 1000, 1),
+        "index_build_ms": round(build_seconds * 1000, 1),
+        "index_query_ms": round(query_seconds * 1000, 1),
+        "speedup": round(sorting_seconds / max(1e-9, build_seconds + query_seconds), 1),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--evidence", type=int, default=10_000)
+    parser.add_argument("--sections", type=int, default=60)
+    args = parser.parse_args()
+    result = run(args.evidence, args.sections)
+    print(
+        f"证据 {result['evidence']} 条 × 小节 {result['sections']} 个："
+        f"全量排序 {result['sorting_ms']} ms；"
+        f"倒排索引 建索引 {result['index_build_ms']} ms + 查询 {result['index_query_ms']} ms；"
+        f"加速 {result['speedup']}×；排序一致：{'是' if result['identical'] else '否'}"
+    )
+    return 0 if result["identical"] else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -10,6 +10,11 @@
 * ② 每个阶段各占多少时间
 * ③ 重复发送的上下文占多少 token
 
+另附各阶段的 provider 前缀缓存命中率：``cached_input_tokens`` 来自响应里的
+``prompt_cache_hit_tokens`` / ``prompt_tokens_details.cached_tokens``，只在
+provider 报了这个数的调用上计算，没报的调用不算进分母。③ 说的是"重复发了
+多少"，命中率说的是"重复的部分 provider 真正省下了多少"。
+
 关于②的口径：并行阶段里各次调用的耗时相加会超过墙钟时间，所以同时给出
 ``wall_s``（该阶段首尾之间的真实墙钟跨度）与 ``busy_s``（各次调用耗时之
 和）。两者的比值就是该阶段的有效并行度，B-4 对齐容量时要看的正是它。
@@ -52,6 +57,8 @@ def summarize(records: list[dict[str, Any]]) -> dict[str, Any]:
             "output_tokens": 0,
             "retries": 0,
             "failures": 0,
+            "cache_reported_input": 0,
+            "cached_input_tokens": 0,
             "first_s": None,
             "last_s": None,
         }
@@ -63,6 +70,9 @@ def summarize(records: list[dict[str, Any]]) -> dict[str, Any]:
         bucket["queue_ms"] += record.get("queue_wait_ms", 0)
         bucket["input_tokens"] += record.get("input_tokens", 0)
         bucket["output_tokens"] += record.get("output_tokens", 0)
+        if record.get("cached_input_tokens") is not None:
+            bucket["cache_reported_input"] += record.get("input_tokens", 0)
+            bucket["cached_input_tokens"] += record["cached_input_tokens"]
         if record.get("is_retry"):
             bucket["retries"] += 1
         if record.get("status") not in {"completed"}:
@@ -152,6 +162,10 @@ def summarize(records: list[dict[str, Any]]) -> dict[str, Any]:
                 "output_tokens": b["output_tokens"],
                 "retries": b["retries"],
                 "failures": b["failures"],
+                "cached_input_tokens": b["cached_input_tokens"],
+                "cache_hit_ratio": _ratio(
+                    b["cached_input_tokens"], b["cache_reported_input"]
+                ),
             }
             for name, b in sorted(
                 stages.items(),
@@ -168,6 +182,7 @@ def summarize(records: list[dict[str, Any]]) -> dict[str, Any]:
             "distinct_blocks": len(block_sends),
             "top_repeated_blocks": top_repeats,
         },
+        "prompt_cache": _prompt_cache_summary(records),
         "queue_wait_reasons": dict(
             sorted(
                 (
@@ -183,6 +198,26 @@ def summarize(records: list[dict[str, Any]]) -> dict[str, Any]:
     }
 
 
+def _ratio(part: int, whole: int) -> float | None:
+    return round(part / whole, 4) if whole else None
+
+
+def _prompt_cache_summary(records: list[dict[str, Any]]) -> dict[str, Any]:
+    reported = [r for r in records if r.get("cached_input_tokens") is not None]
+    cached = sum(r["cached_input_tokens"] for r in reported)
+    return {
+        "reporting_calls": len(reported),
+        "cached_input_tokens": cached,
+        "cache_hit_ratio": _ratio(
+            cached, sum(r.get("input_tokens", 0) for r in reported)
+        ),
+    }
+
+
+def _format_ratio(value: float | None) -> str:
+    return "—" if value is None else f"{value * 100:.1f}%"
+
+
 def _count(records: list[dict[str, Any]], field: str) -> dict[str, int]:
     counts: dict[str, int] = defaultdict(int)
     for record in records:
@@ -206,16 +241,24 @@ def render(summary: dict[str, Any]) -> str:
         "",
         "## ② 各阶段耗时",
         "",
-        "| 阶段 | 次数 | 墙钟(s) | 忙时(s) | 排队(s) | 输入tok | 输出tok | 重试 | 失败 |",
-        "|---|---:|---:|---:|---:|---:|---:|---:|---:|",
+        "| 阶段 | 次数 | 墙钟(s) | 忙时(s) | 排队(s) | 输入tok | 输出tok | 缓存命中 | 重试 | 失败 |",
+        "|---|---:|---:|---:|---:|---:|---:|---:|---:|---:|",
     ]
     for name, stage in summary["answer_2_stages"].items():
         lines.append(
             f"| {name} | {stage['calls']} | {stage['wall_s']} | "
             f"{stage['busy_s']} | {stage['queue_s']} | "
             f"{stage['input_tokens']} | {stage['output_tokens']} | "
+            f"{_format_ratio(stage['cache_hit_ratio'])} | "
             f"{stage['retries']} | {stage['failures']} |"
         )
+    prompt_cache = summary["prompt_cache"]
+    lines += [
+        "",
+        f"provider 前缀缓存：{prompt_cache['reporting_calls']} 次调用报了命中数，"
+        f"命中 {prompt_cache['cached_input_tokens']} token"
+        f"（命中率 {_format_ratio(prompt_cache['cache_hit_ratio'])}）",
+    ]
     repeated = summary["answer_3_repeated_context"]
     lines += [
         "",
@@ -0,0 +1,162 @@
+"""把 ``python -X importtime`` 的输出解析成导入树，给启动耗时预算用。
+
+``-X importtime`` 按**完成顺序**逐行输出 ``self | cumulative | 缩进+模块名``，
+子模块先于父模块出现，缩进深度表示嵌套层级。本工具把它还原成树：
+
+* 树视图：从根模块往下，只展开累计耗时超过阈值的分支；
+* 顶级包汇总：按第三方 / 仓库内顶级包合并自身耗时，一眼看出钱花在哪；
+* 预算：``--budget-ms`` 给定时，根模块累计耗时超出即以非零码退出。
+
+用法::
+
+    python3 backend/tools/import_profile.py                      # 在 backend/ 下剖析 ``import main``
+    python3 backend/tools/import_profile.py --module routers.courses --min-ms 20
+    python3 -X importtime -c "import main" 2> imports.txt
+    python3 backend/tools/import_profile.py --input imports.txt --json out.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+from dataclasses import dataclass, field
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parents[1]
+
+_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|( *)(\S+)\s*$")
+
+
+@dataclass
+class ImportNode:
+    name: str
+    self_us: int
+    cumulative_us: int
+    children: list[ImportNode] = field(default_factory=list)
+
+    def to_dict(self, min_us: int = 0) -> dict:
+        return {
+            "name": self.name,
+            "self_ms": round(self.self_us / 1000, 1),
+            "cumulative_ms": round(self.cumulative_us / 1000, 1),
+            "children": [
+                child.to_dict(min_us) for child in self.children if child.cumulative_us >= min_us
+            ],
+        }
+
+
+def parse_importtime(text: str) -> list[ImportNode]:
+    """把 importtime 输出还原成森林，返回按出现顺序排列的顶层节点。
+
+    一行出现时它的所有子模块都已经出现过；用“按深度挂起的待认领子节点”栈，
+    遇到深度 d 的行就把深度 d+1 上挂起的节点全部认领为子节点。
+    """
+    pending: dict[int, list[ImportNode]] = {}
+    for line in text.splitlines():
+        match = _LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        depth = len(indent) // 2
+        node = ImportNode(name, int(self_us), int(cumulative_us))
+        node.children = pending.pop(depth + 1, [])
+        pending.setdefault(depth, []).append(node)
+    roots: list[ImportNode] = []
+    for depth in sorted(pending):
+        roots.extend(pending[depth])
+    return roots
+
+
+def find(roots: list[ImportNode], name: str) -> ImportNode | None:
+    for root in roots:
+        if root.name == name:
+            return root
+    return None
+
+
+def package_totals(roots: list[ImportNode]) -> dict[str, int]:
+    """按顶级包合并自身耗时（微秒），自身耗时相加不会重复计算。"""
+    totals: dict[str, int] = {}
+    stack = list(roots)
+    while stack:
+        node = stack.pop()
+        top = node.name.split(".", 1)[0]
+        totals[top] = totals.get(top, 0) + node.self_us
+        stack.extend(node.children)
+    return dict(sorted(totals.items(), key=lambda item: item[1], reverse=True))
+
+
+def render_tree(node: ImportNode, min_us: int, max_depth: int, depth: int = 0) -> list[str]:
+    lines = [f"{'  ' * depth}{node.cumulative_us / 1000:8.1f} ms  {node.name}"]
+    if depth >= max_depth:
+        return lines
+    for child in sorted(node.children, key=lambda item: item.cumulative_us, reverse=True):
+        if child.cumulative_us >= min_us:
+            lines.extend(render_tree(child, min_us, max_depth, depth + 1))
+    return lines
+
+
+def run_importtime(module: str, cwd: Path = BACKEND) -> str:
+    """在隔离的数据目录里以 ``-X importtime`` 导入一次模块，返回 stderr。"""
+    with tempfile.TemporaryDirectory(prefix="lingzhi-importtime-") as data_dir:
+        env = {**os.environ, "LINGZHI_DATA_DIR": data_dir, "PYTHONDONTWRITEBYTECODE": "1"}
+        completed = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=cwd,
+            env=env,
+            capture_output=True,
+            text=True,
+            check=False,
+        )
+    if completed.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{completed.stderr[-2000:]}")
+    return completed.stderr
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="main", help="要剖析的模块（默认 main）")
+    parser.add_argument("--input", type=Path, help="直接解析已有的 importtime 输出")
+    parser.add_argument("--min-ms", type=float, default=30.0, help="树视图只展开累计耗时超过该值的分支")
+    parser.add_argument("--depth", type=int, default=6)
+    parser.add_argument("--top", type=int, default=20, help="顶级包汇总的条数")
+    parser.add_argument("--budget-ms", type=float, help="根模块累计耗时的预算，超出即退出码 1")
+    parser.add_argument("--json", type=Path, help="把树与汇总写入 JSON 文件")
+    args = parser.parse_args()
+
+    text = args.input.read_text(encoding="utf-8") if args.input else run_importtime(args.module)
+    roots = parse_importtime(text)
+    root = find(roots, args.module)
+    if root is None:
+        print(f"输出里没有 {args.module} 的导入记录")
+        return 1
+    min_us = int(args.min_ms * 1000)
+
+    print("\n".join(render_tree(root, min_us, args.depth)))
+    totals = package_totals(roots)
+    print(f"\n顶级包自身耗时合计（前 {args.top}）：")
+    for name, total in list(totals.items())[: args.top]:
+        print(f"{total / 1000:8.1f} ms  {name}")
+    total_ms = root.cumulative_us / 1000
+    print(f"\nimport {args.module}: {total_ms:.1f} ms")
+
+    if args.json:
+        args.json.write_text(json.dumps({
+            "module": args.module,
+            "cumulative_ms": round(total_ms, 1),
+            "tree": root.to_dict(min_us),
+            "packages_ms": {name: round(total / 1000, 1) for name, total in totals.items()},
+        }, ensure_ascii=False, indent=2), encoding="utf-8")
+    if args.budget_ms is not None and total_ms > args.budget_ms:
+        print(f"超出预算：{total_ms:.1f} ms > {args.budget_ms:.1f} ms")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
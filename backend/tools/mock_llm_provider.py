@@ -0,0 +1,416 @@
+"""本地 OpenAI 兼容 mock provider：离线压测 ``ai_capacity`` 用。
+
+``scripts/qwen_concurrency_ramp.py`` 和 ``content_parallel_bench.py`` 只能对着真实
+远端测，结果随当天的 provider 负载漂移，也没法复现某一种失败。这个服务说的是
+``AIBase`` 实际在用的那一套协议——``POST /v1/chat/completions``，``stream=True``
+时按 SSE 逐块返回 ``chat.completion.chunk``，末块带 ``finish_reason`` 和
+``usage``——行为全部可配：
+
+* 首字延迟分布：``fixed:0.4`` / ``uniform:0.2,1.5`` / ``lognormal:-0.5,0.6``（秒）。
+* 吐字速度 ``tokens_per_second``，以及每次回答的 token 数（超过请求的 ``max_tokens`` 即截断）。
+* 可选的 ``responder`` 按请求体给出回答，结构化阶段据此拿到符合 schema 的 JSON。
+* 服务端并发上限：在飞请求超过 ``capacity`` 直接 429，模拟 provider 的真实限流。
+* 按比例注入 429（带 ``Retry-After``）、5xx、额度耗尽，以及 ``finish_reason=length``
+  的截断输出；``quota_after_requests`` 让额度在第 N 个请求后耗尽。
+
+``/mock/stats`` 返回服务端计数，``/mock/config`` 可以在运行中改配置。
+
+可以单独起（另一个进程里的后端把 ``AI_API_BASE`` 指过来）::
+
+    python3 backend/tools/mock_llm_provider.py --port 8799 --capacity 6 --rate-limit-ratio 0.05
+
+也可以在进程内起，见 :class:`MockProviderServer`（``capacity_mock_bench.py`` 就这么用）。
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from collections.abc import AsyncIterator, Callable
+from dataclasses import asdict, dataclass, field, fields
+from typing import Any
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+FILLER = (
+    "函数描述两个变量之间的对应关系。给定定义域中的每一个输入，都有唯一的输出与之对应。"
+    "理解这一点之后，再看图像、单调性和最值就有了统一的出发点。"
+)
+# 一个中文字大约一个 token；每个 SSE 块吐这么多 token，贴近真实 provider 的块大小。
+TOKENS_PER_CHUNK = 4
+
+# 按请求体给出回答文本；返回 None 时用占位文本。压测要跑通结构化阶段时，
+# 由调用方按 prompt 标题拼出符合 schema 的 JSON（见 capacity_mock_bench）。
+Responder = Callable[[dict[str, Any]], "str | None"]
+
+
+def parse_latency(spec: str) -> tuple[str, tuple[float, ...]]:
+    """``kind:a,b`` → ``(kind, (a, b))``；格式不对直接报错，压测参数不能悄悄退化。"""
+    kind, _, raw = str(spec).partition(":")
+    kind = kind.strip().lower()
+    params = tuple(float(item) for item in raw.split(",") if item.strip())
+    expected = {"fixed": 1, "uniform": 2, "lognormal": 2}
+    if kind not in expected or len(params) != expected[kind]:
+        raise ValueError(
+            f"latency spec {spec!r}: expected fixed:S, uniform:LO,HI or lognormal:MU,SIGMA"
+        )
+    return kind, params
+
+
+@dataclass
+class MockProviderConfig:
+    latency: str = "uniform:0.2,0.8"
+    tokens_per_second: float = 80.0
+    output_tokens: int = 400
+    capacity: int = 0
+    rate_limit_ratio: float = 0.0
+    retry_after_seconds: float = 2.0
+    server_error_ratio: float = 0.0
+    quota_exhausted_ratio: float = 0.0
+    quota_after_requests: int = 0
+    truncate_ratio: float = 0.0
+    seed: int | None = None
+    models: list[str] = field(default_factory=lambda: ["mock-smart", "mock-fast"])
+
+    def __post_init__(self) -> None:
+        parse_latency(self.latency)
+
+    def update(self, values: dict[str, Any]) -> None:
+        known = {item.name for item in fields(self)}
+        for name, value in values.items():
+            if name in known:
+                setattr(self, name, value)
+        self.__post_init__()
+
+
+class MockProviderState:
+    """服务端计数与随机源；一个 app 一份，跨请求共享。"""
+
+    def __init__(self, config: MockProviderConfig, responder: Responder | None = None) -> None:
+        self.config = config
+        self.responder = responder
+        self.by_prompt: dict[str, int] = {}
+        self.random = random.Random(config.seed)
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.counters = {
+            "requests": 0,
+            "completed": 0,
+            "truncated": 0,
+            "rate_limited": 0,
+            "capacity_rejected": 0,
+            "server_errors": 0,
+            "quota_exhausted": 0,
+            "output_tokens": 0,
+        }
+
+    def first_token_delay(self) -> float:
+        kind, params = parse_latency(self.config.latency)
+        if kind == "fixed":
+            return max(0.0, params[0])
+        if kind == "uniform":
+            return self.random.uniform(min(params), max(params))
+        return self.random.lognormvariate(params[0], params[1])
+
+    def chance(self, ratio: float) -> bool:
+        return ratio > 0 and self.random.random() < ratio
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            **self.counters,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "by_prompt": dict(self.by_prompt),
+            "config": asdict(self.config),
+        }
+
+
+def _error(status: int, message: str, code: str, *, retry_after: float | None = None) -> JSONResponse:
+    headers = {}
+    if retry_after is not None:
+        headers["Retry-After"] = str(max(0, math.ceil(retry_after)))
+    return JSONResponse(
+        {"error": {"message": message, "type": code, "code": code}},
+        status_code=status,
+        headers=headers,
+    )
+
+
+def _prompt_text(body: dict[str, Any]) -> str:
+    parts = []
+    for message in body.get("messages") or []:
+        content = message.get("content")
+        if isinstance(content, str):
+            parts.append(content)
+    return "\n".join(parts)
+
+
+def prompt_title(body: dict[str, Any]) -> str:
+    """按消息顺序找到的第一个 Markdown 标题，用来区分生成阶段。
+
+    结构化阶段把契约放在 system prompt 里，正文阶段放在 user prompt 里，所以
+    两种角色都要看。
+    """
+    for line in _prompt_text(body).splitlines():
+        if line.startswith("#"):
+            return line.lstrip("#").strip()[:40]
+    return ""
+
+
+def _filler_text(body: dict[str, Any], tokens: int) -> str:
+    if (body.get("response_format") or {}).get("type") == "json_object":
+        # JSON 模式只保证能解析；业务字段缺失时下游会按各自的降级路径走。
+        padding = (FILLER * (tokens // len(FILLER) + 1))[: max(0, tokens - 20)]
+        return json.dumps({"mock": True, "content": padding}, ensure_ascii=False)
+    return (FILLER * (tokens // len(FILLER) + 1))[:tokens]
+
+
+def create_app(
+    config: MockProviderConfig | None = None,
+    *,
+    responder: Responder | None = None,
+) -> FastAPI:
+    state = MockProviderState(config or MockProviderConfig(), responder)
+    app = FastAPI(title="mock-llm-provider")
+    app.state.mock = state
+
+    @app.get("/v1/models")
+    async def list_models() -> dict[str, Any]:
+        return {
+            "object": "list",
+            "data": [{"id": model, "object": "model"} for model in state.config.models],
+        }
+
+    @app.get("/mock/stats")
+    async def mock_stats() -> dict[str, Any]:
+        return state.stats()
+
+    @app.post("/mock/config")
+    async def mock_config(request: Request) -> dict[str, Any]:
+        try:
+            state.config.update(await request.json())
+        except (TypeError, ValueError) as exc:
+            return _error(400, str(exc), "invalid_config")
+        return state.stats()
+
+    @app.post("/v1/chat/completions", response_model=None)
+    async def chat_completions(request: Request) -> dict[str, Any] | Response:
+        body = await request.json()
+        config = state.config
+        state.counters["requests"] += 1
+        title = prompt_title(body) or "(untitled)"
+        state.by_prompt[title] = state.by_prompt.get(title, 0) + 1
+        if config.capacity and state.in_flight >= config.capacity:
+            state.counters["capacity_rejected"] += 1
+            state.counters["rate_limited"] += 1
+            return _error(
+                429,
+                "Rate limit reached: too many concurrent requests",
+                "rate_limit_exceeded",
+                retry_after=config.retry_after_seconds,
+            )
+        if (
+            config.quota_after_requests
+            and state.counters["requests"] > config.quota_after_requests
+        ) or state.chance(config.quota_exhausted_ratio):
+            state.counters["quota_exhausted"] += 1
+            return _error(
+                429,
+                "You exceeded your current quota, please check your plan and billing details.",
+                "insufficient_quota",
+            )
+        if state.chance(config.rate_limit_ratio):
+            state.counters["rate_limited"] += 1
+            return _error(
+                429,
+                "Rate limit reached for requests",
+                "rate_limit_exceeded",
+                retry_after=config.retry_after_seconds,
+            )
+        if state.chance(config.server_error_ratio):
+            state.counters["server_errors"] += 1
+            return _error(503, "The server is overloaded, please retry later", "server_error")
+
+        model = str(body.get("model") or config.models[0])
+        max_tokens = int(body.get("max_tokens") or config.output_tokens)
+        scripted = state.responder(body) if state.responder else None
+        text = _filler_text(body, config.output_tokens) if scripted is None else scripted
+        # 超过请求的 max_tokens 就按 provider 的方式截断；按比例注入的截断砍掉后半段。
+        truncated = len(text) > max_tokens or state.chance(config.truncate_ratio)
+        if truncated:
+            text = text[: max(1, min(max_tokens, len(text) // 2))]
+        prompt_tokens = len(_prompt_text(body))
+        finish_reason = "length" if truncated else "stop"
+        delay = state.first_token_delay()
+
+        state.in_flight += 1
+        state.peak_in_flight = max(state.peak_in_flight, state.in_flight)
+
+        def finish() -> None:
+            state.in_flight -= 1
+            state.counters["completed"] += 1
+            state.counters["output_tokens"] += len(text)
+            if truncated:
+                state.counters["truncated"] += 1
+
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": len(text),
+            "total_tokens": prompt_tokens + len(text),
+        }
+        completion_id = f"chatcmpl-mock-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+
+        if not body.get("stream"):
+            try:
+                await asyncio.sleep(delay + len(text) / max(1e-6, config.tokens_per_second))
+            finally:
+                finish()
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": text},
+                    "finish_reason": finish_reason,
+                }],
+                "usage": usage,
+            }
+
+        async def events() -> AsyncIterator[str]:
+            def chunk(delta: dict[str, Any], reason: str | None = None, **extra: Any) -> str:
+                payload = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [{"index": 0, "delta": delta, "finish_reason": reason}],
+                    **extra,
+                }
+                return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+            try:
+                await asyncio.sleep(delay)
+                yield chunk({"role": "assistant", "content": ""})
+                pause = TOKENS_PER_CHUNK / max(1e-6, config.tokens_per_second)
+                for offset in range(0, len(text), TOKENS_PER_CHUNK):
+                    yield chunk({"content": text[offset:offset + TOKENS_PER_CHUNK]})
+                    await asyncio.sleep(pause)
+                yield chunk({}, finish_reason, usage=usage)
+                yield "data: [DONE]\n\n"
+            finally:
+                finish()
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+
+class MockProviderServer:
+    """在后台线程里跑一个 uvicorn，独立事件循环，不和被测代码抢同一个 loop。"""
+
+    def __init__(
+        self,
+        config: MockProviderConfig | None = None,
+        *,
+        responder: Responder | None = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ) -> None:
+        self.app = create_app(config, responder=responder)
+        self.host = host
+        self._server = uvicorn.Server(
+            uvicorn.Config(self.app, host=host, port=port, log_level="warning", lifespan="off")
+        )
+        self._thread: threading.Thread | None = None
+
+    @property
+    def state(self) -> MockProviderState:
+        return self.app.state.mock
+
+    @property
+    def port(self) -> int:
+        return self._server.servers[0].sockets[0].getsockname()[1]
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}/v1"
+
+    def start(self, timeout: float = 10.0) -> MockProviderServer:
+        self._thread = threading.Thread(target=self._server.run, name="mock-llm-provider", daemon=True)
+        self._thread.start()
+        deadline = time.monotonic() + timeout
+        while not self._server.started:
+            if not self._thread.is_alive() or time.monotonic() > deadline:
+                raise RuntimeError("mock LLM provider failed to start")
+            time.sleep(0.01)
+        return self
+
+    def stop(self) -> None:
+        self._server.should_exit = True
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+            self._thread = None
+
+    def __enter__(self) -> MockProviderServer:
+        return self.start()
+
+    def __exit__(self, *_exc_info: Any) -> None:
+        self.stop()
+
+
+def add_config_arguments(parser: argparse.ArgumentParser) -> None:
+    defaults = MockProviderConfig()
+    parser.add_argument("--latency", default=defaults.latency, help="首字延迟分布，如 fixed:0.4 / uniform:0.2,1.5 / lognormal:-0.5,0.6")
+    parser.add_argument("--tokens-per-second", type=float, default=defaults.tokens_per_second)
+    parser.add_argument("--output-tokens", type=int, default=defaults.output_tokens)
+    parser.add_argument("--capacity", type=int, default=defaults.capacity, help="服务端并发上限，0 表示不限")
+    parser.add_argument("--rate-limit-ratio", type=float, default=defaults.rate_limit_ratio)
+    parser.add_argument("--retry-after", type=float, default=defaults.retry_after_seconds)
+    parser.add_argument("--server-error-ratio", type=float, default=defaults.server_error_ratio)
+    parser.add_argument("--quota-exhausted-ratio", type=float, default=defaults.quota_exhausted_ratio)
+    parser.add_argument("--quota-after-requests", type=int, default=defaults.quota_after_requests)
+    parser.add_argument("--truncate-ratio", type=float, default=defaults.truncate_ratio)
+    parser.add_argument("--seed", type=int, default=None)
+
+
+def config_from_args(args: argparse.Namespace) -> MockProviderConfig:
+    return MockProviderConfig(
+        latency=args.latency,
+        tokens_per_second=args.tokens_per_second,
+        output_tokens=args.output_tokens,
+        capacity=args.capacity,
+        rate_limit_ratio=args.rate_limit_ratio,
+        retry_after_seconds=args.retry_after,
+        server_error_ratio=args.server_error_ratio,
+        quota_exhausted_ratio=args.quota_exhausted_ratio,
+        quota_after_requests=args.quota_after_requests,
+        truncate_ratio=args.truncate_ratio,
+        seed=args.seed,
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8799)
+    add_config_arguments(parser)
+    args = parser.parse_args()
+    config = config_from_args(args)
+    print(f"mock provider: http://{args.host}:{args.port}/v1  {json.dumps(asdict(config), ensure_ascii=False)}")
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
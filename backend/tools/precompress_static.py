@@ -0,0 +1,126 @@
+"""构建期给前端产物生成 ``.br`` / ``.gz`` 预压缩文件。
+
+运行时 ``static_serving`` 按 ``Accept-Encoding`` 直接返回这些文件，不再逐请求
+在事件循环上做 gzip。规则：
+
+* 只处理文本类文件（js / css / html / svg / json 等），图片字体本身已压缩；
+* 小于 ``--min-size`` 的文件跳过，压缩后不比原文件小的也不写；
+* 生成的文件沿用原文件的修改时间，运行时据此判断是否过期；
+* 只依赖标准库，``brotli`` 装了才生成 ``.br``，否则只生成 ``.gz``
+  （构建机不一定有后端依赖）。
+
+用法::
+
+    python3 backend/tools/precompress_static.py backend/static
+    python3 backend/tools/precompress_static.py frontend/dist --require-brotli --json out.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import gzip
+import json
+import os
+from collections.abc import Callable, Iterable
+from pathlib import Path
+
+# 与 ``static_serving.COMPRESSIBLE_SUFFIXES`` 保持一致。
+COMPRESSIBLE_SUFFIXES = frozenset({
+    ".css", ".html", ".js", ".json", ".map", ".mjs", ".svg", ".txt", ".wasm", ".webmanifest", ".xml",
+})
+VARIANT_SUFFIXES = (".br", ".gz")
+# 与 GZipMiddleware 的 minimum_size 一致，更小的文件压缩后常常更大。
+DEFAULT_MIN_SIZE = 1000
+
+
+def brotli_compressor() -> Callable[[bytes], bytes] | None:
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return lambda data: brotli.compress(data, quality=11)
+
+
+def gzip_compress(data: bytes) -> bytes:
+    # mtime=0：同样的输入得到同样的字节，产物可复现。
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def precompress_directory(
+    directory: str | os.PathLike[str],
+    *,
+    min_size: int = DEFAULT_MIN_SIZE,
+    encodings: Iterable[str] = ("br", "gzip"),
+) -> dict[str, int]:
+    """给目录下的文本类文件生成预压缩文件，返回文件数与各编码的总字节数。
+
+    没生成某个编码的文件按原始大小计入，统计即客户端实际会下载的字节数。
+    """
+    wanted = set(encodings)
+    compress_br = brotli_compressor() if "br" in wanted else None
+    compressors: list[tuple[str, str, Callable[[bytes], bytes]]] = []
+    if compress_br is not None:
+        compressors.append(("br", ".br", compress_br))
+    if "gzip" in wanted:
+        compressors.append(("gzip", ".gz", gzip_compress))
+    totals = {
+        "files": 0,
+        "identity_bytes": 0,
+        "br_bytes": 0,
+        "gzip_bytes": 0,
+        "brotli_available": int(compress_br is not None),
+    }
+    for path in sorted(Path(directory).rglob("*")):
+        if (
+            not path.is_file()
+            or path.name.endswith(VARIANT_SUFFIXES)
+            or path.suffix.lower() not in COMPRESSIBLE_SUFFIXES
+        ):
+            continue
+        source_stat = path.stat()
+        if source_stat.st_size < min_size:
+            continue
+        data = path.read_bytes()
+        totals["files"] += 1
+        totals["identity_bytes"] += len(data)
+        for encoding, suffix, compress in compressors:
+            target = path.with_name(path.name + suffix)
+            encoded = compress(data)
+            if len(encoded) >= len(data):
+                target.unlink(missing_ok=True)
+                totals[f"{encoding}_bytes"] += len(data)
+                continue
+            target.write_bytes(encoded)
+            os.utime(target, ns=(source_stat.st_atime_ns, source_stat.st_mtime_ns))
+            totals[f"{encoding}_bytes"] += len(encoded)
+    return totals
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("directory", type=Path, help="前端产物目录（含 index.html 与 assets/）")
+    parser.add_argument("--min-size", type=int, default=DEFAULT_MIN_SIZE)
+    parser.add_argument("--require-brotli", action="store_true", help="没装 brotli 时以非零码退出")
+    parser.add_argument("--json", type=Path, help="把统计写入 JSON 文件")
+    args = parser.parse_args()
+
+    if not args.directory.is_dir():
+        print(f"目录不存在：{args.directory}")
+        return 1
+    totals = precompress_directory(args.directory, min_size=args.min_size)
+    identity = totals["identity_bytes"] or 1
+    print(f"预压缩 {totals['files']} 个文件，原始 {totals['identity_bytes']} 字节")
+    print(f"  gzip: {totals['gzip_bytes']} 字节（{totals['gzip_bytes'] / identity:.1%}）")
+    if totals["brotli_available"]:
+        print(f"  br:   {totals['br_bytes']} 字节（{totals['br_bytes'] / identity:.1%}）")
+    else:
+        print("  br:   未安装 brotli，跳过")
+    if args.json:
+        args.json.write_text(json.dumps(totals, ensure_ascii=False, indent=2), encoding="utf-8")
+    if args.require_brotli and not totals["brotli_available"]:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -7,6 +7,7 @@ from pathlib import Path
 import shutil
 from typing import Any
 
+from content_chunks import chunk_store_for
 from course_document import (
     COURSE_DOCUMENT_SCHEMA,
     CourseBlock,
@@ -372,12 +373,14 @@ def _clear_previous_demo_state(data_dir: Path) -> None:
         "teaching_representations",
         "generation_workspaces",
     ):
+        chunks = chunk_store_for(data_dir / directory_name)
         directory = data_dir / directory_name / COURSE_ID
         if directory.exists():
+            chunks.discard_tree(directory)
             shutil.rmtree(directory)
         file_path = data_dir / directory_name / f"{COURSE_ID}.json"
         if file_path.exists():
-            file_path.unlink()
+            chunks.discard(file_path)
     for directory_name in (
         "teaching_representations",
         "change_proposals",
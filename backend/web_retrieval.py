@@ -23,6 +23,13 @@ from urllib.parse import urlparse, urlunparse
 
 import httpx
 
+from retrieval_cache import (
+    RetrievalQueryCache,
+    RetrievalSingleFlight,
+    retrieval_query_cache,
+    retrieval_single_flight,
+)
+
 EXA_SEARCH_ENDPOINT = "https://api.exa.ai/search"
 POLICY_VERSION = "web_retrieval_v2.1"
 ERROR_CODES = {
@@ -32,7 +39,15 @@ ERROR_CODES = {
     "no_sources",
     "privacy_blocked",
 }
-_QUERY_CACHE: dict[str, tuple[float, list[dict[str, Any]]]] = {}
+# How stale a cached provider result each purpose accepts. Entries are shared
+# across purposes; an AI-teacher answer simply refuses older results than a
+# course build would. ``WEB_RETRIEVAL_CACHE_TTL_SECONDS`` overrides all of them.
+PURPOSE_CACHE_TTL_SECONDS: dict[str, float] = {
+    "course": 900.0,
+    "assessment": 900.0,
+    "ai_teacher": 300.0,
+    "ppt_image": 3600.0,
+}
 
 PURPOSE_LIMITS: dict[str, dict[str, int | float]] = {
     "course": {
@@ -456,6 +471,8 @@ class RetrievalGateway:
         tier_a_domains: list[str] | tuple[str, ...] | None = None,
         cache_namespace: str | None = None,
         cache_ttl_seconds: float | None = None,
+        cache: RetrievalQueryCache | None = None,
+        single_flight: RetrievalSingleFlight | None = None,
     ) -> None:
         self.provider = provider or create_search_provider()
         configured_domains = [
@@ -469,15 +486,23 @@ class RetrievalGateway:
         self.cache_namespace = cache_namespace or (
             f"{POLICY_VERSION}:{self.provider.name}"
         )
+        self.cache = cache or retrieval_query_cache
+        self.single_flight = single_flight or retrieval_single_flight
         configured_ttl = cache_ttl_seconds
-        if configured_ttl is None:
+        if configured_ttl is None and os.getenv("WEB_RETRIEVAL_CACHE_TTL_SECONDS"):
             try:
-                configured_ttl = float(
-                    os.getenv("WEB_RETRIEVAL_CACHE_TTL_SECONDS", "900")
-                )
+                configured_ttl = float(os.environ["WEB_RETRIEVAL_CACHE_TTL_SECONDS"])
             except ValueError:
-                configured_ttl = 900.0
-        self.cache_ttl_seconds = max(0.0, min(86400.0, configured_ttl))
+                configured_ttl = None
+        # ``None`` means "use the per-purpose table".
+        self.cache_ttl_seconds = (
+            None if configured_ttl is None else max(0.0, min(86400.0, configured_ttl))
+        )
+
+    def cache_ttl_for(self, purpose: str) -> float:
+        if self.cache_ttl_seconds is not None:
+            return self.cache_ttl_seconds
+        return PURPOSE_CACHE_TTL_SECONDS.get(purpose, PURPOSE_CACHE_TTL_SECONDS["course"])
 
     async def retrieve(self, request: RetrievalRequest) -> dict[str, Any]:
         started = time.monotonic()
@@ -535,12 +560,42 @@ class RetrievalGateway:
             )
 
         semaphore = asyncio.Semaphore(concurrency)
+        cache_ttl = self.cache_ttl_for(request.purpose)
         per_query = max(1, min(max_sources, (max_sources + len(safe_queries) - 1) // len(safe_queries)))
         candidate_limit = min(24, max(12, max_sources * 4, per_query * 8))
 
+        async def search(
+            query: str,
+            cache_key: str,
+        ) -> tuple[list[dict[str, Any]], str | None]:
+            try:
+                if request.category == "general":
+                    results = await self.provider.search(query, limit=candidate_limit)
+                else:
+                    results = await self.provider.search(
+                        query,
+                        limit=candidate_limit,
+                        category=request.category,
+                    )
+                await self.cache.aput(
+                    cache_key,
+                    results,
+                    ttl_seconds=cache_ttl,
+                    purpose=request.purpose,
+                )
+                return results, None
+            except RetrievalProviderError as exc:
+                return [], exc.error_code
+            except httpx.TimeoutException:
+                return [], "timeout"
+            except (httpx.HTTPError, ValueError, TypeError):
+                return [], "provider_error"
+            except Exception:
+                return [], "provider_error"
+
         async def run(
             query: str,
-        ) -> tuple[str, list[dict[str, Any]], str | None, bool]:
+        ) -> tuple[str, list[dict[str, Any]], str | None, bool, bool]:
             async with semaphore:
                 cache_key = _digest({
                     "namespace": self.cache_namespace,
@@ -548,34 +603,18 @@ class RetrievalGateway:
                     "limit": candidate_limit,
                     "category": request.category,
                 })
-                cached = _QUERY_CACHE.get(cache_key)
-                if cached and cached[0] > time.monotonic():
-                    return query, deepcopy(cached[1]), None, True
-                if cached:
-                    _QUERY_CACHE.pop(cache_key, None)
-                try:
-                    if request.category == "general":
-                        results = await self.provider.search(query, limit=candidate_limit)
-                    else:
-                        results = await self.provider.search(
-                            query,
-                            limit=candidate_limit,
-                            category=request.category,
-                        )
-                    if self.cache_ttl_seconds > 0:
-                        _QUERY_CACHE[cache_key] = (
-                            time.monotonic() + self.cache_ttl_seconds,
-                            deepcopy(results),
-                        )
-                    return query, results, None, False
-                except RetrievalProviderError as exc:
-                    return query, [], exc.error_code, False
-                except httpx.TimeoutException:
-                    return query, [], "timeout", False
-                except (httpx.HTTPError, ValueError, TypeError):
-                    return query, [], "provider_error", False
-                except Exception:
-                    return query, [], "provider_error", False
+                if cache_ttl > 0:
+                    cached = self.cache.get(cache_key, max_age_seconds=cache_ttl)
+                    if cached is not None:
+                        return query, cached, None, True, False
+                # Another request may already be asking the provider the same thing.
+                (results, error_code), shared = await self.single_flight.run(
+                    cache_key,
+                    lambda: search(query, cache_key),
+                )
+                if shared:
+                    results = deepcopy(results)
+                return query, results, error_code, False, shared
 
         try:
             batches = await asyncio.wait_for(
@@ -591,8 +630,10 @@ class RetrievalGateway:
         rejected: list[dict[str, Any]] = []
         seen: set[str] = set()
         cache_hit_count = 0
-        for query, results, error_code, cache_hit in batches:
+        coalesced_count = 0
+        for query, results, error_code, cache_hit, shared in batches:
             cache_hit_count += int(cache_hit)
+            coalesced_count += int(shared)
             if error_code:
                 error_codes.append(error_code)
             for raw in results:
@@ -627,6 +668,7 @@ class RetrievalGateway:
                 started=started,
                 retrieved_at=now,
                 cache_hit_count=cache_hit_count,
+                coalesced_count=coalesced_count,
             )
         return self._package(
             request=request,
@@ -638,6 +680,7 @@ class RetrievalGateway:
             started=started,
             retrieved_at=now,
             cache_hit_count=cache_hit_count,
+            coalesced_count=coalesced_count,
         )
 
     def _failed_package(
@@ -673,6 +716,7 @@ class RetrievalGateway:
         started: float,
         retrieved_at: str,
         cache_hit_count: int = 0,
+        coalesced_count: int = 0,
     ) -> dict[str, Any]:
         tier_counts = {"tier_a": 0, "tier_b": 0, "tier_c": 0}
         for source in [*sources, *rejected_sources]:
@@ -697,6 +741,7 @@ class RetrievalGateway:
             "duration_ms": max(0, round((time.monotonic() - started) * 1000)),
             "package_revision": package_revision,
             "cache_hit_count": max(0, int(cache_hit_count)),
+            "coalesced_count": max(0, int(coalesced_count)),
         }
         package = {
             "schema_version": "retrieval_package_v1",
@@ -9,12 +9,15 @@ from __future__ import annotations
 
 import asyncio
 import logging
+import time
 import uuid
 from collections.abc import Awaitable, Callable
 from typing import Any, Literal, TypedDict
 
 from fastapi import WebSocket
 
+from metrics import websocket_send_failures, websocket_send_seconds
+
 logger = logging.getLogger(__name__)
 
 
@@ -56,6 +59,7 @@ class WSCommand(TypedDict, total=False):
 
 # Type alias for the command handler callback (injected, e.g. TaskManager methods)
 CommandHandler = Callable[[str, dict], Awaitable[None]]
+Relay = Callable[[str | None, dict], None]
 
 
 # ---------------------------------------------------------------------------
@@ -82,6 +86,8 @@ class WebSocketService:
         self._lock: asyncio.Lock = asyncio.Lock()
         # Injected callback for handling task-level commands
         self._command_handler: CommandHandler | None = command_handler
+        # Multi-worker mode: forwards pushes to clients connected to other workers
+        self._relay: Relay | None = None
 
     # ------------------------------------------------------------------
     # Command handler injection
@@ -91,6 +97,17 @@ class WebSocketService:
         """Set or replace the command handler callback."""
         self._command_handler = handler
 
+    def set_relay(self, relay: Relay | None) -> None:
+        """Forward every push to *relay* as ``(course_id, message)``; ``course_id`` is None for broadcasts."""
+        self._relay = relay
+
+    async def deliver_relayed(self, course_id: str | None, message: dict[str, Any]) -> None:
+        """Deliver a push relayed from another worker to local clients only."""
+        if course_id is None:
+            await self._deliver_all(message)
+        else:
+            await self._deliver(course_id, message)
+
     # ------------------------------------------------------------------
     # Connection lifecycle
     # ------------------------------------------------------------------
@@ -189,19 +206,35 @@ class WebSocketService:
 
         Silently removes connections that have been closed.
         """
+        await self._deliver(course_id, message)
+        if self._relay is not None:
+            self._relay(course_id, message)
+
+    async def _deliver(self, course_id: str, message: dict[str, Any]) -> None:
         subscribers = await self._get_subscribers(course_id)
         disconnected: list[str] = []
 
         for conn_id, ws in subscribers:
-            try:
-                await ws.send_json(message)
-            except Exception:
+            if not await self._send(ws, message):
                 logger.warning("Failed to send to %s, marking as disconnected", conn_id)
                 disconnected.append(conn_id)
 
         for conn_id in disconnected:
             await self.disconnect(conn_id)
 
+    @staticmethod
+    async def _send(ws: WebSocket, message: dict[str, Any]) -> bool:
+        """Send one message, recording its latency; ``False`` if the client is gone."""
+        message_type = str(message.get("type") or "unknown")
+        started = time.perf_counter()
+        try:
+            await ws.send_json(message)
+        except Exception:
+            websocket_send_failures.inc(type=message_type)
+            return False
+        websocket_send_seconds.observe(time.perf_counter() - started, type=message_type)
+        return True
+
     # ------------------------------------------------------------------
     # Push methods (server -> client)
     # ------------------------------------------------------------------
@@ -357,14 +390,17 @@ class WebSocketService:
 
     async def broadcast(self, message: dict[str, Any]) -> None:
         """Send *message* to every connected client (no subscription filter)."""
+        await self._deliver_all(message)
+        if self._relay is not None:
+            self._relay(None, message)
+
+    async def _deliver_all(self, message: dict[str, Any]) -> None:
         async with self._lock:
             items = list(self._connections.items())
 
         disconnected: list[str] = []
         for conn_id, ws in items:
-            try:
-                await ws.send_json(message)
-            except Exception:
+            if not await self._send(ws, message):
                 disconnected.append(conn_id)
 
         for conn_id in disconnected:
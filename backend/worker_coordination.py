@@ -0,0 +1,379 @@
+"""多 worker 部署的进程间协调原语：文件锁、生成进程选举与本机失效广播。
+
+默认部署是单个 ``uvicorn main:app`` 进程，仓库里的 ``threading.RLock``、
+``asyncio.Lock`` 和各类内存缓存都只在进程内有效。设置 ``LINGZHI_WORKERS``
+（或 uvicorn 的 ``WEB_CONCURRENCY``）大于 1 后进入多 worker 模式：
+
+* :class:`ProcessLock` / :class:`AsyncProcessLock` 在进程内锁之外再叠加
+  ``fcntl.flock`` 文件锁，让既有的 ``_lock(key)`` 辅助函数跨进程互斥；
+  单进程模式不创建锁文件，行为与原来的进程内锁完全一致。
+* :class:`GenerationWorkerElection` 用非阻塞 ``flock`` 选出唯一的生成进程，
+  持锁进程退出时内核自动释放，其余进程可以接任。
+* :class:`WorkerBus` 是基于 Unix 数据报套接字的本机发布/订阅，用于在进程间
+  传递缓存失效、WebSocket 推送等轻量通知。消息尽力投递，不落盘；正确性
+  依赖读方按文件戳校验，广播只负责让其他进程尽早丢弃旧缓存。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import socket
+import tempfile
+import threading
+import uuid
+from collections import defaultdict
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows 开发机
+    fcntl = None  # type: ignore[assignment]
+
+logger = logging.getLogger(__name__)
+
+LOCKS_DIRNAME = ".locks"
+WORKERS_DIRNAME = ".workers"
+# AF_UNIX 路径上限是 108 字节（含结尾 NUL），留出文件名余量。
+_MAX_SOCKET_DIR_LENGTH = 80
+MAX_MESSAGE_BYTES = 64 * 1024
+# AsyncProcessLock 等文件锁时的轮询间隔（秒），从短到长退避。
+_ASYNC_LOCK_POLL_MIN_SECONDS = 0.005
+_ASYNC_LOCK_POLL_MAX_SECONDS = 0.1
+
+
+def worker_count() -> int:
+    """部署声明的 worker 进程数；未声明或无法解析时按单进程处理。"""
+    for name in ("LINGZHI_WORKERS", "WEB_CONCURRENCY"):
+        value = os.getenv(name, "").strip()
+        if not value:
+            continue
+        try:
+            return max(1, int(value))
+        except ValueError:
+            logger.warning("Ignoring invalid %s=%r", name, value)
+    return 1
+
+
+def multi_worker_enabled() -> bool:
+    return worker_count() > 1 and fcntl is not None
+
+
+def lock_file_path(root: str | Path, key: str) -> Path:
+    """``key`` 在 ``root/.locks`` 下对应的锁文件；键做摘要，避免非法文件名。"""
+    digest = hashlib.sha1(str(key).encode("utf-8")).hexdigest()[:32]
+    return Path(root) / LOCKS_DIRNAME / f"{digest}.lock"
+
+
+def socket_dir(data_dir: str | Path) -> Path:
+    """本数据目录下各 worker 共用的套接字目录。
+
+    数据目录路径过长时 AF_UNIX 放不下，改用临时目录下按数据目录摘要命名的目录，
+    同一数据目录的所有 worker 仍会得到同一路径。
+    """
+    preferred = Path(data_dir) / WORKERS_DIRNAME
+    if len(str(preferred)) <= _MAX_SOCKET_DIR_LENGTH:
+        return preferred
+    digest = hashlib.sha1(str(Path(data_dir).resolve()).encode("utf-8")).hexdigest()[:16]
+    return Path(tempfile.gettempdir()) / f"lingzhi-workers-{digest}"
+
+
+class FileLock:
+    """一个锁文件上的排他 ``flock``，不可重入。
+
+    ``flock`` 锁的是打开的文件描述，释放不要求与加锁在同一线程，所以异步代码
+    可以在线程池里阻塞加锁、再回到事件循环释放。
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self._fd: int | None = None
+
+    def acquire(self, blocking: bool = True) -> bool:
+        if fcntl is None:
+            return True
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        except BaseException:
+            os.close(fd)
+            raise
+        self._fd = fd
+        return True
+
+    def release(self) -> None:
+        fd, self._fd = self._fd, None
+        if fd is None:
+            return
+        try:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        finally:
+            os.close(fd)
+
+    @property
+    def held(self) -> bool:
+        return self._fd is not None
+
+
+class ProcessLock:
+    """可重入锁：进程内是 ``threading.RLock``，给出 ``path`` 时再跨进程互斥。
+
+    文件锁只在最外层加、最外层放，同一线程的重入不会重复打开锁文件自锁。
+    """
+
+    def __init__(self, path: str | Path | None = None) -> None:
+        self._local = threading.RLock()
+        self._file = FileLock(path) if path is not None else None
+        self._depth = 0
+
+    def acquire(self, blocking: bool = True) -> bool:
+        if not self._local.acquire(blocking):
+            return False
+        if self._depth == 0 and self._file is not None:
+            try:
+                acquired = self._file.acquire(blocking)
+            except BaseException:
+                self._local.release()
+                raise
+            if not acquired:
+                self._local.release()
+                return False
+        self._depth += 1
+        return True
+
+    def release(self) -> None:
+        self._depth -= 1
+        if self._depth == 0 and self._file is not None:
+            self._file.release()
+        self._local.release()
+
+    def __enter__(self) -> ProcessLock:
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.release()
+
+
+class AsyncProcessLock:
+    """``asyncio.Lock`` 加可选的跨进程文件锁，供 ``async with`` 使用。
+
+    进程内先排队，拿到本地锁的协程再去抢文件锁；抢不到时用非阻塞 ``flock``
+    轮询并 ``await asyncio.sleep`` 退避，不占住事件循环。不在线程里阻塞等待：
+    协程被取消后线程仍会拿到文件锁，却再没有人释放。不可重入，与它替换的
+    ``asyncio.Lock`` 一致。
+    """
+
+    def __init__(self, path: str | Path | None = None) -> None:
+        self._local = asyncio.Lock()
+        self._file = FileLock(path) if path is not None else None
+
+    async def __aenter__(self) -> AsyncProcessLock:
+        await self._local.acquire()
+        if self._file is not None:
+            try:
+                delay = _ASYNC_LOCK_POLL_MIN_SECONDS
+                while not self._file.acquire(blocking=False):
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, _ASYNC_LOCK_POLL_MAX_SECONDS)
+            except BaseException:
+                self._local.release()
+                raise
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        if self._file is not None:
+            self._file.release()
+        self._local.release()
+
+    def locked(self) -> bool:
+        return self._local.locked()
+
+
+class ProcessLockRegistry:
+    """按键分配锁，替换仓库里 ``dict.setdefault(key, threading.RLock())`` 的写法。
+
+    ``enabled`` 默认取 :func:`multi_worker_enabled`；关闭时锁不落文件。
+    """
+
+    def __init__(
+        self,
+        root: str | Path,
+        *,
+        enabled: bool | None = None,
+        factory: Callable[[Path | None], Any] = ProcessLock,
+    ) -> None:
+        self.root = Path(root)
+        self.enabled = multi_worker_enabled() if enabled is None else enabled
+        self._factory = factory
+        self._locks: dict[str, Any] = {}
+        self._guard = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        with self._guard:
+            lock = self._locks.get(key)
+            if lock is None:
+                lock = self._factory(lock_file_path(self.root, key) if self.enabled else None)
+                self._locks[key] = lock
+            return lock
+
+
+def shared_lock(root: str | Path, name: str, *, enabled: bool | None = None) -> ProcessLock:
+    """模块级单把锁（如 ``_usage_lock``）的跨进程版本。"""
+    enabled = multi_worker_enabled() if enabled is None else enabled
+    return ProcessLock(lock_file_path(root, name) if enabled else None)
+
+
+class GenerationWorkerElection:
+    """用 ``socket_dir/generation.lock`` 上的非阻塞 ``flock`` 选出唯一生成进程。"""
+
+    def __init__(self, path: str | Path) -> None:
+        self._file = FileLock(path)
+
+    @property
+    def is_leader(self) -> bool:
+        return self._file.held
+
+    def try_acquire(self) -> bool:
+        if self._file.held:
+            return True
+        if fcntl is None:
+            return False
+        return self._file.acquire(blocking=False)
+
+    def release(self) -> None:
+        self._file.release()
+
+
+BusCallback = Callable[[str, Any], None]
+
+
+class WorkerBus:
+    """同一数据目录下各 worker 之间的本机发布/订阅。
+
+    每个进程在共享目录里绑定一个 ``<name>.sock`` 数据报套接字，发布即向目录里
+    其他套接字逐个 ``sendto``。连不上的套接字属于已退出的进程，发布时顺手删除。
+    接收挂在事件循环的 reader 上，回调与请求处理在同一线程执行，不需要额外加锁。
+    """
+
+    def __init__(self, directory: str | Path, *, name: str | None = None) -> None:
+        self.directory = Path(directory)
+        self.name = name or f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.path = self.directory / f"{self.name}.sock"
+        self._subscribers: dict[str, list[BusCallback]] = defaultdict(list)
+        self._sock: socket.socket | None = None
+        self._sender: socket.socket | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self.counters = {"published": 0, "sent": 0, "received": 0, "dropped": 0, "pruned": 0}
+
+    @property
+    def running(self) -> bool:
+        return self._sock is not None
+
+    def subscribe(self, topic: str, callback: BusCallback) -> None:
+        self._subscribers[topic].append(callback)
+
+    def start(self, loop: asyncio.AbstractEventLoop | None = None) -> None:
+        if self._sock is not None:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.path.unlink(missing_ok=True)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        sock.bind(str(self.path))
+        sock.setblocking(False)
+        sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        sender.setblocking(False)
+        self._sock, self._sender = sock, sender
+        self._loop = loop or asyncio.get_running_loop()
+        self._loop.add_reader(sock.fileno(), self._drain)
+
+    def stop(self) -> None:
+        sock, self._sock = self._sock, None
+        if sock is None:
+            return
+        if self._loop is not None:
+            self._loop.remove_reader(sock.fileno())
+        sock.close()
+        if self._sender is not None:
+            self._sender.close()
+            self._sender = None
+        self.path.unlink(missing_ok=True)
+
+    def publish(self, topic: str, key: str = "", payload: Any = None) -> int:
+        """向其他 worker 发送一条通知，返回送达的套接字数。总线未启动时静默忽略。"""
+        if self._sender is None:
+            return 0
+        message = json.dumps(
+            {"topic": topic, "key": key, "payload": payload, "from": self.name},
+            ensure_ascii=False,
+            separators=(",", ":"),
+            default=str,
+        ).encode("utf-8")
+        self.counters["published"] += 1
+        if len(message) > MAX_MESSAGE_BYTES:
+            self.counters["dropped"] += 1
+            logger.warning("Worker bus message on %s exceeds %d bytes; dropped", topic, MAX_MESSAGE_BYTES)
+            return 0
+        delivered = 0
+        for peer in self.directory.glob("*.sock"):
+            if peer == self.path:
+                continue
+            try:
+                self._sender.sendto(message, str(peer))
+                delivered += 1
+            except (ConnectionRefusedError, FileNotFoundError):
+                peer.unlink(missing_ok=True)
+                self.counters["pruned"] += 1
+            except (BlockingIOError, OSError):
+                # 对端接收缓冲区满：通知是尽力投递，读方仍会按文件戳校验。
+                self.counters["dropped"] += 1
+        self.counters["sent"] += delivered
+        return delivered
+
+    def _drain(self) -> None:
+        sock = self._sock
+        while sock is not None:
+            try:
+                data = sock.recv(MAX_MESSAGE_BYTES + 1024)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                return
+            try:
+                message = json.loads(data.decode("utf-8"))
+            except (UnicodeDecodeError, json.JSONDecodeError):
+                self.counters["dropped"] += 1
+                continue
+            self.counters["received"] += 1
+            for callback in tuple(self._subscribers.get(str(message.get("topic") or ""), ())):
+                try:
+                    callback(str(message.get("key") or ""), message.get("payload"))
+                except Exception:
+                    logger.exception("Worker bus subscriber failed for %s", message.get("topic"))
+
+    def stats(self) -> dict[str, Any]:
+        return {"name": self.name, "running": self.running, **self.counters}
+
+
+__all__ = [
+    "AsyncProcessLock",
+    "FileLock",
+    "GenerationWorkerElection",
+    "ProcessLock",
+    "ProcessLockRegistry",
+    "WorkerBus",
+    "lock_file_path",
+    "multi_worker_enabled",
+    "shared_lock",
+    "socket_dir",
+    "worker_count",
+]
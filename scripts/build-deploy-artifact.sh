@@ -30,6 +30,7 @@ find "$STAGING_DIR" -maxdepth 1 -type f -name 'design-qa-*.png' -delete
 rm -rf "$STAGING_DIR/backend/static"
 mkdir -p "$STAGING_DIR/backend/static"
 cp -a "$ROOT_DIR/frontend/dist/." "$STAGING_DIR/backend/static/"
+python3 "$ROOT_DIR/backend/tools/precompress_static.py" "$STAGING_DIR/backend/static"
 printf '%s\n' "$TARGET_COMMIT" > "$STAGING_DIR/.release-commit"
 
 mkdir -p "$(dirname "$OUTPUT_PATH")"
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""冷启动回归基准：从拉起 ``uvicorn main:app`` 到第一个 200 的耗时，超出预算即失败。
+
+**只读**：每一轮都在隔离的临时数据目录里启动真实服务，不读取也不写入任何真实数据。
+
+用法：
+
+    backend/.venv/bin/python scripts/cold_start_benchmark.py
+    backend/.venv/bin/python scripts/cold_start_benchmark.py --runs 5 --budget-s 3.5 --json out.json
+
+每轮度量：
+
+- ``first_200_s``：进程启动到 ``GET /api/health`` 第一次返回 200；
+- ``first_deferred_200_s``：随后第一次请求一个延迟挂载的路由，到它返回的耗时
+  （含按需导入）；
+- ``import_main_s``：单独 ``import main`` 的耗时，用于区分导入与 uvicorn/lifespan 开销。
+
+默认比较两种模式：``deferred``（默认的按需挂载）与 ``eager``（``LINGZHI_DEFER_ROUTERS=0``，
+启动时全部挂载）。预算只约束 ``deferred`` 模式的中位数，可用 ``--budget-s`` 或环境变量
+``LINGZHI_COLD_START_BUDGET_S`` 配置。脚本先 ``compileall`` 一次，避免把字节码编译时间
+算进冷启动（部署镜像同样预编译）。需要更细的导入明细时用
+``backend/tools/import_profile.py``。
+"""
+
+from __future__ import annotations
+
+import argparse
+import compileall
+import json
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+import httpx
+
+ROOT = Path(__file__).resolve().parents[1]
+BACKEND = ROOT / "backend"
+
+DEFAULT_BUDGET_S = 4.0
+# 延迟挂载路由里的一个只读接口；未登记学习者身份时返回 4xx，同样说明路由已挂上。
+DEFERRED_PROBE = "/api/teachers/me/teaching-calendar"
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _env(data_dir: Path, mode: str) -> dict[str, str]:
+    env = {**os.environ, "LINGZHI_DATA_DIR": str(data_dir), "PYTHONUNBUFFERED": "1"}
+    env.pop("WEB_CONCURRENCY", None)
+    env.pop("LINGZHI_WORKERS", None)
+    env["LINGZHI_DEFER_ROUTERS"] = "0" if mode == "eager" else "1"
+    return env
+
+
+def measure_import(mode: str) -> float:
+    with tempfile.TemporaryDirectory(prefix="lingzhi-cold-start-") as temporary:
+        started = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "-c", "import main"],
+            cwd=BACKEND,
+            env=_env(Path(temporary), mode),
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            check=True,
+        )
+        return time.perf_counter() - started
+
+
+def measure_start(mode: str, timeout: float) -> dict[str, Any]:
+    with tempfile.TemporaryDirectory(prefix="lingzhi-cold-start-") as temporary:
+        port = _free_port()
+        started = time.perf_counter()
+        server = subprocess.Popen(
+            [
+                sys.executable, "-m", "uvicorn", "main:app",
+                "--host", "127.0.0.1", "--port", str(port),
+                "--log-level", "warning", "--no-access-log",
+            ],
+            cwd=BACKEND,
+            env=_env(Path(temporary), mode),
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+        )
+        try:
+            with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=30.0) as client:
+                first_200 = None
+                while time.perf_counter() - started < timeout:
+                    if server.poll() is not None:
+                        raise RuntimeError(server.stderr.read().decode("utf-8", "replace")[-2000:])
+                    try:
+                        if client.get("/api/health").status_code == 200:
+                            first_200 = time.perf_counter() - started
+                            break
+                    except httpx.TransportError:
+                        pass
+                    time.sleep(0.02)
+                if first_200 is None:
+                    raise RuntimeError(f"server did not answer within {timeout}s")
+                probe_started = time.perf_counter()
+                probe = client.get(DEFERRED_PROBE)
+                first_deferred = time.perf_counter() - probe_started
+        finally:
+            server.terminate()
+            try:
+                server.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                server.kill()
+    return {
+        "first_200_s": round(first_200, 3),
+        "first_deferred_200_s": round(first_deferred, 3),
+        # 404 说明延迟路由没有挂上；其他状态码来自真实处理函数。
+        "deferred_route_mounted": probe.status_code != 404,
+    }
+
+
+def run(mode: str, runs: int, timeout: float) -> dict[str, Any]:
+    samples = [measure_start(mode, timeout) for _ in range(runs)]
+    imports = [measure_import(mode) for _ in range(runs)]
+    return {
+        "mode": mode,
+        "runs": runs,
+        "first_200_s": round(statistics.median(sample["first_200_s"] for sample in samples), 3),
+        "first_200_max_s": max(sample["first_200_s"] for sample in samples),
+        "first_deferred_200_s": round(
+            statistics.median(sample["first_deferred_200_s"] for sample in samples), 3,
+        ),
+        "import_main_s": round(statistics.median(imports), 3),
+        "deferred_route_mounted": all(sample["deferred_route_mounted"] for sample in samples),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--modes", nargs="*", choices=["deferred", "eager"], default=["deferred", "eager"])
+    parser.add_argument(
+        "--budget-s",
+        type=float,
+        default=float(os.getenv("LINGZHI_COLD_START_BUDGET_S", DEFAULT_BUDGET_S)),
+        help="deferred 模式冷启动到第一个 200 的中位数预算（秒）",
+    )
+    parser.add_argument("--startup-timeout", type=float, default=120.0)
+    parser.add_argument("--no-compile", action="store_true", help="不预先编译字节码")
+    parser.add_argument("--json", type=Path, help="把结果写入 JSON 文件")
+    args = parser.parse_args()
+
+    if not args.no_compile:
+        compileall.compile_dir(str(BACKEND), quiet=1, rx=re.compile(r"[/\\](\.venv|node_modules|data)[/\\]"))
+
+    rows = [run(mode, args.runs, args.startup_timeout) for mode in args.modes]
+    print(f"{'模式':<10}{'首个200(s)':>12}{'最慢(s)':>10}{'首个延迟路由(s)':>16}{'import main(s)':>16}")
+    for row in rows:
+        print(
+            f"{row['mode']:<10}{row['first_200_s']:>12}{row['first_200_max_s']:>10}"
+            f"{row['first_deferred_200_s']:>16}{row['import_main_s']:>16}"
+        )
+    print(f"预算：deferred 模式首个 200 ≤ {args.budget_s}s")
+    if args.json:
+        args.json.write_text(
+            json.dumps({"budget_s": args.budget_s, "rows": rows}, ensure_ascii=False, indent=2),
+            encoding="utf-8",
+        )
+    healthy = all(row["deferred_route_mounted"] for row in rows) and all(
+        row["first_200_s"] <= args.budget_s for row in rows if row["mode"] == "deferred"
+    )
+    return 0 if healthy else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""度量知识点→内容块绑定在大课程上的耗时，并核对新旧匹配结果一致。
+
+**只读**：脚本在隔离的临时数据目录里合成课程，不读取也不写入任何真实课程数据。
+
+用法：
+
+    backend/.venv/bin/python scripts/knowledge_binding_benchmark.py
+    backend/.venv/bin/python scripts/knowledge_binding_benchmark.py --sections 120 --json out.json
+
+合成课程沿用 ``tests/test_course_knowledge_base.py`` 里课程夹具的形态（概念组 →
+知识点 → 别名、能力点、掌握标准），按小节数放大到仓库里最大课程的量级之上。
+度量两件事：
+
+- 逐块匹配：旧做法对每个候选知识点的名称与别名逐个规范化、逐个子串判断；
+  新做法用按知识库修订缓存的匹配器——规范化只做一次，候选词多的块交给
+  Aho–Corasick 自动机扫一遍，另外单独度量"全部强制走自动机"。各做法结果逐块
+  比对，有任何不一致脚本以非零码退出；
+- ``compile_course_knowledge_base`` 整体：首次编译（匹配器未缓存）与再次编译。
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+ROOT = Path(__file__).resolve().parents[1]
+BACKEND = ROOT / "backend"
+
+# 必须在导入任何 backend 模块之前重定向数据目录：storage 在导入期就把根路径固化下来。
+_ISOLATED_DIR = tempfile.mkdtemp(prefix="lingzhi-benchmark-")
+os.environ.setdefault("LINGZHI_DATA_DIR", _ISOLATED_DIR)
+
+for module_root in (ROOT, BACKEND):
+    if str(module_root) not in sys.path:
+        sys.path.insert(0, str(module_root))
+
+import course_knowledge_base as knowledge_base  # noqa: E402
+from content_blocks import set_node_content_blocks  # noqa: E402
+
+_TOPICS = ["容量", "扩容", "摊还", "链表", "栈帧", "队列", "散列", "冲突", "树高", "遍历", "堆序", "排序"]
+
+
+def synthetic_course(section_count: int, points_per_section: int) -> dict[str, Any]:
+    """合成一门指定规模的课程。名称与正文是占位文本，不取自任何真实课程。"""
+    nodes = []
+    for section in range(section_count):
+        points = []
+        paragraphs = []
+        for index in range(points_per_section):
+            topic = _TOPICS[(section + index) % len(_TOPICS)]
+            name = f"{topic}判定{section}之{index}"
+            points.append({
+                "name": name,
+                "statement": f"{name}说明在给定条件下如何判断并处理{topic}。",
+                "knowledge_type": "rule",
+                "conditions": [f"{topic}条件成立"],
+                "boundaries": [f"{topic}条件不成立时不适用"],
+                "aliases": [f"{topic}规则{section}-{index}", f"{topic}别称{section}{index}"],
+                "capability_points": [{
+                    "name": f"应用{name}",
+                    "observable_behavior": f"能在案例中独立应用{name}",
+                }],
+                "mastery_criteria": [{
+                    "name": f"{name}达标",
+                    "observable_performance": f"独立完成{name}相关判断并说明依据",
+                    "verification_method": "完成三个边界案例",
+                }],
+            })
+            mention = name if index % 3 else points[-1]["aliases"][0]
+            paragraphs.append(f"## 第{index}部分\n\n" + f"本段讲解{mention}，并结合{topic}的例子反复推演。" * 12)
+        node = {
+            "node_id": f"L2-{section + 1}",
+            "node_level": 2,
+            "node_name": f"第{section + 1}节",
+            "learning_objective": f"掌握第{section + 1}节的判定规则",
+            "knowledge_structure": [{
+                "concept_group": f"第{section + 1}节规则组",
+                "description": "合成的概念组",
+                "knowledge_points": points,
+            }],
+            "content_blocks": [],
+            "generation_status": "completed",
+            "node_content": "\n\n".join(paragraphs),
+        }
+        set_node_content_blocks(node, node["node_content"])
+        nodes.append(node)
+    return {"course_id": "benchmark-course", "course_name": "基准课程", "nodes": nodes}
+
+
+def _block_texts(course: dict[str, Any]) -> list[tuple[str, str]]:
+    texts = []
+    for node in course["nodes"]:
+        for block in node.get("content_blocks") or []:
+            texts.append((
+                str(node["node_id"]),
+                knowledge_base._normalize_search_text(
+                    f"{block.get('title') or ''} {block.get('content') or ''} {block.get('summary') or ''}"
+                ),
+            ))
+    return texts
+
+
+def _timed(fn: Callable[[], Any], repeat: int) -> tuple[float, Any]:
+    samples = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples), result
+
+
+def run(section_count: int, points_per_section: int, repeat: int) -> dict[str, Any]:
+    course = synthetic_course(section_count, points_per_section)
+    knowledge_base._point_term_matcher.cache_clear()
+    cold_ms, compiled = _timed(lambda: knowledge_base.compile_course_knowledge_base(course), 1)
+    warm_ms, _ = _timed(lambda: knowledge_base.compile_course_knowledge_base(course), repeat)
+
+    points = compiled.get("knowledge_points") or []
+    by_id = {str(item.get("knowledge_id") or ""): item for item in points}
+    section_points: dict[str, list[str]] = {}
+    for point in points:
+        for section_id in point.get("section_refs") or []:
+            section_points.setdefault(str(section_id or ""), []).append(str(point.get("knowledge_id") or ""))
+    blocks = _block_texts(course)
+
+    def legacy() -> list[list[str]]:
+        return [
+            [
+                point_id for point_id in section_points.get(section_id, [])
+                if knowledge_base._point_matches_text(by_id.get(point_id) or {}, searchable)
+            ]
+            for section_id, searchable in blocks
+        ]
+
+    def compiled() -> list[list[str]]:
+        matcher = knowledge_base._point_term_matcher(knowledge_base._point_terms_key(by_id))
+        return [matcher.matches(section_points.get(section_id, []), searchable) for section_id, searchable in blocks]
+
+    def automaton_only() -> list[list[str]]:
+        automaton = knowledge_base._point_term_matcher(knowledge_base._point_terms_key(by_id)).automaton
+        results = []
+        for section_id, searchable in blocks:
+            found = automaton.labels_in(searchable)
+            results.append([point_id for point_id in section_points.get(section_id, []) if point_id in found])
+        return results
+
+    knowledge_base._point_term_matcher.cache_clear()
+    build_ms, _ = _timed(compiled, 1)
+    legacy_ms, expected = _timed(legacy, repeat)
+    compiled_ms, actual = _timed(compiled, repeat)
+    automaton_ms, scanned = _timed(automaton_only, repeat)
+    return {
+        "sections": section_count,
+        "blocks": len(blocks),
+        "knowledge_points": len(points),
+        "identical": expected == actual == scanned,
+        "matched_pairs": sum(len(item) for item in actual),
+        "legacy_match_ms": round(legacy_ms, 2),
+        "compiled_first_ms": round(build_ms, 2),
+        "compiled_match_ms": round(compiled_ms, 2),
+        "automaton_match_ms": round(automaton_ms, 2),
+        "compile_cold_ms": round(cold_ms, 2),
+        "compile_warm_ms": round(warm_ms, 2),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sections", type=int, nargs="*", default=[10, 40, 120])
+    parser.add_argument("--points", type=int, default=8, help="每节知识点数；调大可看自动机分支的收益")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", type=Path, help="把结果写入 JSON 文件")
+    args = parser.parse_args()
+
+    rows = [run(count, args.points, args.repeat) for count in args.sections]
+    print(
+        f"{'小节':>6}{'块':>8}{'知识点':>8}{'一致':>6}"
+        f"{'旧匹配ms':>12}{'匹配器首次ms':>14}{'匹配器ms':>12}{'纯自动机ms':>12}{'编译冷ms':>12}{'编译热ms':>12}"
+    )
+    for row in rows:
+        print(
+            f"{row['sections']:>6}{row['blocks']:>8}{row['knowledge_points']:>8}"
+            f"{'是' if row['identical'] else '否':>6}"
+            f"{row['legacy_match_ms']:>12}{row['compiled_first_ms']:>14}{row['compiled_match_ms']:>12}"
+            f"{row['automaton_match_ms']:>12}"
+            f"{row['compile_cold_ms']:>12}{row['compile_warm_ms']:>12}"
+        )
+    if args.json:
+        args.json.write_text(json.dumps(rows, ensure_ascii=False, indent=2), encoding="utf-8")
+    return 0 if all(row["identical"] for row in rows) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
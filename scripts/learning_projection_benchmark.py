@@ -13,7 +13,8 @@
 
 - ``build_learning_progress``：目标 × 事实 的匹配
 - ``build_learner_model``：在进度之上再叠加证据编目与知识/技能状态
-- ``build_learning_runtime``：完整运行时（含上面两者）
+- ``build_learning_runtime``：完整运行时（含上面两者），分别度量冷算（备忘清空、
+  每次都从各存储读取并重算）与热命中（输入水位未变，直接复用备忘）
 
 关注的是**随规模增长的方式**，不是绝对毫秒数——后者依赖机器负载。
 """
@@ -43,8 +44,14 @@ for module_root in (ROOT, BACKEND):
         sys.path.insert(0, str(module_root))
 
 from learner_model import build_learner_model  # noqa: E402
+from learning_events import LEARNING_EVENTS_FILE  # noqa: E402
 from learning_progress import build_learning_progress  # noqa: E402
-from learning_runtime import build_runtime_revision_vector  # noqa: E402
+from learning_runtime import (  # noqa: E402
+    build_learning_runtime,
+    build_runtime_revision_vector,
+    learning_runtime_memo,
+)
+from storage import storage  # noqa: E402
 
 USER_ID = "benchmark-learner"
 
@@ -144,12 +151,28 @@ def measure(section_count: int, per_section: int, *, repeats: int) -> dict[str,
         repeats=repeats,
     )
 
+    # 完整运行时要从存储读事实：写进隔离数据目录，与线上读取路径一致。
+    storage.save_data(LEARNING_EVENTS_FILE, events)
+
+    def cold_runtime() -> None:
+        learning_runtime_memo.clear()
+        build_learning_runtime(course, user_id=USER_ID, node_id="node-0")
+
+    runtime_cold_timing = _time_it(cold_runtime, repeats=repeats)
+    build_learning_runtime(course, user_id=USER_ID, node_id="node-0")
+    runtime_warm_timing = _time_it(
+        lambda: build_learning_runtime(course, user_id=USER_ID, node_id="node-0"),
+        repeats=repeats,
+    )
+
     return {
         "section_count": section_count,
         "events_per_section": per_section,
         "event_count": len(events),
         "learning_progress": progress_timing,
         "learner_model": model_timing,
+        "learning_runtime_cold": runtime_cold_timing,
+        "learning_runtime_warm": runtime_warm_timing,
     }
 
 
@@ -173,12 +196,17 @@ def main() -> int:
         for sections, per_section in scenarios
     ]
 
-    print(f"{'节数':>6} {'事实数':>8} {'进度(ms)':>12} {'学习者模型(ms)':>16}")
+    print(
+        f"{'节数':>6} {'事实数':>8} {'进度(ms)':>12} {'学习者模型(ms)':>16} "
+        f"{'运行时冷(ms)':>14} {'运行时热(ms)':>14}"
+    )
     for item in results:
         print(
             f"{item['section_count']:>6} {item['event_count']:>8} "
             f"{item['learning_progress']['median_ms']:>12} "
-            f"{item['learner_model']['median_ms']:>16}"
+            f"{item['learner_model']['median_ms']:>16} "
+            f"{item['learning_runtime_cold']['median_ms']:>14} "
+            f"{item['learning_runtime_warm']['median_ms']:>14}"
         )
 
     # 复杂度观察：节数与事实数同时翻倍时，耗时的增长倍率。
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""多 worker 部署的读接口压测：吞吐随 worker 数的变化，以及生成路由是否都能到达生成进程。
+
+**只读**：每一轮都在隔离的临时数据目录里合成课程，启动真实的
+``uvicorn main:app --workers N``，不读取也不写入任何真实课程数据。
+
+用法：
+
+    backend/.venv/bin/python scripts/multi_worker_load_test.py
+    backend/.venv/bin/python scripts/multi_worker_load_test.py --workers 1 2 4 --duration 10 --json out.json
+
+每轮度量：
+
+- ``GET /api/courses/{course_id}`` 在固定并发下的吞吐与 p50/p95 延迟。课程读取
+  不依赖 ``TaskManager``，在收到请求的 worker 本地处理，应随 worker 数扩展；
+- ``GET /api/tasks`` 依赖 ``TaskManager``，非生成进程把它转发给唯一的生成进程。
+  压测期间穿插请求，确认无论落在哪个 worker 上都返回 200；
+- ``/api/health`` 报告的生成进程 pid 只有一个。
+
+压测请求轮换 ``X-Forwarded-For``，避免按客户端限流的中间件截断读流量。
+吞吐能否随 worker 数增长取决于可用 CPU 核数，结果里一并记录 ``os.cpu_count()``。
+有请求失败或出现多个生成进程时脚本以非零码退出。
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+import httpx
+
+ROOT = Path(__file__).resolve().parents[1]
+BACKEND = ROOT / "backend"
+
+
+def synthetic_course(index: int, sections: int) -> dict[str, Any]:
+    """一门旧版节点结构的课程，正文足够长，让读取的序列化开销占主导。"""
+    nodes = [{
+        "node_id": f"n{index}-root",
+        "parent_node_id": None,
+        "node_name": f"压测课程 {index}",
+        "node_level": 1,
+        "node_content": "",
+    }]
+    for section in range(sections):
+        nodes.append({
+            "node_id": f"n{index}-{section}",
+            "parent_node_id": f"n{index}-root",
+            "node_name": f"第 {section + 1} 节",
+            "node_level": 2,
+            "node_content": "\n\n".join(
+                f"段落 {paragraph}：事件触发后处理函数才会执行，返回值经过校验再展示。"
+                for paragraph in range(12)
+            ),
+        })
+    return {"course_id": f"load-{index}", "course_name": f"压测课程 {index}", "nodes": nodes}
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _start_server(workers: int, data_dir: Path, port: int) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "LINGZHI_DATA_DIR": str(data_dir),
+        "LINGZHI_WORKERS": str(workers),
+        "PYTHONUNBUFFERED": "1",
+    }
+    env.pop("WEB_CONCURRENCY", None)
+    return subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "main:app",
+            "--host", "127.0.0.1", "--port", str(port),
+            "--workers", str(workers), "--log-level", "warning", "--no-access-log",
+        ],
+        cwd=BACKEND,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+    )
+
+
+async def _wait_ready(client: httpx.AsyncClient, workers: int, timeout: float) -> set[int]:
+    """等到健康检查能返回生成进程；多 worker 时多打几次，尽量覆盖每个 worker。"""
+    deadline = time.monotonic() + timeout
+    leaders: set[int] = set()
+    while time.monotonic() < deadline:
+        try:
+            health = (await client.get("/api/health")).json()
+        except (httpx.HTTPError, ValueError):
+            await asyncio.sleep(0.2)
+            continue
+        modes = health.get("workers") or {}
+        if modes.get("mode") in {"single", "leader"}:
+            leaders.add(int(modes["pid"]))
+            break
+        await asyncio.sleep(0.2)
+    else:
+        raise RuntimeError("server did not become ready")
+    for _ in range(workers * 8):
+        modes = (await client.get("/api/health")).json().get("workers") or {}
+        if modes.get("mode") in {"single", "leader"}:
+            leaders.add(int(modes["pid"]))
+    return leaders
+
+
+async def _load(
+    client: httpx.AsyncClient,
+    course_ids: list[str],
+    concurrency: int,
+    duration: float,
+) -> dict[str, Any]:
+    latencies: list[float] = []
+    errors = 0
+    task_route_checks = 0
+    task_route_failures = 0
+    addresses = itertools.count()
+    paths = itertools.cycle(f"/api/courses/{course_id}" for course_id in course_ids)
+    stop_at = time.perf_counter() + duration
+
+    def forwarded_for() -> dict[str, str]:
+        value = next(addresses)
+        return {"X-Forwarded-For": f"10.{value >> 16 & 255}.{value >> 8 & 255}.{value & 255}"}
+
+    async def reader() -> None:
+        nonlocal errors
+        while time.perf_counter() < stop_at:
+            started = time.perf_counter()
+            try:
+                response = await client.get(next(paths), headers=forwarded_for())
+                ok = response.status_code == 200
+            except httpx.HTTPError:
+                ok = False
+            if ok:
+                latencies.append((time.perf_counter() - started) * 1000)
+            else:
+                errors += 1
+
+    async def task_route() -> None:
+        nonlocal task_route_checks, task_route_failures
+        while time.perf_counter() < stop_at:
+            task_route_checks += 1
+            try:
+                response = await client.get("/api/tasks", headers=forwarded_for())
+                if response.status_code != 200:
+                    task_route_failures += 1
+            except httpx.HTTPError:
+                task_route_failures += 1
+            await asyncio.sleep(0.1)
+
+    started = time.perf_counter()
+    await asyncio.gather(task_route(), *(reader() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    ordered = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(statistics.median(ordered), 2) if ordered else None,
+        "p95_ms": round(ordered[int(len(ordered) * 0.95) - 1], 2) if ordered else None,
+        "task_route_checks": task_route_checks,
+        "task_route_failures": task_route_failures,
+    }
+
+
+async def run(workers: int, args: argparse.Namespace) -> dict[str, Any]:
+    with tempfile.TemporaryDirectory(prefix="lingzhi-multi-worker-") as temporary:
+        data_dir = Path(temporary) / "data"
+        courses_dir = data_dir / "courses"
+        courses_dir.mkdir(parents=True)
+        course_ids = []
+        for index in range(args.courses):
+            course = synthetic_course(index, args.sections)
+            (courses_dir / f"{course['course_id']}.json").write_text(
+                json.dumps(course, ensure_ascii=False), encoding="utf-8",
+            )
+            course_ids.append(course["course_id"])
+        port = _free_port()
+        server = _start_server(workers, data_dir, port)
+        try:
+            limits = httpx.Limits(max_connections=args.concurrency + 4)
+            async with httpx.AsyncClient(
+                base_url=f"http://127.0.0.1:{port}", timeout=30.0, limits=limits,
+            ) as client:
+                leaders = await _wait_ready(client, workers, args.startup_timeout)
+                await _load(client, course_ids, args.concurrency, min(1.0, args.duration))
+                result = await _load(client, course_ids, args.concurrency, args.duration)
+                leaders |= await _wait_ready(client, workers, args.startup_timeout)
+        finally:
+            server.terminate()
+            try:
+                server.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                server.kill()
+    return {"workers": workers, "generation_workers": len(leaders), **result}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="*", default=[1, 2, 4])
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=8.0)
+    parser.add_argument("--courses", type=int, default=8)
+    parser.add_argument("--sections", type=int, default=60)
+    parser.add_argument("--startup-timeout", type=float, default=120.0)
+    parser.add_argument("--json", type=Path, help="把结果写入 JSON 文件")
+    args = parser.parse_args()
+
+    rows = [asyncio.run(run(count, args)) for count in args.workers]
+    baseline = rows[0]["rps"] or 1.0
+    print(f"CPU 核数：{os.cpu_count()}")
+    print(f"{'workers':>8}{'请求数':>8}{'失败':>6}{'req/s':>10}{'加速比':>8}{'p50ms':>9}{'p95ms':>9}{'生成进程':>9}{'转发失败':>9}")
+    for row in rows:
+        row["speedup"] = round(row["rps"] / baseline, 2)
+        print(
+            f"{row['workers']:>8}{row['requests']:>8}{row['errors']:>6}{row['rps']:>10}"
+            f"{row['speedup']:>8}{row['p50_ms']!s:>9}{row['p95_ms']!s:>9}"
+            f"{row['generation_workers']:>9}{row['task_route_failures']:>9}"
+        )
+    if args.json:
+        args.json.write_text(
+            json.dumps({"cpu_count": os.cpu_count(), "rows": rows}, ensure_ascii=False, indent=2),
+            encoding="utf-8",
+        )
+    healthy = all(
+        not row["errors"] and not row["task_route_failures"] and row["generation_workers"] == 1
+        for row in rows
+    )
+    return 0 if healthy else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""度量限流中间件每个请求的开销，并核对滑动窗口不再放过窗口交界处的突发。
+
+**只读**：脚本在隔离的临时数据目录里运行，共享计数表也建在临时目录，
+不读取也不写入任何真实数据。
+
+用法：
+
+    backend/.venv/bin/python scripts/rate_limiter_benchmark.py
+    backend/.venv/bin/python scripts/rate_limiter_benchmark.py --requests 50000 --json out.json
+
+度量四项：
+
+- 路由匹配：旧做法逐个前缀比较 vs 编译后的正则加缓存，每次调用纳秒数；
+- 计数判定：旧固定窗口计数器 vs 进程内分段后端 vs 共享内存后端，每次调用纳秒数；
+- 中间件：直接驱动 ASGI 应用，比较不限流、旧 ``BaseHTTPMiddleware`` 实现、
+  新中间件（进程内 / 共享后端）下每个请求的微秒数，并给出相对不限流的额外开销；
+- 窗口交界突发：限额 10/60s，在第一个窗口最后一秒与下一个窗口开头各打满，
+  记录两种算法放行的请求数。
+
+编译匹配与旧做法结果不一致，或新算法在交界处放行超过限额时，脚本以非零码退出。
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+ROOT = Path(__file__).resolve().parents[1]
+BACKEND = ROOT / "backend"
+
+# 必须在导入任何 backend 模块之前重定向数据目录：storage 在导入期就把根路径固化下来。
+_ISOLATED_DIR = tempfile.mkdtemp(prefix="lingzhi-benchmark-")
+os.environ.setdefault("LINGZHI_DATA_DIR", _ISOLATED_DIR)
+os.environ.setdefault("RATE_LIMIT_BACKEND", "local")
+
+for module_root in (ROOT, BACKEND):
+    if str(module_root) not in sys.path:
+        sys.path.insert(0, str(module_root))
+
+from starlette.applications import Starlette  # noqa: E402
+from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint  # noqa: E402
+from starlette.requests import Request  # noqa: E402
+from starlette.responses import JSONResponse, Response  # noqa: E402
+from starlette.routing import Route  # noqa: E402
+from starlette.types import ASGIApp, Message  # noqa: E402
+
+from rate_limiter import (  # noqa: E402
+    RATE_LIMITS,
+    LocalRateLimitBackend,
+    RateLimiter,
+    RateLimitMiddleware,
+    SharedMemoryRateLimitBackend,
+    _match_rate_limit,
+)
+
+PATHS = [
+    "/api/courses/course-1/document",
+    "/api/courses/course-2/question-bank/rebuilds/job-1",
+    "/api/courses/course-3/evolution/progress",
+    "/api/tasks/task-1",
+    "/api/learning-records/u1/c1",
+    "/api/course-generation/generate",
+    "/api/execute",
+    "/api/diagram/render",
+]
+
+
+class LegacyFixedWindowCounter:
+    """改造前的固定窗口计数器，仅供对照。"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._windows: dict[str, tuple[float, int]] = {}
+
+    def is_allowed(self, key: str, max_requests: int, window_seconds: int, now: float | None = None) -> bool:
+        now = time.time() if now is None else now
+        with self._lock:
+            if key in self._windows:
+                window_start, count = self._windows[key]
+                if now - window_start < window_seconds:
+                    if count >= max_requests:
+                        return False
+                    self._windows[key] = (window_start, count + 1)
+                    return True
+                self._windows[key] = (now, 1)
+                return True
+            self._windows[key] = (now, 1)
+            return True
+
+
+def legacy_match(path: str, method: str = "") -> tuple[int, int]:
+    """改造前逐条比较的匹配，仅供对照。"""
+    if method.upper() == "GET" and path.startswith("/api/courses/") and "/question-bank/rebuilds/" in path:
+        return 120, 60
+    if path.startswith("/api/courses/") and path.endswith("/evolution/progress"):
+        return 120, 60
+    for prefix, limits in RATE_LIMITS.items():
+        if prefix.startswith("/") and path.startswith(prefix):
+            return limits
+    return RATE_LIMITS["_default"]
+
+
+class LegacyRateLimitMiddleware(BaseHTTPMiddleware):
+    counter = LegacyFixedWindowCounter()
+
+    async def dispatch(self, request: Request, call_next: RequestResponseEndpoint) -> Response:
+        path = request.url.path
+        if path in ("/health", "/api/health") or not path.startswith("/api"):
+            return await call_next(request)
+        client_ip = request.client.host if request.client else "unknown"
+        max_requests, window = legacy_match(path, request.method)
+        if not self.counter.is_allowed(f"{client_ip}:{path}", max_requests, window):
+            return JSONResponse(status_code=429, content={"detail": "limited"})
+        return await call_next(request)
+
+
+def _ns_per_call(fn: Callable[[int], Any], calls: int) -> float:
+    started = time.perf_counter_ns()
+    for index in range(calls):
+        fn(index)
+    return (time.perf_counter_ns() - started) / calls
+
+
+def bench_matcher(calls: int) -> dict[str, Any]:
+    identical = all(_match_rate_limit(path, "GET") == legacy_match(path, "GET") for path in PATHS)
+    return {
+        "identical": identical,
+        "legacy_ns": round(_ns_per_call(lambda i: legacy_match(PATHS[i % len(PATHS)], "GET"), calls), 1),
+        "compiled_ns": round(_ns_per_call(lambda i: _match_rate_limit(PATHS[i % len(PATHS)], "GET"), calls), 1),
+    }
+
+
+def bench_counters(calls: int, keys: int, work_dir: Path) -> dict[str, Any]:
+    legacy = LegacyFixedWindowCounter()
+    local = LocalRateLimitBackend()
+    shared = SharedMemoryRateLimitBackend(work_dir / "bench_rate_limits.bin")
+    now = time.time()
+    names = [f"10.0.{i // 256}.{i % 256}:/api/courses/c" for i in range(keys)]
+    try:
+        return {
+            "legacy_fixed_window_ns": round(_ns_per_call(
+                lambda i: legacy.is_allowed(names[i % keys], 10**9, 60, now), calls), 1),
+            "local_sliding_ns": round(_ns_per_call(
+                lambda i: local.hit(names[i % keys], 10**9, 60, now), calls), 1),
+            "shared_sliding_ns": round(_ns_per_call(
+                lambda i: shared.hit(names[i % keys], 10**9, 60, now), calls), 1),
+        }
+    finally:
+        shared.close()
+
+
+async def _drive(app: ASGIApp, requests: int) -> float:
+    """直接调用 ASGI 应用；每个请求换一个客户端地址，避免被限流截断。"""
+    async def receive() -> Message:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: Message) -> None:
+        return None
+
+    samples = []
+    for round_index in range(3):
+        started = time.perf_counter()
+        for index in range(requests):
+            path = PATHS[index % 4]
+            await app({
+                "type": "http",
+                "asgi": {"version": "3.0"},
+                "http_version": "1.1",
+                "method": "GET",
+                "scheme": "http",
+                "path": path,
+                "raw_path": path.encode(),
+                "query_string": b"",
+                "root_path": "",
+                "headers": [],
+                "client": (f"10.{round_index}.{index >> 8 & 255}.{index & 255}", 1234),
+                "server": ("bench", 80),
+            }, receive, send)
+        samples.append((time.perf_counter() - started) / requests * 1e6)
+    return statistics.median(samples)
+
+
+def _app(middleware: type | None = None, **options) -> Starlette:
+    from starlette.middleware import Middleware
+
+    async def endpoint(request: Request) -> JSONResponse:
+        return JSONResponse({"ok": True})
+
+    stack = [Middleware(middleware, **options)] if middleware else []
+    return Starlette(routes=[Route("/{path:path}", endpoint)], middleware=stack)
+
+
+def bench_middleware(requests: int, work_dir: Path) -> dict[str, Any]:
+    shared = SharedMemoryRateLimitBackend(work_dir / "middleware_rate_limits.bin")
+    try:
+        timings = {
+            "bare_us": asyncio.run(_drive(_app(), requests)),
+            "legacy_us": asyncio.run(_drive(_app(LegacyRateLimitMiddleware), requests)),
+            "local_us": asyncio.run(_drive(
+                _app(RateLimitMiddleware, limiter=RateLimiter(LocalRateLimitBackend())), requests)),
+            "shared_us": asyncio.run(_drive(
+                _app(RateLimitMiddleware, limiter=RateLimiter(shared)), requests)),
+        }
+    finally:
+        shared.close()
+    bare = timings["bare_us"]
+    return {
+        **{name: round(value, 2) for name, value in timings.items()},
+        **{
+            f"{name[:-3]}_overhead_us": round(value - bare, 2)
+            for name, value in timings.items() if name != "bare_us"
+        },
+    }
+
+
+def edge_burst(limit: int = 10, window: int = 60) -> dict[str, int]:
+    legacy = LegacyFixedWindowCounter()
+    local = LocalRateLimitBackend()
+    # 旧计数器的窗口从第一次请求开始；让第一次请求落在 0 秒，再在窗口末尾与下一窗口开头各打满。
+    legacy.is_allowed("k", limit, window, 0.0)
+    legacy_allowed = sum(legacy.is_allowed("k", limit, window, window - 0.5) for _ in range(limit))
+    legacy_allowed += sum(legacy.is_allowed("k", limit, window, window + 0.5) for _ in range(limit))
+    sliding_allowed = sum(local.hit("k", limit, window, window - 0.5).allowed for _ in range(limit))
+    sliding_allowed += sum(local.hit("k", limit, window, window + 0.5).allowed for _ in range(limit))
+    return {"limit": limit, "legacy_allowed_in_1s": legacy_allowed, "sliding_allowed_in_1s": sliding_allowed}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=200_000)
+    parser.add_argument("--keys", type=int, default=10_000)
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--json", type=Path, help="把结果写入 JSON 文件")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="lingzhi-rate-limit-") as work_dir:
+        result = {
+            "matcher": bench_matcher(args.calls),
+            "counters": bench_counters(args.calls, args.keys, Path(work_dir)),
+            "middleware": bench_middleware(args.requests, Path(work_dir)),
+            "edge_burst": edge_burst(),
+        }
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    if args.json:
+        args.json.write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8")
+    healthy = (
+        result["matcher"]["identical"]
+        and result["edge_burst"]["sliding_allowed_in_1s"] <= result["edge_burst"]["limit"]
+    )
+    return 0 if healthy else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""前端首屏加载基准：预压缩静态资源与逐请求动态 gzip 的字节数、每请求 CPU 对比。
+
+**只读**：把前端产物复制到临时目录再预压缩，不改动原目录。
+
+用法：
+
+    backend/.venv/bin/python scripts/static_asset_benchmark.py
+    backend/.venv/bin/python scripts/static_asset_benchmark.py --dist frontend/dist --loads 50 --json out.json
+
+一次“首屏加载”= ``GET /`` 加上 ``index.html`` 引用的全部 ``/assets/...`` 文件，
+与 ``main`` 的静态站点同样的挂载方式，在进程内通过 ASGI 调用，不经过网络。
+每种模式度量：
+
+- ``first_load_bytes``：一次首屏加载实际传输的响应体字节数（压缩后）；
+- ``cpu_ms_per_request``：进程 CPU 时间除以请求数，包含压缩开销；
+- ``revalidate_304``：带上 ETag 再次请求 ``index.html`` 是否返回 304。
+
+模式：``dynamic-gzip``（没有预压缩文件，GZip 中间件逐请求压缩，即改动前的行为）、
+``precompressed-gzip``、``precompressed-br``（装了 ``brotli`` 才有）。没有构建产物时
+用 ``frontend/src`` 的源码拼出体量相近的合成包。预压缩模式首屏字节数多于
+动态 gzip 或 304 失效时脚本以非零码退出；CPU 只报告不设门槛（机器噪声大）。
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import re
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+import httpx
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "backend"))
+
+from starlette.applications import Starlette  # noqa: E402
+from starlette.middleware import Middleware  # noqa: E402
+from starlette.middleware.gzip import GZipMiddleware  # noqa: E402
+from starlette.requests import Request  # noqa: E402
+from starlette.responses import Response  # noqa: E402
+from starlette.routing import Mount, Route  # noqa: E402
+
+from static_serving import (  # noqa: E402
+    ImmutableStaticFiles,
+    PrecompressedAwareGZipMiddleware,
+    frontend_file_response,
+    has_precompressed_files,
+)
+from tools.precompress_static import brotli_compressor, precompress_directory  # noqa: E402
+
+ASSET_REFERENCE = re.compile(r"""(?:src|href)="/?(assets/[^"]+)\"""")
+
+
+def synthesize_dist(target: Path) -> None:
+    """没有构建产物时，用前端源码拼一个体量相近的 index.html + js/css 包。"""
+    sources = sorted((ROOT / "frontend" / "src").rglob("*"))
+    scripts = [path for path in sources if path.suffix in {".ts", ".vue", ".js"} and path.is_file()]
+    styles = [path for path in sources if path.suffix in {".css", ".scss"} and path.is_file()]
+    assets = target / "assets"
+    assets.mkdir(parents=True)
+    chunks: list[str] = []
+    for index in range(0, len(scripts), 40):
+        name = f"chunk-{index // 40:02d}-synthetic.js"
+        (assets / name).write_text(
+            "\n".join(path.read_text(encoding="utf-8", errors="replace") for path in scripts[index:index + 40]),
+            encoding="utf-8",
+        )
+        chunks.append(name)
+    (assets / "index-synthetic.css").write_text(
+        "\n".join(path.read_text(encoding="utf-8", errors="replace") for path in styles) or "body{margin:0}\n" * 200,
+        encoding="utf-8",
+    )
+    tags = "\n".join(f'    <script type="module" src="/assets/{name}"></script>' for name in chunks)
+    (target / "index.html").write_text(
+        "<!doctype html>\n<html lang=\"zh-CN\">\n  <head>\n    <meta charset=\"UTF-8\" />\n"
+        f"    <link rel=\"stylesheet\" href=\"/assets/index-synthetic.css\">\n{tags}\n"
+        "  </head>\n  <body><div id=\"app\"></div></body>\n</html>\n",
+        encoding="utf-8",
+    )
+
+
+def build_app(static_dir: Path, *, precompressed: bool) -> Any:
+    """与 ``main`` 相同的静态挂载；动态模式用原来的 ``GZipMiddleware``。"""
+    index_html = static_dir / "index.html"
+
+    async def serve_root(request: Request) -> Response:
+        return frontend_file_response(index_html, entrypoint=True, request_headers=request.headers)
+
+    routes = [
+        Mount("/assets", app=ImmutableStaticFiles(directory=static_dir / "assets")),
+        Route("/", serve_root),
+    ]
+    if precompressed:
+        bypass = ("/assets/",) if has_precompressed_files(static_dir / "assets") else ()
+        middleware = [Middleware(PrecompressedAwareGZipMiddleware, minimum_size=1000, bypass_prefixes=bypass)]
+    else:
+        middleware = [Middleware(GZipMiddleware, minimum_size=1000)]
+    return Starlette(routes=routes, middleware=middleware)
+
+
+async def first_load(client: httpx.AsyncClient, accept_encoding: str) -> tuple[int, int, str]:
+    headers = {"Accept-Encoding": accept_encoding}
+    index = await client.get("/", headers=headers)
+    index.raise_for_status()
+    total = index.num_bytes_downloaded
+    references = ASSET_REFERENCE.findall(index.text)
+    for reference in references:
+        response = await client.get(f"/{reference}", headers=headers)
+        response.raise_for_status()
+        total += response.num_bytes_downloaded
+    return total, 1 + len(references), index.headers.get("etag", "")
+
+
+async def measure(static_dir: Path, mode: str, accept_encoding: str, loads: int) -> dict[str, Any]:
+    app = build_app(static_dir, precompressed=mode != "dynamic-gzip")
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        load_bytes, requests, etag = await first_load(client, accept_encoding)
+        cpu_started = time.process_time()
+        wall_started = time.perf_counter()
+        for _ in range(loads):
+            await first_load(client, accept_encoding)
+        cpu_s = time.process_time() - cpu_started
+        wall_s = time.perf_counter() - wall_started
+        revalidate = await client.get("/", headers={"Accept-Encoding": accept_encoding, "If-None-Match": etag})
+    return {
+        "mode": mode,
+        "accept_encoding": accept_encoding,
+        "requests_per_load": requests,
+        "first_load_bytes": load_bytes,
+        "cpu_ms_per_request": round(cpu_s * 1000 / (loads * requests), 3),
+        "wall_ms_per_load": round(wall_s * 1000 / loads, 2),
+        "revalidate_304": revalidate.status_code == 304,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dist", type=Path, default=ROOT / "frontend" / "dist", help="前端构建产物目录")
+    parser.add_argument("--loads", type=int, default=30, help="每种模式重复的首屏加载次数")
+    parser.add_argument("--json", type=Path, help="把结果写入 JSON 文件")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="lingzhi-static-bench-") as temporary:
+        raw_dir = Path(temporary) / "raw"
+        if (args.dist / "index.html").exists():
+            shutil.copytree(args.dist, raw_dir)
+            source = str(args.dist)
+        else:
+            synthesize_dist(raw_dir)
+            source = "synthetic"
+        precompressed_dir = Path(temporary) / "precompressed"
+        shutil.copytree(raw_dir, precompressed_dir)
+        totals = precompress_directory(precompressed_dir)
+
+        plans = [("dynamic-gzip", raw_dir, "gzip, deflate, br"), ("precompressed-gzip", precompressed_dir, "gzip")]
+        if brotli_compressor() is not None:
+            plans.append(("precompressed-br", precompressed_dir, "gzip, deflate, br"))
+        rows = [asyncio.run(measure(directory, mode, accept, args.loads)) for mode, directory, accept in plans]
+
+    print(f"产物：{source}，预压缩 {totals['files']} 个文件，原始 {totals['identity_bytes']} 字节")
+    print(f"{'模式':<20}{'首屏字节':>12}{'CPU ms/请求':>14}{'ms/首屏':>10}{'304':>6}")
+    for row in rows:
+        print(
+            f"{row['mode']:<20}{row['first_load_bytes']:>12}{row['cpu_ms_per_request']:>14}"
+            f"{row['wall_ms_per_load']:>10}{'是' if row['revalidate_304'] else '否':>6}"
+        )
+    if args.json:
+        args.json.write_text(
+            json.dumps({"source": source, "precompress": totals, "rows": rows}, ensure_ascii=False, indent=2),
+            encoding="utf-8",
+        )
+    dynamic = rows[0]["first_load_bytes"]
+    healthy = all(
+        row["revalidate_304"] and row["first_load_bytes"] <= dynamic
+        for row in rows if row["mode"] != "dynamic-gzip"
+    )
+    return 0 if healthy else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
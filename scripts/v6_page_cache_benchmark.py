@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""度量 V6 课件按页渲染缓存对"改一页再导出 + 审计"的收益，并核对输出一致。
+
+**只读**：脚本在隔离的临时数据目录里合成课件，不读取也不写入任何真实课程数据。
+
+用法：
+
+    backend/.venv/bin/python scripts/v6_page_cache_benchmark.py
+    backend/.venv/bin/python scripts/v6_page_cache_benchmark.py --pages 40 --repeat 3 --json out.json
+
+合成课件沿用 ``tests/test_slide_deck_v6_rendering.py`` 里代码页夹具的编译路径
+（``compile_slide_deck_v6``），把编译出的页面复制到指定页数。度量三种做法：
+
+- 旧做法：整份导出，再用 ``audit_exported_pptx`` 审计每一页；
+- 冷缓存：第一次带页缓存导出（每页都渲染、审计并入缓存）；
+- 改一页：修改一页标题后带页缓存导出，只重新渲染、审计这一页，其余页从缓存拼装。
+
+改一页后的输出与不带缓存的整份导出逐页比对幻灯片 XML，审计结论也逐项比对；
+有任何不一致脚本以非零码退出。
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+ROOT = Path(__file__).resolve().parents[1]
+BACKEND = ROOT / "backend"
+
+# 必须在导入任何 backend 模块之前重定向数据目录：storage 在导入期就把根路径固化下来。
+_ISOLATED_DIR = tempfile.mkdtemp(prefix="lingzhi-benchmark-")
+os.environ.setdefault("LINGZHI_DATA_DIR", _ISOLATED_DIR)
+
+for module_root in (ROOT, BACKEND):
+    if str(module_root) not in sys.path:
+        sys.path.insert(0, str(module_root))
+
+from pptx import Presentation  # noqa: E402
+
+from course_document import (  # noqa: E402
+    CourseBlock,
+    CourseDocument,
+    CourseSection,
+    refresh_document_revision,
+)
+from course_presentation_graph import compile_course_presentation_graph  # noqa: E402
+from slide_deck_renderer import audit_exported_pptx  # noqa: E402
+from slide_deck_v6 import (  # noqa: E402
+    SlideDeckV6,
+    SlideStoryBatchV3,
+    SlideStoryPageV3,
+    SlideStoryPlanV3,
+    SlideVisualDecisionV2,
+    SlideVisualPlanV2,
+    compile_slide_deck_v6,
+)
+from slide_deck_v6_renderer import export_slide_deck_v6_pptx, render_slide_deck_v6_pptx  # noqa: E402
+from slide_page_render_cache import SlidePageRenderCache  # noqa: E402
+from template_layout_contract import compile_builtin_template_layout_contract_v1  # noqa: E402
+
+
+def synthetic_deck(page_count: int) -> SlideDeckV6:
+    """编译一页代码课件后复制到指定页数。文本取自渲染测试夹具，不取自任何真实课程。"""
+    document = refresh_document_revision(CourseDocument(
+        course_id="benchmark-v6-course",
+        title="Event-driven interaction",
+        sections=[CourseSection(section_id="chapter-1", title="Callbacks", position=0)],
+        blocks=[
+            CourseBlock(
+                block_id="condition",
+                section_id="chapter-1",
+                position=0,
+                role="concept",
+                payload={"markdown": "The handler runs only after the event is emitted."},
+            ),
+            CourseBlock(
+                block_id="implementation",
+                section_id="chapter-1",
+                position=1,
+                role="example",
+                kind="code",
+                payload={"markdown": "function onEvent(value) {\n  return validate(value);\n}"},
+            ),
+            CourseBlock(
+                block_id="result",
+                section_id="chapter-1",
+                position=2,
+                role="feedback",
+                payload={"markdown": "A rejected value remains visible with its validation reason."},
+            ),
+        ],
+    ))
+    graph = compile_course_presentation_graph(document, teaching_plan={})
+    template = compile_builtin_template_layout_contract_v1("qizhi-classroom")
+    unit = graph.units[0]
+    layout_id = template.layout_id("evidence-code")
+    story = SlideStoryPlanV3(
+        source_document_revision=document.document_revision,
+        template_digest=template.template_digest,
+        batches=[SlideStoryBatchV3(
+            batch_id="story-1",
+            chapter_id="chapter-1",
+            provider="benchmark",
+            model="benchmark",
+            duration_ms=1,
+            attempts=1,
+            validation_status="passed",
+            pages=[SlideStoryPageV3(
+                page_id="page-code",
+                teaching_unit_id=unit.teaching_unit_id,
+                template_layout_id=layout_id,
+                title="Connect the event to observable feedback",
+                source_block_ids=unit.primary_block_ids,
+                page_ordinal=0,
+            )],
+        )],
+    )
+    visual = SlideVisualPlanV2(
+        source_document_revision=document.document_revision,
+        template_digest=template.template_digest,
+        decisions=[SlideVisualDecisionV2(
+            page_id="page-code",
+            decision="code",
+            source_block_ids=unit.primary_block_ids,
+            resolved_template_layout_id=layout_id,
+        )],
+    )
+    deck = compile_slide_deck_v6(document, graph, story, visual, template)
+    deck.pages = [
+        deck.pages[0].model_copy(deep=True, update={"page_id": f"page-{index}", "page_ordinal": index})
+        for index in range(page_count)
+    ]
+    return deck
+
+
+def _timed(fn: Callable[[], Any], repeat: int) -> tuple[float, Any]:
+    samples = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples), result
+
+
+def run(page_count: int, repeat: int, work_dir: Path) -> dict[str, Any]:
+    deck = synthetic_deck(page_count)
+    full_path = work_dir / "full.pptx"
+    cached_path = work_dir / "cached.pptx"
+
+    def full() -> dict[str, Any]:
+        export_slide_deck_v6_pptx(deck, full_path)
+        return audit_exported_pptx(full_path, expected_slide_count=page_count)
+
+    def cached(cache: SlidePageRenderCache) -> tuple[Any, dict[str, Any]]:
+        exported = render_slide_deck_v6_pptx(deck, cached_path, page_cache=cache)
+        review = audit_exported_pptx(
+            cached_path,
+            expected_slide_count=page_count,
+            page_issues=exported.page_issues,
+        )
+        return exported, review
+
+    cold_samples = []
+    edit_samples = []
+    edit_result = None
+    edited_page = deck.pages[page_count // 2]
+    for attempt in range(repeat):
+        deck.pages[page_count // 2] = edited_page
+        cache = SlidePageRenderCache()
+        started = time.perf_counter()
+        cached(cache)
+        cold_samples.append((time.perf_counter() - started) * 1000)
+        deck.pages[page_count // 2] = edited_page.model_copy(
+            update={"title": f"Trace the validated value back to its event ({attempt + 1})"},
+        )
+        started = time.perf_counter()
+        edit_result = cached(cache)
+        edit_samples.append((time.perf_counter() - started) * 1000)
+
+    full_ms, full_review = _timed(full, repeat)
+    exported, review = edit_result
+    identical = (
+        [slide.part.blob for slide in Presentation(cached_path).slides]
+        == [slide.part.blob for slide in Presentation(full_path).slides]
+        and review == full_review
+    )
+    return {
+        "pages": page_count,
+        "identical": identical,
+        "rendered_pages": len(exported.rendered_page_ids),
+        "reused_pages": len(exported.reused_page_ids),
+        "full_export_audit_ms": round(full_ms, 2),
+        "cold_cache_ms": round(statistics.median(cold_samples), 2),
+        "one_page_edit_ms": round(statistics.median(edit_samples), 2),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, nargs="*", default=[10, 40])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", type=Path, help="把结果写入 JSON 文件")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="lingzhi-v6-page-cache-") as work_dir:
+        rows = [run(count, args.repeat, Path(work_dir)) for count in args.pages]
+    print(f"{'页数':>6}{'一致':>6}{'重渲染':>8}{'复用':>6}{'整份导出+审计ms':>18}{'冷缓存ms':>12}{'改一页ms':>12}")
+    for row in rows:
+        print(
+            f"{row['pages']:>6}{'是' if row['identical'] else '否':>6}"
+            f"{row['rendered_pages']:>8}{row['reused_pages']:>6}"
+            f"{row['full_export_audit_ms']:>18}{row['cold_cache_ms']:>12}{row['one_page_edit_ms']:>12}"
+        )
+    if args.json:
+        args.json.write_text(json.dumps(rows, ensure_ascii=False, indent=2), encoding="utf-8")
+    return 0 if all(row["identical"] for row in rows) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,33 @@
+"""``/metrics`` 端点：Prometheus 文本格式与可选的抓取令牌。"""
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+
+@pytest.fixture
+async def client():
+    from main import app
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as api:
+        yield api
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_serves_prometheus_text(client):
+    response = await client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert "# TYPE lingzhi_llm_request_duration_seconds histogram" in response.text
+    assert "# TYPE lingzhi_provider_concurrency_limit gauge" in response.text
+    assert "lingzhi_task_queue_depth" in response.text
+    assert "lingzhi_websocket_connections" in response.text
+
+
+@pytest.mark.asyncio
+async def test_metrics_token_is_required_when_configured(client, monkeypatch):
+    monkeypatch.setenv("LINGZHI_METRICS_TOKEN", "scrape-secret")
+
+    assert (await client.get("/metrics")).status_code == 401
+    authorized = await client.get("/metrics", headers={"Authorization": "Bearer scrape-secret"})
+    assert authorized.status_code == 200
@@ -1,3 +1,5 @@
+import gzip
+import os
 from pathlib import Path
 
 import pytest
@@ -6,11 +8,17 @@ from starlette.applications import Starlette
 from starlette.routing import Mount
 
 from static_serving import (
+    COMPRESSIBLE_SUFFIXES,
     ENTRYPOINT_HEADERS,
     IMMUTABLE_ASSET_CACHE_CONTROL,
     ImmutableStaticFiles,
+    PrecompressedAwareGZipMiddleware,
+    accepted_encodings,
     frontend_file_response,
+    has_precompressed_files,
 )
+from tools import precompress_static
+from tools.precompress_static import precompress_directory
 
 
 def test_entrypoint_is_never_reused_without_validation(tmp_path: Path):
@@ -37,3 +45,117 @@ async def test_hashed_assets_are_cached_as_immutable(tmp_path: Path):
 
     assert response.status_code == 200
     assert response.headers["cache-control"] == IMMUTABLE_ASSET_CACHE_CONTROL
+
+
+def _build_assets(directory: Path) -> Path:
+    asset = directory / "index-buildhash.js"
+    asset.write_text("console.log('lingzhi');\n" * 200, encoding="utf-8")
+    precompress_directory(directory)
+    return asset
+
+
+def _asset_client(directory: Path) -> AsyncClient:
+    app = Starlette(routes=[Mount("/", app=ImmutableStaticFiles(directory=directory))])
+    return AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+
+
+def test_accepted_encodings_honours_quality_values():
+    assert accepted_encodings("gzip, deflate, br") == {"gzip", "deflate", "br"}
+    assert accepted_encodings("br;q=0, gzip;q=0.5") == {"gzip"}
+    assert accepted_encodings("*") >= {"br", "gzip"}
+    assert accepted_encodings("*, gzip;q=0") >= {"br"}
+    assert "gzip" not in accepted_encodings("*, gzip;q=0")
+    assert accepted_encodings("") == frozenset()
+
+
+def test_precompress_skips_small_files_and_keeps_source_mtime(tmp_path: Path):
+    asset = _build_assets(tmp_path)
+    (tmp_path / "tiny.css").write_text("a{}", encoding="utf-8")
+    (tmp_path / "logo.png").write_bytes(b"\x89PNG" * 500)
+
+    totals = precompress_directory(tmp_path)
+
+    variant = tmp_path / "index-buildhash.js.gz"
+    assert gzip.decompress(variant.read_bytes()) == asset.read_bytes()
+    assert variant.stat().st_mtime_ns == asset.stat().st_mtime_ns
+    assert not (tmp_path / "tiny.css.gz").exists()
+    assert not (tmp_path / "logo.png.gz").exists()
+    assert totals["files"] == 1
+    assert totals["gzip_bytes"] < totals["identity_bytes"]
+    assert COMPRESSIBLE_SUFFIXES == precompress_static.COMPRESSIBLE_SUFFIXES
+    assert has_precompressed_files(tmp_path)
+
+
+@pytest.mark.asyncio
+async def test_assets_serve_precompressed_variant_with_vary(tmp_path: Path):
+    asset = _build_assets(tmp_path)
+
+    async with _asset_client(tmp_path) as client:
+        response = await client.get("/index-buildhash.js", headers={"Accept-Encoding": "gzip"})
+        revalidated = await client.get(
+            "/index-buildhash.js",
+            headers={"Accept-Encoding": "gzip", "If-None-Match": response.headers["etag"]},
+        )
+        identity = await client.get("/index-buildhash.js", headers={"Accept-Encoding": "identity"})
+
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.headers["content-type"].startswith("text/javascript")
+    assert response.headers["cache-control"] == IMMUTABLE_ASSET_CACHE_CONTROL
+    assert int(response.headers["content-length"]) < asset.stat().st_size
+    assert response.content == asset.read_bytes()
+    assert revalidated.status_code == 304
+    assert identity.status_code == 200
+    assert "content-encoding" not in identity.headers
+    assert identity.headers["vary"] == "Accept-Encoding"
+    assert identity.content == asset.read_bytes()
+
+
+@pytest.mark.asyncio
+async def test_stale_variant_is_ignored(tmp_path: Path):
+    asset = _build_assets(tmp_path)
+    asset.write_text("console.log('rebuilt');\n" * 200, encoding="utf-8")
+    newer = asset.stat().st_mtime_ns + 5_000_000_000
+    os.utime(asset, ns=(newer, newer))
+
+    async with _asset_client(tmp_path) as client:
+        response = await client.get("/index-buildhash.js", headers={"Accept-Encoding": "gzip"})
+
+    assert response.status_code == 200
+    assert response.content == asset.read_bytes()
+
+
+def test_entrypoint_has_strong_etag_and_answers_304(tmp_path: Path):
+    index_html = tmp_path / "index.html"
+    index_html.write_text("<div id=\"app\"></div>" * 100, encoding="utf-8")
+    precompress_directory(tmp_path)
+
+    plain = frontend_file_response(index_html, entrypoint=True)
+    encoded = frontend_file_response(index_html, entrypoint=True, request_headers={"accept-encoding": "gzip"})
+    revalidated = frontend_file_response(
+        index_html, entrypoint=True, request_headers={"if-none-match": plain.headers["etag"]},
+    )
+
+    assert not plain.headers["etag"].startswith("W/")
+    assert plain.headers["etag"] == frontend_file_response(index_html, entrypoint=True).headers["etag"]
+    assert encoded.headers["content-encoding"] == "gzip"
+    assert encoded.headers["etag"] != plain.headers["etag"]
+    assert plain.headers["vary"] == "Accept-Encoding"
+    assert revalidated.status_code == 304
+    assert revalidated.headers["cache-control"] == ENTRYPOINT_HEADERS["Cache-Control"]
+
+
+@pytest.mark.asyncio
+async def test_gzip_middleware_bypasses_precompressed_prefix():
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/plain")]})
+        await send({"type": "http.response.body", "body": b"x" * 5000})
+
+    middleware = PrecompressedAwareGZipMiddleware(app, minimum_size=1000, bypass_prefixes=("/assets/",))
+    async with AsyncClient(transport=ASGITransport(app=middleware), base_url="http://test") as client:
+        asset = await client.get("/assets/a.js", headers={"Accept-Encoding": "gzip"})
+        api = await client.get("/api/x", headers={"Accept-Encoding": "gzip"})
+
+    assert "content-encoding" not in asset.headers
+    assert api.headers["content-encoding"] == "gzip"
@@ -93,3 +93,32 @@ async def test_clear_invalid_task_records_can_be_scoped_to_course(client, task_m
         "invalid",
         course_id="course-1",
     )
+
+
+@pytest.mark.asyncio
+async def test_generation_bill_is_readable_while_the_task_runs(client, task_manager):
+    import generation_telemetry
+
+    task_manager.get_task_summary.return_value = {"task_id": "task-bill", "status": "running"}
+    with generation_telemetry.stage("正文生成", task_id="task-bill"):
+        generation_telemetry.record_call(
+            model_id="writer", status="completed", stream=True, duration_ms=1200, input_tokens=900,
+        )
+    assert generation_telemetry.flush()
+
+    response = await client.get("/api/tasks/task-bill/generation-bill")
+
+    assert response.status_code == 200
+    payload = response.json()
+    assert payload["task_status"] == "running"
+    assert payload["bill"]["calls"] == 1
+    assert payload["bill"]["stages"]["正文生成"]["input_tokens"] == 900
+
+
+@pytest.mark.asyncio
+async def test_generation_bill_for_unknown_task_returns_404(client, task_manager):
+    task_manager.get_task_summary.return_value = None
+
+    response = await client.get("/api/tasks/never-ran/generation-bill")
+
+    assert response.status_code == 404